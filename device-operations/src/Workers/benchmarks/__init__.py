@@ -0,0 +1,77 @@
+"""
+Benchmarks Package for SDXL Workers System
+==========================================
+
+This package contains end-to-end performance benchmarks that drive real
+requests through the worker interface using tiny random-weight models.
+"""
+
+from .benchmark_inference import (
+    BenchmarkConfiguration,
+    InferenceBenchmark,
+    build_tiny_sdxl_pipeline,
+    run_inference_benchmark
+)
+from .benchmark_inpaint_crop import (
+    InpaintCropBenchmarkConfiguration,
+    InpaintCropBenchmark,
+    run_inpaint_crop_benchmark
+)
+from .benchmark_mmap_loading import (
+    MmapLoadingBenchmarkConfiguration,
+    MmapLoadingBenchmark,
+    run_mmap_loading_benchmark
+)
+from .benchmark_lora_switching import (
+    LoRASwitchingBenchmarkConfiguration,
+    LoRASwitchingBenchmark,
+    run_lora_switching_benchmark
+)
+from .benchmark_multi_lora import (
+    MultiLoRABenchmarkConfiguration,
+    MultiLoRABenchmark,
+    run_multi_lora_benchmark
+)
+from .benchmark_model_hashing import (
+    ModelHashingBenchmarkConfiguration,
+    ModelHashingBenchmark,
+    run_model_hashing_benchmark
+)
+from .benchmark_session_store import (
+    SessionStoreBenchmarkConfiguration,
+    SessionStoreBenchmark,
+    run_session_store_benchmark
+)
+from .benchmark_onnx_backend import (
+    ONNXBackendBenchmarkConfiguration,
+    ONNXBackendBenchmark,
+    run_onnx_backend_benchmark
+)
+
+__all__ = [
+    "BenchmarkConfiguration",
+    "InferenceBenchmark",
+    "build_tiny_sdxl_pipeline",
+    "run_inference_benchmark",
+    "InpaintCropBenchmarkConfiguration",
+    "InpaintCropBenchmark",
+    "run_inpaint_crop_benchmark",
+    "MmapLoadingBenchmarkConfiguration",
+    "MmapLoadingBenchmark",
+    "run_mmap_loading_benchmark",
+    "LoRASwitchingBenchmarkConfiguration",
+    "LoRASwitchingBenchmark",
+    "run_lora_switching_benchmark",
+    "MultiLoRABenchmarkConfiguration",
+    "MultiLoRABenchmark",
+    "run_multi_lora_benchmark",
+    "ModelHashingBenchmarkConfiguration",
+    "ModelHashingBenchmark",
+    "run_model_hashing_benchmark",
+    "SessionStoreBenchmarkConfiguration",
+    "SessionStoreBenchmark",
+    "run_session_store_benchmark",
+    "ONNXBackendBenchmarkConfiguration",
+    "ONNXBackendBenchmark",
+    "run_onnx_backend_benchmark"
+]
@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Inference Benchmark for SDXL Workers System
+===========================================
+
+End-to-end CPU benchmark that builds tiny random-weight SDXL-shaped models
+(UNet, VAE, both text encoders) and sends real requests through
+`WorkersInterface.process_request`. Reports per-stage latency, images/sec
+per batch size and peak RSS as JSON, and can gate against a baseline file.
+With --cpu-performance it also applies the cpu_performance optimization
+profile and reports step time before and after; with --backends torch onnx
+it compares the torch and ONNX Runtime execution backends side by side.
+
+Usage (from device-operations/src):
+    python -m Workers.benchmarks.benchmark_inference --output results.json
+    python -m Workers.benchmarks.benchmark_inference --baseline results.json --tolerance 0.15
+    python -m Workers.benchmarks.benchmark_inference --cpu-performance --torch-compile
+    python -m Workers.benchmarks.benchmark_inference --backends torch onnx
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import torch
+from diffusers import AutoencoderKL, EulerDiscreteScheduler, StableDiffusionXLPipeline, UNet2DConditionModel
+from transformers import CLIPTextConfig, CLIPTextModel, CLIPTextModelWithProjection, CLIPTokenizer
+from transformers.models.clip.tokenization_clip import bytes_to_unicode
+
+logger = logging.getLogger(__name__)
+
+STAGES = ["tokenize", "encode", "steps", "decode", "postprocess", "serialize"]
+
+
+@dataclass
+class BenchmarkConfiguration:
+    """Configuration for an inference benchmark run."""
+    batch_sizes: List[int] = field(default_factory=lambda: [1, 2, 4])
+    iterations: int = 5
+    warmup_iterations: int = 1
+    steps: int = 4
+    width: int = 64
+    height: int = 64
+    guidance_scale: float = 5.0
+    prompt: str = "a tiny benchmark prompt"
+    seed: int = 0
+    num_threads: Optional[int] = None
+    tokenizer_path: Optional[str] = None
+    cpu_performance: bool = False
+    torch_compile: bool = False
+    backends: List[str] = field(default_factory=lambda: ["torch"])
+
+    def __post_init__(self):
+        """Validate configuration."""
+        if not self.batch_sizes or any(size < 1 for size in self.batch_sizes):
+            raise ValueError("batch_sizes must contain positive integers")
+        if self.iterations < 1:
+            raise ValueError("iterations must be at least 1")
+        if self.warmup_iterations < 0:
+            raise ValueError("warmup_iterations cannot be negative")
+        if self.width % 8 != 0 or self.height % 8 != 0:
+            raise ValueError("width and height must be multiples of 8")
+        if not self.backends or any(backend not in ("torch", "onnx") for backend in self.backends):
+            raise ValueError("backends must be a non-empty subset of ['torch', 'onnx']")
+        if self.cpu_performance and len(self.backends) > 1:
+            raise ValueError("cpu_performance comparison runs on a single backend")
+
+
+def _build_tiny_tokenizer(directory: Path) -> CLIPTokenizer:
+    """Build a byte-level CLIP tokenizer with no merges, so no download is needed."""
+    characters = list(bytes_to_unicode().values())
+    vocab: Dict[str, int] = {}
+    for character in characters:
+        vocab[character] = len(vocab)
+    for character in characters:
+        vocab[f"{character}</w>"] = len(vocab)
+    vocab["<|startoftext|>"] = len(vocab)
+    vocab["<|endoftext|>"] = len(vocab)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    vocab_file = directory / "vocab.json"
+    merges_file = directory / "merges.txt"
+    vocab_file.write_text(json.dumps(vocab), encoding="utf-8")
+    merges_file.write_text("#version: 0.2\n", encoding="utf-8")
+
+    return CLIPTokenizer(str(vocab_file), str(merges_file), model_max_length=77)
+
+
+def build_tiny_sdxl_pipeline(seed: int = 0, tokenizer_path: Optional[str] = None,
+                             work_dir: Optional[str] = None) -> StableDiffusionXLPipeline:
+    """
+    Build an SDXL-shaped pipeline with tiny random weights on CPU.
+
+    The layout matches SDXL (two text encoders, text_time added conditioning,
+    cross-attention over concatenated hidden states) so every code path of
+    the real pipeline runs, only with small tensors.
+    """
+    torch.manual_seed(seed)
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=2,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        attention_head_dim=(2, 4),
+        use_linear_projection=True,
+        addition_embed_type="text_time",
+        addition_time_embed_dim=8,
+        transformer_layers_per_block=(1, 2),
+        projection_class_embeddings_input_dim=80,  # 6 * 8 time ids + 32 pooled
+        cross_attention_dim=64,
+        norm_num_groups=1
+    )
+
+    scheduler = EulerDiscreteScheduler(
+        beta_start=0.00085,
+        beta_end=0.012,
+        steps_offset=1,
+        beta_schedule="scaled_linear",
+        timestep_spacing="leading"
+    )
+
+    torch.manual_seed(seed)
+    vae = AutoencoderKL(
+        block_out_channels=[32, 64],
+        in_channels=3,
+        out_channels=3,
+        down_block_types=["DownEncoderBlock2D", "DownEncoderBlock2D"],
+        up_block_types=["UpDecoderBlock2D", "UpDecoderBlock2D"],
+        latent_channels=4,
+        sample_size=128
+    )
+
+    text_encoder_config = CLIPTextConfig(
+        bos_token_id=0,
+        eos_token_id=2,
+        hidden_size=32,
+        intermediate_size=37,
+        layer_norm_eps=1e-05,
+        num_attention_heads=4,
+        num_hidden_layers=5,
+        pad_token_id=1,
+        vocab_size=1000,
+        hidden_act="gelu",
+        projection_dim=32
+    )
+    torch.manual_seed(seed)
+    text_encoder = CLIPTextModel(text_encoder_config)
+    torch.manual_seed(seed)
+    text_encoder_2 = CLIPTextModelWithProjection(text_encoder_config)
+
+    if tokenizer_path:
+        tokenizer = CLIPTokenizer.from_pretrained(tokenizer_path)
+    else:
+        tokenizer = _build_tiny_tokenizer(Path(work_dir or tempfile.mkdtemp()) / "tokenizer")
+
+    pipeline = StableDiffusionXLPipeline(
+        vae=vae,
+        text_encoder=text_encoder,
+        text_encoder_2=text_encoder_2,
+        tokenizer=tokenizer,
+        tokenizer_2=tokenizer,
+        unet=unet,
+        scheduler=scheduler,
+        add_watermarker=False
+    )
+    pipeline.to("cpu")
+    pipeline.set_progress_bar_config(disable=True)
+    return pipeline
+
+
+def _get_peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+
+    try:
+        import psutil
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, "peak_wset", memory_info.rss) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class InferenceBenchmark:
+    """
+    End-to-end inference benchmark through the full instructor stack.
+
+    Registers a tiny pipeline with the SDXL worker and issues
+    `inference.text2img` requests via `WorkersInterface.process_request`.
+    """
+
+    def __init__(self, config: BenchmarkConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.interface = None
+        self.work_dir = Path(tempfile.mkdtemp(prefix="sdxl_benchmark_"))
+
+    async def setup(self) -> None:
+        """Initialize the worker interface and register the tiny pipeline."""
+        from ..interface_main import WorkersInterface
+
+        if self.config.num_threads:
+            torch.set_num_threads(self.config.num_threads)
+
+        self.interface = WorkersInterface({
+            "inference": {
+                "max_batch_size": max(self.config.batch_sizes),
+                "output_path": str(self.work_dir / "outputs"),
+                "preview": {"method": "none"},
+                "cpu_torch_compile": self.config.torch_compile,
+                "compile_cache_dir": str(self.work_dir / "inductor_cache"),
+                "onnx": {"cache_dir": str(self.work_dir / "onnx_cache"), "providers": ["CPUExecutionProvider"]}
+            }
+        })
+        if not await self.interface.initialize():
+            raise RuntimeError("Failed to initialize workers interface")
+
+        pipeline = build_tiny_sdxl_pipeline(
+            seed=self.config.seed,
+            tokenizer_path=self.config.tokenizer_path,
+            work_dir=str(self.work_dir)
+        )
+        sdxl_worker = self.interface.inference_instructor.inference_interface.sdxl_worker
+        # The benchmark runs its own warmup iterations per shape
+        await sdxl_worker.load_pipeline("tiny-sdxl", pipeline, warmup=False)
+
+    async def _run_request(self, batch_size: int, index: int, backend: str = "torch") -> Dict[str, Any]:
+        """Send one text2img request and return its result data."""
+        response = await self.interface.process_request({
+            "request_id": f"benchmark-{backend}-{batch_size}-{index}",
+            "type": "inference.text2img",
+            "data": {
+                "model_name": "tiny-sdxl",
+                "prompt": self.config.prompt,
+                "num_images": batch_size,
+                "steps": self.config.steps,
+                "width": self.config.width,
+                "height": self.config.height,
+                "guidance_scale": self.config.guidance_scale,
+                "seed": self.config.seed,
+                "backend": backend
+            }
+        })
+        data = response.get("data") or {}
+        if not response.get("success") or "error" in data:
+            raise RuntimeError(f"Benchmark request failed: {response.get('error') or data.get('error')}")
+        return data
+
+    async def run_batch_size(self, batch_size: int, backend: str = "torch") -> Dict[str, Any]:
+        """Benchmark a single batch size."""
+        # Warmup also triggers ONNX export for this shape bucket
+        for index in range(self.config.warmup_iterations):
+            await self._run_request(batch_size, -1 - index, backend)
+
+        latencies: List[float] = []
+        stage_samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        images = 0
+        for index in range(self.config.iterations):
+            start_time = time.perf_counter()
+            data = await self._run_request(batch_size, index, backend)
+            latencies.append(time.perf_counter() - start_time)
+            images += len(data.get("images", []))
+            for stage, seconds in data.get("stage_timings", {}).items():
+                stage_samples.setdefault(stage, []).append(seconds)
+
+        total_time = sum(latencies)
+        return {
+            "batch_size": batch_size,
+            "backend": backend,
+            "iterations": self.config.iterations,
+            "latency_ms": {
+                "mean": total_time / len(latencies) * 1000,
+                "p50": _percentile(latencies, 50) * 1000,
+                "p95": _percentile(latencies, 95) * 1000
+            },
+            "stage_latency_ms": {
+                stage: sum(samples) / len(samples) * 1000
+                for stage, samples in stage_samples.items() if samples
+            },
+            "images_per_sec": images / total_time if total_time > 0 else 0.0,
+            "peak_rss_mb": _get_peak_rss_mb()
+        }
+
+    async def run_all_batch_sizes(self, backend: str = "torch") -> List[Dict[str, Any]]:
+        """Benchmark every configured batch size."""
+        results = []
+        for batch_size in self.config.batch_sizes:
+            self.logger.info("Benchmarking batch size %d (%s)...", batch_size, backend)
+            results.append(await self.run_batch_size(batch_size, backend))
+        return results
+
+    async def compare_backends(self) -> Dict[str, Any]:
+        """Benchmark every configured backend and report latency relative to the first."""
+        backend_results = {}
+        for backend in self.config.backends:
+            backend_results[backend] = await self.run_all_batch_sizes(backend)
+
+        reference = self.config.backends[0]
+        speedup = {}
+        for backend, results in backend_results.items():
+            if backend == reference:
+                continue
+            speedup[backend] = {
+                str(result["batch_size"]): base["latency_ms"]["mean"] / result["latency_ms"]["mean"]
+                for base, result in zip(backend_results[reference], results)
+                if result["latency_ms"]["mean"] > 0
+            }
+
+        return {
+            "reference_backend": reference,
+            "results": backend_results,
+            "latency_speedup": speedup
+        }
+
+    async def apply_cpu_performance(self) -> Dict[str, Any]:
+        """Apply the cpu_performance profile to the benchmark pipeline."""
+        response = await self.interface.process_request({
+            "request_id": "benchmark-optimize",
+            "type": "inference.optimize_pipeline",
+            "data": {"optimization_target": "cpu_performance", "model_name": "tiny-sdxl"}
+        })
+        if not response.get("success"):
+            raise RuntimeError(f"Failed to apply cpu_performance profile: {response.get('error')}")
+        return response["data"]
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the benchmark across all configured batch sizes."""
+        await self.setup()
+        try:
+            cpu_performance = None
+            backend_comparison = None
+            if len(self.config.backends) > 1:
+                backend_comparison = await self.compare_backends()
+                results = backend_comparison["results"][self.config.backends[0]]
+            elif self.config.cpu_performance:
+                baseline_results = await self.run_all_batch_sizes(self.config.backends[0])
+                profile = await self.apply_cpu_performance()
+                results = await self.run_all_batch_sizes(self.config.backends[0])
+                cpu_performance = {
+                    "profile": profile,
+                    "baseline_results": baseline_results,
+                    "steps_speedup": {
+                        str(after["batch_size"]): before["stage_latency_ms"]["steps"] / after["stage_latency_ms"]["steps"]
+                        for before, after in zip(baseline_results, results)
+                        if before["stage_latency_ms"].get("steps") and after["stage_latency_ms"].get("steps")
+                    }
+                }
+            else:
+                results = await self.run_all_batch_sizes(self.config.backends[0])
+
+            return {
+                "benchmark": "inference_text2img_cpu",
+                "timestamp": time.time(),
+                "environment": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "torch": torch.__version__,
+                    "torch_threads": torch.get_num_threads(),
+                    "cpu_count": os.cpu_count()
+                },
+                "config": asdict(self.config),
+                "results": results,
+                "cpu_performance": cpu_performance,
+                "backend_comparison": backend_comparison,
+                "peak_rss_mb": _get_peak_rss_mb()
+            }
+        finally:
+            await self.interface.cleanup()
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any],
+                        tolerance: float = 0.1) -> List[str]:
+    """
+    Compare a report against a baseline report.
+
+    Returns a list of regression descriptions; throughput may not drop and
+    mean latency may not grow by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    baseline_results = {result["batch_size"]: result for result in baseline.get("results", [])}
+
+    for result in report.get("results", []):
+        previous = baseline_results.get(result["batch_size"])
+        if previous is None:
+            continue
+
+        if result["images_per_sec"] < previous["images_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"batch {result['batch_size']}: images/sec {result['images_per_sec']:.2f} "
+                f"< baseline {previous['images_per_sec']:.2f}"
+            )
+        if result["latency_ms"]["mean"] > previous["latency_ms"]["mean"] * (1 + tolerance):
+            regressions.append(
+                f"batch {result['batch_size']}: mean latency {result['latency_ms']['mean']:.1f}ms "
+                f"> baseline {previous['latency_ms']['mean']:.1f}ms"
+            )
+
+    return regressions
+
+
+async def run_inference_benchmark(config: Optional[BenchmarkConfiguration] = None) -> Dict[str, Any]:
+    """Run the inference benchmark and return the JSON-serializable report."""
+    return await InferenceBenchmark(config or BenchmarkConfiguration()).run()
+
+
+def main() -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="End-to-end CPU inference benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--size", type=int, default=64, help="Image width and height")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--tokenizer", default=None, help="Optional pretrained CLIP tokenizer path")
+    parser.add_argument("--cpu-performance", action="store_true",
+                        help="Benchmark before and after applying the cpu_performance profile")
+    parser.add_argument("--torch-compile", action="store_true",
+                        help="Include torch.compile in the cpu_performance profile")
+    parser.add_argument("--backends", nargs="+", default=["torch"], choices=["torch", "onnx"],
+                        help="Execution backends to benchmark; more than one runs a side-by-side comparison")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON report to gate against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = BenchmarkConfiguration(
+        batch_sizes=args.batch_sizes,
+        iterations=args.iterations,
+        warmup_iterations=args.warmup,
+        steps=args.steps,
+        width=args.size,
+        height=args.size,
+        num_threads=args.threads,
+        tokenizer_path=args.tokenizer,
+        cpu_performance=args.cpu_performance,
+        torch_compile=args.torch_compile,
+        backends=args.backends
+    )
+    report = asyncio.run(run_inference_benchmark(config))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for regression in regressions:
+            logger.error("Regression: %s", regression)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
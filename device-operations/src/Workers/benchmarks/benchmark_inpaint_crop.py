@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Inpainting Crop Benchmark for SDXL Workers System
+=================================================
+
+Measures how much denoising time crop-to-mask inpainting saves as a
+function of mask area. For each mask area a centered square mask is
+inpainted twice through `WorkersInterface.process_request`: once on the
+full frame and once with `crop_to_mask`, using tiny random-weight
+SDXL-shaped models on CPU.
+
+Usage (from device-operations/src):
+    python -m Workers.benchmarks.benchmark_inpaint_crop --output inpaint_crop.json
+    python -m Workers.benchmarks.benchmark_inpaint_crop --size 512 --mask-areas 0.01 0.05 0.25
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import torch
+from diffusers import StableDiffusionXLInpaintPipeline
+from PIL import Image
+
+from .benchmark_inference import build_tiny_sdxl_pipeline, _get_peak_rss_mb
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class InpaintCropBenchmarkConfiguration:
+    """Configuration for the crop-to-mask inpainting benchmark."""
+    mask_areas: List[float] = field(default_factory=lambda: [0.01, 0.05, 0.1, 0.25, 0.5])
+    size: int = 256
+    iterations: int = 3
+    warmup_iterations: int = 1
+    steps: int = 4
+    padding: int = 16
+    feather: int = 4
+    guidance_scale: float = 5.0
+    prompt: str = "a tiny benchmark prompt"
+    seed: int = 0
+    num_threads: Optional[int] = None
+    tokenizer_path: Optional[str] = None
+
+    def __post_init__(self):
+        """Validate configuration."""
+        if not self.mask_areas or any(not 0 < area <= 1 for area in self.mask_areas):
+            raise ValueError("mask_areas must be fractions in (0, 1]")
+        if self.size % 8 != 0:
+            raise ValueError("size must be a multiple of 8")
+        if self.iterations < 1:
+            raise ValueError("iterations must be at least 1")
+        if self.warmup_iterations < 0:
+            raise ValueError("warmup_iterations cannot be negative")
+
+
+def _encode_png(image: Image.Image) -> str:
+    """Encode a PIL image as base64 PNG."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _make_square_mask(size: int, area: float) -> Image.Image:
+    """Centered square mask covering `area` of a size x size frame."""
+    side = max(1, int(round(size * area ** 0.5)))
+    offset = (size - side) // 2
+    mask = Image.new("L", (size, size), 0)
+    mask.paste(255, (offset, offset, offset + side, offset + side))
+    return mask
+
+
+class InpaintCropBenchmark:
+    """
+    Full-frame versus crop-to-mask inpainting through the instructor stack.
+
+    Registers a tiny SDXL inpainting pipeline and issues
+    `inference.inpainting` requests with and without `crop_to_mask`.
+    """
+
+    def __init__(self, config: InpaintCropBenchmarkConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.interface = None
+        self.work_dir = Path(tempfile.mkdtemp(prefix="sdxl_inpaint_benchmark_"))
+        self.image_b64 = ""
+
+    async def setup(self) -> None:
+        """Initialize the worker interface and register the tiny inpainting pipeline."""
+        from ..interface_main import WorkersInterface
+
+        if self.config.num_threads:
+            torch.set_num_threads(self.config.num_threads)
+
+        self.interface = WorkersInterface({
+            "inference": {
+                "output_path": str(self.work_dir / "outputs"),
+                "preview": {"method": "none"}
+            }
+        })
+        if not await self.interface.initialize():
+            raise RuntimeError("Failed to initialize workers interface")
+
+        base = build_tiny_sdxl_pipeline(
+            seed=self.config.seed,
+            tokenizer_path=self.config.tokenizer_path,
+            work_dir=str(self.work_dir)
+        )
+        pipeline = StableDiffusionXLInpaintPipeline(**base.components)
+        sdxl_worker = self.interface.inference_instructor.inference_interface.sdxl_worker
+        # The benchmark runs its own warmup iterations per shape
+        await sdxl_worker.load_pipeline("tiny-sdxl-inpaint", pipeline, warmup=False)
+
+        rng = np.random.default_rng(self.config.seed)
+        pixels = rng.integers(0, 256, (self.config.size, self.config.size, 3), dtype=np.uint8)
+        self.image_b64 = _encode_png(Image.fromarray(pixels))
+
+    async def _run_request(self, mask_b64: str, crop_to_mask: bool, index: int) -> Dict[str, Any]:
+        """Send one inpainting request and return its result data."""
+        response = await self.interface.process_request({
+            "request_id": f"benchmark-inpaint-{'crop' if crop_to_mask else 'full'}-{index}",
+            "type": "inference.inpainting",
+            "data": {
+                "model_name": "tiny-sdxl-inpaint",
+                "prompt": self.config.prompt,
+                "image": self.image_b64,
+                "mask_image": mask_b64,
+                "width": self.config.size,
+                "height": self.config.size,
+                "steps": self.config.steps,
+                "strength": 1.0,
+                "guidance_scale": self.config.guidance_scale,
+                "seed": self.config.seed,
+                "crop_to_mask": crop_to_mask,
+                "crop_padding": self.config.padding,
+                "feather": self.config.feather
+            }
+        })
+        data = response.get("data") or {}
+        if not response.get("success") or "error" in data:
+            raise RuntimeError(f"Benchmark request failed: {response.get('error') or data.get('error')}")
+        return data
+
+    async def _measure(self, mask_b64: str, crop_to_mask: bool) -> Dict[str, Any]:
+        """Mean step and end-to-end latency for one mode."""
+        for index in range(self.config.warmup_iterations):
+            await self._run_request(mask_b64, crop_to_mask, -1 - index)
+
+        steps, latencies = [], []
+        data: Dict[str, Any] = {}
+        for index in range(self.config.iterations):
+            start_time = time.perf_counter()
+            data = await self._run_request(mask_b64, crop_to_mask, index)
+            latencies.append(time.perf_counter() - start_time)
+            steps.append(data.get("stage_timings", {}).get("steps", 0.0))
+
+        return {
+            "steps_ms": sum(steps) / len(steps) * 1000,
+            "latency_ms": sum(latencies) / len(latencies) * 1000,
+            "crop": data.get("crop")
+        }
+
+    async def run_mask_area(self, area: float) -> Dict[str, Any]:
+        """Benchmark full-frame and cropped inpainting for one mask area."""
+        mask_b64 = _encode_png(_make_square_mask(self.config.size, area))
+        full = await self._measure(mask_b64, crop_to_mask=False)
+        cropped = await self._measure(mask_b64, crop_to_mask=True)
+        return {
+            "mask_area": area,
+            "full": full,
+            "crop": cropped,
+            "steps_speedup": full["steps_ms"] / cropped["steps_ms"] if cropped["steps_ms"] > 0 else None,
+            "latency_speedup": full["latency_ms"] / cropped["latency_ms"] if cropped["latency_ms"] > 0 else None
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """Run the benchmark across all configured mask areas."""
+        await self.setup()
+        try:
+            results = []
+            for area in self.config.mask_areas:
+                self.logger.info("Benchmarking mask area %.3f...", area)
+                results.append(await self.run_mask_area(area))
+
+            return {
+                "benchmark": "inference_inpaint_crop_cpu",
+                "timestamp": time.time(),
+                "environment": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "torch": torch.__version__,
+                    "torch_threads": torch.get_num_threads()
+                },
+                "config": asdict(self.config),
+                "results": results,
+                "peak_rss_mb": _get_peak_rss_mb()
+            }
+        finally:
+            await self.interface.cleanup()
+
+
+async def run_inpaint_crop_benchmark(config: Optional[InpaintCropBenchmarkConfiguration] = None) -> Dict[str, Any]:
+    """Run the inpainting crop benchmark and return the JSON-serializable report."""
+    return await InpaintCropBenchmark(config or InpaintCropBenchmarkConfiguration()).run()
+
+
+def main() -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Crop-to-mask inpainting CPU benchmark")
+    parser.add_argument("--mask-areas", type=float, nargs="+", default=[0.01, 0.05, 0.1, 0.25, 0.5])
+    parser.add_argument("--size", type=int, default=256, help="Frame width and height")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--padding", type=int, default=16, help="Context padding around the mask in pixels")
+    parser.add_argument("--feather", type=int, default=4, help="Seam feather radius in pixels")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--tokenizer", default=None, help="Optional pretrained CLIP tokenizer path")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = InpaintCropBenchmarkConfiguration(
+        mask_areas=args.mask_areas,
+        size=args.size,
+        iterations=args.iterations,
+        warmup_iterations=args.warmup,
+        steps=args.steps,
+        padding=args.padding,
+        feather=args.feather,
+        num_threads=args.threads,
+        tokenizer_path=args.tokenizer
+    )
+    report = asyncio.run(run_inpaint_crop_benchmark(config))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
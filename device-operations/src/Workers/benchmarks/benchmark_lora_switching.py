@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+LoRA Switching Benchmark for SDXL Workers System
+================================================
+
+Measures how long `LoRAFusionWorker` takes to switch a pipeline between
+LoRA combinations: the first switch to a combination (deltas computed and
+fused), later switches (memoized fused weights copied in) and unfusing
+back to the base weights. Random kohya-format LoRAs are generated for the
+attention projections of a tiny SDXL-shaped pipeline; the report also
+checks that unfusing restores the base weights exactly.
+
+Usage (from device-operations/src):
+    python -m Workers.benchmarks.benchmark_lora_switching
+    python -m Workers.benchmarks.benchmark_lora_switching --rank 16 --rounds 10 --output lora_switching.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+import torch
+
+from .benchmark_inference import build_tiny_sdxl_pipeline
+from ..model.workers.worker_lora_fusion import LoRAFusionWorker, lora_modules
+from ..utilities.timing import summarize_samples
+
+logger = logging.getLogger(__name__)
+
+ATTENTION_PROJECTIONS = ("to_q", "to_k", "to_v", "to_out.0")
+
+
+@dataclass
+class LoRASwitchingBenchmarkConfiguration:
+    """Configuration for the LoRA switching benchmark."""
+    adapters: int = 3
+    rank: int = 4
+    rounds: int = 5
+    device: str = "cpu"
+    seed: int = 0
+
+    def __post_init__(self):
+        """Validate configuration."""
+        if self.adapters < 2:
+            raise ValueError("adapters must be at least 2")
+        if self.rank < 1:
+            raise ValueError("rank must be at least 1")
+        if self.rounds < 2:
+            raise ValueError("rounds must be at least 2 (the first round computes every combination)")
+
+
+def write_random_lora(pipeline: Any, path: Path, rank: int, seed: int) -> str:
+    """Save a random kohya-format LoRA over the UNet attention projections."""
+    import safetensors.torch
+
+    generator = torch.Generator().manual_seed(seed)
+    tensors: Dict[str, torch.Tensor] = {}
+    for name, module in lora_modules(pipeline)["unet"].items():
+        if not isinstance(module, torch.nn.Linear) or not name.endswith(ATTENTION_PROJECTIONS):
+            continue
+        base = "lora_unet_" + name.replace(".", "_")
+        tensors[f"{base}.lora_down.weight"] = torch.randn(rank, module.in_features, generator=generator) * 0.1
+        tensors[f"{base}.lora_up.weight"] = torch.randn(module.out_features, rank, generator=generator) * 0.1
+        tensors[f"{base}.alpha"] = torch.tensor(float(rank))
+    safetensors.torch.save_file(tensors, str(path))
+    return str(path)
+
+
+class LoRASwitchingBenchmark:
+    """Switch latency between LoRA combinations, computed versus memoized."""
+
+    def __init__(self, config: LoRASwitchingBenchmarkConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.work_dir = Path(tempfile.mkdtemp(prefix="sdxl_lora_switching_"))
+
+    def _combinations(self, paths: List[str]) -> List[List[Tuple[str, float]]]:
+        """Single adapters, one adapter at another scale, and stacked sets."""
+        combinations = [[(path, 1.0)] for path in paths]
+        combinations.append([(paths[0], 0.5)])
+        combinations.append([(paths[0], 0.8), (paths[1], 0.6)])
+        combinations.append([(path, 1.0) for path in paths])
+        return combinations
+
+    def run(self) -> Dict[str, Any]:
+        """Cycle through the combinations and report switch latency per kind."""
+        pipeline = build_tiny_sdxl_pipeline(self.config.seed).to(self.config.device)
+        paths = [
+            write_random_lora(pipeline, self.work_dir / f"lora_{index}.safetensors", self.config.rank,
+                              self.config.seed + index + 1)
+            for index in range(self.config.adapters)
+        ]
+        base_weights = {name: parameter.detach().clone() for name, parameter in pipeline.unet.named_parameters()}
+
+        worker = LoRAFusionWorker({"lora_fusion": {"cache_mb": 1024, "cache_device": "cpu"}})
+        combinations = self._combinations(paths)
+        samples: Dict[str, List[float]] = {"computed": [], "cached": [], "unfuse": []}
+        for _ in range(self.config.rounds):
+            for combination in combinations:
+                report = worker.activate(pipeline, combination)
+                samples[report["source"]].append(report["switch_ms"])
+            samples["unfuse"].append(worker.deactivate(pipeline)["switch_ms"])
+
+        restored_exactly = all(
+            torch.equal(parameter, base_weights[name]) for name, parameter in pipeline.unet.named_parameters()
+        )
+        fused_layers = worker.activate(pipeline, combinations[0])["layers"]
+        worker.deactivate(pipeline)
+
+        return {
+            "benchmark": "lora_switching",
+            "timestamp": time.time(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "torch": torch.__version__
+            },
+            "config": asdict(self.config),
+            "combinations": len(combinations),
+            "fused_layers_per_adapter": fused_layers,
+            "switch_ms": {kind: summarize_samples(values) for kind, values in samples.items() if values},
+            "memo_speedup": (
+                summarize_samples(samples["computed"])["p50_ms"] / summarize_samples(samples["cached"])["p50_ms"]
+                if samples["cached"] else None
+            ),
+            "restored_exactly": restored_exactly,
+            "cache_mb": worker.cached_bytes / (1024 * 1024)
+        }
+
+
+def run_lora_switching_benchmark(config: Optional[LoRASwitchingBenchmarkConfiguration] = None) -> Dict[str, Any]:
+    """Run the LoRA switching benchmark and return the JSON-serializable report."""
+    return LoRASwitchingBenchmark(config or LoRASwitchingBenchmarkConfiguration()).run()
+
+
+def main() -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="LoRA fuse/unfuse switching benchmark")
+    parser.add_argument("--adapters", type=int, default=3)
+    parser.add_argument("--rank", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = LoRASwitchingBenchmarkConfiguration(
+        adapters=args.adapters,
+        rank=args.rank,
+        rounds=args.rounds,
+        device=args.device
+    )
+    report = run_lora_switching_benchmark(config)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
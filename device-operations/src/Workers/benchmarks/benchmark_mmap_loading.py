@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Loading Benchmark for SDXL Workers System
+=======================================================
+
+Compares VAE load time and memory growth of the current diffusers path
+(`from_single_file` / `from_pretrained`) against `MmapWeightLoader`. Each
+load runs in a fresh process so resident and private memory are measured
+from the same starting point. Point `--model` at a single-file SDXL
+checkpoint to see the effect of skipping the UNet and text encoders;
+without it a tiny random-weight VAE is generated.
+
+Usage (from device-operations/src):
+    python -m Workers.benchmarks.benchmark_mmap_loading --model sd_xl_base_1.0.safetensors
+    python -m Workers.benchmarks.benchmark_mmap_loading --iterations 5 --output mmap_loading.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MmapLoadingBenchmarkConfiguration:
+    """Configuration for the memory-mapped loading benchmark."""
+    model_path: Optional[str] = None
+    iterations: int = 3
+    dtype: str = "float16"
+    seed: int = 0
+
+    def __post_init__(self):
+        """Validate configuration."""
+        if self.iterations < 1:
+            raise ValueError("iterations must be at least 1")
+        if self.dtype not in ("float16", "float32", "bfloat16"):
+            raise ValueError(f"Unsupported dtype: {self.dtype}")
+
+
+def build_tiny_vae(directory: Path, seed: int = 0, dtype: str = "float16") -> str:
+    """Save a tiny random-weight AutoencoderKL in diffusers layout and return its directory."""
+    from diffusers import AutoencoderKL
+
+    torch.manual_seed(seed)
+    vae = AutoencoderKL(
+        block_out_channels=(32, 64),
+        down_block_types=("DownEncoderBlock2D",) * 2,
+        up_block_types=("UpDecoderBlock2D",) * 2,
+        latent_channels=4,
+        norm_num_groups=32
+    )
+    vae.to(getattr(torch, dtype)).save_pretrained(str(directory), safe_serialization=True)
+    return str(directory)
+
+
+def _load_in_process(mode: str, model_path: str, dtype_name: str, results) -> None:
+    """Child process body: load the VAE once and report timings and memory growth."""
+    from ..model.workers.worker_mmap_loader import MmapWeightLoader, _memory_snapshot, _delta_mb
+
+    torch_dtype = getattr(torch, dtype_name)
+    before = _memory_snapshot()
+    start_time = time.perf_counter()
+    stats: Dict[str, Any] = {}
+    if mode == "mmap":
+        loader = MmapWeightLoader({})
+        vae, stats = loader.load_vae(model_path, torch_dtype=torch_dtype)
+    else:
+        from diffusers import AutoencoderKL
+        if Path(model_path).is_dir():
+            vae = AutoencoderKL.from_pretrained(model_path, torch_dtype=torch_dtype)
+        else:
+            vae = AutoencoderKL.from_single_file(model_path, torch_dtype=torch_dtype)
+    load_seconds = time.perf_counter() - start_time
+    after = _memory_snapshot()
+
+    results.put({
+        "mode": mode,
+        "load_seconds": load_seconds,
+        "rss_delta_mb": _delta_mb(before, after, "rss"),
+        "private_delta_mb": _delta_mb(before, after, "uss"),
+        "parameters": sum(parameter.numel() for parameter in vae.parameters()),
+        "materialized_bytes": stats.get("materialized_bytes"),
+        "skipped_bytes": stats.get("skipped_bytes"),
+        "zero_copy_tensors": stats.get("zero_copy_tensors"),
+        "tensors": stats.get("tensors")
+    })
+
+
+class MmapLoadingBenchmark:
+    """Current diffusers loading versus memory-mapped loading, one process per load."""
+
+    def __init__(self, config: MmapLoadingBenchmarkConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.work_dir = Path(tempfile.mkdtemp(prefix="sdxl_mmap_benchmark_"))
+        self.context = multiprocessing.get_context("spawn")
+
+    def _run_once(self, mode: str, model_path: str) -> Dict[str, Any]:
+        """Load once in a fresh process."""
+        results = self.context.Queue()
+        process = self.context.Process(target=_load_in_process, args=(mode, model_path, self.config.dtype, results))
+        process.start()
+        result = results.get()
+        process.join()
+        return result
+
+    def _measure(self, mode: str, model_path: str) -> Dict[str, Any]:
+        """Mean load time and memory growth over the configured iterations."""
+        runs = [self._run_once(mode, model_path) for _ in range(self.config.iterations)]
+        summary = dict(runs[-1])
+        for key in ("load_seconds", "rss_delta_mb", "private_delta_mb"):
+            summary[key] = sum(run[key] for run in runs) / len(runs)
+        return summary
+
+    def run(self) -> Dict[str, Any]:
+        """Run both loaders and report the savings of the memory-mapped path."""
+        model_path = self.config.model_path or build_tiny_vae(
+            self.work_dir / "tiny_vae", self.config.seed, self.config.dtype
+        )
+
+        self.logger.info("Benchmarking current loading path...")
+        current = self._measure("current", model_path)
+        self.logger.info("Benchmarking memory-mapped loading path...")
+        mapped = self._measure("mmap", model_path)
+
+        return {
+            "benchmark": "model_mmap_loading",
+            "timestamp": time.time(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "torch": torch.__version__
+            },
+            "config": asdict(self.config),
+            "model_path": model_path,
+            "current": current,
+            "mmap": mapped,
+            "load_speedup": current["load_seconds"] / mapped["load_seconds"] if mapped["load_seconds"] > 0 else None,
+            "rss_saved_mb": current["rss_delta_mb"] - mapped["rss_delta_mb"],
+            "private_saved_mb": current["private_delta_mb"] - mapped["private_delta_mb"]
+        }
+
+
+def run_mmap_loading_benchmark(config: Optional[MmapLoadingBenchmarkConfiguration] = None) -> Dict[str, Any]:
+    """Run the memory-mapped loading benchmark and return the JSON-serializable report."""
+    return MmapLoadingBenchmark(config or MmapLoadingBenchmarkConfiguration()).run()
+
+
+def main() -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Memory-mapped VAE loading benchmark")
+    parser.add_argument("--model", default=None, help="VAE file, diffusers VAE directory or single-file checkpoint")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--dtype", default="float16", choices=["float16", "float32", "bfloat16"])
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = MmapLoadingBenchmarkConfiguration(
+        model_path=args.model,
+        iterations=args.iterations,
+        dtype=args.dtype
+    )
+    report = run_mmap_loading_benchmark(config)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Model Hashing Benchmark for SDXL Workers System
+===============================================
+
+Measures content hashing throughput of a model file: a serial streaming
+blake2b pass (how files were hashed before) against the chunked Merkle
+hash of `ModelHashManager` at several thread counts, plus a sampled
+`verify`. Hashes a real model file when one is given, or a random file of
+`--size-mb` otherwise. Runs after the first read hit the page cache, so
+the numbers are hashing throughput rather than disk throughput.
+
+Usage (from device-operations/src):
+    python -m Workers.benchmarks.benchmark_model_hashing
+    python -m Workers.benchmarks.benchmark_model_hashing --model /path/to/sd_xl_base_1.0.safetensors --threads 1 2 4 8
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from ..model.managers.manager_model_hash import ModelHashManager, tree_hash_file, GB, MB
+from ..utilities.timing import summarize_samples
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelHashingBenchmarkConfiguration:
+    """Configuration for the model hashing benchmark."""
+    model_path: Optional[str] = None
+    size_mb: int = 1024
+    chunk_mb: int = 16
+    threads: List[int] = field(default_factory=lambda: [1, 2, 4, 8])
+    rounds: int = 3
+    sample_chunks: int = 8
+
+    def __post_init__(self):
+        """Validate configuration."""
+        if self.model_path is not None and not Path(self.model_path).is_file():
+            raise ValueError(f"Model file not found: {self.model_path}")
+        if self.size_mb < 1:
+            raise ValueError("size_mb must be at least 1")
+        if self.chunk_mb < 1:
+            raise ValueError("chunk_mb must be at least 1")
+        if not self.threads or min(self.threads) < 1:
+            raise ValueError("threads must list positive thread counts")
+        if self.rounds < 1:
+            raise ValueError("rounds must be at least 1")
+
+
+def serial_hash(path: str, chunk_size: int) -> str:
+    """Single-threaded streaming blake2b of a whole file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelHashingBenchmark:
+    """Serial versus parallel Merkle hashing throughput."""
+
+    def __init__(self, config: ModelHashingBenchmarkConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.work_dir = Path(tempfile.mkdtemp(prefix="sdxl_model_hashing_"))
+
+    def _model_file(self) -> str:
+        if self.config.model_path:
+            return self.config.model_path
+        path = self.work_dir / "random.bin"
+        with open(path, "wb") as handle:
+            for _ in range(self.config.size_mb):
+                handle.write(os.urandom(MB))
+        return str(path)
+
+    def _time(self, function, *args) -> Dict[str, Any]:
+        """Seconds of each round of a hashing function, and its result."""
+        samples = []
+        result = None
+        for _ in range(self.config.rounds):
+            start_time = time.perf_counter()
+            result = function(*args)
+            samples.append((time.perf_counter() - start_time) * 1000)
+        return {"samples": samples, "result": result}
+
+    def run(self) -> Dict[str, Any]:
+        """Hash the file serially and at every thread count, then verify a sample."""
+        path = self._model_file()
+        size = os.path.getsize(path)
+        chunk_size = self.config.chunk_mb * MB
+        # Warm the page cache so every mode reads from memory
+        serial_hash(path, chunk_size)
+
+        def throughput(samples: List[float]) -> float:
+            return size / GB / (summarize_samples(samples)["p50_ms"] / 1000)
+
+        serial = self._time(serial_hash, path, chunk_size)
+        modes = {"serial": {"time_ms": summarize_samples(serial["samples"]), "gbps": throughput(serial["samples"])}}
+        digests = set()
+        for threads in self.config.threads:
+            timed = self._time(tree_hash_file, path, chunk_size, threads)
+            digests.add(timed["result"])
+            modes[f"merkle_{threads}_threads"] = {
+                "time_ms": summarize_samples(timed["samples"]),
+                "gbps": throughput(timed["samples"])
+            }
+
+        manager = ModelHashManager({"model_hash": {
+            "chunk_mb": self.config.chunk_mb,
+            "threads": max(self.config.threads),
+            "sample_chunks": self.config.sample_chunks,
+            "cache_path": str(self.work_dir / "hashes.json")
+        }})
+        manager.hash_file(path)
+        verification = manager.verify(path)
+
+        best = max((mode for mode in modes if mode != "serial"), key=lambda mode: modes[mode]["gbps"])
+        return {
+            "benchmark": "model_hashing",
+            "timestamp": time.time(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count()
+            },
+            "config": asdict(self.config),
+            "file_gb": size / GB,
+            "modes": modes,
+            "best_mode": best,
+            "speedup": modes[best]["gbps"] / modes["serial"]["gbps"],
+            "digest_independent_of_threads": len(digests) == 1,
+            "verify": {key: verification[key] for key in ("verified", "checked_chunks", "chunk_count",
+                                                          "coverage", "seconds", "gbps")}
+        }
+
+
+def run_model_hashing_benchmark(config: Optional[ModelHashingBenchmarkConfiguration] = None) -> Dict[str, Any]:
+    """Run the model hashing benchmark and return the JSON-serializable report."""
+    return ModelHashingBenchmark(config or ModelHashingBenchmarkConfiguration()).run()
+
+
+def main() -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Serial vs parallel Merkle model hashing benchmark")
+    parser.add_argument("--model", default=None, help="Model file to hash (default: a random file)")
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--chunk-mb", type=int, default=16)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = ModelHashingBenchmarkConfiguration(
+        model_path=args.model,
+        size_mb=args.size_mb,
+        chunk_mb=args.chunk_mb,
+        threads=args.threads,
+        rounds=args.rounds
+    )
+    report = run_model_hashing_benchmark(config)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
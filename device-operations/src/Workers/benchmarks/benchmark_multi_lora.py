@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Multi-LoRA Batching Benchmark for SDXL Workers System
+=====================================================
+
+Compares two ways of serving requests that use different LoRAs on a tiny
+SDXL-shaped pipeline: one pipeline call per LoRA with its weights fused
+(`LoRAFusionWorker`), and a single heterogeneous batch in which every
+sample adds its own adapter unfused (`MultiLoRAWorker`). Reports images
+per second for both and checks that the heterogeneous latents match the
+fused ones.
+
+Usage (from device-operations/src):
+    python -m Workers.benchmarks.benchmark_multi_lora
+    python -m Workers.benchmarks.benchmark_multi_lora --adapters 8 --images-per-adapter 2 --output multi_lora.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+import torch
+
+from .benchmark_inference import build_tiny_sdxl_pipeline
+from .benchmark_lora_switching import write_random_lora
+from ..model.workers.worker_lora_fusion import LoRAFusionWorker
+from ..model.workers.worker_multi_lora import MultiLoRAWorker
+from ..utilities.timing import summarize_samples
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MultiLoRABenchmarkConfiguration:
+    """Configuration for the multi-LoRA batching benchmark."""
+    adapters: int = 4
+    images_per_adapter: int = 1
+    rank: int = 4
+    steps: int = 4
+    rounds: int = 3
+    device: str = "cpu"
+    seed: int = 0
+    prompt: str = "a photograph of an astronaut riding a horse"
+
+    def __post_init__(self):
+        """Validate configuration."""
+        if self.adapters < 2:
+            raise ValueError("adapters must be at least 2")
+        if self.images_per_adapter < 1:
+            raise ValueError("images_per_adapter must be at least 1")
+        if self.rank < 1:
+            raise ValueError("rank must be at least 1")
+        if self.steps < 1:
+            raise ValueError("steps must be at least 1")
+        if self.rounds < 1:
+            raise ValueError("rounds must be at least 1")
+
+
+class MultiLoRABenchmark:
+    """Sequential per-LoRA fused calls versus one heterogeneous batch."""
+
+    def __init__(self, config: MultiLoRABenchmarkConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.work_dir = Path(tempfile.mkdtemp(prefix="sdxl_multi_lora_"))
+
+    def _call(self, pipeline: Any, images: int, first_seed: int) -> torch.Tensor:
+        """Denoise `images` latents seeded `first_seed + i`."""
+        generators = [torch.Generator(device="cpu").manual_seed(first_seed + index) for index in range(images)]
+        return pipeline(
+            prompt=[self.config.prompt] * images,
+            num_inference_steps=self.config.steps,
+            generator=generators,
+            output_type="latent"
+        ).images
+
+    def _sequential(self, pipeline: Any, fusion: LoRAFusionWorker, paths: List[str]) -> torch.Tensor:
+        """One fused call per adapter, as a batcher keyed by LoRA combination would run them."""
+        per_adapter = self.config.images_per_adapter
+        latents = []
+        for index, path in enumerate(paths):
+            fusion.activate(pipeline, [(path, 1.0)])
+            latents.append(self._call(pipeline, per_adapter, self.config.seed + index * per_adapter))
+        fusion.deactivate(pipeline)
+        return torch.cat(latents)
+
+    def _heterogeneous(self, pipeline: Any, multi: MultiLoRAWorker, paths: List[str]) -> torch.Tensor:
+        """One call in which every image uses its own adapter."""
+        samples = [[(path, 1.0)] for path in paths for _ in range(self.config.images_per_adapter)]
+        with multi.batch(pipeline, samples):
+            return self._call(pipeline, len(samples), self.config.seed)
+
+    def run(self) -> Dict[str, Any]:
+        """Time both modes and compare their latents."""
+        pipeline = build_tiny_sdxl_pipeline(self.config.seed).to(self.config.device)
+        pipeline.set_progress_bar_config(disable=True)
+        paths = [
+            write_random_lora(pipeline, self.work_dir / f"lora_{index}.safetensors", self.config.rank,
+                              self.config.seed + index + 1)
+            for index in range(self.config.adapters)
+        ]
+        fusion = LoRAFusionWorker({"lora_fusion": {"cache_mb": 1024, "cache_device": "cpu"}})
+        multi = MultiLoRAWorker({"multi_lora": {"max_adapters": self.config.adapters,
+                                                "max_adapters_per_sample": 1}})
+        multi.fusion_worker = fusion
+
+        # Warm-up fills the fused memo and registers every adapter
+        sequential_latents = self._sequential(pipeline, fusion, paths)
+        heterogeneous_latents = self._heterogeneous(pipeline, multi, paths)
+
+        seconds: Dict[str, List[float]] = {"sequential": [], "heterogeneous": []}
+        for _ in range(self.config.rounds):
+            start_time = time.perf_counter()
+            self._sequential(pipeline, fusion, paths)
+            seconds["sequential"].append(time.perf_counter() - start_time)
+            start_time = time.perf_counter()
+            self._heterogeneous(pipeline, multi, paths)
+            seconds["heterogeneous"].append(time.perf_counter() - start_time)
+        multi.detach(pipeline)
+
+        images = self.config.adapters * self.config.images_per_adapter
+        throughput = {
+            mode: images / summarize_samples([value * 1000 for value in values])["p50_ms"] * 1000
+            for mode, values in seconds.items()
+        }
+        return {
+            "benchmark": "multi_lora",
+            "timestamp": time.time(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "torch": torch.__version__
+            },
+            "config": asdict(self.config),
+            "images": images,
+            "call_ms": {mode: summarize_samples([value * 1000 for value in values])
+                        for mode, values in seconds.items()},
+            "images_per_second": throughput,
+            "speedup": throughput["heterogeneous"] / throughput["sequential"],
+            "max_abs_diff": (heterogeneous_latents - sequential_latents).abs().max().item()
+        }
+
+
+def run_multi_lora_benchmark(config: Optional[MultiLoRABenchmarkConfiguration] = None) -> Dict[str, Any]:
+    """Run the multi-LoRA batching benchmark and return the JSON-serializable report."""
+    return MultiLoRABenchmark(config or MultiLoRABenchmarkConfiguration()).run()
+
+
+def main() -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Heterogeneous multi-LoRA batching benchmark")
+    parser.add_argument("--adapters", type=int, default=4)
+    parser.add_argument("--images-per-adapter", type=int, default=1)
+    parser.add_argument("--rank", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = MultiLoRABenchmarkConfiguration(
+        adapters=args.adapters,
+        images_per_adapter=args.images_per_adapter,
+        rank=args.rank,
+        steps=args.steps,
+        rounds=args.rounds,
+        device=args.device
+    )
+    report = run_multi_lora_benchmark(config)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+ONNX Backend Parity Benchmark for SDXL Workers System
+=====================================================
+
+Runs a tiny SDXL-shaped pipeline through the ONNX Runtime backend
+(`ONNXWorker`) on the CPU execution provider and through torch with the
+same seed, then compares the latents and the decoded images. The first
+ONNX call exports every component, so export time is reported apart from
+the timed calls. While the ONNX view is active the original pipeline is
+also run, which must stay on torch. The run fails (exit code 1) if the
+outputs differ by more than the tolerance, if no ONNX call was made, or if
+the original pipeline ran through ONNX.
+
+Usage (from device-operations/src):
+    python -m Workers.benchmarks.benchmark_onnx_backend
+    python -m Workers.benchmarks.benchmark_onnx_backend --size 128 --steps 4 --output onnx_backend.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+import torch
+
+from .benchmark_inference import build_tiny_sdxl_pipeline
+from ..inference.workers.worker_onnx import ONNXWorker, ONNXRUNTIME_AVAILABLE
+from ..utilities.timing import summarize_samples
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ONNXBackendBenchmarkConfiguration:
+    """Configuration for the ONNX backend parity benchmark."""
+    size: int = 64
+    steps: int = 4
+    rounds: int = 3
+    seed: int = 0
+    prompt: str = "a photograph of an astronaut riding a horse"
+    # Largest allowed absolute difference from torch, for latents and for decoded images
+    tolerance: float = 1e-3
+
+    def __post_init__(self):
+        """Validate configuration."""
+        if self.size < 64 or self.size % 8:
+            raise ValueError("size must be a multiple of 8 and at least 64")
+        if self.steps < 1:
+            raise ValueError("steps must be at least 1")
+        if self.rounds < 1:
+            raise ValueError("rounds must be at least 1")
+        if self.tolerance <= 0:
+            raise ValueError("tolerance must be positive")
+
+
+class ONNXBackendBenchmark:
+    """Torch versus ONNX Runtime (CPU provider) outputs and call time."""
+
+    def __init__(self, config: ONNXBackendBenchmarkConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.work_dir = Path(tempfile.mkdtemp(prefix="sdxl_onnx_backend_"))
+
+    def _call(self, pipeline: Any) -> Dict[str, torch.Tensor]:
+        """Denoise one seeded image and decode it; returns its latents and image."""
+        latents = pipeline(
+            prompt=self.config.prompt,
+            height=self.config.size,
+            width=self.config.size,
+            num_inference_steps=self.config.steps,
+            generator=torch.Generator(device="cpu").manual_seed(self.config.seed),
+            output_type="latent"
+        ).images
+        with torch.no_grad():
+            image = pipeline.vae.decode(latents / pipeline.vae.config.scaling_factor, return_dict=False)[0]
+        return {"latents": latents, "image": image}
+
+    def _timed(self, pipeline: Any) -> List[float]:
+        samples = []
+        for _ in range(self.config.rounds):
+            start_time = time.perf_counter()
+            self._call(pipeline)
+            samples.append((time.perf_counter() - start_time) * 1000)
+        return samples
+
+    def run(self) -> Dict[str, Any]:
+        """Compare torch and ONNX outputs, then time both backends."""
+        worker = ONNXWorker({"onnx": {
+            "cache_dir": str(self.work_dir / "onnx_cache"),
+            "providers": ["CPUExecutionProvider"]
+        }})
+        asyncio.run(worker.initialize())
+        pipeline = build_tiny_sdxl_pipeline(self.config.seed)
+        pipeline.set_progress_bar_config(disable=True)
+
+        try:
+            reference = self._call(pipeline)
+            with worker.activate(pipeline) as onnx_pipeline:
+                start_time = time.perf_counter()
+                exported = self._call(onnx_pipeline)
+                first_call_seconds = time.perf_counter() - start_time
+                onnx_calls = worker.stats["onnx_calls"]
+
+                # The original pipeline must keep running torch while a view is active
+                self._call(pipeline)
+                leaked_calls = worker.stats["onnx_calls"] - onnx_calls
+
+                onnx_samples = self._timed(onnx_pipeline)
+            torch_samples = self._timed(pipeline)
+        finally:
+            asyncio.run(worker.cleanup())
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+        max_abs_diff = {
+            name: (exported[name] - reference[name]).abs().max().item()
+            for name in ("latents", "image")
+        }
+        torch_ms = summarize_samples(torch_samples)
+        onnx_ms = summarize_samples(onnx_samples)
+        return {
+            "benchmark": "onnx_backend",
+            "timestamp": time.time(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "torch": torch.__version__,
+                "providers": worker.providers
+            },
+            "config": asdict(self.config),
+            "export_seconds": worker.stats["export_time"],
+            "first_call_seconds": first_call_seconds,
+            "call_ms": {"torch": torch_ms, "onnx": onnx_ms},
+            "speedup": torch_ms["p50_ms"] / onnx_ms["p50_ms"],
+            "max_abs_diff": max_abs_diff,
+            "onnx_calls": onnx_calls,
+            "torch_fallbacks": worker.stats["torch_fallbacks"],
+            "original_pipeline_onnx_calls": leaked_calls,
+            "matches": all(diff <= self.config.tolerance for diff in max_abs_diff.values())
+        }
+
+
+def run_onnx_backend_benchmark(config: Optional[ONNXBackendBenchmarkConfiguration] = None) -> Dict[str, Any]:
+    """Run the ONNX backend parity benchmark and return the JSON-serializable report."""
+    return ONNXBackendBenchmark(config or ONNXBackendBenchmarkConfiguration()).run()
+
+
+def main() -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="ONNX Runtime CPU backend parity with torch")
+    parser.add_argument("--size", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    if not ONNXRUNTIME_AVAILABLE:
+        logger.error("onnxruntime is not installed")
+        return 1
+
+    config = ONNXBackendBenchmarkConfiguration(
+        size=args.size,
+        steps=args.steps,
+        rounds=args.rounds,
+        tolerance=args.tolerance
+    )
+    report = run_onnx_backend_benchmark(config)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+    if not report["onnx_calls"]:
+        logger.error("No component ran through ONNX Runtime")
+        return 1
+    if report["original_pipeline_onnx_calls"]:
+        logger.error("The original pipeline ran through ONNX while a request's view was active")
+        return 1
+    if not report["matches"]:
+        logger.error("ONNX outputs differ from torch: %s (tolerance %g)",
+                     report["max_abs_diff"], config.tolerance)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
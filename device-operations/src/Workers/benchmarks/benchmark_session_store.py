@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Session Store Soak Benchmark for SDXL Workers System
+====================================================
+
+Drives a long run of inference sessions (100k by default) through the
+session-tracking `PipelineManager`: each session is created, receives
+progress frames with a preview and completes with a result, every
+`spill_every`-th one large enough to be spilled to disk. Python heap
+usage is traced with tracemalloc once the store has filled up and then at
+regular intervals; the run fails (exit code 1) if the heap grew by more
+than the tolerance, since a bounded store must keep a flat memory profile.
+
+Usage (from device-operations/src):
+    python -m Workers.benchmarks.benchmark_session_store
+    python -m Workers.benchmarks.benchmark_session_store --sessions 200000 --max-sessions 5000 --output soak.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from ..inference.managers.manager_pipeline_simple import PipelineManager
+
+logger = logging.getLogger(__name__)
+
+KB = 1024
+
+
+@dataclass
+class SessionStoreBenchmarkConfiguration:
+    """Configuration for the session store soak benchmark."""
+    sessions: int = 100000
+    max_sessions: int = 1000
+    ttl_seconds: float = 3600.0
+    clients: int = 64
+    frames_per_session: int = 4
+    result_bytes: int = 2 * KB
+    spill_every: int = 10
+    spill_threshold_bytes: int = 64 * KB
+    samples: int = 10
+    # Allowed heap growth after the store filled: a fraction of the baseline, but at least min_growth_kb
+    growth_tolerance: float = 0.05
+    min_growth_kb: int = 256
+
+    def __post_init__(self):
+        """Validate configuration."""
+        if self.max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        if self.sessions < 2 * self.max_sessions:
+            raise ValueError("sessions must be at least twice max_sessions so the store fills up")
+        if self.clients < 1:
+            raise ValueError("clients must be at least 1")
+        if self.frames_per_session < 0:
+            raise ValueError("frames_per_session cannot be negative")
+        if self.spill_every < 0:
+            raise ValueError("spill_every cannot be negative")
+        if self.samples < 1:
+            raise ValueError("samples must be at least 1")
+        if self.growth_tolerance < 0:
+            raise ValueError("growth_tolerance cannot be negative")
+
+
+class SessionStoreBenchmark:
+    """Soak test of session tracking with a flat-memory check."""
+
+    def __init__(self, config: SessionStoreBenchmarkConfiguration):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.work_dir = Path(tempfile.mkdtemp(prefix="sdxl_session_store_"))
+
+    def _result(self, index: int) -> Dict[str, Any]:
+        """Result of a session; every `spill_every`-th one is above the spill threshold."""
+        spill = self.config.spill_every and index % self.config.spill_every == 0
+        size = self.config.spill_threshold_bytes + KB if spill else self.config.result_bytes
+        return {"images": ["x" * size], "seed_used": index, "status": "completed"}
+
+    def _run_session(self, manager: PipelineManager, index: int) -> None:
+        """One session through its whole lifecycle."""
+        session_id = f"soak-{index}"
+        manager.create_session(
+            session_id, "text2img",
+            request_data={"model_name": "soak", "prompt": f"prompt {index}"},
+            client_id=f"client-{index % self.config.clients}"
+        )
+        steps = self.config.frames_per_session
+        for step in range(1, steps + 1):
+            manager.update_session_progress(session_id, step / steps, {
+                "session_id": session_id,
+                "step": step,
+                "total_steps": steps,
+                "preview": {"image": "p" * 256, "step": step}
+            })
+        status = "failed" if index % 97 == 0 else "completed"
+        manager.complete_session(session_id, self._result(index), status)
+
+    @staticmethod
+    def _traced_bytes() -> int:
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+
+    def run(self) -> Dict[str, Any]:
+        """Run every session, sampling the traced heap after the store filled up."""
+        manager = PipelineManager({"session_store": {
+            "max_sessions": self.config.max_sessions,
+            "ttl_seconds": self.config.ttl_seconds,
+            "spill_threshold_bytes": self.config.spill_threshold_bytes,
+            "spill_dir": str(self.work_dir / "spill")
+        }})
+
+        # Sessions before the first sample fill the store and reach steady state
+        warmup = 2 * self.config.max_sessions
+        interval = max(1, (self.config.sessions - warmup) // self.config.samples)
+        samples: List[Dict[str, Any]] = []
+
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        try:
+            for index in range(self.config.sessions):
+                self._run_session(manager, index)
+                done = index + 1
+                if done == warmup or (done > warmup and (done - warmup) % interval == 0) \
+                        or done == self.config.sessions:
+                    samples.append({
+                        "sessions": done,
+                        "traced_kb": self._traced_bytes() / KB,
+                        "stored_sessions": len(manager.session_store),
+                        "pending": len(manager.pending),
+                        "spilled_results": manager.session_store.get_memory_usage()["spilled_results"]
+                    })
+            seconds = time.perf_counter() - start_time
+            peak_kb = tracemalloc.get_traced_memory()[1] / KB
+        finally:
+            tracemalloc.stop()
+            manager.session_store.clear()
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+        baseline_kb = samples[0]["traced_kb"]
+        final_kb = samples[-1]["traced_kb"]
+        allowed_kb = max(baseline_kb * self.config.growth_tolerance, self.config.min_growth_kb)
+        growth_kb = final_kb - baseline_kb
+        return {
+            "benchmark": "session_store",
+            "timestamp": time.time(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform()
+            },
+            "config": asdict(self.config),
+            "sessions_per_second": self.config.sessions / seconds,
+            "samples": samples,
+            "baseline_kb": baseline_kb,
+            "final_kb": final_kb,
+            "peak_kb": peak_kb,
+            "growth_kb": growth_kb,
+            "allowed_growth_kb": allowed_kb,
+            "bounded": max(sample["stored_sessions"] for sample in samples) <= self.config.max_sessions,
+            "flat": growth_kb <= allowed_kb
+        }
+
+
+def run_session_store_benchmark(config: Optional[SessionStoreBenchmarkConfiguration] = None) -> Dict[str, Any]:
+    """Run the session store soak benchmark and return the JSON-serializable report."""
+    return SessionStoreBenchmark(config or SessionStoreBenchmarkConfiguration()).run()
+
+
+def main() -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Session store soak test with a flat-memory check")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--ttl-seconds", type=float, default=3600.0)
+    parser.add_argument("--spill-every", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Allowed heap growth after the store filled, as a fraction of the baseline")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = SessionStoreBenchmarkConfiguration(
+        sessions=args.sessions,
+        max_sessions=args.max_sessions,
+        ttl_seconds=args.ttl_seconds,
+        spill_every=args.spill_every,
+        samples=args.samples,
+        growth_tolerance=args.tolerance
+    )
+    report = run_session_store_benchmark(config)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+    if not report["bounded"]:
+        logger.error("Session store held more than %d sessions", config.max_sessions)
+        return 1
+    if not report["flat"]:
+        logger.error("Heap grew by %.0f KB after the store filled (allowed %.0f KB)",
+                     report["growth_kb"], report["allowed_growth_kb"])
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
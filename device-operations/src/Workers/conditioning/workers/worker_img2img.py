@@ -6,7 +6,11 @@ Migrated from conditioning/img2img.py
 Worker for image-to-image conditioning and processing.
 """
 
+import hashlib
+import itertools
 import logging
+import weakref
+from collections import OrderedDict
 import torch
 import numpy as np
 from PIL import Image
@@ -16,6 +20,76 @@ import torchvision.transforms as transforms
 logger = logging.getLogger(__name__)
 
 
+class LatentCache:
+    """
+    LRU cache of VAE posteriors for init images.
+    
+    Entries are keyed by the content hash and size of the preprocessed
+    image and by the VAE instance, so a seed sweep over one init image
+    costs a single encode.
+    """
+    
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Tuple[int, int], int], Tuple[torch.Tensor, torch.Tensor]]" = OrderedDict()
+        self._vae_tokens: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+        self._token_counter = itertools.count()
+        self.hits = 0
+        self.misses = 0
+    
+    def make_key(self, image: torch.Tensor, vae_encoder) -> Tuple[str, Tuple[int, int], int]:
+        """Build the cache key for a single preprocessed image and VAE."""
+        data = image.detach().contiguous().cpu().view(torch.uint8).numpy()
+        digest = hashlib.blake2b(data.tobytes(), digest_size=16)
+        digest.update(str(image.dtype).encode())
+        size = (int(image.shape[-2]), int(image.shape[-1]))
+        return digest.hexdigest(), size, self._vae_token(vae_encoder)
+    
+    def _vae_token(self, vae_encoder) -> int:
+        """Stable identity for a VAE that is not reused after it is freed."""
+        try:
+            token = self._vae_tokens.get(vae_encoder)
+            if token is None:
+                token = next(self._token_counter)
+                self._vae_tokens[vae_encoder] = token
+            return token
+        except TypeError:
+            # Not weak-referenceable; fall back to object identity
+            return id(vae_encoder)
+    
+    def get(self, key) -> Optional[Tuple[torch.Tensor, torch.Tensor]]:
+        """Get cached posterior (mean, std) and mark it recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def put(self, key, mean: torch.Tensor, std: torch.Tensor) -> None:
+        """Store a posterior, evicting the least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (mean, std)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all cached posteriors."""
+        self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
 class Img2ImgWorker:
     """
     Worker for image-to-image conditioning and processing.
@@ -28,6 +102,7 @@ class Img2ImgWorker:
         self.logger = logging.getLogger(__name__)
         self.device = torch.device(config.get("device", "cpu"))
         self.dtype = getattr(torch, config.get("dtype", "float16"))
+        self.latent_cache = LatentCache(config.get("latent_cache_size", 16))
         self.processor = None
         self.initialized = False
         
@@ -35,7 +110,7 @@ class Img2ImgWorker:
         """Initialize img2img worker."""
         try:
             self.logger.info("Initializing img2img worker...")
-            self.processor = Img2ImgProcessor(self.device, self.dtype)
+            self.processor = Img2ImgProcessor(self.device, self.dtype, self.latent_cache)
             self.initialized = True
             self.logger.info("Img2img worker initialized successfully")
             return True
@@ -71,7 +146,8 @@ class Img2ImgWorker:
         return {
             "initialized": self.initialized,
             "device": str(self.device),
-            "dtype": str(self.dtype)
+            "dtype": str(self.dtype),
+            "latent_cache": self.latent_cache.get_stats()
         }
     
     async def cleanup(self) -> None:
@@ -79,6 +155,7 @@ class Img2ImgWorker:
         try:
             self.logger.info("Cleaning up img2img worker...")
             self.processor = None
+            self.latent_cache.clear()
             self.initialized = False
             self.logger.info("Img2img worker cleanup complete")
         except Exception as e:
@@ -91,11 +168,13 @@ class Img2ImgProcessor:
     def __init__(
         self,
         device: torch.device,
-        dtype: torch.dtype = torch.float16
+        dtype: torch.dtype = torch.float16,
+        latent_cache: Optional[LatentCache] = None
     ):
         """Initialize img2img processor."""
         self.device = device
         self.dtype = dtype
+        self.latent_cache = latent_cache if latent_cache is not None else LatentCache()
         
         # Standard SDXL transforms
         self.transform = transforms.Compose([
@@ -157,18 +236,63 @@ class Img2ImgProcessor:
         logger.debug(f"Preprocessed image to shape {image_tensor.shape}")
         return image_tensor
     
+    def encode_posterior(
+        self,
+        image: torch.Tensor,
+        vae_encoder
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Encode unique images to their VAE posterior (mean, std).
+        
+        Each image in the batch is looked up in the latent cache and only
+        the misses go through the VAE encoder.
+        """
+        keys = [self.latent_cache.make_key(single, vae_encoder) for single in image]
+        cached = [self.latent_cache.get(key) for key in keys]
+        missing = [index for index, entry in enumerate(cached) if entry is None]
+        
+        if missing:
+            # Encode each distinct missing image once
+            unique = list(OrderedDict((keys[index], index) for index in missing).items())
+            with torch.no_grad():
+                latent_dist = vae_encoder.encode(image[[index for _, index in unique]]).latent_dist
+            encoded = {}
+            for position, (key, _) in enumerate(unique):
+                encoded[key] = (latent_dist.mean[position:position + 1], latent_dist.std[position:position + 1])
+                self.latent_cache.put(key, *encoded[key])
+            cached = [entry if entry is not None else encoded[keys[index]] for index, entry in enumerate(cached)]
+            logger.debug(f"Encoded {len(unique)} init image(s), {len(keys) - len(missing)} cache hit(s)")
+        
+        mean = torch.cat([entry[0] for entry in cached])
+        std = torch.cat([entry[1] for entry in cached])
+        return mean, std
+    
     def encode_image(
         self,
         image: torch.Tensor,
         vae_encoder,
-        strength: float = 0.75
+        strength: float = 0.75,
+        generator: Optional[torch.Generator] = None,
+        batch_size: Optional[int] = None
     ) -> Tuple[torch.Tensor, int]:
-        """Encode image to latent space with noise scheduling."""
+        """
+        Encode image to latent space with noise scheduling.
+        
+        The posterior is computed once per unique image and broadcast to
+        `batch_size`; every batch item still draws its own latent sample.
+        """
         
         # Encode to latents
-        with torch.no_grad():
-            latents = vae_encoder.encode(image).latent_dist.sample()
-            latents = latents * vae_encoder.config.scaling_factor
+        mean, std = self.encode_posterior(image, vae_encoder)
+        if batch_size is not None and batch_size != mean.shape[0]:
+            if batch_size % mean.shape[0] != 0:
+                raise ValueError(f"Cannot broadcast {mean.shape[0]} image(s) to batch size {batch_size}")
+            repeats = batch_size // mean.shape[0]
+            mean = mean.repeat_interleave(repeats, dim=0)
+            std = std.repeat_interleave(repeats, dim=0)
+        
+        sample = torch.randn(mean.shape, generator=generator, device=mean.device, dtype=mean.dtype)
+        latents = (mean + std * sample) * vae_encoder.config.scaling_factor
         
         # Calculate timestep based on strength
         # strength=1.0 means full noise (like text2img)
@@ -210,13 +334,9 @@ class Img2ImgProcessor:
         # Preprocess image
         processed_image = self.preprocess_image(image)
         
-        # Repeat for batch size
-        if batch_size > 1:
-            processed_image = processed_image.repeat(batch_size, 1, 1, 1)
-        
-        # Encode to latents
+        # Encode once and broadcast to the batch
         init_latents, init_timestep = self.encode_image(
-            processed_image, vae_encoder, strength
+            processed_image, vae_encoder, strength, generator=generator, batch_size=batch_size
         )
         
         # Generate noise
@@ -253,11 +373,13 @@ class InpaintingProcessor:
     def __init__(
         self,
         device: torch.device,
-        dtype: torch.dtype = torch.float16
+        dtype: torch.dtype = torch.float16,
+        latent_cache: Optional[LatentCache] = None
     ):
         """Initialize inpainting processor."""
         self.device = device
         self.dtype = dtype
+        self.img_processor = Img2ImgProcessor(device, dtype, latent_cache)
         
         logger.info("Inpainting processor initialized")
     
@@ -316,19 +438,15 @@ class InpaintingProcessor:
         """Prepare latents for inpainting."""
         
         # Preprocess image and mask
-        img_processor = Img2ImgProcessor(self.device, self.dtype)
-        processed_image = img_processor.preprocess_image(image)
+        processed_image = self.img_processor.preprocess_image(image)
         processed_mask = self.preprocess_mask(mask, blur_factor=mask_blur)
         
-        # Repeat for batch size
+        # Encode the image once and broadcast to the batch
+        init_latents, _ = self.img_processor.encode_image(
+            processed_image, vae_encoder, generator=generator, batch_size=batch_size
+        )
         if batch_size > 1:
-            processed_image = processed_image.repeat(batch_size, 1, 1, 1)
-            processed_mask = processed_mask.repeat(batch_size, 1, 1, 1)
-        
-        # Encode image to latents
-        with torch.no_grad():
-            init_latents = vae_encoder.encode(processed_image).latent_dist.sample()
-            init_latents = init_latents * vae_encoder.config.scaling_factor
+            processed_mask = processed_mask.expand(batch_size, -1, -1, -1)
         
         # Resize mask to latent dimensions
         latent_height = init_latents.shape[2]
@@ -352,19 +470,129 @@ class InpaintingProcessor:
         
         logger.debug(f"Prepared inpainting latents: image {init_latents.shape}, mask {mask_latents.shape}")
         return masked_latents, mask_latents, init_latents
+    
+    def compute_crop_box(
+        self,
+        mask: Image.Image,
+        padding: int = 32,
+        multiple: int = 8,
+        threshold: int = 0
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Compute the crop box around the masked region.
+        
+        The mask bounding box is grown by `padding` pixels of context and
+        snapped outwards to `multiple` (the VAE downscale factor), clipped
+        to the image. Returns None when the mask is empty.
+        """
+        binary = mask.convert("L").point(lambda value: 255 if value > threshold else 0)
+        bbox = binary.getbbox()
+        if bbox is None:
+            return None
+        
+        width, height = mask.size
+        left = max(0, bbox[0] - padding) // multiple * multiple
+        top = max(0, bbox[1] - padding) // multiple * multiple
+        right = min(width, -(-(bbox[2] + padding) // multiple) * multiple)
+        bottom = min(height, -(-(bbox[3] + padding) // multiple) * multiple)
+        return left, top, right, bottom
+    
+    def crop_to_mask(
+        self,
+        image: Image.Image,
+        mask: Image.Image,
+        padding: int = 32,
+        min_resolution: Optional[int] = None,
+        multiple: int = 8
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Crop image and mask to the masked region plus context padding.
+        
+        With `min_resolution`, crops whose long side is smaller are
+        upsampled so the long side matches it; otherwise the crop is
+        processed at native resolution. Returns None when the mask is
+        empty or the crop would cover the whole frame.
+        """
+        mask = mask.convert("L")
+        if mask.size != image.size:
+            mask = mask.resize(image.size, Image.Resampling.NEAREST)
+        
+        crop_box = self.compute_crop_box(mask, padding, multiple)
+        if crop_box is None or crop_box == (0, 0, image.width, image.height):
+            return None
+        
+        crop_width = crop_box[2] - crop_box[0]
+        crop_height = crop_box[3] - crop_box[1]
+        scale = 1.0
+        if min_resolution and max(crop_width, crop_height) < min_resolution:
+            scale = min_resolution / max(crop_width, crop_height)
+        process_size = (
+            max(multiple, int(round(crop_width * scale / multiple)) * multiple),
+            max(multiple, int(round(crop_height * scale / multiple)) * multiple)
+        )
+        
+        cropped_image = image.crop(crop_box)
+        cropped_mask = mask.crop(crop_box)
+        if process_size != (crop_width, crop_height):
+            cropped_image = cropped_image.resize(process_size, Image.Resampling.LANCZOS)
+            cropped_mask = cropped_mask.resize(process_size, Image.Resampling.NEAREST)
+        
+        logger.debug(f"Cropped inpainting region {crop_box} of {image.size}, processing at {process_size}")
+        return {
+            "image": cropped_image,
+            "mask": cropped_mask,
+            "crop_box": crop_box,
+            "process_size": process_size,
+            "original_size": image.size,
+            "mask_area": (crop_width * crop_height) / (image.width * image.height)
+        }
+    
+    def blend_crop(
+        self,
+        original: Image.Image,
+        generated: Image.Image,
+        mask: Image.Image,
+        crop_box: Tuple[int, int, int, int],
+        feather: int = 8
+    ) -> Image.Image:
+        """
+        Blend a generated crop back into the original image.
+        
+        The mask is blurred by `feather` pixels so the seam fades into the
+        untouched context instead of showing a hard edge.
+        """
+        from PIL import ImageFilter
+        
+        crop_size = (crop_box[2] - crop_box[0], crop_box[3] - crop_box[1])
+        if generated.size != crop_size:
+            generated = generated.resize(crop_size, Image.Resampling.LANCZOS)
+        
+        mask = mask.convert("L")
+        if mask.size != original.size:
+            mask = mask.resize(original.size, Image.Resampling.NEAREST)
+        alpha = mask.crop(crop_box)
+        if feather > 0:
+            alpha = alpha.filter(ImageFilter.GaussianBlur(radius=feather))
+        
+        result = original.convert("RGB").copy()
+        region = result.crop(crop_box)
+        result.paste(Image.composite(generated.convert("RGB"), region, alpha), crop_box[:2])
+        return result
 
 
 def create_img2img_processor(
     device: torch.device,
-    dtype: torch.dtype = torch.float16
+    dtype: torch.dtype = torch.float16,
+    latent_cache: Optional[LatentCache] = None
 ) -> Img2ImgProcessor:
     """Create an img2img processor."""
-    return Img2ImgProcessor(device, dtype)
+    return Img2ImgProcessor(device, dtype, latent_cache)
 
 
 def create_inpainting_processor(
     device: torch.device,
-    dtype: torch.dtype = torch.float16
+    dtype: torch.dtype = torch.float16,
+    latent_cache: Optional[LatentCache] = None
 ) -> InpaintingProcessor:
     """Create an inpainting processor."""
-    return InpaintingProcessor(device, dtype)
+    return InpaintingProcessor(device, dtype, latent_cache)
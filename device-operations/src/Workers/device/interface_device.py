@@ -141,7 +141,11 @@ class DeviceInterface:
             return {"success": False, "error": "Device interface not initialized"}
         
         try:
-            settings = await self.device_manager.optimize_settings()
+            data = request.get("data", {})
+            settings = await self.device_manager.optimize_settings(
+                data.get("device_id"),
+                data.get("optimization_target", "balanced")
+            )
             return {
                 "success": True,
                 "data": settings,
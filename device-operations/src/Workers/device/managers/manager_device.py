@@ -18,6 +18,7 @@ except ImportError:
         dml_patch = None
 
 import logging
+import os
 import torch
 import platform
 from typing import Dict, Any, List, Optional, Tuple
@@ -137,14 +138,13 @@ class DeviceManager:
             if self.current_device:
                 self.logger.info(f"Selected device: {self.current_device.name} ({self.current_device.device_type.value})")
             
+            self._initialized = True
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to initialize device manager: {str(e)}")
             self._initialized = False
             return False
-        
-        self._initialized = True
     
     def _check_directml_availability(self) -> None:
         """Check if PyTorch DirectML is available."""
@@ -545,7 +545,9 @@ class DeviceManager:
         
         Args:
             device_id: Optional device identifier
-            optimization_target: Optimization target (performance, memory, balanced)
+            optimization_target: Optimization target (performance, memory, balanced,
+                cpu_performance). cpu_performance also applies its thread
+                settings to this process.
             
         Returns:
             Structured response with recommended settings
@@ -585,6 +587,13 @@ class DeviceManager:
             device_type = target_device.device_type
             memory_gb = target_device.memory_total / (1024**3)
             
+            if optimization_target == "cpu_performance" and device_type != DeviceType.CPU:
+                return create_error_response(
+                    DeviceErrorCodes.DEVICE_OPTIMIZATION_FAILED,
+                    f"cpu_performance target requires a CPU device, got {device_type.value}",
+                    device_id=target_device.device_id
+                )
+            
             # Base settings
             settings = {
                 "attention_slicing": True,
@@ -594,8 +603,14 @@ class DeviceManager:
                 "optimization_target": optimization_target
             }
             
+            applied_settings: Dict[str, Any] = {}
+            
             # Adjust settings based on device type, memory, and optimization target
-            if device_type == DeviceType.CPU:
+            if device_type == DeviceType.CPU and optimization_target == "cpu_performance":
+                settings.update(self._get_cpu_performance_settings())
+                applied_settings = self._apply_cpu_thread_settings(settings)
+            
+            elif device_type == DeviceType.CPU:
                 settings.update({
                     "cpu_offload": False,
                     "sequential_cpu_offload": False,
@@ -637,6 +652,7 @@ class DeviceManager:
             optimization_data = {
                 "current_settings": settings,
                 "recommended_settings": settings,
+                "applied_settings": applied_settings,
                 "expected_improvement": 15.0,  # Percentage improvement estimate
                 "confidence_score": 0.85,
                 "analysis": {
@@ -656,6 +672,77 @@ class DeviceManager:
                 details={"exception": str(e)}
             )
     
+    def _get_cpu_performance_settings(self) -> Dict[str, Any]:
+        """
+        Build the cpu_performance profile.
+        
+        Slicing only saves memory at the cost of extra kernel launches, so it
+        is disabled. The UNet and VAE run channels_last. bf16 autocast is
+        enabled only where the CPU has native bf16 support. Intra-op threads
+        default to the physical core count, because hyper-threads rarely help
+        GEMM-bound workloads.
+        """
+        physical_cores = self._get_physical_core_count()
+        
+        return {
+            "attention_slicing": False,
+            "vae_slicing": False,
+            "cpu_offload": False,
+            "sequential_cpu_offload": False,
+            "channels_last": True,
+            "bf16_autocast": self.config.get("cpu_bf16_autocast", self._cpu_supports_bf16()),
+            "torch_compile": self.config.get("cpu_torch_compile", False) and hasattr(torch, "compile"),
+            "intra_op_threads": self.config.get("cpu_intra_op_threads", physical_cores),
+            "inter_op_threads": self.config.get("cpu_inter_op_threads", 1),
+            "physical_cores": physical_cores
+        }
+    
+    def _apply_cpu_thread_settings(self, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply intra/inter-op thread counts to this process."""
+        applied = {}
+        
+        intra_op_threads = settings.get("intra_op_threads")
+        if intra_op_threads:
+            torch.set_num_threads(int(intra_op_threads))
+            applied["intra_op_threads"] = torch.get_num_threads()
+        
+        inter_op_threads = settings.get("inter_op_threads")
+        if inter_op_threads:
+            try:
+                torch.set_num_interop_threads(int(inter_op_threads))
+                applied["inter_op_threads"] = int(inter_op_threads)
+            except RuntimeError as e:
+                # Can only be set once, before any inter-op parallel work has started
+                self.logger.warning(f"Could not set inter-op threads: {str(e)}")
+                applied["inter_op_threads"] = torch.get_num_interop_threads()
+        
+        return applied
+    
+    def _get_physical_core_count(self) -> int:
+        """Get the number of physical CPU cores."""
+        try:
+            import psutil
+            cores = psutil.cpu_count(logical=False)
+            if cores:
+                return cores
+        except ImportError:
+            pass
+        return os.cpu_count() or 1
+    
+    def _cpu_supports_bf16(self) -> bool:
+        """Check whether the CPU has native bf16 instructions (AVX512-BF16 / AMX)."""
+        try:
+            return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+        except Exception:
+            pass
+        
+        try:
+            with open("/proc/cpuinfo", "r") as f:
+                flags = f.read()
+            return "avx512_bf16" in flags or "amx_bf16" in flags
+        except OSError:
+            return False
+    
     async def get_device_status(self, device_id: str) -> Dict[str, Any]:
         """
         Get status information for a specific device.
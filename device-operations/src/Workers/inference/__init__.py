@@ -17,6 +17,9 @@ from .managers.manager_memory import MemoryManager
 from .workers.worker_sdxl import SDXLWorker
 from .workers.worker_controlnet import ControlNetWorker
 from .workers.worker_lora import LoRAWorker
+from .workers.worker_preview import PreviewWorker
+from .workers.worker_onnx import ONNXWorker
+from .workers.worker_tiled_diffusion import TiledDiffusionWorker
 
 __all__ = [
     "InferenceInterface",
@@ -26,5 +29,8 @@ __all__ = [
     "MemoryManager",
     "SDXLWorker",
     "ControlNetWorker",
-    "LoRAWorker"
+    "LoRAWorker",
+    "PreviewWorker",
+    "ONNXWorker",
+    "TiledDiffusionWorker"
 ]
@@ -8,13 +8,22 @@ Unified interface for inference operations.
 import logging
 from typing import Dict, Any, Optional, TYPE_CHECKING
 
+from ..utilities.timing import mark
+
 if TYPE_CHECKING:
     from .managers.manager_batch import BatchManager
     from .managers.manager_pipeline_simple import PipelineManager
     from .managers.manager_memory import MemoryManager
+    from .managers.manager_cpu_performance import CPUPerformanceManager
+    from .managers.manager_warmup import WarmupManager
+    from .managers.manager_bucket import ResolutionBucketManager
+    from .managers.manager_prefetch import PrefetchManager
     from .workers.worker_sdxl import SDXLWorker
     from .workers.worker_controlnet import ControlNetWorker
     from .workers.worker_lora import LoRAWorker
+    from .workers.worker_preview import PreviewWorker
+    from .workers.worker_onnx import ONNXWorker
+    from .workers.worker_tiled_diffusion import TiledDiffusionWorker
 
 
 class InferenceInterface:
@@ -33,9 +42,16 @@ class InferenceInterface:
         self.batch_manager: Optional['BatchManager'] = None
         self.pipeline_manager: Optional['PipelineManager'] = None
         self.memory_manager: Optional['MemoryManager'] = None
+        self.cpu_performance_manager: Optional['CPUPerformanceManager'] = None
+        self.warmup_manager: Optional['WarmupManager'] = None
+        self.bucket_manager: Optional['ResolutionBucketManager'] = None
+        self.prefetch_manager: Optional['PrefetchManager'] = None
         self.sdxl_worker: Optional['SDXLWorker'] = None
         self.controlnet_worker: Optional['ControlNetWorker'] = None
         self.lora_worker: Optional['LoRAWorker'] = None
+        self.preview_worker: Optional['PreviewWorker'] = None
+        self.onnx_worker: Optional['ONNXWorker'] = None
+        self.tiled_worker: Optional['TiledDiffusionWorker'] = None
         
         self.initialized = False
         
@@ -48,23 +64,64 @@ class InferenceInterface:
             from .managers.manager_batch import BatchManager
             from .managers.manager_pipeline_simple import PipelineManager
             from .managers.manager_memory import MemoryManager
+            from .managers.manager_cpu_performance import CPUPerformanceManager
+            from .managers.manager_warmup import WarmupManager
+            from .managers.manager_bucket import ResolutionBucketManager
+            from .managers.manager_prefetch import PrefetchManager
             from .workers.worker_sdxl import SDXLWorker
             from .workers.worker_controlnet import ControlNetWorker
             from .workers.worker_lora import LoRAWorker
+            from .workers.worker_preview import PreviewWorker
+            from .workers.worker_onnx import ONNXWorker
+            from .workers.worker_tiled_diffusion import TiledDiffusionWorker
             
             # Create components
             self.batch_manager = BatchManager(self.config)
             self.pipeline_manager = PipelineManager(self.config)
             self.memory_manager = MemoryManager(self.config)
+            self.cpu_performance_manager = CPUPerformanceManager(self.config)
+            self.warmup_manager = WarmupManager(self.config)
+            self.bucket_manager = ResolutionBucketManager(self.config)
+            self.prefetch_manager = PrefetchManager(self.config)
             self.sdxl_worker = SDXLWorker(self.config)
             self.controlnet_worker = ControlNetWorker(self.config)
             self.lora_worker = LoRAWorker(self.config)
+            self.preview_worker = PreviewWorker(self.config)
+            self.onnx_worker = ONNXWorker(self.config)
+            self.tiled_worker = TiledDiffusionWorker(self.config)
+            
+            # Inject preview worker so progress frames can carry previews
+            self.sdxl_worker.preview_worker = self.preview_worker
+            self.sdxl_worker.cpu_performance_manager = self.cpu_performance_manager
+            self.sdxl_worker.onnx_worker = self.onnx_worker
+            self.sdxl_worker.tiled_worker = self.tiled_worker
+            self.sdxl_worker.warmup_manager = self.warmup_manager
+            self.sdxl_worker.bucket_manager = self.bucket_manager
+            self.sdxl_worker.lora_worker = self.lora_worker
+            
+            # Bucketed batches are executed by the SDXL worker
+            self.batch_manager.bucket_manager = self.bucket_manager
+            self.batch_manager.batch_executor = self.sdxl_worker.process_batch
+            
+            # Queued bucket batches and sessions waiting to start drive model prefetch into the
+            # memory manager's host tier
+            self.prefetch_manager.tiered_cache = self.memory_manager.tiered_cache
+            self.prefetch_manager.add_queue("buckets", self.bucket_manager.pending_requests)
+            self.prefetch_manager.add_queue("sessions", self.pipeline_manager.pending_requests)
+            self.batch_manager.prefetch_manager = self.prefetch_manager
             
             # Initialize components
             components = [
                 self.batch_manager,
                 self.pipeline_manager,
                 self.memory_manager,
+                self.cpu_performance_manager,
+                self.warmup_manager,
+                self.bucket_manager,
+                self.prefetch_manager,
+                self.preview_worker,
+                self.onnx_worker,
+                self.tiled_worker,
                 self.sdxl_worker,
                 self.controlnet_worker,
                 self.lora_worker
@@ -83,6 +140,39 @@ class InferenceInterface:
             self.logger.error("Inference interface initialization failed: %s", e)
             return False
     
+    async def _process_with_session(self, inference_data: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run SDXL inference inside a tracked session that receives progress frames."""
+        mark("interface")
+        session_id = inference_data.get("session_id") or request.get("request_id", "")
+        inference_data["session_id"] = session_id
+        
+        if not session_id or not self.pipeline_manager:
+            return await self.sdxl_worker.process_inference(inference_data)
+        
+        self.pipeline_manager.create_session(
+            session_id, inference_data.get("type", "unknown"),
+            request_data=inference_data,
+            client_id=request.get("client_id") or inference_data.get("client_id")
+        )
+        inference_data["progress_callback"] = lambda frame: self.pipeline_manager.update_session_progress(
+            session_id, frame["progress"], frame
+        )
+        
+        if self.prefetch_manager is not None:
+            self.prefetch_manager.schedule()
+        
+        try:
+            result = await self.sdxl_worker.process_inference(inference_data)
+        except Exception as e:
+            self.pipeline_manager.complete_session(session_id, {"error": str(e)}, "failed")
+            raise
+        finally:
+            inference_data.pop("progress_callback", None)
+        
+        status = "failed" if "error" in result else "completed"
+        self.pipeline_manager.complete_session(session_id, result, status)
+        return result
+    
     async def text2img(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Process text-to-image inference request."""
         if not self.initialized or not self.sdxl_worker:
@@ -91,7 +181,7 @@ class InferenceInterface:
         try:
             inference_data = request.get("data", {})
             inference_data["type"] = "text2img"
-            result = await self.sdxl_worker.process_inference(inference_data)
+            result = await self._process_with_session(inference_data, request)
             return {
                 "success": True,
                 "data": result,
@@ -112,7 +202,7 @@ class InferenceInterface:
         try:
             inference_data = request.get("data", {})
             inference_data["type"] = "img2img"
-            result = await self.sdxl_worker.process_inference(inference_data)
+            result = await self._process_with_session(inference_data, request)
             return {
                 "success": True,
                 "data": result,
@@ -133,7 +223,7 @@ class InferenceInterface:
         try:
             inference_data = request.get("data", {})
             inference_data["type"] = "inpainting"
-            result = await self.sdxl_worker.process_inference(inference_data)
+            result = await self._process_with_session(inference_data, request)
             return {
                 "success": True,
                 "data": result,
@@ -440,7 +530,8 @@ class InferenceInterface:
         
         try:
             # Get active sessions from pipeline manager
-            sessions = await self.pipeline_manager.get_active_sessions()
+            client_id = request.get("data", {}).get("client_id")
+            sessions = await self.pipeline_manager.get_active_sessions(client_id)
             
             return {
                 "success": True,
@@ -457,6 +548,152 @@ class InferenceInterface:
                 "request_id": request.get("request_id", "")
             }
 
+    async def optimize_pipeline(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a device optimization profile to loaded pipelines."""
+        if not self.initialized or not self.sdxl_worker or not self.cpu_performance_manager:
+            return {"success": False, "error": "Inference interface not initialized"}
+        
+        try:
+            data = request.get("data", {})
+            optimization_target = data.get("optimization_target", "cpu_performance")
+            if optimization_target != "cpu_performance":
+                return {
+                    "success": False,
+                    "error": f"Unsupported optimization target for pipelines: {optimization_target}",
+                    "request_id": request.get("request_id", "")
+                }
+            
+            # Get the profile from the device manager (also applies thread settings)
+            from ..device.interface_device import DeviceInterface
+            device_interface = DeviceInterface(self.config)
+            await device_interface.initialize()
+            
+            device_response = await device_interface.optimize_settings({
+                "data": {
+                    "device_id": data.get("device_id"),
+                    "optimization_target": optimization_target
+                }
+            })
+            optimization = device_response.get("data", {})
+            if not device_response.get("success") or not optimization.get("success"):
+                return {
+                    "success": False,
+                    "error": optimization.get("error_message") or device_response.get("error", "Device optimization failed"),
+                    "request_id": request.get("request_id", "")
+                }
+            
+            settings = dict(optimization["data"]["recommended_settings"])
+            settings.update(data.get("settings", {}))
+            
+            model_names = [data["model_name"]] if data.get("model_name") else list(self.sdxl_worker.pipelines.keys())
+            applied = {}
+            for model_name in model_names:
+                pipeline = self.sdxl_worker.pipelines.get(model_name)
+                if pipeline is None:
+                    applied[model_name] = {"error": f"Pipeline not loaded: {model_name}"}
+                    continue
+                applied[model_name] = self.cpu_performance_manager.apply_profile(model_name, pipeline, settings)
+            
+            return {
+                "success": True,
+                "data": {
+                    "optimization_target": optimization_target,
+                    "settings": settings,
+                    "thread_settings": optimization["data"].get("applied_settings", {}),
+                    "pipelines": applied
+                },
+                "request_id": request.get("request_id", "")
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "request_id": request.get("request_id", "")
+            }
+
+    async def warmup_model(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Warm up a loaded pipeline over resolution buckets and batch sizes."""
+        if not self.initialized or not self.sdxl_worker or not self.warmup_manager:
+            return {"success": False, "error": "Inference interface not initialized"}
+        
+        try:
+            data = request.get("data", {})
+            model_name = data.get("model_name") or self.sdxl_worker.current_model_name
+            if not model_name:
+                return {
+                    "success": False,
+                    "error": "model_name is required",
+                    "request_id": request.get("request_id", "")
+                }
+            
+            # Without explicit buckets, prime the buckets that see the most traffic
+            resolution_buckets = data.get("resolution_buckets")
+            if not resolution_buckets and self.bucket_manager:
+                resolution_buckets = self.bucket_manager.get_hot_buckets() or None
+            
+            await self.sdxl_worker.warmup_model(
+                model_name,
+                resolution_buckets=resolution_buckets,
+                batch_sizes=data.get("batch_sizes"),
+                steps=data.get("steps")
+            )
+            return {
+                "success": True,
+                "data": {"model_name": model_name, **self.warmup_manager.get_model_state(model_name)},
+                "request_id": request.get("request_id", "")
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "request_id": request.get("request_id", "")
+            }
+
+    async def get_model_readiness(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Get readiness state and warmup timings of loaded pipelines."""
+        if not self.initialized or not self.sdxl_worker or not self.warmup_manager:
+            return {"success": False, "error": "Inference interface not initialized"}
+        
+        try:
+            data = request.get("data", {})
+            model_names = [data["model_name"]] if data.get("model_name") else list(self.sdxl_worker.pipelines.keys())
+            models = {
+                model_name: self.warmup_manager.get_model_state(model_name) or {"state": "not_loaded"}
+                for model_name in model_names
+            }
+            return {
+                "success": True,
+                "data": {
+                    "models": models,
+                    "ready_models": [name for name in model_names if self.warmup_manager.is_ready(name)]
+                },
+                "request_id": request.get("request_id", "")
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "request_id": request.get("request_id", "")
+            }
+
+    async def get_bucket_stats(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Get per-bucket traffic, pending queue depth and batch occupancy."""
+        if not self.initialized or not self.bucket_manager:
+            return {"success": False, "error": "Inference interface not initialized"}
+        
+        try:
+            return {
+                "success": True,
+                "data": await self.bucket_manager.get_status(),
+                "request_id": request.get("request_id", "")
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "request_id": request.get("request_id", "")
+            }
+
     async def get_status(self) -> Dict[str, Any]:
         """Get inference interface status."""
         if not self.initialized:
@@ -474,9 +711,16 @@ class InferenceInterface:
                 ("batch_manager", self.batch_manager),
                 ("pipeline_manager", self.pipeline_manager),
                 ("memory_manager", self.memory_manager),
+                ("cpu_performance_manager", self.cpu_performance_manager),
+                ("warmup_manager", self.warmup_manager),
+                ("bucket_manager", self.bucket_manager),
+                ("prefetch_manager", self.prefetch_manager),
                 ("sdxl_worker", self.sdxl_worker),
                 ("controlnet_worker", self.controlnet_worker),
-                ("lora_worker", self.lora_worker)
+                ("lora_worker", self.lora_worker),
+                ("preview_worker", self.preview_worker),
+                ("onnx_worker", self.onnx_worker),
+                ("tiled_worker", self.tiled_worker)
             ]
             
             for name, component in components:
@@ -501,6 +745,13 @@ class InferenceInterface:
                 self.lora_worker,
                 self.controlnet_worker,
                 self.sdxl_worker,
+                self.tiled_worker,
+                self.onnx_worker,
+                self.preview_worker,
+                self.prefetch_manager,
+                self.bucket_manager,
+                self.warmup_manager,
+                self.cpu_performance_manager,
                 self.memory_manager,
                 self.pipeline_manager,
                 self.batch_manager
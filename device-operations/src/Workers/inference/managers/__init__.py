@@ -3,15 +3,26 @@ Inference Managers Package for SDXL Workers System
 ==================================================
 
 This package contains inference managers that handle batch processing,
-pipeline lifecycle management, and memory optimization.
+pipeline lifecycle management, session storage, memory optimization, and model warmup.
 """
 
 from .manager_batch import BatchManager
 from .manager_pipeline import PipelineManager
 from .manager_memory import MemoryManager
+from .manager_session_store import SessionStore
+from .manager_cpu_performance import CPUPerformanceManager
+from .manager_warmup import WarmupManager
+from .manager_bucket import ResolutionBucketManager, BucketAssignment
+from .manager_prefetch import PrefetchManager
 
 __all__ = [
     "BatchManager",
     "PipelineManager",
-    "MemoryManager"
+    "MemoryManager",
+    "SessionStore",
+    "CPUPerformanceManager",
+    "WarmupManager",
+    "ResolutionBucketManager",
+    "BucketAssignment",
+    "PrefetchManager"
 ]
\ No newline at end of file
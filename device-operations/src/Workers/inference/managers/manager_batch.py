@@ -13,6 +13,8 @@ from typing import Dict, List, Optional, Any, Tuple, Callable
 from dataclasses import dataclass
 import time
 
+from ...utilities.timing import record_stages
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -203,6 +205,12 @@ class BatchManager:
         self.device = config.get("device", "cuda")
         self.memory_monitor = MemoryMonitor(self.device)
         self.current_metrics: Optional[BatchMetrics] = None
+        self.max_batch_size = config.get("max_batch_size", 4)
+        
+        # Resolution bucket queues and the executor that runs one bucket batch (injected)
+        self.bucket_manager = None
+        self.batch_executor: Optional[Callable] = None
+        self.prefetch_manager = None
         self.initialized = False
         
     async def initialize(self) -> bool:
@@ -225,15 +233,19 @@ class BatchManager:
             if not requests:
                 return {"error": "No requests provided for batch processing"}
             
+            if self.bucket_manager is not None and self.batch_executor is not None:
+                return await self._process_bucketed_batch(requests, batch_data.get("batch_size") or self.max_batch_size)
+            
             # Process batches (simplified for this migration)
             results = []
             for request in requests:
                 # Simulate processing
+                request_start = time.perf_counter()
                 result = {
                     "request_id": request.get("request_id", ""),
-                    "status": "completed",
-                    "processing_time": 1.0  # Placeholder
+                    "status": "completed"
                 }
+                result["processing_time"] = time.perf_counter() - request_start
                 results.append(result)
             
             return {
@@ -246,6 +258,74 @@ class BatchManager:
             self.logger.error("Failed to process batch: %s", e)
             return {"error": str(e)}
         
+    async def _process_bucketed_batch(self, requests: List[Dict[str, Any]], max_batch_size: int) -> Dict[str, Any]:
+        """
+        Snap requests to resolution buckets and execute them bucket by bucket.
+        
+        Requests are queued per batch key; the fullest queue is drained first
+        in batches of up to `max_batch_size` images, and each executed batch
+        is recorded for per-bucket occupancy statistics. The requests share
+        the bucket queues with overlapping calls (and the prefetch lookahead)
+        but are tagged with this call, which only pops its own entries.
+        """
+        order = {id(request): index for index, request in enumerate(requests)}
+        owner = object()
+        for request in requests:
+            self.bucket_manager.enqueue(request, owner=owner)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        batches = []
+        try:
+            while True:
+                key, entries = self.bucket_manager.pop_batch(max_batch_size, owner=owner)
+                if not entries:
+                    break
+                
+                images = sum(max(1, int(entry["request"].get("num_images", 1))) for entry in entries)
+                batch_start_time = time.time()
+                queue_times = [batch_start_time - entry["enqueued_at"] for entry in entries]
+                if self.prefetch_manager is not None:
+                    # Load the next batches' models while this one runs
+                    self.prefetch_manager.schedule()
+                try:
+                    batch_results = await self.batch_executor(entries)
+                except Exception as e:
+                    self.logger.error("Bucket batch %s failed: %s", key, e)
+                    batch_results = [{"error": str(e)} for _ in entries]
+                batch_time = time.time() - batch_start_time
+                record_stages({"batch_queue": max(queue_times), "batch_execute": batch_time})
+                
+                bucket = entries[0]["assignment"].bucket
+                self.bucket_manager.record_batch(bucket, images, max_batch_size, batch_time)
+                batches.append({
+                    "bucket": list(bucket),
+                    "requests": len(entries),
+                    "images": images,
+                    "occupancy": images / max_batch_size,
+                    "batch_time": batch_time
+                })
+                
+                for entry, result, queue_time in zip(entries, batch_results, queue_times):
+                    request = entry["request"]
+                    result = dict(result)
+                    result["queue_time"] = queue_time
+                    result["batch_time"] = batch_time
+                    result.setdefault("request_id", request.get("request_id", ""))
+                    result.setdefault("status", "failed" if "error" in result else "completed")
+                    results[order[id(request)]] = result
+        finally:
+            # Entries left behind by a cancelled or failed call must not stay queued
+            self.bucket_manager.discard(owner)
+        
+        return {
+            "batch_processed": True,
+            "total_requests": len(requests),
+            "results": results,
+            "batch_size": max_batch_size,
+            "batches": batches,
+            "bucket_stats": self.bucket_manager.get_bucket_stats()
+        }
+        
     async def process_batch_generation(self, 
                                      generation_function: Callable,
                                      batch_config: BatchConfiguration,
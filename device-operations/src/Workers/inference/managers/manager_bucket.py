@@ -0,0 +1,325 @@
+"""
+Resolution Bucket Manager for SDXL Workers System
+=================================================
+
+Snaps arbitrary request resolutions to a fixed set of aspect-ratio buckets
+so that requests of different sizes can share a batch, keeps a queue per
+bucket for the batching engine, and tracks batch occupancy per bucket.
+"""
+
+import logging
+import math
+import time
+from collections import deque, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple, Deque
+
+from PIL import Image
+
+from ..workers.worker_lora import requested_loras
+
+logger = logging.getLogger(__name__)
+
+# SDXL training aspect buckets (~1 megapixel, multiples of 64)
+SDXL_RESOLUTION_BUCKETS: List[Tuple[int, int]] = [
+    (1024, 1024),
+    (1152, 896), (896, 1152),
+    (1216, 832), (832, 1216),
+    (1344, 768), (768, 1344),
+    (1536, 640), (640, 1536)
+]
+
+# "nearest": resize to the bucket and back; "crop": cover the bucket and
+# center-crop; "pad": fit inside the bucket and pad the remainder
+SNAP_POLICIES = ("nearest", "crop", "pad")
+
+
+@dataclass
+class BucketAssignment:
+    """A request resolution snapped to a bucket, with the mapping between the two."""
+    requested_size: Tuple[int, int]
+    bucket: Tuple[int, int]
+    policy: str = "nearest"
+
+    def __post_init__(self):
+        """Validate assignment."""
+        if self.policy not in SNAP_POLICIES:
+            raise ValueError(f"Unknown snap policy: {self.policy}")
+        if min(self.requested_size) <= 0:
+            raise ValueError("requested_size must be positive")
+
+    @property
+    def content_box(self) -> Tuple[int, int, int, int]:
+        """Centered box of the requested aspect ratio inside the bucket."""
+        bucket_width, bucket_height = self.bucket
+        width, height = self.requested_size
+        scale = min(bucket_width / width, bucket_height / height)
+        content_width = min(bucket_width, max(1, round(width * scale)))
+        content_height = min(bucket_height, max(1, round(height * scale)))
+        left = (bucket_width - content_width) // 2
+        top = (bucket_height - content_height) // 2
+        return left, top, left + content_width, top + content_height
+
+    def prepare_input_image(self, image: Image.Image, fill: Any = 0) -> Image.Image:
+        """Map a request-sized input image (init image or mask) onto the bucket."""
+        if image.size == self.bucket:
+            return image
+        if self.policy == "nearest":
+            return image.resize(self.bucket, Image.Resampling.LANCZOS)
+
+        bucket_width, bucket_height = self.bucket
+        if self.policy == "crop":
+            scale = max(bucket_width / image.width, bucket_height / image.height)
+            resized = image.resize(
+                (max(bucket_width, round(image.width * scale)), max(bucket_height, round(image.height * scale))),
+                Image.Resampling.LANCZOS
+            )
+            left = (resized.width - bucket_width) // 2
+            top = (resized.height - bucket_height) // 2
+            return resized.crop((left, top, left + bucket_width, top + bucket_height))
+
+        box = self.content_box
+        canvas = Image.new(image.mode, self.bucket, fill)
+        canvas.paste(image.resize((box[2] - box[0], box[3] - box[1]), Image.Resampling.LANCZOS), box[:2])
+        return canvas
+
+    def restore_output_image(self, image: Image.Image) -> Image.Image:
+        """Map a bucket-sized generated image back to the requested size."""
+        if image.size == self.requested_size:
+            return image
+        if self.policy != "nearest":
+            image = image.crop(self.content_box)
+        return image.resize(self.requested_size, Image.Resampling.LANCZOS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize assignment."""
+        return {
+            "requested_size": list(self.requested_size),
+            "bucket": list(self.bucket),
+            "policy": self.policy
+        }
+
+
+class ResolutionBucketManager:
+    """
+    Resolution and aspect-ratio bucketing for batch compatibility.
+
+    Requests are snapped to the bucket with the closest aspect ratio
+    (closest area on ties) and queued per batch key, which is the bucket
+    plus everything else that must match to share a pipeline call.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        bucket_config = config.get("buckets", {})
+        self.snap_single_requests = bucket_config.get("snap_single_requests", False)
+        self.snap_policy = bucket_config.get("snap_policy", "nearest")
+        self.buckets = [
+            (int(width), int(height))
+            for width, height in bucket_config.get("resolutions", SDXL_RESOLUTION_BUCKETS)
+        ]
+        if self.snap_policy not in SNAP_POLICIES:
+            raise ValueError(f"Unknown snap policy: {self.snap_policy}")
+        if not self.buckets or any(width % 8 or height % 8 for width, height in self.buckets):
+            raise ValueError("resolution buckets must be non-empty multiples of 8")
+
+        # Without multi-LoRA batching, LoRAs are fused and each call runs one combination
+        self.split_by_lora = not config.get("multi_lora", {}).get("enabled", True)
+
+        # Pending requests per batch key, in arrival order
+        self.queues: "OrderedDict[Tuple, Deque[Dict[str, Any]]]" = OrderedDict()
+
+        # Per-bucket traffic and occupancy statistics
+        self.bucket_stats: Dict[Tuple[int, int], Dict[str, Any]] = {}
+
+    async def initialize(self) -> bool:
+        """Initialize resolution bucket manager."""
+        try:
+            self.logger.info("Initializing resolution bucket manager...")
+            self.initialized = True
+            self.logger.info("Resolution bucket manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Resolution bucket manager initialization failed: {e}")
+            return False
+
+    def find_bucket(self, width: int, height: int) -> Tuple[int, int]:
+        """Bucket with the closest aspect ratio, then the closest area."""
+        aspect = math.log(width / height)
+        area = width * height
+        return min(
+            self.buckets,
+            key=lambda bucket: (round(abs(math.log(bucket[0] / bucket[1]) - aspect), 6),
+                                abs(bucket[0] * bucket[1] - area))
+        )
+
+    def snap(self, width: int, height: int, policy: Optional[str] = None) -> BucketAssignment:
+        """Snap a requested resolution to its bucket."""
+        width, height = int(width), int(height)
+        assignment = BucketAssignment((width, height), self.find_bucket(width, height), policy or self.snap_policy)
+        stats = self._get_bucket_stats(assignment.bucket)
+        stats["requests"] += 1
+        if assignment.bucket != (width, height):
+            stats["snapped_requests"] += 1
+        return assignment
+
+    def batch_key(self, request_data: Dict[str, Any], assignment: BucketAssignment) -> Tuple:
+        """Key of requests that can share one pipeline call."""
+        return (
+            request_data.get("model_name"),
+            request_data.get("type", "text2img"),
+            assignment.bucket,
+            int(request_data.get("steps", request_data.get("num_inference_steps", 20))),
+            float(request_data.get("guidance_scale", 7.5)),
+            request_data.get("backend"),
+            request_data.get("clip_skip"),
+            tuple(sorted(requested_loras(request_data))) if self.split_by_lora else ()
+        )
+
+    def enqueue(self, request_data: Dict[str, Any], owner: Optional[object] = None) -> Tuple:
+        """
+        Snap a request and add it to its bucket queue; returns the batch key.
+
+        `owner` tags the entry so that only `pop_batch(..., owner=owner)` takes it.
+        """
+        policy = request_data.get("snap_policy")
+        assignment = self.snap(
+            request_data.get("width", 1024), request_data.get("height", 1024),
+            policy if policy != "none" else None
+        )
+        key = self.batch_key(request_data, assignment)
+        self.queues.setdefault(key, deque()).append({
+            "request": request_data,
+            "assignment": assignment,
+            "enqueued_at": time.time(),
+            "owner": owner
+        })
+        return key
+
+    def pop_batch(self, max_batch_size: int, key: Optional[Tuple] = None,
+                  owner: Optional[object] = None) -> Tuple[Optional[Tuple], List[Dict[str, Any]]]:
+        """
+        Take up to `max_batch_size` images worth of queued requests.
+
+        Without a key, the queue with the most pending requests is chosen,
+        oldest first on ties. A request is never split across batches. With
+        an `owner`, only entries enqueued with that owner are considered, so
+        overlapping callers sharing the queues never take each other's requests.
+        """
+        def owned(queue: Deque[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return [entry for entry in queue if owner is None or entry["owner"] is owner]
+
+        if key is None:
+            candidates = []
+            for queue_key, queue in self.queues.items():
+                pending = owned(queue)
+                if pending:
+                    candidates.append((len(pending), -pending[0]["enqueued_at"], queue_key))
+            if not candidates:
+                return None, []
+            key = max(candidates, key=lambda candidate: candidate[:2])[2]
+
+        queue = self.queues.get(key)
+        entries: List[Dict[str, Any]] = []
+        images = 0
+        for entry in owned(queue) if queue else []:
+            num_images = max(1, int(entry["request"].get("num_images", 1)))
+            if entries and images + num_images > max_batch_size:
+                break
+            entries.append(entry)
+            images += num_images
+        if entries:
+            taken = {id(entry) for entry in entries}
+            queue = deque(entry for entry in queue if id(entry) not in taken)
+            if queue:
+                self.queues[key] = queue
+            else:
+                del self.queues[key]
+        return key, entries
+
+    def discard(self, owner: object) -> int:
+        """Drop the queued entries of an owner (e.g. a caller that stopped early); returns how many."""
+        dropped = 0
+        for key in list(self.queues):
+            queue = self.queues[key]
+            kept = deque(entry for entry in queue if entry["owner"] is not owner)
+            dropped += len(queue) - len(kept)
+            if kept:
+                self.queues[key] = kept
+            else:
+                del self.queues[key]
+        return dropped
+
+    def record_batch(self, bucket: Tuple[int, int], images: int, capacity: int, seconds: float) -> None:
+        """Record a batch executed at a bucket for occupancy statistics."""
+        stats = self._get_bucket_stats(bucket)
+        stats["batches"] += 1
+        stats["images"] += images
+        stats["capacity"] += max(capacity, images)
+        stats["batch_seconds"] += seconds
+
+    def pending_requests(self) -> List[Dict[str, Any]]:
+        """Queued requests in the order `pop_batch` will take them (fullest queue first)."""
+        ordered = sorted(
+            (queue for queue in self.queues.values() if queue),
+            key=lambda queue: (len(queue), -queue[0]["enqueued_at"]),
+            reverse=True
+        )
+        return [entry["request"] for queue in ordered for entry in queue]
+
+    def get_hot_buckets(self, limit: int = 3) -> List[Tuple[int, int]]:
+        """Most requested buckets, for prioritizing pipeline warmup."""
+        ranked = sorted(self.bucket_stats.items(), key=lambda item: item[1]["requests"], reverse=True)
+        return [bucket for bucket, stats in ranked[:limit] if stats["requests"] > 0]
+
+    def get_bucket_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-bucket traffic and achieved batch occupancy."""
+        pending: Dict[Tuple[int, int], int] = {}
+        for key, queue in self.queues.items():
+            pending[key[2]] = pending.get(key[2], 0) + len(queue)
+
+        report = {}
+        for bucket, stats in self.bucket_stats.items():
+            report[f"{bucket[0]}x{bucket[1]}"] = {
+                **stats,
+                "pending": pending.get(bucket, 0),
+                "occupancy": stats["images"] / stats["capacity"] if stats["capacity"] else None,
+                "average_batch_size": stats["images"] / stats["batches"] if stats["batches"] else None
+            }
+        return report
+
+    def _get_bucket_stats(self, bucket: Tuple[int, int]) -> Dict[str, Any]:
+        """Get or create the statistics record of a bucket."""
+        return self.bucket_stats.setdefault(bucket, {
+            "requests": 0,
+            "snapped_requests": 0,
+            "batches": 0,
+            "images": 0,
+            "capacity": 0,
+            "batch_seconds": 0.0
+        })
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get resolution bucket manager status."""
+        return {
+            "initialized": self.initialized,
+            "snap_single_requests": self.snap_single_requests,
+            "snap_policy": self.snap_policy,
+            "buckets": [list(bucket) for bucket in self.buckets],
+            "pending_requests": sum(len(queue) for queue in self.queues.values()),
+            "bucket_stats": self.get_bucket_stats()
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up resolution bucket manager resources."""
+        try:
+            self.logger.info("Cleaning up resolution bucket manager...")
+            self.queues.clear()
+            self.bucket_stats.clear()
+            self.initialized = False
+            self.logger.info("Resolution bucket manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Resolution bucket manager cleanup error: {e}")
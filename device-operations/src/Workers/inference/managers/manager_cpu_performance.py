@@ -0,0 +1,177 @@
+"""
+CPU Performance Manager for SDXL Workers System
+===============================================
+
+Applies the cpu_performance optimization profile to loaded pipelines:
+channels_last memory format, bf16 autocast, optional torch.compile with a
+persistent compiled-graph cache, and memory-saving features turned off.
+"""
+
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class CPUPerformanceManager:
+    """
+    Applies CPU performance settings to diffusion pipelines.
+
+    Settings come from the device manager's cpu_performance target. Thread
+    counts are process-wide, so the device manager applies them; this
+    manager handles everything that is per pipeline.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        self.compile_mode = config.get("compile_mode", "default")
+        self.compile_cache_dir = config.get(
+            "compile_cache_dir",
+            os.path.join(tempfile.gettempdir(), "sdxl_inductor_cache")
+        )
+
+        # Applied profiles and compiled modules, keyed by model name
+        self.pipeline_profiles: Dict[str, Dict[str, Any]] = {}
+        self.compiled_modules: Dict[Tuple[str, str], torch.nn.Module] = {}
+
+    async def initialize(self) -> bool:
+        """Initialize CPU performance manager."""
+        try:
+            self.logger.info("Initializing CPU performance manager...")
+
+            # Persist inductor's compiled graphs so restarts skip recompilation
+            os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", self.compile_cache_dir)
+            os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+
+            self.initialized = True
+            self.logger.info("CPU performance manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"CPU performance manager initialization failed: {e}")
+            return False
+
+    def apply_profile(self, model_name: str, pipeline, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply cpu_performance settings to a pipeline.
+
+        Args:
+            model_name: Name the pipeline is registered under
+            pipeline: Loaded diffusers pipeline
+            settings: Recommended settings from the device manager
+
+        Returns:
+            The settings that were actually applied
+        """
+        applied: Dict[str, Any] = {}
+
+        if not settings.get("attention_slicing", True):
+            try:
+                pipeline.disable_attention_slicing()
+                applied["attention_slicing"] = False
+            except Exception as e:
+                logger.debug(f"Could not disable attention slicing: {e}")
+
+        if not settings.get("vae_slicing", True):
+            try:
+                pipeline.disable_vae_slicing()
+                applied["vae_slicing"] = False
+            except Exception as e:
+                logger.debug(f"Could not disable VAE slicing: {e}")
+
+        if settings.get("channels_last"):
+            for component in ("unet", "vae"):
+                module = getattr(pipeline, component, None)
+                if module is not None:
+                    module.to(memory_format=torch.channels_last)
+            applied["channels_last"] = True
+
+        applied["bf16_autocast"] = bool(settings.get("bf16_autocast"))
+
+        if settings.get("torch_compile"):
+            applied["torch_compile"] = self._compile_unet(model_name, pipeline)
+
+        self.pipeline_profiles[model_name] = applied
+        self.logger.info(f"Applied cpu_performance profile to {model_name}: {applied}")
+        return applied
+
+    def _compile_unet(self, model_name: str, pipeline) -> bool:
+        """Compile the pipeline UNet once per model, reusing the compiled module afterwards."""
+        key = (model_name, "unet")
+        compiled = self.compiled_modules.get(key)
+
+        if compiled is None:
+            unet = getattr(pipeline, "unet", None)
+            if unet is None or not hasattr(torch, "compile"):
+                return False
+            if getattr(unet, "_orig_mod", None) is not None:
+                # Already compiled elsewhere
+                self.compiled_modules[key] = unet
+                return True
+
+            try:
+                import torch._inductor.config as inductor_config
+                inductor_config.fx_graph_cache = True
+            except Exception:
+                pass
+
+            try:
+                compiled = torch.compile(unet, mode=self.compile_mode, fullgraph=False, dynamic=False)
+            except Exception as e:
+                self.logger.warning(f"torch.compile failed for {model_name}: {e}")
+                return False
+            self.compiled_modules[key] = compiled
+
+        pipeline.unet = compiled
+        return True
+
+    @contextmanager
+    def autocast(self, model_name: Optional[str]):
+        """
+        Context for running a pipeline under its profile's autocast.
+
+        Autocast state is thread-local, so enter this inside the thread
+        that runs the pipeline.
+        """
+        profile = self.pipeline_profiles.get(model_name or "")
+        if profile and profile.get("bf16_autocast"):
+            with torch.autocast("cpu", dtype=torch.bfloat16):
+                yield
+        else:
+            yield
+
+    def release_model(self, model_name: str) -> None:
+        """Forget the profile and compiled modules of a model."""
+        self.pipeline_profiles.pop(model_name, None)
+        for key in [key for key in self.compiled_modules if key[0] == model_name]:
+            del self.compiled_modules[key]
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get CPU performance manager status."""
+        return {
+            "initialized": self.initialized,
+            "optimized_models": list(self.pipeline_profiles.keys()),
+            "compiled_modules": len(self.compiled_modules),
+            "compile_mode": self.compile_mode,
+            "compile_cache_dir": os.environ.get("TORCHINDUCTOR_CACHE_DIR", self.compile_cache_dir),
+            "intra_op_threads": torch.get_num_threads(),
+            "inter_op_threads": torch.get_num_interop_threads()
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up CPU performance manager resources."""
+        try:
+            self.logger.info("Cleaning up CPU performance manager...")
+            self.pipeline_profiles.clear()
+            self.compiled_modules.clear()
+            self.initialized = False
+            self.logger.info("CPU performance manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"CPU performance manager cleanup error: {e}")
@@ -6,6 +6,7 @@ Migrated from inference/memory_optimizer.py
 Provides memory optimization strategies and VRAM management for inference operations.
 """
 
+import asyncio
 import logging
 import torch
 import gc
@@ -15,6 +16,8 @@ from dataclasses import dataclass
 import psutil
 import time
 
+from ...model.workers.worker_tiered_cache import TieredModelCache, TIER_HOST
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,26 +59,30 @@ class MemoryManager:
         self.memory_history: List[MemoryStats] = []
         self.optimization_enabled = True
         
+        # Initialize optimization state
+        self.models_on_cpu: Dict[str, torch.nn.Module] = {}
+        self.current_model_on_gpu: Optional[str] = None
+        self.peak_memory = 0.0
+        
+        # Keeps as many models on the device as fit instead of swapping one at a time
+        self.tiered_cache: Optional[TieredModelCache] = None
+        if config.get("tiered_cache", {}).get("enabled", True):
+            self.tiered_cache = TieredModelCache({**config, "device": str(self.device)})
+        
     async def initialize(self) -> bool:
         """Initialize memory manager."""
         try:
             self.logger.info("Initializing memory manager...")
+            if self.tiered_cache is not None and not await self.tiered_cache.initialize():
+                self.tiered_cache = None
             self.initialized = True
+            self._log_memory_config()
             self.logger.info("Memory manager initialized successfully")
             return True
         except Exception as e:
             self.logger.error(f"Memory manager initialization failed: {e}")
             return False
         
-            
-        # Initialize optimization state
-        self.models_on_cpu: Dict[str, torch.nn.Module] = {}
-        self.current_model_on_gpu: Optional[str] = None
-        self.peak_memory = 0.0
-        
-        self.logger.info(f"Memory manager initialized for {self.device}")
-        self._log_memory_config()
-        
     async def get_status(self) -> Dict[str, Any]:
         """Get memory manager status."""
         return {
@@ -85,7 +92,8 @@ class MemoryManager:
             "models_on_cpu": len(self.models_on_cpu),
             "current_model_on_gpu": self.current_model_on_gpu,
             "peak_memory_gb": self.peak_memory,
-            "current_memory": self.get_memory_stats().__dict__
+            "current_memory": self.get_memory_stats().__dict__,
+            "tiered_cache": await self.tiered_cache.get_status() if self.tiered_cache else None
         }
     
     async def cleanup(self) -> None:
@@ -100,6 +108,8 @@ class MemoryManager:
             self.current_model_on_gpu = None
             self.memory_history.clear()
             self.peak_memory = 0.0
+            if self.tiered_cache is not None:
+                await self.tiered_cache.cleanup()
             
             # Clear GPU cache
             self.clear_cache()
@@ -226,6 +236,16 @@ class MemoryManager:
     def move_model_to_gpu(self, model_name: str, model: torch.nn.Module) -> None:
         """Move a specific model to GPU."""
         
+        if self.tiered_cache is not None:
+            # Other models stay on the device until the cache needs their room
+            if model_name in self.tiered_cache.entries:
+                self.tiered_cache.get(model_name)
+            else:
+                self.tiered_cache.put(model_name, model)
+            self.current_model_on_gpu = model_name
+            logger.debug(f"Moved {model_name} to GPU")
+            return
+        
         # Move current model to CPU if different
         if self.current_model_on_gpu and self.current_model_on_gpu != model_name:
             self._move_current_model_to_cpu()
@@ -239,8 +259,26 @@ class MemoryManager:
         
         logger.debug(f"Moved {model_name} to GPU")
     
+    async def move_model_to_gpu_async(self, model_name: str, model: torch.nn.Module) -> None:
+        """Move a specific model to GPU without blocking the event loop during the copy."""
+        if self.tiered_cache is None:
+            await asyncio.to_thread(self.move_model_to_gpu, model_name, model)
+            return
+        if model_name not in self.tiered_cache.entries:
+            await asyncio.to_thread(self.tiered_cache.put, model_name, model, TIER_HOST)
+        await self.tiered_cache.get_async(model_name)
+        self.current_model_on_gpu = model_name
+    
     def move_model_to_cpu(self, model_name: str, model: torch.nn.Module) -> None:
         """Move a specific model to CPU."""
+        if self.tiered_cache is not None and model_name in self.tiered_cache.entries:
+            # Pinned host memory, so moving it back is a fast asynchronous copy
+            self.tiered_cache.demote(model_name, TIER_HOST)
+            if self.current_model_on_gpu == model_name:
+                self.current_model_on_gpu = None
+            logger.debug(f"Moved {model_name} to CPU")
+            return
+        
         model.to('cpu')
         self.models_on_cpu[model_name] = model
         
@@ -330,7 +368,8 @@ class MemoryManager:
             "model_distribution": {
                 "current_gpu_model": self.current_model_on_gpu,
                 "cpu_models": list(self.models_on_cpu.keys()),
-                "total_models": len(self.models_on_cpu) + (1 if self.current_model_on_gpu else 0)
+                "total_models": len(self.models_on_cpu) + (1 if self.current_model_on_gpu else 0),
+                "cached_models": self.tiered_cache.get_entries() if self.tiered_cache else []
             },
             "memory_pressure": self.check_memory_pressure(),
             "recommendations": self.get_memory_recommendations()
@@ -13,6 +13,8 @@ from dataclasses import dataclass
 from datetime import datetime
 import uuid
 
+from .manager_session_store import SessionStore
+
 
 @dataclass
 class WorkerRequest:
@@ -67,7 +69,10 @@ class PipelineManager:
         
         # Task management  
         self.active_tasks: Dict[str, PipelineTask] = {}
-        self.completed_tasks: Dict[str, Dict[str, Any]] = {}
+        self.completed_tasks = SessionStore(self.config.get("session_store", {}))
+        
+        # Loads the models of queued tasks while the current ones run (injected)
+        self.prefetch_manager = None
         
         # Configuration
         self.max_concurrent_tasks = self.config.get("max_concurrent_tasks", 2)
@@ -90,6 +95,8 @@ class PipelineManager:
             "active_pipelines": len(self.active_pipelines),
             "queued_tasks": len(self.task_queue),
             "pipeline_stats": self.pipeline_stats,
+            "completed_tasks": len(self.completed_tasks),
+            "task_memory": self.completed_tasks.get_memory_usage(),
             "supported_types": ["text2img", "img2img", "inpainting", "controlnet", "lora"],
             "supported_models": ["stable-diffusion-xl", "stable-diffusion-v1-5", "flux"],
             "max_batch_size": 8,
@@ -112,16 +119,16 @@ class PipelineManager:
             }
         
         # Check if session is in completed tasks
-        if session_id in self.completed_tasks:
-            completed = self.completed_tasks[session_id]
+        completed = self.completed_tasks.get(session_id)
+        if completed is not None:
             return {
                 "session_id": session_id,
-                "status": "completed" if completed["result"].success else "failed",
-                "task_type": completed["task"].pipeline_type,
-                "created_at": completed["task"].created_at.isoformat() if completed["task"].created_at else None,
-                "completed_at": completed["completed_at"].isoformat(),
-                "result": completed["result"].data if completed["result"].success else None,
-                "error": completed["result"].error if not completed["result"].success else None
+                "status": completed["status"],
+                "task_type": completed.get("task_type"),
+                "created_at": completed.get("created_at"),
+                "completed_at": completed.get("completed_at"),
+                "result": self.completed_tasks.get_result(session_id) if completed["status"] == "completed" else None,
+                "error": completed.get("error")
             }
         
         # Session not found
@@ -183,7 +190,7 @@ class PipelineManager:
         # Task management
         self.task_queue: List[PipelineTask] = []
         self.active_tasks: Dict[str, PipelineTask] = {}
-        self.completed_tasks: Dict[str, Dict[str, Any]] = {}
+        self.completed_tasks = SessionStore(self.config.get("session_store", {}))
         
         # Configuration
         self.max_concurrent_tasks = self.config.get("max_concurrent_tasks", 2)
@@ -483,6 +490,10 @@ class PipelineManager:
             }
         )
     
+    def pending_requests(self) -> List[Dict[str, Any]]:
+        """Request data of queued tasks, next to run first."""
+        return [task.request_data for task in self.task_queue]
+    
     async def process_task_queue(self) -> None:
         """Process tasks from the queue."""
         while self.task_queue and len(self.active_tasks) < self.max_concurrent_tasks:
@@ -499,6 +510,9 @@ class PipelineManager:
         try:
             self.logger.info(f"Processing queued task: {task.task_id}")
             
+            if self.prefetch_manager is not None:
+                self.prefetch_manager.schedule()
+            
             # Create request
             task_request = WorkerRequest(
                 request_id=task.task_id,
@@ -511,11 +525,7 @@ class PipelineManager:
             result = await self.sdxl_worker.process_request(task_request)
             
             # Store result
-            self.completed_tasks[task.task_id] = {
-                "task": task,
-                "result": result,
-                "completed_at": datetime.utcnow()
-            }
+            self._store_task_result(task, result)
             
             self.logger.info(f"Completed task: {task.task_id}")
             
@@ -529,11 +539,7 @@ class PipelineManager:
                 error=str(e)
             )
             
-            self.completed_tasks[task.task_id] = {
-                "task": task,
-                "result": error_result,
-                "completed_at": datetime.utcnow()
-            }
+            self._store_task_result(task, error_result)
             
         finally:
             # Remove from active tasks
@@ -550,9 +556,34 @@ class PipelineManager:
         
         return workflow_id
     
+    def _store_task_result(self, task: PipelineTask, result: WorkerResponse) -> None:
+        """Record a finished task in the bounded task store."""
+        success = getattr(result, "success", result.status == "success")
+        self.completed_tasks.create(
+            task.task_id,
+            status="running",
+            client_id=task.request_data.get("client_id"),
+            task_type=task.pipeline_type,
+            priority=task.priority,
+            created_at=task.created_at.isoformat() if task.created_at else None
+        )
+        self.completed_tasks.complete(
+            task.task_id,
+            result.data,
+            status="completed" if success else "failed",
+            completed_at=datetime.utcnow().isoformat(),
+            error=result.error
+        )
+    
     def get_task_result(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """Get the result of a completed task."""
-        return self.completed_tasks.get(task_id)
+        """Get the result of a completed task, loading it from disk if spilled."""
+        task = self.completed_tasks.get(task_id)
+        if task is None:
+            return None
+        return {
+            **task,
+            "result": self.completed_tasks.get_result(task_id)
+        }
     
     def list_available_pipelines(self) -> List[str]:
         """List available pipeline types."""
@@ -575,6 +606,8 @@ class PipelineManager:
             "initialized": self.initialized,
             "queue_length": len(self.task_queue),
             "active_pipelines": len(self.active_pipelines),
+            "completed_tasks": len(self.completed_tasks),
+            "task_memory": self.completed_tasks.get_memory_usage(),
             "pipeline_stats": self.pipeline_stats
         }
     
@@ -586,6 +619,7 @@ class PipelineManager:
             # Clear pipeline state
             self.active_pipelines.clear()
             self.task_queue.clear()
+            self.completed_tasks.clear()
             self.pipeline_stats.clear()
             
             self.initialized = False
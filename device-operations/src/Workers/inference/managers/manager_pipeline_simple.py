@@ -11,6 +11,8 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime
 import uuid
 
+from .manager_session_store import SessionStore
+
 
 class PipelineManager:
     """
@@ -24,9 +26,11 @@ class PipelineManager:
         self.logger = logging.getLogger(__name__)
         self.initialized = False
         
-        # Session tracking
-        self.active_sessions: Dict[str, Dict[str, Any]] = {}
-        self.completed_sessions: Dict[str, Dict[str, Any]] = {}
+        # Session tracking (bounded, with TTL expiry and status/client indexes)
+        self.session_store = SessionStore(config.get("session_store", {}))
+        
+        # Request data of sessions that have not started denoising yet (e.g. waiting for their pipeline)
+        self.pending: Dict[str, Dict[str, Any]] = {}
         
         # Pipeline configuration
         self.max_batch_size = config.get("max_batch_size", 8)
@@ -49,8 +53,9 @@ class PipelineManager:
     async def get_pipeline_info(self) -> Dict[str, Any]:
         """Get pipeline information."""
         return {
-            "active_sessions": len(self.active_sessions),
-            "completed_sessions": len(self.completed_sessions),
+            "active_sessions": len(self.session_store.ids_by_status("running")),
+            "completed_sessions": len(self.session_store) - len(self.session_store.ids_by_status("running")),
+            "session_memory": self.session_store.get_memory_usage(),
             "supported_types": ["text2img", "img2img", "inpainting", "controlnet", "lora"],
             "supported_models": self.supported_models,
             "max_batch_size": self.max_batch_size,
@@ -61,34 +66,37 @@ class PipelineManager:
 
     async def get_session_status(self, session_id: str) -> Dict[str, Any]:
         """Get status of a specific session."""
-        # Check active sessions
-        if session_id in self.active_sessions:
-            session = self.active_sessions[session_id]
+        session = self.session_store.get(session_id)
+        
+        # Session not found (never created, expired or evicted)
+        if session is None:
             return {
                 "session_id": session_id,
-                "status": "running",
-                "created_at": session.get("created_at"),
-                "progress": session.get("progress", 0.0),
-                "inference_type": session.get("inference_type", "unknown")
+                "status": "not_found",
+                "error": f"Session {session_id} not found"
             }
         
-        # Check completed sessions
-        if session_id in self.completed_sessions:
-            session = self.completed_sessions[session_id]
+        # Check active sessions
+        if session["status"] == "running":
             return {
                 "session_id": session_id,
-                "status": session.get("status", "completed"),
+                "status": "running",
                 "created_at": session.get("created_at"),
-                "completed_at": session.get("completed_at"),
+                "progress": session.get("progress", 0.0),
                 "inference_type": session.get("inference_type", "unknown"),
-                "result": session.get("result")
+                "progress_frame": session.get("progress_frame"),
+                "preview": session.get("preview")
             }
         
-        # Session not found
+        # Completed, failed or cancelled sessions
         return {
             "session_id": session_id,
-            "status": "not_found",
-            "error": f"Session {session_id} not found"
+            "status": session["status"],
+            "created_at": session.get("created_at"),
+            "completed_at": session.get("completed_at"),
+            "inference_type": session.get("inference_type", "unknown"),
+            "result": self.session_store.get_result(session_id),
+            "preview": session.get("preview")
         }
 
     async def cancel_session(self, session_id: str, reason: str = "user_requested") -> Dict[str, Any]:
@@ -96,16 +104,14 @@ class PipelineManager:
         cancelled = False
         
         # Check if session is active
-        if session_id in self.active_sessions:
-            session = self.active_sessions.pop(session_id)
-            
+        session = self.session_store.get(session_id)
+        if session is not None and session["status"] == "running":
             # Move to completed with cancelled status
-            self.completed_sessions[session_id] = {
-                **session,
-                "status": "cancelled",
-                "completed_at": datetime.utcnow().isoformat(),
-                "cancellation_reason": reason
-            }
+            self.session_store.complete(
+                session_id, None, status="cancelled",
+                completed_at=datetime.utcnow().isoformat(),
+                cancellation_reason=reason
+            )
             cancelled = True
         
         return {
@@ -115,14 +121,20 @@ class PipelineManager:
             "timestamp": datetime.utcnow().isoformat()
         }
 
-    async def get_active_sessions(self) -> List[Dict[str, Any]]:
-        """Get list of all active sessions."""
+    async def get_active_sessions(self, client_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get list of all active sessions, optionally for a single client."""
         sessions = []
         
-        for session_id, session_data in self.active_sessions.items():
+        session_ids = self.session_store.ids_by_status("running")
+        if client_id is not None:
+            session_ids = set(session_ids).intersection(self.session_store.ids_by_client(client_id))
+        
+        for session_id in session_ids:
+            session_data = self.session_store.get(session_id)
             sessions.append({
                 "session_id": session_id,
                 "status": "running",
+                "client_id": session_data.get("client_id"),
                 "created_at": session_data.get("created_at"),
                 "inference_type": session_data.get("inference_type", "unknown"),
                 "progress": session_data.get("progress", 0.0)
@@ -130,38 +142,65 @@ class PipelineManager:
         
         return sessions
 
-    def create_session(self, session_id: str, inference_type: str, **kwargs) -> None:
-        """Create a new session."""
-        self.active_sessions[session_id] = {
-            "session_id": session_id,
-            "inference_type": inference_type,
-            "created_at": datetime.utcnow().isoformat(),
-            "progress": 0.0,
+    def create_session(self, session_id: str, inference_type: str,
+                       request_data: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+        """Create a new session; its request data is pending until the first progress frame."""
+        client_id = kwargs.pop("client_id", None)
+        if request_data is not None:
+            self.pending[session_id] = request_data
+        self.session_store.create(
+            session_id,
+            status="running",
+            client_id=client_id,
+            inference_type=inference_type,
+            created_at=datetime.utcnow().isoformat(),
+            progress=0.0,
             **kwargs
-        }
+        )
 
-    def update_session_progress(self, session_id: str, progress: float) -> None:
-        """Update session progress."""
-        if session_id in self.active_sessions:
-            self.active_sessions[session_id]["progress"] = progress
+    def update_session_progress(self, session_id: str, progress: float,
+                                frame: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Update session progress, keeping the latest progress frame and preview.
+        
+        Called from pipeline threads; the store applies the update under its lock.
+        """
+        self.pending.pop(session_id, None)
+        fields: Dict[str, Any] = {"progress": progress}
+        if frame is not None:
+            frame = dict(frame)
+            preview = frame.pop("preview", None)
+            fields["progress_frame"] = frame
+            if preview is not None:
+                fields["preview"] = preview
+        self.session_store.update_if_status(session_id, "running", **fields)
 
     def complete_session(self, session_id: str, result: Any, status: str = "completed") -> None:
         """Complete a session."""
-        if session_id in self.active_sessions:
-            session = self.active_sessions.pop(session_id)
-            self.completed_sessions[session_id] = {
-                **session,
-                "status": status,
-                "completed_at": datetime.utcnow().isoformat(),
-                "result": result
-            }
+        self.pending.pop(session_id, None)
+        session = self.session_store.get(session_id)
+        if session is not None and session["status"] == "running":
+            session.pop("progress_frame", None)
+            self.session_store.complete(
+                session_id, result, status=status,
+                completed_at=datetime.utcnow().isoformat()
+            )
+
+    def pending_requests(self) -> List[Dict[str, Any]]:
+        """Request data of sessions that have not started yet, oldest first."""
+        return list(self.pending.values())
+    
+    def get_task_result(self, session_id: str) -> Any:
+        """Get the result of a finished session, loading it from disk if spilled."""
+        return self.session_store.get_result(session_id)
 
     async def get_status(self) -> Dict[str, Any]:
         """Get pipeline manager status."""
         return {
             "initialized": self.initialized,
-            "active_sessions": len(self.active_sessions),
-            "completed_sessions": len(self.completed_sessions),
+            "active_sessions": len(self.session_store.ids_by_status("running")),
+            "sessions_by_status": self.session_store.count_by_status(),
+            "session_memory": self.session_store.get_memory_usage(),
             "max_concurrent": self.max_concurrent,
             "supported_models_count": len(self.supported_models)
         }
@@ -172,8 +211,8 @@ class PipelineManager:
             self.logger.info("Cleaning up pipeline manager...")
             
             # Clear session data
-            self.active_sessions.clear()
-            self.completed_sessions.clear()
+            self.session_store.clear()
+            self.pending.clear()
             
             self.initialized = False
             self.logger.info("Pipeline manager cleanup complete")
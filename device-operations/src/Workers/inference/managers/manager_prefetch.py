@@ -0,0 +1,312 @@
+"""
+Prefetch Manager for SDXL Workers System
+========================================
+
+Predictive model prefetch driven by pending work. While a job runs, the
+requests waiting in the registered queues (resolution bucket queues,
+pipeline task queues) are inspected and the weights of the checkpoints
+and LoRAs they need are loaded in the background into the host tier of
+the tiered model cache, so the next job only has to copy them to the
+device. Prefetching only uses free host budget and never evicts cached
+components to make room for a guess. Resolving what a request needs
+(index lookups, stat calls, safetensors headers) runs in a worker thread,
+off the event loop.
+
+Component loads consume prefetched weights through `take`, which is where
+the load time hidden behind the previous job's compute is counted.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable, Set, Tuple, TYPE_CHECKING
+
+from ...model.workers.worker_tiered_cache import TIER_HOST
+from ..workers.worker_lora import requested_loras
+
+if TYPE_CHECKING:
+    from ...model.workers.worker_tiered_cache import TieredModelCache
+    from ...model.workers.worker_mmap_loader import MmapWeightLoader
+    from ...model.managers.manager_model_index import ModelIndexManager
+    from ...model.managers.manager_checkpoint_conversion import CheckpointConversionManager
+
+logger = logging.getLogger(__name__)
+
+# Returns the requests waiting in a queue, next to run first
+QueueSource = Callable[[], List[Dict[str, Any]]]
+
+CHECKPOINT_COMPONENTS = ("unet", "text_encoder", "text_encoder_2", "vae")
+
+
+@dataclass
+class PrefetchItem:
+    """One component being (or already) prefetched."""
+    key: str
+    path: str
+    component: Optional[str]
+    nbytes: int
+    state: str = "pending"  # pending, loading, ready, failed
+    task: Optional["asyncio.Task"] = None
+    load_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def prefetch_key(path: str, component: Optional[str]) -> str:
+    """Tiered cache key of a prefetched component."""
+    return f"prefetch:{component or 'weights'}:{path}"
+
+
+class PrefetchManager:
+    """
+    Loads the components of queued requests into pinned host memory ahead of time.
+
+    Queues are registered with `add_queue`; `schedule` is called whenever
+    a job starts.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        prefetch_config = config.get("model_prefetch", {})
+        self.enabled = prefetch_config.get("enabled", True)
+        self.lookahead = prefetch_config.get("lookahead", 2)
+        self.max_concurrent_loads = prefetch_config.get("max_concurrent_loads", 1)
+        self.components = tuple(prefetch_config.get("components", CHECKPOINT_COMPONENTS))
+
+        # Injected by the inference interface
+        self.tiered_cache: Optional["TieredModelCache"] = None
+        self.queues: Dict[str, QueueSource] = {}
+
+        # Injected by the main interface: the model interface's index, weight loader and
+        # conversion cache, so prefetch shares their state instead of keeping its own
+        self.model_index: Optional["ModelIndexManager"] = None
+        self.mmap_loader: Optional["MmapWeightLoader"] = None
+        self.conversion_manager: Optional["CheckpointConversionManager"] = None
+        self.items: Dict[str, PrefetchItem] = {}
+        self._schedule_tasks: Set["asyncio.Task"] = set()
+        # Prefetch key -> load seconds of weights in the host tier not yet taken by a load
+        self.load_seconds: Dict[str, float] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.stats = {
+            "scheduled": 0,
+            "completed": 0,
+            "failed": 0,
+            "skipped_budget": 0,
+            "taken": 0,
+            "hidden_load_seconds": 0.0
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize prefetch manager."""
+        try:
+            self.logger.info("Initializing prefetch manager...")
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_loads)
+            self.initialized = True
+            self.logger.info("Prefetch manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Prefetch manager initialization failed: {e}")
+            return False
+
+    @property
+    def active(self) -> bool:
+        """Whether prefetching can run."""
+        return (
+            self.enabled and self.initialized and self.tiered_cache is not None
+            and self.mmap_loader is not None and self.conversion_manager is not None
+        )
+
+    def add_queue(self, name: str, source: QueueSource) -> None:
+        """Register a queue whose pending requests drive prefetching."""
+        self.queues[name] = source
+
+    def upcoming_requests(self) -> List[Dict[str, Any]]:
+        """The next `lookahead` pending requests across all queues."""
+        upcoming: List[Dict[str, Any]] = []
+        for name, source in self.queues.items():
+            try:
+                upcoming.extend(source()[:self.lookahead])
+            except Exception as e:
+                self.logger.debug(f"Could not read queue {name}: {e}")
+        return upcoming[:self.lookahead]
+
+    def requirements(self, request: Dict[str, Any]) -> List[Tuple[str, Optional[str], int]]:
+        """(path, component, expected bytes) of every weights file a request needs."""
+        required: List[Tuple[str, Optional[str], int]] = []
+        model_path = self._resolve_path(request.get("model_path") or request.get("model_name"))
+        if model_path is not None:
+            required.extend(self._checkpoint_components(model_path))
+
+        for reference, _ in requested_loras(request):
+            lora_path = self._resolve_path(reference)
+            if lora_path is not None and lora_path.endswith(".safetensors"):
+                required.append((lora_path, None, Path(lora_path).stat().st_size))
+        return required
+
+    def _resolve_path(self, reference: Optional[str]) -> Optional[str]:
+        """Local path of a model reference (path or indexed model name)."""
+        if not reference:
+            return None
+        if Path(reference).exists():
+            return str(Path(reference).resolve())
+        entry = self.model_index.find(reference) if self.model_index else None
+        return entry["path"] if entry else None
+
+    def _checkpoint_components(self, model_path: str) -> List[Tuple[str, Optional[str], int]]:
+        """Safetensors files and components of a checkpoint file or diffusers directory."""
+        # Pickle checkpoints are prefetched from their safetensors conversion, if they have one
+        path = Path(self.conversion_manager.resolve(model_path))
+        if path.is_dir():
+            found = []
+            for component in self.components:
+                weights = sorted((path / component).glob("*.safetensors"))
+                if weights:
+                    found.append((str(weights[0]), None, weights[0].stat().st_size))
+            return found
+        if path.suffix.lower() != ".safetensors":
+            # Unconverted pickle checkpoints cannot be memory-mapped
+            return []
+        component_bytes = self.mmap_loader.inspect(str(path))["component_bytes"]
+        if not component_bytes:
+            return [(str(path), None, path.stat().st_size)]
+        return [(str(path), component, component_bytes[component])
+                for component in self.components if component in component_bytes]
+
+    def _upcoming_requirements(self, requests: List[Dict[str, Any]]) -> List[Tuple[str, Optional[str], int]]:
+        """Requirements of several requests; requests that cannot be resolved are skipped."""
+        required: List[Tuple[str, Optional[str], int]] = []
+        for request in requests:
+            try:
+                required.extend(self.requirements(request))
+            except Exception as e:
+                self.logger.debug(f"Cannot resolve models of a queued request: {e}")
+        return required
+
+    def schedule(self) -> None:
+        """Start prefetching the upcoming requests' components in the background."""
+        if not self.active:
+            return
+        requests = self.upcoming_requests()
+        if not requests:
+            return
+        task = asyncio.get_running_loop().create_task(self._schedule(requests))
+        self._schedule_tasks.add(task)
+        task.add_done_callback(self._schedule_tasks.discard)
+
+    async def _schedule(self, requests: List[Dict[str, Any]]) -> int:
+        """Resolve the requests' components in a thread, then start their loads; returns the number started."""
+        required = await asyncio.to_thread(self._upcoming_requirements, requests)
+
+        # Forget loads whose weights were taken or evicted, so they can be prefetched again
+        for key, item in list(self.items.items()):
+            if item.state == "ready" and not self.tiered_cache.contains(key):
+                del self.items[key]
+
+        started = 0
+        for path, component, nbytes in required:
+            key = prefetch_key(path, component)
+            if key in self.items or self.tiered_cache.contains(key):
+                continue
+            reserved = sum(item.nbytes for item in self.items.values() if item.state in ("pending", "loading"))
+            if self.tiered_cache.free_bytes(TIER_HOST) - reserved < nbytes:
+                self.stats["skipped_budget"] += 1
+                continue
+            item = PrefetchItem(key=key, path=path, component=component, nbytes=nbytes)
+            item.task = asyncio.get_running_loop().create_task(self._load(item))
+            self.items[key] = item
+            self.stats["scheduled"] += 1
+            started += 1
+        return started
+
+    async def _load(self, item: PrefetchItem) -> None:
+        """Map a component's weights and place them in pinned host memory."""
+        async with self._semaphore:
+            if self.tiered_cache.free_bytes(TIER_HOST) < item.nbytes:
+                # Budget was taken while this load waited its turn
+                self.items.pop(item.key, None)
+                self.stats["skipped_budget"] += 1
+                return
+            item.state = "loading"
+            start_time = time.perf_counter()
+            try:
+                state_dict, _ = await asyncio.to_thread(self.mmap_loader.load_state_dict, item.path, item.component)
+                item.load_seconds = time.perf_counter() - start_time
+
+                def reload(path: str = item.path, component: Optional[str] = item.component):
+                    return self.mmap_loader.load_state_dict(path, component)[0]
+
+                await asyncio.to_thread(
+                    self.tiered_cache.put, item.key, state_dict, TIER_HOST, reload, item.path, item.load_seconds
+                )
+                # Pinning copies the mapped pages into host memory; that is part of the hidden load
+                item.load_seconds = time.perf_counter() - start_time
+                self.load_seconds[item.key] = item.load_seconds
+                item.state = "ready"
+                self.stats["completed"] += 1
+                self.logger.debug(f"Prefetched {item.key} in {item.load_seconds:.2f}s")
+            except Exception as e:
+                item.state = "failed"
+                item.error = str(e)
+                self.stats["failed"] += 1
+                self.logger.warning(f"Prefetch of {item.key} failed: {e}")
+
+    def take(self, path: str, component: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        State dict of a prefetched component, handed over to a load that consumes it.
+
+        The weights are moved to the device and dropped from the cache (the
+        loader registers its own entry); None if they were not prefetched.
+        Safe to call from loader threads.
+        """
+        if not self.active:
+            return None
+        key = prefetch_key(str(Path(path).resolve()), component)
+        state_dict = self.tiered_cache.get(key)
+        if state_dict is None:
+            return None
+        self.tiered_cache.remove(key)
+        self.stats["taken"] += 1
+        self.stats["hidden_load_seconds"] += self.load_seconds.pop(key, 0.0)
+        return state_dict
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get prefetch manager status."""
+        states: Dict[str, int] = {}
+        for item in self.items.values():
+            states[item.state] = states.get(item.state, 0) + 1
+        return {
+            "initialized": self.initialized,
+            "enabled": self.enabled,
+            "active": self.active,
+            "queues": list(self.queues),
+            "lookahead": self.lookahead,
+            "items": states,
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up prefetch manager resources."""
+        try:
+            self.logger.info("Cleaning up prefetch manager...")
+            for task in list(self._schedule_tasks):
+                task.cancel()
+            self._schedule_tasks.clear()
+            for item in self.items.values():
+                if item.task is not None:
+                    item.task.cancel()
+            self.items.clear()
+            self.load_seconds.clear()
+            self.queues.clear()
+            # The injected index, loader and conversion cache belong to the model interface
+            self.model_index = None
+            self.mmap_loader = None
+            self.conversion_manager = None
+            self.initialized = False
+            self.logger.info("Prefetch manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Prefetch manager cleanup error: {e}")
@@ -0,0 +1,358 @@
+"""
+Session Store for SDXL Workers System
+=====================================
+
+Bounded, indexed storage for inference sessions and task results.
+Terminal sessions expire after a TTL, the store never holds more than
+``max_sessions`` records, and large results are spilled to disk so that
+long-running workers keep a flat memory profile.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Set
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset({"completed", "failed", "cancelled"})
+
+
+class SessionStore:
+    """
+    Bounded session store with TTL expiry and secondary indexes.
+
+    Records are plain dictionaries keyed by session id. Sessions in a
+    terminal status are tracked in completion order, which with a fixed TTL
+    is also expiry order, so expiry only ever touches records that are due.
+    When the store is full the oldest terminal sessions are evicted. Running
+    sessions are never evicted: while every stored session is still running
+    the store holds more than ``max_sessions`` records, and it shrinks back
+    as they complete.
+
+    All methods take a reentrant lock, so progress updates from pipeline
+    threads can run alongside the event loop's creates and completions.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+
+        self.max_sessions = int(config.get("max_sessions", 10000))
+        self.ttl_seconds = float(config.get("ttl_seconds", 3600))
+        self.spill_threshold_bytes = int(config.get("spill_threshold_bytes", 256 * 1024))
+        spill_dir = config.get("spill_dir") or os.path.join(tempfile.gettempdir(), "sdxl_session_results")
+        self.spill_dir = Path(spill_dir)
+
+        if self.max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        if self.ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be positive")
+
+        # Primary storage, ordered by insertion
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Terminal sessions in completion order: session_id -> expiry time
+        self._terminal: "OrderedDict[str, float]" = OrderedDict()
+
+        # Secondary indexes
+        self._by_status: Dict[str, Set[str]] = {}
+        self._by_client: Dict[str, Set[str]] = {}
+
+        # Result accounting
+        self._result_sizes: Dict[str, int] = {}
+        self._spilled: Dict[str, int] = {}
+
+        self._lock = threading.RLock()
+
+        self.stats = {
+            "created": 0,
+            "expired": 0,
+            "evicted": 0,
+            "over_capacity": 0,
+            "spilled": 0,
+            "spill_failures": 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            self.expire()
+            return session_id in self._records
+
+    def create(self, session_id: str, status: str = "running",
+               client_id: Optional[str] = None, **fields) -> Dict[str, Any]:
+        """Create (or replace) a session record."""
+        with self._lock:
+            self.expire()
+            if session_id in self._records:
+                self.remove(session_id)
+
+            record = {
+                "session_id": session_id,
+                "status": status,
+                "client_id": client_id,
+                **fields
+            }
+            self._records[session_id] = record
+            self._index(session_id, status, client_id)
+            if status in TERMINAL_STATUSES:
+                self._terminal[session_id] = time.monotonic() + self.ttl_seconds
+
+            self.stats["created"] += 1
+            self._enforce_capacity()
+            return record
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a session record. Spilled results are not loaded; use get_result."""
+        with self._lock:
+            self.expire()
+            return self._records.get(session_id)
+
+    def update(self, session_id: str, **fields) -> bool:
+        """Update fields of a session record."""
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                return False
+            if "status" in fields:
+                self.set_status(session_id, fields.pop("status"))
+            record.update(fields)
+            return True
+
+    def update_if_status(self, session_id: str, status: str, **fields) -> bool:
+        """Update fields of a session record only while it has the given status."""
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None or record["status"] != status:
+                return False
+            record.update(fields)
+            return True
+
+    def set_status(self, session_id: str, status: str) -> bool:
+        """Move a session to a new status, keeping indexes and expiry in sync."""
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                return False
+
+            old_status = record["status"]
+            if old_status != status:
+                self._discard(self._by_status, old_status, session_id)
+                self._by_status.setdefault(status, set()).add(session_id)
+                record["status"] = status
+
+            if status in TERMINAL_STATUSES:
+                self._terminal.pop(session_id, None)
+                self._terminal[session_id] = time.monotonic() + self.ttl_seconds
+            else:
+                self._terminal.pop(session_id, None)
+            return True
+
+    def complete(self, session_id: str, result: Any, status: str = "completed",
+                 **fields) -> bool:
+        """Store a result and move the session to a terminal status."""
+        with self._lock:
+            if session_id not in self._records:
+                return False
+            self._records[session_id].update(fields)
+            self._store_result(session_id, result)
+            self.set_status(session_id, status)
+            self.expire()
+            # Shrink back after running sessions exceeded the cap
+            self._enforce_capacity()
+            return True
+
+    def get_result(self, session_id: str) -> Any:
+        """Get a session result, loading it from disk if it was spilled."""
+        with self._lock:
+            self.expire()
+            record = self._records.get(session_id)
+            if record is None:
+                return None
+            if session_id not in self._spilled:
+                return record.get("result")
+
+        try:
+            with open(self._spill_path(session_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.error(f"Failed to load spilled result for {session_id}: {e}")
+            return None
+
+    def remove(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a session record and any spilled result."""
+        with self._lock:
+            record = self._records.pop(session_id, None)
+            if record is None:
+                return None
+
+            self._discard(self._by_status, record.get("status"), session_id)
+            self._discard(self._by_client, record.get("client_id"), session_id)
+            self._terminal.pop(session_id, None)
+            self._result_sizes.pop(session_id, None)
+            if self._spilled.pop(session_id, None) is not None:
+                try:
+                    os.unlink(self._spill_path(session_id))
+                except OSError:
+                    pass
+            return record
+
+    def ids_by_status(self, status: str) -> List[str]:
+        """Get session ids with the given status."""
+        with self._lock:
+            self.expire()
+            return list(self._by_status.get(status, ()))
+
+    def ids_by_client(self, client_id: str) -> List[str]:
+        """Get session ids belonging to the given client."""
+        with self._lock:
+            self.expire()
+            return list(self._by_client.get(client_id, ()))
+
+    def list_by_status(self, status: str) -> List[Dict[str, Any]]:
+        """Get session records with the given status."""
+        with self._lock:
+            return [self._records[sid] for sid in self.ids_by_status(status)]
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Get the number of sessions per status."""
+        with self._lock:
+            self.expire()
+            return {status: len(ids) for status, ids in self._by_status.items() if ids}
+
+    def expire(self) -> int:
+        """Drop terminal sessions whose TTL has elapsed."""
+        with self._lock:
+            now = time.monotonic()
+            expired = 0
+            while self._terminal:
+                session_id, expires_at = next(iter(self._terminal.items()))
+                if expires_at > now:
+                    break
+                self.remove(session_id)
+                expired += 1
+
+            if expired:
+                self.stats["expired"] += expired
+            return expired
+
+    def get_memory_usage(self) -> Dict[str, Any]:
+        """Report approximate memory held by the store."""
+        with self._lock:
+            resident_result_bytes = sum(
+                size for sid, size in self._result_sizes.items() if sid not in self._spilled
+            )
+            index_entries = sum(len(ids) for ids in self._by_status.values()) + \
+                sum(len(ids) for ids in self._by_client.values())
+
+            usage = {
+                "sessions": len(self._records),
+                "terminal_sessions": len(self._terminal),
+                "max_sessions": self.max_sessions,
+                "record_bytes": sum(sys.getsizeof(record) for record in self._records.values()),
+                "resident_result_bytes": resident_result_bytes,
+                "spilled_results": len(self._spilled),
+                "spilled_bytes": sum(self._spilled.values()),
+                "index_entries": index_entries,
+                "stats": dict(self.stats)
+            }
+
+        try:
+            import psutil
+            usage["process_rss_mb"] = psutil.Process().memory_info().rss / (1024 * 1024)
+        except Exception:
+            pass
+
+        return usage
+
+    def clear(self) -> None:
+        """Remove all sessions and spilled results."""
+        with self._lock:
+            for session_id in list(self._records.keys()):
+                self.remove(session_id)
+
+    def _store_result(self, session_id: str, result: Any) -> None:
+        """Keep a result in memory, or spill it to disk when it is large."""
+        record = self._records[session_id]
+        if self._spilled.pop(session_id, None) is not None:
+            try:
+                os.unlink(self._spill_path(session_id))
+            except OSError:
+                pass
+
+        try:
+            payload = json.dumps(result, default=str)
+        except (TypeError, ValueError):
+            record["result"] = result
+            self._result_sizes[session_id] = sys.getsizeof(result)
+            return
+
+        size = len(payload)
+        self._result_sizes[session_id] = size
+        if size < self.spill_threshold_bytes:
+            record["result"] = result
+            return
+
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._spill_path(session_id), "w", encoding="utf-8") as f:
+                f.write(payload)
+            record["result"] = None
+            record["result_spilled"] = True
+            self._spilled[session_id] = size
+            self.stats["spilled"] += 1
+        except OSError as e:
+            self.logger.warning(f"Failed to spill result for {session_id}, keeping in memory: {e}")
+            record["result"] = result
+            self.stats["spill_failures"] += 1
+
+    def _enforce_capacity(self) -> None:
+        """Evict terminal sessions until the store is within max_sessions; running ones are kept."""
+        while len(self._records) > self.max_sessions and self._terminal:
+            self.remove(next(iter(self._terminal)))
+            self.stats["evicted"] += 1
+        if len(self._records) > self.max_sessions:
+            # Only running sessions are left: their requests are in flight and will complete
+            self.stats["over_capacity"] += 1
+            if self.stats["over_capacity"] == 1:
+                self.logger.warning(
+                    f"{len(self._records)} running sessions exceed max_sessions={self.max_sessions}; "
+                    "none are evicted until they complete"
+                )
+
+    def _spill_path(self, session_id: str) -> str:
+        # Plain string paths: pathlib interns every path component, which grows the
+        # interpreter's intern table with each spilled session id
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in session_id)
+        if safe_id != session_id:
+            safe_id = f"{safe_id[:64]}_{hashlib.sha1(session_id.encode('utf-8')).hexdigest()[:12]}"
+        return os.path.join(self.spill_dir, f"{safe_id}.json")
+
+    def _index(self, session_id: str, status: str, client_id: Optional[str]) -> None:
+        self._by_status.setdefault(status, set()).add(session_id)
+        if client_id is not None:
+            self._by_client.setdefault(client_id, set()).add(session_id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: Optional[str], session_id: str) -> None:
+        if key is None:
+            return
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(session_id)
+            if not ids:
+                del index[key]
+
+
+def create_session_store(config: Optional[Dict[str, Any]] = None) -> SessionStore:
+    """Factory function to create a session store."""
+    return SessionStore(config or {})
@@ -0,0 +1,193 @@
+"""
+Warmup Manager for SDXL Workers System
+======================================
+
+Tracks model readiness and runs warmup passes over the common resolution
+buckets and batch sizes, so allocator growth, kernel selection and lazy
+module initialization happen before user traffic arrives.
+"""
+
+import logging
+import time
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# Model readiness states
+STATE_COLD = "cold"
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+DEFAULT_RESOLUTION_BUCKETS: List[Tuple[int, int]] = [(1024, 1024), (1152, 896), (896, 1152)]
+
+# Runs one dummy generation: (model_name, width, height, batch_size, steps) -> result
+WarmupRunner = Callable[[str, int, int, int, int], Awaitable[Dict[str, Any]]]
+
+
+class WarmupManager:
+    """
+    Runs warmup passes for loaded models and records their readiness.
+
+    Each (resolution bucket, batch size) shape is run once cold and then
+    `warm_iterations` more times; the first and the mean warm timings are
+    kept in the model's warmup metadata. A model is reported "ready" only
+    after every shape has been warmed.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        warmup_config = config.get("warmup", {})
+        self.enabled = warmup_config.get("enabled", True)
+        self.resolution_buckets = [
+            (int(width), int(height))
+            for width, height in warmup_config.get("resolution_buckets", DEFAULT_RESOLUTION_BUCKETS)
+        ]
+        self.batch_sizes = [int(size) for size in warmup_config.get("batch_sizes", [1])]
+        self.steps = int(warmup_config.get("steps", 2))
+        self.warm_iterations = max(1, int(warmup_config.get("warm_iterations", 1)))
+
+        # Readiness and warmup metadata, keyed by model name
+        self.model_states: Dict[str, Dict[str, Any]] = {}
+
+    async def initialize(self) -> bool:
+        """Initialize warmup manager."""
+        try:
+            self.logger.info("Initializing warmup manager...")
+            self.initialized = True
+            self.logger.info("Warmup manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Warmup manager initialization failed: {e}")
+            return False
+
+    def mark_cold(self, model_name: str) -> None:
+        """Record a newly registered model that has not been warmed up."""
+        self.model_states[model_name] = {
+            "state": STATE_COLD,
+            "registered_at": time.time(),
+            "warmup": None
+        }
+
+    def mark_ready(self, model_name: str) -> None:
+        """Mark a model ready without warming it up."""
+        state = self.model_states.setdefault(model_name, {"registered_at": time.time(), "warmup": None})
+        state["state"] = STATE_READY
+
+    def is_ready(self, model_name: str) -> bool:
+        """Check whether a model has completed warmup."""
+        return self.model_states.get(model_name, {}).get("state") == STATE_READY
+
+    def get_model_state(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Get readiness and warmup metadata for a model."""
+        state = self.model_states.get(model_name)
+        return dict(state) if state is not None else None
+
+    async def warmup(self, model_name: str, runner: WarmupRunner,
+                     resolution_buckets: Optional[List[Tuple[int, int]]] = None,
+                     batch_sizes: Optional[List[int]] = None,
+                     steps: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Warm up a model over its shape buckets.
+
+        Args:
+            model_name: Name the pipeline is registered under
+            runner: Coroutine running one dummy generation at a given shape
+            resolution_buckets: (width, height) buckets, defaults to config
+            batch_sizes: Batch sizes, defaults to config
+            steps: Denoising steps per warmup pass, defaults to config
+
+        Returns:
+            Warmup metadata with cold and warm timings per shape
+        """
+        buckets = [(int(w), int(h)) for w, h in (resolution_buckets or self.resolution_buckets)]
+        sizes = [int(size) for size in (batch_sizes or self.batch_sizes)]
+        steps = int(steps or self.steps)
+
+        state = self.model_states.setdefault(model_name, {"registered_at": time.time()})
+        state["state"] = STATE_WARMING
+        self.logger.info(f"Warming up {model_name}: buckets={buckets}, batch_sizes={sizes}, steps={steps}")
+
+        shapes = []
+        start_time = time.perf_counter()
+        try:
+            for width, height in buckets:
+                for batch_size in sizes:
+                    shapes.append(await self._warmup_shape(model_name, runner, width, height, batch_size, steps))
+        except Exception as e:
+            state["state"] = STATE_FAILED
+            state["error"] = str(e)
+            self.logger.error(f"Warmup failed for {model_name}: {e}")
+            raise
+
+        cold_total = sum(shape["cold_seconds"] for shape in shapes)
+        warm_total = sum(shape["warm_seconds"] for shape in shapes)
+        warmup = {
+            "steps": steps,
+            "warm_iterations": self.warm_iterations,
+            "shapes": shapes,
+            "cold_seconds": cold_total,
+            "warm_seconds": warm_total,
+            "cold_to_warm_ratio": cold_total / warm_total if warm_total > 0 else None,
+            "duration_seconds": time.perf_counter() - start_time,
+            "completed_at": time.time()
+        }
+
+        state.pop("error", None)
+        state["warmup"] = warmup
+        state["state"] = STATE_READY
+        self.logger.info(f"Model {model_name} ready after {warmup['duration_seconds']:.2f}s warmup")
+        return warmup
+
+    async def _warmup_shape(self, model_name: str, runner: WarmupRunner, width: int, height: int,
+                            batch_size: int, steps: int) -> Dict[str, Any]:
+        """Run one shape cold, then warm, and return its timings."""
+        cold_start = time.perf_counter()
+        cold_result = await runner(model_name, width, height, batch_size, steps)
+        cold_seconds = time.perf_counter() - cold_start
+        if "error" in cold_result:
+            raise RuntimeError(cold_result["error"])
+
+        warm_timings = []
+        for _ in range(self.warm_iterations):
+            warm_start = time.perf_counter()
+            await runner(model_name, width, height, batch_size, steps)
+            warm_timings.append(time.perf_counter() - warm_start)
+        warm_seconds = sum(warm_timings) / len(warm_timings)
+
+        return {
+            "width": width,
+            "height": height,
+            "batch_size": batch_size,
+            "cold_seconds": cold_seconds,
+            "warm_seconds": warm_seconds,
+            "cold_stage_timings": cold_result.get("stage_timings", {})
+        }
+
+    def release_model(self, model_name: str) -> None:
+        """Forget the readiness state of a model."""
+        self.model_states.pop(model_name, None)
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get warmup manager status."""
+        return {
+            "initialized": self.initialized,
+            "enabled": self.enabled,
+            "resolution_buckets": [list(bucket) for bucket in self.resolution_buckets],
+            "batch_sizes": list(self.batch_sizes),
+            "steps": self.steps,
+            "models": {name: state.get("state") for name, state in self.model_states.items()}
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up warmup manager resources."""
+        try:
+            self.logger.info("Cleaning up warmup manager...")
+            self.model_states.clear()
+            self.initialized = False
+            self.logger.info("Warmup manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Warmup manager cleanup error: {e}")
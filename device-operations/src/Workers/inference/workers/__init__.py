@@ -9,9 +9,15 @@ and LoRA inference operations.
 from .worker_sdxl import SDXLWorker
 from .worker_controlnet import ControlNetWorker
 from .worker_lora import LoRAWorker
+from .worker_preview import PreviewWorker
+from .worker_onnx import ONNXWorker
+from .worker_tiled_diffusion import TiledDiffusionWorker
 
 __all__ = [
     "SDXLWorker",
     "ControlNetWorker", 
-    "LoRAWorker"
+    "LoRAWorker",
+    "PreviewWorker",
+    "ONNXWorker",
+    "TiledDiffusionWorker"
 ]
\ No newline at end of file
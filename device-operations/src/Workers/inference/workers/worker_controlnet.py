@@ -8,6 +8,7 @@ condition preprocessing, and multi-condition stacking.
 """
 
 import logging
+import time
 import torch
 import gc
 from typing import Dict, Any, Optional, List
@@ -71,6 +72,7 @@ class ControlNetWorker:
     async def process_controlnet(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process a ControlNet inference request."""
         try:
+            start_time = time.perf_counter()
             prompt = request_data.get("prompt", "")
             control_image = request_data.get("control_image")
             controlnet_type = request_data.get("controlnet_type", "canny")
@@ -89,7 +91,7 @@ class ControlNetWorker:
                 "controlnet_type": controlnet_type,
                 "controlnet_conditioning_scale": controlnet_conditioning_scale,
                 "images": [],  # Would contain generated images
-                "processing_time": 1.0,
+                "processing_time": time.perf_counter() - start_time,
                 "status": "completed"
             }
             
@@ -5,16 +5,28 @@ LoRA Worker for SDXL Workers System
 Migrated from inference/lora_worker.py
 Advanced LoRA (Low-Rank Adaptation) adapter management for SDXL pipelines.
 Provides comprehensive LoRA support including model loading, weight adjustment,
-and multiple adapter stacking.
+and multiple adapter stacking. Adapters are applied to pipelines by fusing
+their weights (see model/workers/worker_lora_fusion.py), or unfused per
+sample when one batch mixes adapters (see model/workers/worker_multi_lora.py).
 """
 
+import asyncio
 import logging
+import os
+import tempfile
+import time
 import torch
 import gc
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, ContextManager, TYPE_CHECKING
 from pathlib import Path
 from dataclasses import dataclass
 
+if TYPE_CHECKING:
+    from ...model.workers.worker_lora_fusion import LoRAFusionWorker
+    from ...model.workers.worker_multi_lora import MultiLoRAWorker
+    from ...model.managers.manager_model_index import ModelIndexManager
+
 try:
     import safetensors.torch
     SAFETENSORS_AVAILABLE = True
@@ -34,6 +46,19 @@ class LoRAConfiguration:
     file_size_mb: Optional[float] = None
 
 
+def requested_loras(request_data: Dict[str, Any]) -> List[Tuple[str, float]]:
+    """(name or path, scale) of every LoRA a request asks for."""
+    loras = []
+    if request_data.get("lora_path") or request_data.get("lora_name"):
+        loras.append((request_data.get("lora_path") or request_data.get("lora_name"),
+                      float(request_data.get("lora_scale", 1.0))))
+    for adapter in request_data.get("lora_adapters", []) + request_data.get("loras", []):
+        reference = adapter.get("path") or adapter.get("name")
+        if reference:
+            loras.append((reference, float(adapter.get("weight", adapter.get("scale", 1.0)))))
+    return loras
+
+
 class LoRAWorker:
     """
     Advanced LoRA adapter management for SDXL pipelines.
@@ -50,9 +75,12 @@ class LoRAWorker:
         # LoRA configuration
         self.lora_path = Path(config.get("lora_path", "../../../models/loras"))
         self.lora_path.mkdir(parents=True, exist_ok=True)
+        self.lora_index_path = config.get(
+            "lora_index_path", os.path.join(tempfile.gettempdir(), "sdxl_lora_index.json")
+        )
         
-        # Active LoRA adapters
-        self.active_loras: Dict[str, LoRAConfiguration] = {}
+        # Active LoRA adapters, least recently used first
+        self.active_loras: "OrderedDict[str, LoRAConfiguration]" = OrderedDict()
         self.available_loras: Dict[str, str] = {}  # name -> path mapping
         
         # Configuration
@@ -63,6 +91,13 @@ class LoRAWorker:
         # Performance settings
         self.enable_memory_efficient_loading = config.get("enable_memory_efficient_loading", True)
         
+        # Fuses adapter weights into pipelines
+        self.fusion_worker: Optional["LoRAFusionWorker"] = None
+        # Applies different adapters per sample within one batch
+        self.multi_lora_worker: Optional["MultiLoRAWorker"] = None
+        # Incremental header index of the LoRA directory
+        self.lora_index: Optional["ModelIndexManager"] = None
+        
     async def initialize(self) -> bool:
         """Initialize the LoRA worker."""
         try:
@@ -71,6 +106,24 @@ class LoRAWorker:
             if not SAFETENSORS_AVAILABLE:
                 self.logger.warning("Safetensors not available, falling back to PyTorch format")
             
+            from ...model.workers.worker_lora_fusion import LoRAFusionWorker
+            self.fusion_worker = LoRAFusionWorker(self.config)
+            if not await self.fusion_worker.initialize():
+                return False
+            
+            from ...model.workers.worker_multi_lora import MultiLoRAWorker
+            self.multi_lora_worker = MultiLoRAWorker(self.config)
+            self.multi_lora_worker.fusion_worker = self.fusion_worker
+            if not await self.multi_lora_worker.initialize():
+                return False
+            
+            from ...model.managers.manager_model_index import ModelIndexManager
+            index_config = dict(self.config.get("model_index", {}))
+            index_config.update({"index_path": self.lora_index_path, "model_dirs": [str(self.lora_path)]})
+            self.lora_index = ModelIndexManager({"model_index": index_config})
+            if not await self.lora_index.initialize():
+                return False
+            
             # Scan for available LoRA models
             await self._scan_lora_models()
             
@@ -85,6 +138,7 @@ class LoRAWorker:
     async def process_lora(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process a LoRA inference request."""
         try:
+            start_time = time.perf_counter()
             prompt = request_data.get("prompt", "")
             negative_prompt = request_data.get("negative_prompt", "")
             lora_name = request_data.get("lora_name")
@@ -104,11 +158,15 @@ class LoRAWorker:
             else:
                 raise ValueError("No LoRA adapter specified")
             
-            # Validate LoRA adapters
+            # Validate LoRA adapters and read their weights
             for lora_config in lora_configs:
                 lora_name = lora_config.get("name")
+                if lora_name not in self.available_loras:
+                    await self._scan_lora_models()
                 if lora_name not in self.available_loras:
                     raise ValueError(f"LoRA adapter not found: {lora_name}")
+                if not await self.load_lora_adapter(lora_name, lora_config.get("weight", self.default_weight)):
+                    raise RuntimeError(f"Failed to load LoRA adapter: {lora_name}")
             
             # Placeholder implementation
             result = {
@@ -116,7 +174,7 @@ class LoRAWorker:
                 "prompt": prompt,
                 "lora_adapters": lora_configs,
                 "images": [],  # Would contain generated images
-                "processing_time": 1.0,
+                "processing_time": time.perf_counter() - start_time,
                 "status": "completed"
             }
             
@@ -132,14 +190,18 @@ class LoRAWorker:
         try:
             if lora_name in self.active_loras:
                 self.logger.debug(f"LoRA adapter {lora_name} already loaded")
+                self.active_loras.move_to_end(lora_name)
                 return True
             
+            if lora_name not in self.available_loras:
+                # Added since the last refresh
+                await self._scan_lora_models()
             if lora_name not in self.available_loras:
                 raise ValueError(f"LoRA adapter not found: {lora_name}")
             
             # Check adapter limit
             if len(self.active_loras) >= self.max_adapters:
-                # Remove oldest adapter
+                # Remove least recently used adapter
                 oldest_adapter = next(iter(self.active_loras))
                 await self.unload_lora_adapter(oldest_adapter)
             
@@ -151,12 +213,12 @@ class LoRAWorker:
                 name=lora_name,
                 path=lora_path,
                 weight=weight,
-                file_format=file_format
+                file_format=file_format,
+                file_size_mb=Path(lora_path).stat().st_size / (1024 * 1024)
             )
             
-            # Placeholder for actual loading
             self.logger.info(f"Loading LoRA adapter: {lora_name} (format: {file_format})")
-            # Actual loading would happen here
+            await asyncio.to_thread(self.fusion_worker.load_adapter, lora_path)
             
             self.active_loras[lora_name] = lora_config
             return True
@@ -172,7 +234,11 @@ class LoRAWorker:
                 return True
             
             self.logger.info(f"Unloading LoRA adapter: {lora_name}")
-            del self.active_loras[lora_name]
+            lora_config = self.active_loras.pop(lora_name)
+            if self.multi_lora_worker is not None:
+                self.multi_lora_worker.release_adapter(lora_config.path)
+            if self.fusion_worker is not None:
+                self.fusion_worker.release_adapter(lora_config.path)
             
             # Clear GPU cache
             if torch.cuda.is_available():
@@ -199,17 +265,70 @@ class LoRAWorker:
             self.logger.error(f"Failed to adjust LoRA weight {lora_name}: {e}")
             return False
     
+    async def apply_to_pipeline(self, pipeline: Any, request_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Fuse the LoRAs a request asks for into a pipeline.
+        
+        A request without LoRAs restores the base weights if a combination
+        is fused. Returns the fusion worker's switch report, or None when
+        nothing had to change.
+        """
+        if self.fusion_worker is None:
+            return None
+        adapters = await self._resolve_adapters(requested_loras(request_data))
+        
+        if not adapters and not self.fusion_worker.active_combination(pipeline):
+            return None
+        report = await asyncio.to_thread(self.fusion_worker.activate, pipeline, adapters)
+        if report["switched"]:
+            self.logger.debug(f"LoRA switch ({report['source']}, {report['layers']} layers) "
+                              f"took {report['switch_ms']:.1f} ms")
+        return report
+    
+    async def prepare_batch(self, pipeline: Any, per_sample: List[List[Tuple[str, float]]]) -> ContextManager:
+        """
+        Context manager running a batch whose samples use different LoRAs.
+        
+        `per_sample[i]` lists the (name or path, scale) LoRAs of sample i.
+        Fused weights are restored to the base first, and every adapter is
+        registered with the multi-LoRA worker off the event loop; the
+        returned context yields the batch report.
+        """
+        if self.multi_lora_worker is None or not self.multi_lora_worker.enabled:
+            raise RuntimeError("Multi-LoRA batching is not enabled")
+        samples = [await self._resolve_adapters(loras) for loras in per_sample]
+        
+        def register() -> None:
+            self.fusion_worker.deactivate(pipeline)
+            keep = {str(Path(path).resolve()) for sample in samples for path, _ in sample}
+            for path in keep:
+                self.multi_lora_worker.register(pipeline, path, keep)
+        
+        await asyncio.to_thread(register)
+        return self.multi_lora_worker.batch(pipeline, samples)
+    
+    async def _resolve_adapters(self, loras: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """(file path, scale) of requested LoRAs, loading adapters referenced by name."""
+        adapters = []
+        for reference, scale in loras:
+            if Path(reference).is_file():
+                adapters.append((reference, scale))
+                continue
+            if not await self.load_lora_adapter(reference, scale):
+                raise ValueError(f"LoRA adapter not available: {reference}")
+            adapters.append((self.active_loras[reference].path, scale))
+        return adapters
+    
     async def _scan_lora_models(self) -> None:
-        """Scan for available LoRA models in the LoRA directory."""
+        """Refresh the available LoRA models from the incremental LoRA directory index."""
         try:
-            self.available_loras.clear()
-            
-            for file_path in self.lora_path.rglob("*"):
-                if file_path.is_file() and file_path.suffix.lower() in [".safetensors", ".pt", ".ckpt"]:
-                    lora_name = file_path.stem
-                    self.available_loras[lora_name] = str(file_path)
-            
-            self.logger.info(f"Found {len(self.available_loras)} LoRA adapters")
+            entries = await asyncio.to_thread(self.lora_index.scan)
+            self.available_loras = {
+                entry["name"]: entry["path"] for entry in entries if entry["format"] in self.supported_formats
+            }
+            scan = self.lora_index.last_scan
+            self.logger.info(f"Found {len(self.available_loras)} LoRA adapters "
+                             f"({scan['listed_directories']} directories listed, {scan['indexed']} files indexed)")
             
         except Exception as e:
             self.logger.error(f"Failed to scan LoRA models: {e}")
@@ -228,19 +347,23 @@ class LoRAWorker:
         else:
             return "unknown"
     
-    def get_available_loras(self) -> List[Dict[str, Any]]:
-        """Get list of available LoRA adapters."""
+    def get_available_loras(self, prefix: Optional[str] = None,
+                            tags: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get list of available LoRA adapters, optionally by name/path prefix and tags."""
         loras = []
-        for name, path in self.available_loras.items():
-            file_format = self._detect_file_format(path)
-            file_size = Path(path).stat().st_size / (1024 * 1024)  # MB
-            
+        for entry in self.lora_index.query(prefix=prefix, tags=tags, directories=[str(self.lora_path)]):
+            if entry["format"] not in self.supported_formats:
+                continue
+            architecture = entry.get("architecture", {})
             loras.append({
-                "name": name,
-                "path": path,
-                "format": file_format,
-                "size_mb": round(file_size, 2),
-                "is_active": name in self.active_loras
+                "name": entry["name"],
+                "path": entry["path"],
+                "format": entry["format"],
+                "size_mb": round(entry["size"] / (1024 * 1024), 2),
+                "base": architecture.get("base"),
+                "rank": architecture.get("rank"),
+                "tags": entry.get("tags", []),
+                "is_active": entry["name"] in self.active_loras
             })
         
         return loras
@@ -254,6 +377,10 @@ class LoRAWorker:
             "max_adapters": self.max_adapters,
             "supported_formats": self.supported_formats,
             "safetensors_available": SAFETENSORS_AVAILABLE,
+            "index": await self.lora_index.get_status() if self.lora_index is not None else None,
+            "fusion": await self.fusion_worker.get_status() if self.fusion_worker is not None else None,
+            "multi_lora": (await self.multi_lora_worker.get_status()
+                           if self.multi_lora_worker is not None else None),
             "active_adapter_details": [
                 {
                     "name": config.name,
@@ -275,6 +402,12 @@ class LoRAWorker:
             
             self.active_loras.clear()
             self.available_loras.clear()
+            if self.lora_index is not None:
+                await self.lora_index.cleanup()
+            if self.multi_lora_worker is not None:
+                await self.multi_lora_worker.cleanup()
+            if self.fusion_worker is not None:
+                await self.fusion_worker.cleanup()
             
             # Clear GPU cache
             if torch.cuda.is_available():
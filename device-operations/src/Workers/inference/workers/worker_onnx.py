@@ -0,0 +1,438 @@
+"""
+ONNX Runtime Worker for SDXL Workers System
+===========================================
+
+Alternative execution backend that runs the UNet, VAE decoder and text
+encoders of a loaded pipeline through ONNX Runtime. Components are exported
+to ONNX once per (module content hash, input shape bucket, dtype) and the
+exported graphs are cached on disk, so later processes reuse them.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+import torch
+
+from ...model.workers.worker_lora_fusion import weight_version
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ort = None
+    ONNXRUNTIME_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class _UNetExportWrapper(torch.nn.Module):
+    """Flat-input wrapper around a UNet for export."""
+
+    def __init__(self, unet: torch.nn.Module, text_time: bool):
+        super().__init__()
+        self.unet = unet
+        self.text_time = text_time
+
+    def forward(self, sample, timestep, encoder_hidden_states, text_embeds=None, time_ids=None):
+        added_cond_kwargs = {"text_embeds": text_embeds, "time_ids": time_ids} if self.text_time else None
+        # Call the class forward so patches on the instance (e.g. tiled diffusion) are bypassed
+        return type(self.unet).forward(
+            self.unet, sample, timestep, encoder_hidden_states,
+            added_cond_kwargs=added_cond_kwargs, return_dict=False
+        )[0]
+
+
+class _VAEDecoderExportWrapper(torch.nn.Module):
+    """Latents-to-image wrapper around a VAE decoder for export."""
+
+    def __init__(self, vae: torch.nn.Module):
+        super().__init__()
+        self.vae = vae
+
+    def forward(self, latents):
+        return type(self.vae).decode(self.vae, latents, return_dict=False)[0]
+
+
+class _TextEncoderExportWrapper(torch.nn.Module):
+    """Wrapper exporting the first output and the penultimate hidden state of a CLIP text encoder."""
+
+    def __init__(self, text_encoder: torch.nn.Module):
+        super().__init__()
+        self.text_encoder = text_encoder
+
+    def forward(self, input_ids):
+        output = type(self.text_encoder).forward(self.text_encoder, input_ids, output_hidden_states=True)
+        return output[0], output.hidden_states[-2]
+
+
+class _TextEncoderOutput:
+    """Minimal stand-in for a transformers text encoder output (`[0]` and `hidden_states[-2]`)."""
+
+    def __init__(self, first: torch.Tensor, penultimate: torch.Tensor):
+        self.hidden_states = (penultimate, first)
+        self._first = first
+
+    def __getitem__(self, index: int) -> torch.Tensor:
+        if index == 0:
+            return self._first
+        raise IndexError(index)
+
+
+class _ONNXComponent(torch.nn.Module):
+    """
+    Per-request stand-in for a pipeline component with one entry point run through ONNX Runtime.
+
+    The wrapped module is not modified; every other attribute (config,
+    dtype, submodules, methods) is looked up on it.
+    """
+
+    def __init__(self, module: torch.nn.Module, attribute: str, replacement: Callable):
+        super().__init__()
+        self.module = module
+        # An instance attribute takes precedence over nn.Module.forward and is never forwarded to `module`
+        object.__setattr__(self, attribute, replacement)
+
+    def __getattr__(self, name: str):
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            modules = self.__dict__.get("_modules")
+            if not modules or "module" not in modules:
+                raise
+            return getattr(modules["module"], name)
+
+
+class ONNXWorker:
+    """
+    ONNX Runtime execution backend for diffusion pipelines.
+
+    `activate(pipeline)` yields a per-request view of the pipeline whose
+    UNet forward, VAE decode and (for SDXL dual-encoder pipelines) text
+    encoder forwards run through ONNX Runtime sessions. The pipeline and its
+    modules are left untouched, so other requests running it stay on torch.
+    Sessions are created lazily from the shapes actually seen. Calls with features the exported graphs do not
+    cover (ControlNet residuals, timestep conditioning, attention kwargs)
+    fall back to torch.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        onnx_config = config.get("onnx", {})
+        self.cache_dir = Path(onnx_config.get(
+            "cache_dir", os.path.join(tempfile.gettempdir(), "sdxl_onnx_cache")
+        ))
+        self.opset_version = onnx_config.get("opset_version", 17)
+        self.max_sessions = onnx_config.get("max_sessions", 8)
+        self.requested_providers: List[str] = onnx_config.get(
+            "providers", ["DmlExecutionProvider", "CPUExecutionProvider"]
+        )
+        self.intra_op_threads = onnx_config.get("intra_op_threads")
+        self.providers: List[str] = []
+
+        # Loaded sessions (LRU) and module content hashes with the weight version they were computed at
+        self.sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._module_hashes: "weakref.WeakKeyDictionary[torch.nn.Module, Tuple[int, str]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "exports": 0,
+            "export_time": 0.0,
+            "disk_cache_hits": 0,
+            "session_cache_hits": 0,
+            "onnx_calls": 0,
+            "torch_fallbacks": 0
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize ONNX worker."""
+        try:
+            self.logger.info("Initializing ONNX worker...")
+
+            if ONNXRUNTIME_AVAILABLE:
+                available = ort.get_available_providers()
+                self.providers = [p for p in self.requested_providers if p in available]
+                if "CPUExecutionProvider" not in self.providers:
+                    self.providers.append("CPUExecutionProvider")
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+            else:
+                self.logger.warning("onnxruntime not available, ONNX backend disabled")
+
+            self.initialized = True
+            self.logger.info("ONNX worker initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"ONNX worker initialization failed: {e}")
+            return False
+
+    @property
+    def available(self) -> bool:
+        """Whether the ONNX backend can be used."""
+        return ONNXRUNTIME_AVAILABLE and self.initialized
+
+    @contextmanager
+    def activate(self, pipeline, text_encoders: bool = True):
+        """
+        Run the pipeline's UNet, VAE decoder and text encoders through ONNX Runtime.
+        
+        Yields a shallow copy of the pipeline whose components are wrapped
+        with ONNX entry points; the request runs that copy, while the
+        pipeline itself keeps running torch for everyone else.
+        `text_encoders=False` keeps the text encoders on torch (e.g. for CLIP
+        skip, which needs hidden states the exported graphs do not return).
+        """
+        if not self.available:
+            raise RuntimeError("ONNX Runtime backend not available")
+
+        # Set in the copy's __dict__ directly: pipeline __setattr__ would re-register the component
+        view = copy.copy(pipeline)
+        unet = getattr(pipeline, "unet", None)
+        if unet is not None and getattr(unet, "_orig_mod", None) is None:
+            view.__dict__["unet"] = _ONNXComponent(unet, "forward", self._make_unet_forward(unet))
+
+        vae = getattr(pipeline, "vae", None)
+        if vae is not None:
+            view.__dict__["vae"] = _ONNXComponent(vae, "decode", self._make_vae_decode(vae))
+
+        # SDXL `encode_prompt` reads only the first output and the penultimate hidden state
+        if text_encoders and getattr(pipeline, "tokenizer_2", None) is not None:
+            for name in ("text_encoder", "text_encoder_2"):
+                text_encoder = getattr(pipeline, name, None)
+                if text_encoder is not None:
+                    view.__dict__[name] = _ONNXComponent(
+                        text_encoder, "forward", self._make_text_encoder_forward(text_encoder, name)
+                    )
+
+        yield view
+
+    def _make_unet_forward(self, unet: torch.nn.Module) -> Callable:
+        """Create an ONNX-backed replacement for `unet.forward`."""
+        text_time = getattr(unet.config, "addition_embed_type", None) == "text_time"
+
+        def forward(sample, timestep, encoder_hidden_states, *args, added_cond_kwargs=None,
+                    return_dict: bool = True, **kwargs):
+            unsupported = args or any(value is not None for value in kwargs.values())
+            if unsupported or (text_time and not added_cond_kwargs):
+                self.stats["torch_fallbacks"] += 1
+                return type(unet).forward(
+                    unet, sample, timestep, encoder_hidden_states, *args,
+                    added_cond_kwargs=added_cond_kwargs, return_dict=return_dict, **kwargs
+                )
+
+            timestep = torch.as_tensor(timestep, dtype=torch.float32)
+            if timestep.ndim > 0:
+                timestep = timestep.flatten()[0]
+
+            inputs = {
+                "sample": sample,
+                "timestep": timestep,
+                "encoder_hidden_states": encoder_hidden_states
+            }
+            if text_time:
+                inputs["text_embeds"] = added_cond_kwargs["text_embeds"]
+                inputs["time_ids"] = added_cond_kwargs["time_ids"]
+
+            wrapper = _UNetExportWrapper(unet, text_time)
+            result = self._run(unet, "unet", wrapper, inputs, ["noise_pred"])[0]
+            result = result.to(device=sample.device, dtype=sample.dtype)
+
+            if return_dict:
+                from diffusers.models.unets.unet_2d_condition import UNet2DConditionOutput
+                return UNet2DConditionOutput(sample=result)
+            return (result,)
+
+        return forward
+
+    def _make_vae_decode(self, vae: torch.nn.Module) -> Callable:
+        """Create an ONNX-backed replacement for `vae.decode`."""
+        def decode(latents, return_dict: bool = True, **kwargs):
+            if any(value is not None for value in kwargs.values()):
+                self.stats["torch_fallbacks"] += 1
+                return type(vae).decode(vae, latents, return_dict=return_dict, **kwargs)
+
+            wrapper = _VAEDecoderExportWrapper(vae)
+            image = self._run(vae, "vae_decoder", wrapper, {"latents": latents}, ["image"])[0]
+            image = image.to(device=latents.device, dtype=latents.dtype)
+
+            if return_dict:
+                from diffusers.models.autoencoders.vae import DecoderOutput
+                return DecoderOutput(sample=image)
+            return (image,)
+
+        return decode
+
+    def _make_text_encoder_forward(self, text_encoder: torch.nn.Module, name: str) -> Callable:
+        """Create an ONNX-backed replacement for a text encoder's `forward`."""
+        def forward(input_ids, *args, output_hidden_states: Optional[bool] = None, **kwargs):
+            if args or any(value is not None for value in kwargs.values()):
+                self.stats["torch_fallbacks"] += 1
+                return type(text_encoder).forward(
+                    text_encoder, input_ids, *args, output_hidden_states=output_hidden_states, **kwargs
+                )
+
+            wrapper = _TextEncoderExportWrapper(text_encoder)
+            first, penultimate = self._run(
+                text_encoder, name, wrapper, {"input_ids": input_ids}, ["output_0", "penultimate_hidden_state"]
+            )
+            return _TextEncoderOutput(first, penultimate)
+
+        return forward
+
+    def _run(self, module: torch.nn.Module, component: str, wrapper: torch.nn.Module,
+             inputs: Dict[str, torch.Tensor], output_names: List[str]) -> List[torch.Tensor]:
+        """Run a component through ONNX Runtime, exporting it for this shape bucket if needed."""
+        session = self._get_session(module, component, wrapper, inputs, output_names)
+
+        feeds = {}
+        for name, tensor in inputs.items():
+            array = tensor.detach().cpu()
+            if array.dtype == torch.bfloat16:
+                array = array.float()
+            feeds[name] = array.numpy()
+
+        outputs = session.run(None, feeds)
+        self.stats["onnx_calls"] += 1
+        return [torch.from_numpy(output) for output in outputs]
+
+    def _get_session(self, module: torch.nn.Module, component: str, wrapper: torch.nn.Module,
+                     inputs: Dict[str, torch.Tensor], output_names: List[str]):
+        """Get an ONNX Runtime session for the component and input shapes."""
+        dtype = str(next(module.parameters()).dtype).replace("torch.", "")
+        bucket = "_".join("x".join(str(dim) for dim in tensor.shape) or "scalar" for tensor in inputs.values())
+        key = f"{self._module_hash(module)}/{component}/{bucket}_{dtype}"
+
+        with self._lock:
+            session = self.sessions.get(key)
+            if session is not None:
+                self.sessions.move_to_end(key)
+                self.stats["session_cache_hits"] += 1
+                return session
+
+            model_path = self.cache_dir / key / "model.onnx"
+            if model_path.exists():
+                self.stats["disk_cache_hits"] += 1
+            else:
+                self._export(wrapper, inputs, output_names, model_path, key)
+
+            session = self._create_session(model_path)
+            self.sessions[key] = session
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return session
+
+    def _export(self, wrapper: torch.nn.Module, inputs: Dict[str, torch.Tensor],
+                output_names: List[str], model_path: Path, key: str) -> None:
+        """Export a component to ONNX, writing to a temporary directory and renaming into place."""
+        self.logger.info(f"Exporting {key} to ONNX...")
+        start_time = time.perf_counter()
+
+        model_path.parent.parent.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(dir=model_path.parent.parent, prefix=".export_"))
+        try:
+            with torch.no_grad():
+                torch.onnx.export(
+                    wrapper,
+                    tuple(inputs.values()),
+                    str(staging_dir / "model.onnx"),
+                    input_names=list(inputs.keys()),
+                    output_names=output_names,
+                    opset_version=self.opset_version,
+                    do_constant_folding=True
+                )
+
+            with open(staging_dir / "manifest.json", "w", encoding="utf-8") as f:
+                json.dump({
+                    "key": key,
+                    "inputs": {name: list(tensor.shape) for name, tensor in inputs.items()},
+                    "outputs": output_names,
+                    "opset_version": self.opset_version,
+                    "torch_version": torch.__version__,
+                    "exported_at": time.time()
+                }, f, indent=2)
+
+            try:
+                os.replace(staging_dir, model_path.parent)
+            except OSError:
+                # Another process exported the same bucket first
+                if not model_path.exists():
+                    raise
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        export_time = time.perf_counter() - start_time
+        self.stats["exports"] += 1
+        self.stats["export_time"] += export_time
+        self.logger.info(f"Exported {key} in {export_time:.1f}s")
+
+    def _create_session(self, model_path: Path):
+        """Create an ONNX Runtime inference session."""
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_op_threads:
+            options.intra_op_num_threads = int(self.intra_op_threads)
+        return ort.InferenceSession(str(model_path), sess_options=options, providers=self.providers)
+
+    def _module_hash(self, module: torch.nn.Module) -> str:
+        """
+        Content hash of a module's weights, computed once per module instance
+        and weight version (LoRA fusion rewrites weights in place and bumps it).
+        """
+        version = weight_version(module)
+        cached = self._module_hashes.get(module)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(type(module).__name__.encode("utf-8"))
+        config = getattr(module, "config", None)
+        if config is not None:
+            hasher.update(json.dumps(dict(config), sort_keys=True, default=str).encode("utf-8"))
+        for name, tensor in module.state_dict().items():
+            hasher.update(name.encode("utf-8"))
+            hasher.update(str(tuple(tensor.shape)).encode("utf-8"))
+            data = tensor.detach().cpu().contiguous().reshape(-1)
+            hasher.update(memoryview(data.view(torch.uint8).numpy()))
+
+        module_hash = hasher.hexdigest()
+        self._module_hashes[module] = (version, module_hash)
+        return module_hash
+
+    def release_module_hashes(self) -> None:
+        """Forget computed module hashes (for weight changes made outside LoRA fusion)."""
+        self._module_hashes.clear()
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get ONNX worker status."""
+        return {
+            "initialized": self.initialized,
+            "onnxruntime_available": ONNXRUNTIME_AVAILABLE,
+            "providers": self.providers,
+            "cache_dir": str(self.cache_dir),
+            "loaded_sessions": len(self.sessions),
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up ONNX worker resources."""
+        try:
+            self.logger.info("Cleaning up ONNX worker...")
+            self.sessions.clear()
+            self._module_hashes.clear()
+            self.initialized = False
+            self.logger.info("ONNX worker cleanup complete")
+        except Exception as e:
+            self.logger.error(f"ONNX worker cleanup error: {e}")
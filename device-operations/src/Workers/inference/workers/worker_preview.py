@@ -0,0 +1,351 @@
+"""
+Preview Worker for SDXL Workers System
+======================================
+
+Cheap latent-space previews for in-flight progress frames.
+Decodes denoising latents into small RGB previews without running the full VAE,
+using either a per-family linear latent-to-RGB projection or a tiny distilled decoder.
+"""
+
+import base64
+import io
+import logging
+import time
+import torch
+import torch.nn.functional as F
+from typing import Dict, Any, Optional, List
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+# Linear latent -> RGB projections (rows: latent channels, columns: R, G, B)
+# applied to scaled latents as they appear inside the denoising loop.
+LATENT_RGB_FACTORS: Dict[str, List[List[float]]] = {
+    "sdxl": [
+        [0.3651, 0.4232, 0.4341],
+        [-0.2533, -0.0042, 0.1068],
+        [0.1076, 0.1111, -0.0362],
+        [-0.3165, -0.2492, -0.2188]
+    ],
+    "sd15": [
+        [0.3512, 0.2297, 0.3227],
+        [0.3250, 0.4974, 0.2350],
+        [-0.2829, 0.1762, 0.2721],
+        [-0.2120, -0.2616, -0.7177]
+    ]
+}
+
+LATENT_RGB_BIAS: Dict[str, List[float]] = {
+    "sdxl": [0.1084, -0.0175, -0.0256],
+    "sd15": [0.0, 0.0, 0.0]
+}
+
+# Distilled tiny decoders (TAESD family) per model family
+TINY_DECODER_MODELS: Dict[str, str] = {
+    "sdxl": "madebyollin/taesdxl",
+    "sd15": "madebyollin/taesd"
+}
+
+
+@dataclass
+class PreviewConfiguration:
+    """Configuration for latent previews."""
+    method: str = "linear"  # "linear", "tiny", "none"
+    model_family: str = "sdxl"
+    preview_size: int = 256
+    interval: int = 5
+    image_format: str = "JPEG"
+    quality: int = 75
+    tiny_decoder_path: Optional[str] = None
+
+    def __post_init__(self):
+        """Validate configuration parameters."""
+        valid_methods = ["linear", "tiny", "none"]
+        if self.method not in valid_methods:
+            raise ValueError(f"method must be one of {valid_methods}, got {self.method}")
+
+        if not 128 <= self.preview_size <= 256:
+            raise ValueError(f"preview_size must be between 128 and 256, got {self.preview_size}")
+
+        if self.interval < 1:
+            raise ValueError(f"interval must be at least 1, got {self.interval}")
+
+
+@dataclass
+class PreviewFrame:
+    """A single decoded preview attached to a progress frame."""
+    step: int
+    width: int
+    height: int
+    method: str
+    decode_time_ms: float
+    image: str  # base64-encoded image
+    image_format: str = "JPEG"
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format."""
+        return {
+            "step": self.step,
+            "width": self.width,
+            "height": self.height,
+            "method": self.method,
+            "decode_time_ms": self.decode_time_ms,
+            "image": self.image,
+            "image_format": self.image_format,
+            "created_at": self.created_at
+        }
+
+
+class LatentPreviewDecoder:
+    """Decodes 4-channel latents into small RGB tensors."""
+
+    def __init__(self, config: PreviewConfiguration):
+        self.config = config
+        self.projections: Dict[str, torch.Tensor] = {}
+        self.biases: Dict[str, torch.Tensor] = {}
+        self.tiny_decoders: Dict[str, Any] = {}
+
+        for family, factors in LATENT_RGB_FACTORS.items():
+            self.projections[family] = torch.tensor(factors, dtype=torch.float32)
+            self.biases[family] = torch.tensor(LATENT_RGB_BIAS.get(family, [0.0, 0.0, 0.0]), dtype=torch.float32)
+
+    def calibrate(self, family: str, latents: torch.Tensor, decoded: torch.Tensor) -> Dict[str, Any]:
+        """
+        Fit a linear latent-to-RGB projection for a model family.
+
+        Args:
+            family: Model family the projection applies to
+            latents: Scaled latents (B, C, h, w)
+            decoded: Matching full VAE decodes in [-1, 1] (B, 3, H, W)
+
+        Returns:
+            Calibration summary with the fitted residual error
+        """
+        latents = latents.detach().float().cpu()
+        decoded = decoded.detach().float().cpu()
+
+        # Bring decoded images down to latent resolution so pixels line up
+        targets = F.interpolate(decoded, size=latents.shape[-2:], mode="area")
+
+        x = latents.permute(0, 2, 3, 1).reshape(-1, latents.shape[1])
+        y = targets.permute(0, 2, 3, 1).reshape(-1, 3)
+        x = torch.cat([x, torch.ones(x.shape[0], 1)], dim=1)
+
+        solution = torch.linalg.lstsq(x, y).solution
+        self.projections[family] = solution[:-1].contiguous()
+        self.biases[family] = solution[-1].contiguous()
+
+        residual = (x @ solution - y).pow(2).mean().sqrt().item()
+        logger.info(f"Calibrated linear preview projection for {family} (rmse: {residual:.4f})")
+
+        return {
+            "family": family,
+            "channels": latents.shape[1],
+            "samples": x.shape[0],
+            "rmse": residual
+        }
+
+    def decode(self, latents: torch.Tensor, method: Optional[str] = None,
+               family: Optional[str] = None) -> torch.Tensor:
+        """Decode the first latent of a batch into an RGB tensor in [0, 1] (3, H, W)."""
+        method = method or self.config.method
+        family = family or self.config.model_family
+
+        latent = latents[:1].detach()
+
+        if method == "tiny":
+            decoder = self._get_tiny_decoder(family, latent.device)
+            if decoder is not None:
+                with torch.no_grad():
+                    image = decoder.decode(latent.to(dtype=next(decoder.parameters()).dtype)).sample
+                return ((image[0].float() + 1.0) / 2.0).clamp(0.0, 1.0)
+            # Fall back to the linear projection if the tiny decoder is unavailable
+
+        return self._decode_linear(latent, family)
+
+    def _decode_linear(self, latent: torch.Tensor, family: str) -> torch.Tensor:
+        """Project latents to RGB with a single matmul."""
+        projection = self.projections.get(family, self.projections["sdxl"])
+        bias = self.biases.get(family, self.biases["sdxl"])
+
+        projection = projection.to(device=latent.device)
+        bias = bias.to(device=latent.device)
+
+        # (C, h, w) -> (h, w, C) @ (C, 3) -> (3, h, w)
+        rgb = torch.einsum("chw,cr->rhw", latent[0].float(), projection) + bias[:, None, None]
+        return ((rgb + 1.0) / 2.0).clamp(0.0, 1.0)
+
+    def _get_tiny_decoder(self, family: str, device: torch.device) -> Optional[Any]:
+        """Lazily load the distilled decoder for a family."""
+        if family in self.tiny_decoders:
+            return self.tiny_decoders[family]
+
+        decoder = None
+        model_path = self.config.tiny_decoder_path or TINY_DECODER_MODELS.get(family)
+        if model_path:
+            try:
+                from diffusers import AutoencoderTiny
+                decoder = AutoencoderTiny.from_pretrained(model_path, torch_dtype=torch.float16 if device.type == "cuda" else torch.float32)
+                decoder.to(device)
+                decoder.eval()
+                logger.info(f"Loaded tiny preview decoder for {family}: {model_path}")
+            except Exception as e:
+                logger.warning(f"Tiny preview decoder unavailable for {family}, using linear projection: {e}")
+
+        self.tiny_decoders[family] = decoder
+        return decoder
+
+    def clear(self) -> None:
+        """Release tiny decoders."""
+        self.tiny_decoders.clear()
+
+
+class PreviewWorker:
+    """
+    Worker producing latent previews for progress frames.
+
+    Previews are produced every `interval` steps and the most recent preview
+    per session is cached so status requests can return it without re-decoding.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        preview_config = config.get("preview", {})
+        self.preview_config = PreviewConfiguration(
+            method=preview_config.get("method", "linear"),
+            model_family=preview_config.get("model_family", "sdxl"),
+            preview_size=preview_config.get("preview_size", 256),
+            interval=preview_config.get("interval", 5),
+            image_format=preview_config.get("image_format", "JPEG"),
+            quality=preview_config.get("quality", 75),
+            tiny_decoder_path=preview_config.get("tiny_decoder_path")
+        )
+        self.decoder = LatentPreviewDecoder(self.preview_config)
+
+        # Last preview per session
+        self.last_previews: Dict[str, PreviewFrame] = {}
+        self.max_cached_previews = preview_config.get("max_cached_previews", 64)
+
+        # Performance tracking
+        self.stats = {
+            "previews_generated": 0,
+            "total_decode_time_ms": 0.0
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize preview worker."""
+        try:
+            self.logger.info("Initializing preview worker...")
+            self.initialized = True
+            self.logger.info(f"Preview worker initialized (method: {self.preview_config.method})")
+            return True
+        except Exception as e:
+            self.logger.error(f"Preview worker initialization failed: {e}")
+            return False
+
+    def should_preview(self, step: int, total_steps: int, interval: Optional[int] = None) -> bool:
+        """Whether a preview should be attached to this step's progress frame."""
+        if self.preview_config.method == "none":
+            return False
+        interval = interval or self.preview_config.interval
+        return (step + 1) % interval == 0 or step + 1 == total_steps
+
+    def create_preview(self, session_id: str, latents: torch.Tensor, step: int,
+                       method: Optional[str] = None, family: Optional[str] = None) -> Optional[PreviewFrame]:
+        """Decode latents into a preview frame and cache it for the session."""
+        try:
+            start_time = time.perf_counter()
+            method = method or self.preview_config.method
+
+            rgb = self.decoder.decode(latents, method=method, family=family)
+            rgb = self._resize(rgb)
+            image = self._encode_image(rgb)
+
+            decode_time = (time.perf_counter() - start_time) * 1000
+            frame = PreviewFrame(
+                step=step,
+                width=rgb.shape[2],
+                height=rgb.shape[1],
+                method=method,
+                decode_time_ms=decode_time,
+                image=image,
+                image_format=self.preview_config.image_format
+            )
+
+            self._cache_preview(session_id, frame)
+            self.stats["previews_generated"] += 1
+            self.stats["total_decode_time_ms"] += decode_time
+            return frame
+
+        except Exception as e:
+            self.logger.warning(f"Preview generation failed for session {session_id}: {e}")
+            return None
+
+    def get_last_preview(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get the cached preview for a session."""
+        frame = self.last_previews.get(session_id)
+        return frame.to_dict() if frame else None
+
+    def release_session(self, session_id: str) -> None:
+        """Drop the cached preview for a session."""
+        self.last_previews.pop(session_id, None)
+
+    def calibrate(self, family: str, latents: torch.Tensor, decoded: torch.Tensor) -> Dict[str, Any]:
+        """Calibrate the linear projection for a model family from real decodes."""
+        return self.decoder.calibrate(family, latents, decoded)
+
+    def _resize(self, rgb: torch.Tensor) -> torch.Tensor:
+        """Resize so the longest side matches the configured preview size."""
+        height, width = rgb.shape[1], rgb.shape[2]
+        scale = self.preview_config.preview_size / max(height, width)
+        target = (max(1, round(height * scale)), max(1, round(width * scale)))
+        if target == (height, width):
+            return rgb
+        return F.interpolate(rgb.unsqueeze(0), size=target, mode="bilinear", align_corners=False)[0]
+
+    def _encode_image(self, rgb: torch.Tensor) -> str:
+        """Encode an RGB tensor in [0, 1] as a base64 image."""
+        from PIL import Image
+
+        array = (rgb.permute(1, 2, 0) * 255).round().to(torch.uint8).cpu().numpy()
+        buffer = io.BytesIO()
+        Image.fromarray(array).save(buffer, format=self.preview_config.image_format, quality=self.preview_config.quality)
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    def _cache_preview(self, session_id: str, frame: PreviewFrame) -> None:
+        """Store the latest preview, keeping the cache bounded."""
+        self.last_previews.pop(session_id, None)
+        self.last_previews[session_id] = frame
+        while len(self.last_previews) > self.max_cached_previews:
+            oldest = next(iter(self.last_previews))
+            del self.last_previews[oldest]
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get preview worker status."""
+        generated = self.stats["previews_generated"]
+        return {
+            "initialized": self.initialized,
+            "method": self.preview_config.method,
+            "model_family": self.preview_config.model_family,
+            "preview_size": self.preview_config.preview_size,
+            "interval": self.preview_config.interval,
+            "cached_previews": len(self.last_previews),
+            "previews_generated": generated,
+            "avg_decode_time_ms": self.stats["total_decode_time_ms"] / generated if generated else 0.0
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up preview worker resources."""
+        try:
+            self.logger.info("Cleaning up preview worker...")
+            self.last_previews.clear()
+            self.decoder.clear()
+            self.initialized = False
+            self.logger.info("Preview worker cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Preview worker cleanup error: {e}")
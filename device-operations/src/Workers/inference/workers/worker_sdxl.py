@@ -7,13 +7,21 @@ Main worker for handling SDXL inference requests with comprehensive support for
 text-to-image, image-to-image, inpainting, LoRA, ControlNet, and advanced features.
 """
 
+import asyncio
+import base64
+import io
 import logging
+import time
+import weakref
 import torch
 import gc
-from typing import Dict, Any, Optional
+from contextlib import ExitStack
+from typing import Dict, Any, Optional, Callable, List, Tuple, Union
 from pathlib import Path
 
 from diffusers import (
+    AutoPipelineForImage2Image,
+    AutoPipelineForInpainting,
     StableDiffusionXLPipeline,
     StableDiffusionXLImg2ImgPipeline,
     StableDiffusionXLInpaintPipeline,
@@ -21,6 +29,15 @@ from diffusers import (
 )
 from diffusers.utils import logging as diffusers_logging
 
+from ...utilities.timing import mark, record_stages
+from .worker_lora import requested_loras
+
+# Pipeline class that runs a task as is, and the auto pipeline deriving it from another pipeline
+TASK_PIPELINES = {
+    "img2img": (StableDiffusionXLImg2ImgPipeline, AutoPipelineForImage2Image),
+    "inpainting": (StableDiffusionXLInpaintPipeline, AutoPipelineForInpainting)
+}
+
 
 class SDXLWorker:
     """
@@ -39,11 +56,23 @@ class SDXLWorker:
         self.device_manager = None
         self.model_interface = None
         self.scheduler_interface = None
+        self.preview_worker = None
+        self.cpu_performance_manager = None
+        self.onnx_worker = None
+        self.warmup_manager = None
+        self.bucket_manager = None
+        self.tiled_worker = None
+        self.lora_worker = None
         
         # Loaded pipelines
         self.pipelines: Dict[str, DiffusionPipeline] = {}
         self.current_pipeline: Optional[DiffusionPipeline] = None
         self.current_model_name: Optional[str] = None
+        # Registered models that finished warmup (or need none) and may receive requests
+        self.ready_models: set = set()
+        # (model name, task) -> img2img/inpainting pipeline sharing the registered pipeline's components
+        self.task_pipelines: Dict[Tuple[str, str], DiffusionPipeline] = {}
+        self._pipeline_locks: "weakref.WeakKeyDictionary[DiffusionPipeline, asyncio.Lock]" = weakref.WeakKeyDictionary()
         
         # Configuration
         self.output_path = Path(config.get("output_path", "../../../outputs"))
@@ -54,6 +83,17 @@ class SDXLWorker:
         self.enable_xformers = config.get("enable_xformers", True)
         self.enable_compile = config.get("enable_compile", False)
         
+        # Execution backend ("torch" or "onnx"), selectable per model and per request
+        self.default_backend = config.get("execution_backend", "torch")
+        self.model_backends: Dict[str, str] = dict(config.get("model_backends", {}))
+        
+        # Crop-to-mask inpainting: denoise only the masked region plus context
+        self.inpaint_crop_to_mask = config.get("inpaint_crop_to_mask", False)
+        self.inpaint_crop_padding = config.get("inpaint_crop_padding", 32)
+        self.inpaint_crop_min_resolution = config.get("inpaint_crop_min_resolution")
+        self.inpaint_feather = config.get("inpaint_feather", 8)
+        self._inpainting_processor = None
+        
         # Create output directory
         self.output_path.mkdir(parents=True, exist_ok=True)
     
@@ -76,31 +116,577 @@ class SDXLWorker:
     async def process_inference(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process an SDXL inference request."""
         try:
+            mark("worker")
+            start_time = time.perf_counter()
             inference_type = request_data.get("type", "text2img")
             
             if inference_type == "text2img":
-                return await self._process_text2img(request_data)
+                result = await self._process_text2img(request_data)
             elif inference_type == "img2img":
-                return await self._process_img2img(request_data)
+                result = await self._process_img2img(request_data)
             elif inference_type == "inpainting":
-                return await self._process_inpainting(request_data)
+                result = await self._process_inpainting(request_data)
             elif inference_type == "controlnet":
-                return await self._process_controlnet(request_data)
+                result = await self._process_controlnet(request_data)
             elif inference_type == "lora":
-                return await self._process_lora(request_data)
+                result = await self._process_lora(request_data)
             else:
                 raise ValueError(f"Unknown inference type: {inference_type}")
+            
+            # Paths that do not run a pipeline report their measured wall time
+            result.setdefault("processing_time", time.perf_counter() - start_time)
+            return result
                 
         except Exception as e:
             self.logger.error("SDXL inference failed: %s", e)
             return {"error": str(e)}
     
+    def register_pipeline(self, model_name: str, pipeline: DiffusionPipeline,
+                          backend: Optional[str] = None) -> None:
+        """
+        Register a loaded pipeline.
+        
+        Without a warmup manager the pipeline is ready and made current at
+        once; otherwise it receives no requests until `load_pipeline` or
+        `warmup_model` has made it ready.
+        """
+        if backend is not None:
+            self.set_model_backend(model_name, backend)
+        if self.cpu_performance_manager is not None:
+            self.cpu_performance_manager.release_model(model_name)
+        self.ready_models.discard(model_name)
+        for task in TASK_PIPELINES:
+            self.task_pipelines.pop((model_name, task), None)
+        self.pipelines[model_name] = pipeline
+        if self.warmup_manager is not None:
+            self.warmup_manager.mark_cold(model_name)
+        else:
+            self._set_ready(model_name)
+        self.logger.info("Registered pipeline: %s", model_name)
+    
+    def _set_ready(self, model_name: str) -> None:
+        """Route requests to a registered model and make it current."""
+        self.ready_models.add(model_name)
+        self.current_pipeline = self.pipelines[model_name]
+        self.current_model_name = model_name
+    
+    async def load_pipeline(self, model_name: str, pipeline: DiffusionPipeline,
+                            backend: Optional[str] = None, warmup: Optional[bool] = None,
+                            **warmup_options) -> Dict[str, Any]:
+        """
+        Register a loaded pipeline and warm it up before it receives requests.
+        
+        The model becomes current once ready. Returns its readiness state
+        including cold/warm timings.
+        """
+        self.register_pipeline(model_name, pipeline, backend)
+        if self.warmup_manager is None:
+            return {"model_name": model_name, "state": "ready", "warmup": None}
+        
+        if warmup if warmup is not None else self.warmup_manager.enabled:
+            await self.warmup_model(model_name, **warmup_options)
+        else:
+            self.warmup_manager.mark_ready(model_name)
+            self._set_ready(model_name)
+        return {"model_name": model_name, **self.warmup_manager.get_model_state(model_name)}
+    
+    async def warmup_model(self, model_name: str, **warmup_options) -> Dict[str, Any]:
+        """
+        Run warmup passes for a registered pipeline over the configured shape buckets.
+        
+        A model that was not ready starts receiving requests (and becomes
+        current) when its warmup completes; one already serving keeps serving.
+        """
+        if model_name not in self.pipelines:
+            raise ValueError(f"Pipeline not loaded: {model_name}")
+        if self.warmup_manager is None:
+            raise RuntimeError("Warmup manager not available")
+        warmup = await self.warmup_manager.warmup(model_name, self._run_warmup_pass, **warmup_options)
+        if model_name not in self.ready_models:
+            self._set_ready(model_name)
+        return warmup
+    
+    async def _run_warmup_pass(self, model_name: str, width: int, height: int,
+                               batch_size: int, steps: int) -> Dict[str, Any]:
+        """Run one dummy text-to-image generation through the normal execution path."""
+        request_data = {
+            "model_name": model_name,
+            "prompt": "warmup",
+            "steps": steps,
+            "num_images": batch_size,
+            "width": width,
+            "height": height,
+            "seed": 0
+        }
+        pipeline_kwargs = self._base_pipeline_kwargs(request_data)
+        pipeline_kwargs["width"] = width
+        pipeline_kwargs["height"] = height
+        return await self._run_pipeline(self.pipelines[model_name], "text2img", pipeline_kwargs, request_data,
+                                        model_name=model_name)
+    
+    def set_model_backend(self, model_name: str, backend: str) -> None:
+        """Select the default execution backend for a model."""
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown execution backend: {backend}")
+        self.model_backends[model_name] = backend
+    
+    def _resolve_backend(self, request_data: Dict[str, Any], model_name: Optional[str]) -> str:
+        """Resolve the execution backend: request, then model, then worker default."""
+        backend = request_data.get("backend") or self.model_backends.get(model_name or "") or self.default_backend
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown execution backend: {backend}")
+        if backend == "onnx" and (self.onnx_worker is None or not self.onnx_worker.available):
+            raise ValueError("ONNX Runtime backend not available")
+        return backend
+    
+    def _get_pipeline(self, request_data: Dict[str, Any]) -> Optional[DiffusionPipeline]:
+        """Resolve the pipeline for a request (the current one when it names no model)."""
+        model_name = self._resolve_model_name(request_data)
+        return self.pipelines.get(model_name) if model_name else None
+    
+    def _get_task_pipeline(self, request_data: Dict[str, Any], task: str) -> Optional[DiffusionPipeline]:
+        """
+        Resolve the img2img or inpainting pipeline for a request.
+        
+        A registered pipeline of another task is converted with the auto
+        pipeline's `from_pipe`, which shares its components (no weights are
+        copied); the result is cached per model.
+        """
+        model_name = self._resolve_model_name(request_data)
+        pipeline = self.pipelines.get(model_name) if model_name else None
+        if pipeline is None:
+            return None
+        pipeline_class, auto_class = TASK_PIPELINES[task]
+        if isinstance(pipeline, pipeline_class):
+            return pipeline
+        
+        task_pipeline = self.task_pipelines.get((model_name, task))
+        if task_pipeline is None:
+            try:
+                task_pipeline = auto_class.from_pipe(pipeline)
+            except Exception as e:
+                raise ValueError(f"Model {model_name} ({type(pipeline).__name__}) cannot run {task}: {e}") from e
+            self.task_pipelines[(model_name, task)] = task_pipeline
+            self.logger.info("Derived %s pipeline %s for %s", task, type(task_pipeline).__name__, model_name)
+        return task_pipeline
+    
+    def _resolve_model_name(self, request_data: Dict[str, Any]) -> Optional[str]:
+        """Resolve the registered model name for a request; requests without one use the current model."""
+        model_name = request_data.get("model_name")
+        if not model_name:
+            return self.current_model_name
+        if model_name not in self.pipelines:
+            raise ValueError(f"Model {model_name} is not loaded")
+        if model_name not in self.ready_models:
+            raise ValueError(f"Model {model_name} is not ready: its warmup has not completed")
+        return model_name
+    
+    def _pipeline_lock(self, pipeline: DiffusionPipeline) -> asyncio.Lock:
+        """Lock serializing the runs of one pipeline instance."""
+        lock = self._pipeline_locks.get(pipeline)
+        if lock is None:
+            lock = self._pipeline_locks[pipeline] = asyncio.Lock()
+        return lock
+    
+    def _run_in_profile(self, model_name: Optional[str], fn: Callable, /, *args, **kwargs):
+        """Call `fn` under the model's performance profile (autocast state is thread-local)."""
+        if self.cpu_performance_manager is None:
+            return fn(*args, **kwargs)
+        with self.cpu_performance_manager.autocast(model_name):
+            return fn(*args, **kwargs)
+    
+    def _create_step_callback(self, session_id: str, total_steps: int,
+                              progress_callback: Optional[Callable[[Dict[str, Any]], None]],
+                              preview_interval: Optional[int] = None) -> Callable:
+        """Create a `callback_on_step_end` hook that emits progress frames."""
+        def on_step_end(pipeline, step: int, timestep, callback_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+            frame = {
+                "session_id": session_id,
+                "step": step + 1,
+                "total_steps": total_steps,
+                "progress": (step + 1) / total_steps if total_steps else 1.0,
+                "timestep": float(timestep) if timestep is not None else None
+            }
+            
+            latents = callback_kwargs.get("latents")
+            if (self.preview_worker is not None and latents is not None
+                    and self.preview_worker.should_preview(step, total_steps, preview_interval)):
+                preview = self.preview_worker.create_preview(session_id, latents, step + 1)
+                if preview is not None:
+                    frame["preview"] = preview.to_dict()
+            
+            if progress_callback is not None:
+                try:
+                    progress_callback(frame)
+                except Exception as e:
+                    self.logger.warning("Progress callback failed: %s", e)
+            
+            return callback_kwargs
+        
+        return on_step_end
+    
+    async def _run_pipeline(self, pipeline: DiffusionPipeline, inference_type: str,
+                            pipeline_kwargs: Dict[str, Any], request_data: Dict[str, Any],
+                            image_transform: Optional[Union[Callable, List[Callable]]] = None,
+                            model_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run a loaded pipeline with progress frames and return serialized images.
+        
+        Execution is split into stages (tokenize, encode, steps, decode,
+        postprocess, serialize) so that each one can be timed separately.
+        `image_transform`, if given, is applied to each decoded image before
+        serialization (e.g. blending an inpainting crop back into the frame);
+        a list supplies one transform per image. `model_name` bypasses
+        request routing (warmup passes run before the model is ready).
+        """
+        session_id = request_data.get("session_id", "")
+        model_name = model_name or self._resolve_model_name(request_data)
+        # Task pipelines share the registered pipeline's modules; LoRA state and the run lock belong to it
+        shared = self.pipelines.get(model_name, pipeline) if model_name else pipeline
+        backend = self._resolve_backend(request_data, model_name)
+        if backend == "onnx" and request_data.get("lora_batch"):
+            # Exported graphs bake in the base weights and would drop every sample's own adapters
+            self.logger.info("Running a mixed-LoRA batch of %s with torch instead of ONNX", model_name)
+            backend = "torch"
+        steps = pipeline_kwargs.get("num_inference_steps", 20)
+        prompt = pipeline_kwargs.get("prompt", "")
+        stage_timings: Dict[str, float] = {}
+        start_time = time.perf_counter()
+        
+        pipeline_kwargs["callback_on_step_end"] = self._create_step_callback(
+            session_id, steps,
+            request_data.get("progress_callback"),
+            request_data.get("preview_interval")
+        )
+        pipeline_kwargs["callback_on_step_end_tensor_inputs"] = ["latents"]
+        
+        seed = request_data.get("seed")
+        if seed is not None:
+            pipeline_kwargs["generator"] = torch.Generator(device="cpu").manual_seed(int(seed))
+        
+        # LoRA fusion, multi-LoRA wrappers and tiling modify the shared pipeline in place:
+        # one run per pipeline at a time, from applying the request's LoRAs until its latents are decoded
+        async with self._pipeline_lock(shared):
+            # Fuse the request's LoRAs (or restore base weights) before anything runs the UNet;
+            # batches mixing LoRAs keep the base weights and add each sample's adapters unfused
+            lora_report = lora_batch = None
+            if self.lora_worker is not None:
+                if request_data.get("lora_batch"):
+                    lora_batch = await self.lora_worker.prepare_batch(shared, request_data["lora_batch"])
+                else:
+                    lora_report = await self.lora_worker.apply_to_pipeline(shared, request_data)
+            
+            tiled = self._use_tiled_diffusion(request_data, pipeline_kwargs)
+            with ExitStack() as stack:
+                if lora_batch is not None:
+                    lora_report = stack.enter_context(lora_batch)
+                if backend == "onnx":
+                    # This request runs a view of the pipeline with ONNX components; concurrent
+                    # requests keep the torch modules. Exported text encoders only return the
+                    # penultimate hidden state
+                    pipeline = stack.enter_context(self.onnx_worker.activate(
+                        pipeline, text_encoders=not pipeline_kwargs.get("clip_skip")
+                    ))
+                if tiled:
+                    # Entered after the backend so tiles run through the active backend
+                    stack.enter_context(self.tiled_worker.activate(
+                        pipeline, request_data.get("tile_size"), request_data.get("tile_overlap")
+                    ))
+                
+                # Pipelines run under no_grad; execute off the event loop so progress stays responsive
+                if self._supports_staged_encode(pipeline):
+                    embeds = await asyncio.to_thread(
+                        self._run_in_profile, model_name, self._encode_prompt_staged,
+                        pipeline, pipeline_kwargs, stage_timings
+                    )
+                    pipeline_kwargs.update(embeds)
+                
+                pipeline_kwargs["output_type"] = "latent"
+                stage_start = time.perf_counter()
+                result = await asyncio.to_thread(self._run_in_profile, model_name, pipeline, **pipeline_kwargs)
+                stage_timings["steps"] = time.perf_counter() - stage_start
+                
+                images = await asyncio.to_thread(
+                    self._run_in_profile, model_name, self._decode_latents_staged,
+                    pipeline, result.images, stage_timings
+                )
+        
+        if image_transform is not None:
+            stage_start = time.perf_counter()
+            transforms = image_transform if isinstance(image_transform, list) else [image_transform] * len(images)
+            images = [transform(image) for transform, image in zip(transforms, images)]
+            stage_timings["composite"] = time.perf_counter() - stage_start
+        
+        stage_start = time.perf_counter()
+        serialized = [self._serialize_image(image) for image in images]
+        stage_timings["serialize"] = time.perf_counter() - stage_start
+        record_stages(stage_timings)
+        
+        return {
+            "type": inference_type,
+            "prompt": prompt,
+            "images": serialized,
+            "seed_used": seed,
+            "backend": backend,
+            "tiled": tiled,
+            "lora": lora_report,
+            "processing_time": time.perf_counter() - start_time,
+            "stage_timings": stage_timings,
+            "status": "completed"
+        }
+    
+    def _use_tiled_diffusion(self, request_data: Dict[str, Any], pipeline_kwargs: Dict[str, Any]) -> bool:
+        """Decide whether to denoise in overlapping latent tiles for this request."""
+        if self.tiled_worker is None:
+            return False
+        width = pipeline_kwargs.get("width") or request_data.get("width") or 1024
+        height = pipeline_kwargs.get("height") or request_data.get("height") or 1024
+        return self.tiled_worker.should_tile(width, height, request_data.get("tiled"))
+    
+    def _supports_staged_encode(self, pipeline: DiffusionPipeline) -> bool:
+        """Check whether the pipeline exposes the SDXL dual text encoder layout."""
+        return (getattr(pipeline, "tokenizer_2", None) is not None
+                and getattr(pipeline, "text_encoder_2", None) is not None)
+    
+    @torch.no_grad()
+    def _encode_prompt_staged(self, pipeline: DiffusionPipeline, pipeline_kwargs: Dict[str, Any],
+                              stage_timings: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Encode the prompts with the pipeline's own `encode_prompt` ahead of the denoising call.
+        
+        Second-encoder prompts, CLIP skip, LoRA text encoder scaling and
+        textual inversion tokens are handled by diffusers exactly as inside
+        `__call__`; the prompt arguments are popped from `pipeline_kwargs`
+        in favour of the embeddings. Text encoder forwards are timed with
+        module hooks as "encode", the rest of the call (mostly tokenization)
+        as "tokenize". Per-image duplication is left to the pipeline.
+        """
+        encoder_seconds = []
+        encoder_starts = []
+        handles = []
+        for text_encoder in (pipeline.text_encoder, pipeline.text_encoder_2):
+            if text_encoder is not None:
+                handles.append(text_encoder.register_forward_pre_hook(
+                    lambda module, args: encoder_starts.append(time.perf_counter())
+                ))
+                handles.append(text_encoder.register_forward_hook(
+                    lambda module, args, output: encoder_seconds.append(time.perf_counter() - encoder_starts.pop())
+                ))
+        
+        cross_attention_kwargs = pipeline_kwargs.get("cross_attention_kwargs") or {}
+        do_classifier_free_guidance = (pipeline_kwargs.get("guidance_scale", 5.0) > 1.0
+                                       and getattr(pipeline.unet.config, "time_cond_proj_dim", None) is None)
+        stage_start = time.perf_counter()
+        try:
+            prompt_embeds, negative_prompt_embeds, pooled_prompt_embeds, negative_pooled_prompt_embeds = \
+                pipeline.encode_prompt(
+                    prompt=pipeline_kwargs.pop("prompt", ""),
+                    prompt_2=pipeline_kwargs.pop("prompt_2", None),
+                    device=pipeline._execution_device,
+                    num_images_per_prompt=1,
+                    do_classifier_free_guidance=do_classifier_free_guidance,
+                    negative_prompt=pipeline_kwargs.pop("negative_prompt", None),
+                    negative_prompt_2=pipeline_kwargs.pop("negative_prompt_2", None),
+                    lora_scale=cross_attention_kwargs.get("scale"),
+                    clip_skip=pipeline_kwargs.get("clip_skip")
+                )
+        finally:
+            for handle in handles:
+                handle.remove()
+        total = time.perf_counter() - stage_start
+        stage_timings["encode"] = sum(encoder_seconds)
+        stage_timings["tokenize"] = max(0.0, total - stage_timings["encode"])
+        
+        encoded = {"prompt_embeds": prompt_embeds, "pooled_prompt_embeds": pooled_prompt_embeds}
+        if do_classifier_free_guidance:
+            encoded["negative_prompt_embeds"] = negative_prompt_embeds
+            encoded["negative_pooled_prompt_embeds"] = negative_pooled_prompt_embeds
+        return encoded
+    
+    @torch.no_grad()
+    def _decode_latents_staged(self, pipeline: DiffusionPipeline, latents: torch.Tensor,
+                               stage_timings: Dict[str, float]) -> list:
+        """Decode latents with the pipeline VAE and postprocess them into PIL images."""
+        vae = pipeline.vae
+        
+        stage_start = time.perf_counter()
+        needs_upcasting = vae.dtype == torch.float16 and getattr(vae.config, "force_upcast", False)
+        if needs_upcasting:
+            vae.to(dtype=torch.float32)
+        latents = latents.to(device=vae.device, dtype=vae.dtype)
+        
+        latents_mean = getattr(vae.config, "latents_mean", None)
+        latents_std = getattr(vae.config, "latents_std", None)
+        if latents_mean is not None and latents_std is not None:
+            mean = torch.tensor(latents_mean).view(1, -1, 1, 1).to(latents.device, latents.dtype)
+            std = torch.tensor(latents_std).view(1, -1, 1, 1).to(latents.device, latents.dtype)
+            latents = latents * std / vae.config.scaling_factor + mean
+        else:
+            latents = latents / vae.config.scaling_factor
+        
+        decoded = vae.decode(latents, return_dict=False)[0]
+        if needs_upcasting:
+            vae.to(dtype=torch.float16)
+        stage_timings["decode"] = time.perf_counter() - stage_start
+        
+        stage_start = time.perf_counter()
+        if getattr(pipeline, "watermark", None) is not None:
+            decoded = pipeline.watermark.apply_watermark(decoded)
+        images = pipeline.image_processor.postprocess(decoded, output_type="pil")
+        stage_timings["postprocess"] = time.perf_counter() - stage_start
+        
+        return images
+    
+    def _serialize_image(self, image) -> str:
+        """Encode a PIL image as base64 PNG."""
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+    
+    def _load_image(self, image):
+        """Decode base64 or path image inputs into PIL images."""
+        if not isinstance(image, str):
+            return image
+        from PIL import Image
+        if Path(image).exists():
+            return Image.open(image).convert("RGB")
+        return Image.open(io.BytesIO(base64.b64decode(image))).convert("RGB")
+    
+    def _snap_request(self, request_data: Dict[str, Any], width: int, height: int):
+        """Snap a single request to its resolution bucket, if bucketing applies to it."""
+        if self.bucket_manager is None:
+            return None
+        policy = request_data.get("snap_policy")
+        if policy == "none" or (policy is None and not self.bucket_manager.snap_single_requests):
+            return None
+        return self.bucket_manager.snap(width, height, policy)
+    
+    async def process_batch(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Run queued requests that share a batch key in a single pipeline call.
+        
+        Entries come from the resolution bucket queues (request plus bucket
+        assignment). text2img requests are batched with one prompt and one
+        generator per image, seeded `seed + i`; each image is mapped back
+        to its request's size. A batch whose requests share one LoRA
+        combination fuses it; a batch mixing combinations runs each image's
+        LoRAs unfused. Other request types run one by one.
+        """
+        first = entries[0]["request"]
+        pipeline = self._get_pipeline(first)
+        if pipeline is None or first.get("type", "text2img") != "text2img":
+            return [await self.process_inference(entry["request"]) for entry in entries]
+        
+        prompts, negative_prompts, generators, transforms, owners, loras = [], [], [], [], [], []
+        prompts_2, negative_prompts_2 = [], []
+        for index, entry in enumerate(entries):
+            request_data = entry["request"]
+            seed = request_data.get("seed")
+            for image_index in range(min(request_data.get("num_images", 1), self.max_batch_size)):
+                generator = torch.Generator(device="cpu")
+                if seed is not None:
+                    generator.manual_seed(int(seed) + image_index)
+                else:
+                    generator.seed()
+                prompts.append(request_data.get("prompt", ""))
+                negative_prompts.append(request_data.get("negative_prompt"))
+                # Second encoder prompts default to the first ones, as in diffusers
+                prompts_2.append(request_data.get("prompt_2") or request_data.get("prompt", ""))
+                negative_prompts_2.append(request_data.get("negative_prompt_2") or request_data.get("negative_prompt"))
+                generators.append(generator)
+                transforms.append(entry["assignment"].restore_output_image)
+                owners.append(index)
+                loras.append(requested_loras(request_data))
+        
+        pipeline_kwargs = self._base_pipeline_kwargs(first)
+        pipeline_kwargs.update({
+            "prompt": prompts,
+            "negative_prompt": None if all(text is None for text in negative_prompts)
+                               else [text or "" for text in negative_prompts],
+            "num_images_per_prompt": 1,
+            "generator": generators
+        })
+        if any(entry["request"].get("prompt_2") for entry in entries):
+            pipeline_kwargs["prompt_2"] = prompts_2
+        if any(entry["request"].get("negative_prompt_2") for entry in entries):
+            pipeline_kwargs["negative_prompt_2"] = [text or "" for text in negative_prompts_2]
+        pipeline_kwargs["width"], pipeline_kwargs["height"] = entries[0]["assignment"].bucket
+        batch_request = {"model_name": first.get("model_name"), "backend": first.get("backend")}
+        if all(sample == loras[0] for sample in loras):
+            # One combination for the whole batch is fused into the weights
+            batch_request.update({key: first[key] for key in ("lora_name", "lora_path", "lora_scale", "lora_adapters", "loras")
+                                  if key in first})
+        else:
+            batch_request["lora_batch"] = loras
+        
+        result = await self._run_pipeline(pipeline, "text2img", pipeline_kwargs, batch_request,
+                                          image_transform=transforms)
+        
+        batch_info = {"batch_size": len(prompts), "requests": len(entries),
+                      "lora_mode": "heterogeneous" if "lora_batch" in batch_request else "fused" if loras[0] else None}
+        results = []
+        for index, entry in enumerate(entries):
+            request_data = entry["request"]
+            results.append({
+                "type": "text2img",
+                "prompt": request_data.get("prompt", ""),
+                "images": [image for image, owner in zip(result["images"], owners) if owner == index],
+                "seed_used": request_data.get("seed"),
+                "backend": result["backend"],
+                "processing_time": result["processing_time"],
+                "stage_timings": result["stage_timings"],
+                "bucket": entry["assignment"].to_dict(),
+                "batch": batch_info,
+                "status": "completed"
+            })
+        return results
+    
+    def _get_inpainting_processor(self):
+        """Get the inpainting processor used for crop-to-mask geometry."""
+        if self._inpainting_processor is None:
+            from ...conditioning.workers.worker_img2img import create_inpainting_processor
+            self._inpainting_processor = create_inpainting_processor(torch.device("cpu"), torch.float32)
+        return self._inpainting_processor
+    
+    def _base_pipeline_kwargs(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect generation parameters shared by all pipeline types."""
+        pipeline_kwargs = {
+            "prompt": request_data.get("prompt", ""),
+            "negative_prompt": request_data.get("negative_prompt"),
+            "num_inference_steps": request_data.get("steps", request_data.get("num_inference_steps", 20)),
+            "guidance_scale": request_data.get("guidance_scale", 7.5),
+            "num_images_per_prompt": min(request_data.get("num_images", 1), self.max_batch_size)
+        }
+        # Second text encoder prompts (SDXL) and CLIP skip are only passed when requested
+        for key in ("prompt_2", "negative_prompt_2", "clip_skip"):
+            if request_data.get(key) is not None:
+                pipeline_kwargs[key] = request_data[key]
+        return pipeline_kwargs
+    
     async def _process_text2img(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process text-to-image request."""
         prompt = request_data.get("prompt", "")
         num_images = request_data.get("num_images", 1)
         steps = request_data.get("steps", 20)
         
+        pipeline = self._get_pipeline(request_data)
+        if pipeline is not None:
+            pipeline_kwargs = self._base_pipeline_kwargs(request_data)
+            pipeline_kwargs["width"] = request_data.get("width", 1024)
+            pipeline_kwargs["height"] = request_data.get("height", 1024)
+            
+            assignment = self._snap_request(request_data, pipeline_kwargs["width"], pipeline_kwargs["height"])
+            if assignment is None:
+                return await self._run_pipeline(pipeline, "text2img", pipeline_kwargs, request_data)
+            
+            pipeline_kwargs["width"], pipeline_kwargs["height"] = assignment.bucket
+            result = await self._run_pipeline(
+                pipeline, "text2img", pipeline_kwargs, request_data,
+                image_transform=assignment.restore_output_image
+            )
+            result["bucket"] = assignment.to_dict()
+            return result
+        
         # Placeholder implementation
         return {
             "type": "text2img",
@@ -108,7 +694,6 @@ class SDXLWorker:
             "num_images": num_images,
             "steps": steps,
             "images": [],  # Would contain generated images
-            "processing_time": 1.0,
             "status": "completed"
         }
     
@@ -117,13 +702,32 @@ class SDXLWorker:
         prompt = request_data.get("prompt", "")
         strength = request_data.get("strength", 0.8)
         
+        pipeline = self._get_task_pipeline(request_data, "img2img")
+        if pipeline is not None and request_data.get("image") is not None:
+            pipeline_kwargs = self._base_pipeline_kwargs(request_data)
+            image = self._load_image(request_data["image"])
+            pipeline_kwargs["strength"] = strength
+            
+            assignment = self._snap_request(request_data, *image.size)
+            if assignment is None:
+                pipeline_kwargs["image"] = image
+                return await self._run_pipeline(pipeline, "img2img", pipeline_kwargs, request_data)
+            
+            pipeline_kwargs["image"] = assignment.prepare_input_image(image)
+            pipeline_kwargs["width"], pipeline_kwargs["height"] = assignment.bucket
+            result = await self._run_pipeline(
+                pipeline, "img2img", pipeline_kwargs, request_data,
+                image_transform=assignment.restore_output_image
+            )
+            result["bucket"] = assignment.to_dict()
+            return result
+        
         # Placeholder implementation
         return {
             "type": "img2img",
             "prompt": prompt,
             "strength": strength,
             "images": [],  # Would contain generated images
-            "processing_time": 1.0,
             "status": "completed"
         }
     
@@ -131,12 +735,52 @@ class SDXLWorker:
         """Process inpainting request."""
         prompt = request_data.get("prompt", "")
         
+        pipeline = self._get_task_pipeline(request_data, "inpainting")
+        if pipeline is not None and request_data.get("image") is not None and request_data.get("mask_image") is not None:
+            pipeline_kwargs = self._base_pipeline_kwargs(request_data)
+            image = self._load_image(request_data["image"])
+            mask_image = self._load_image(request_data["mask_image"])
+            pipeline_kwargs["strength"] = request_data.get("strength", 0.99)
+            
+            crop = None
+            if request_data.get("crop_to_mask", self.inpaint_crop_to_mask):
+                crop = self._get_inpainting_processor().crop_to_mask(
+                    image, mask_image,
+                    padding=request_data.get("crop_padding", self.inpaint_crop_padding),
+                    min_resolution=request_data.get("crop_min_resolution", self.inpaint_crop_min_resolution)
+                )
+            
+            if crop is None:
+                pipeline_kwargs["image"] = image
+                pipeline_kwargs["mask_image"] = mask_image
+                for key in ("width", "height"):
+                    if request_data.get(key):
+                        pipeline_kwargs[key] = request_data[key]
+                return await self._run_pipeline(pipeline, "inpainting", pipeline_kwargs, request_data)
+            
+            # Denoise only the crop, then blend it back with a feathered seam
+            pipeline_kwargs["image"] = crop["image"]
+            pipeline_kwargs["mask_image"] = crop["mask"]
+            pipeline_kwargs["width"], pipeline_kwargs["height"] = crop["process_size"]
+            feather = request_data.get("feather", self.inpaint_feather)
+            result = await self._run_pipeline(
+                pipeline, "inpainting", pipeline_kwargs, request_data,
+                image_transform=lambda generated: self._get_inpainting_processor().blend_crop(
+                    image, generated, mask_image, crop["crop_box"], feather
+                )
+            )
+            result["crop"] = {
+                "crop_box": list(crop["crop_box"]),
+                "process_size": list(crop["process_size"]),
+                "mask_area": crop["mask_area"]
+            }
+            return result
+        
         # Placeholder implementation
         return {
             "type": "inpainting",
             "prompt": prompt,
             "images": [],  # Would contain generated images
-            "processing_time": 1.0,
             "status": "completed"
         }
     
@@ -151,12 +795,16 @@ class SDXLWorker:
             "prompt": prompt,
             "controlnet_type": controlnet_type,
             "images": [],  # Would contain generated images
-            "processing_time": 1.0,
             "status": "completed"
         }
     
     async def _process_lora(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process LoRA request."""
+        """Process LoRA request: text-to-image with the requested LoRAs fused."""
+        if self._get_pipeline(request_data) is not None and self.lora_worker is not None:
+            result = await self._process_text2img(request_data)
+            result["type"] = "lora"
+            return result
+        
         prompt = request_data.get("prompt", "")
         lora_name = request_data.get("lora_name")
         lora_scale = request_data.get("lora_scale", 1.0)
@@ -168,7 +816,6 @@ class SDXLWorker:
             "lora_name": lora_name,
             "lora_scale": lora_scale,
             "images": [],  # Would contain generated images
-            "processing_time": 1.0,
             "status": "completed"
         }
     
@@ -178,6 +825,13 @@ class SDXLWorker:
             "initialized": self.initialized,
             "current_model": self.current_model_name,
             "loaded_pipelines": list(self.pipelines.keys()),
+            "ready_models": sorted(self.ready_models),
+            "default_backend": self.default_backend,
+            "model_backends": dict(self.model_backends),
+            "model_states": (
+                {name: self.warmup_manager.model_states.get(name, {}).get("state") for name in self.pipelines}
+                if self.warmup_manager is not None else {}
+            ),
             "enable_safety_checker": self.enable_safety_checker,
             "max_batch_size": self.max_batch_size
         }
@@ -192,6 +846,8 @@ class SDXLWorker:
                 del self.pipelines[pipeline_name]
             self.pipelines.clear()
             
+            self.ready_models.clear()
+            self.task_pipelines.clear()
             self.current_pipeline = None
             self.current_model_name = None
             
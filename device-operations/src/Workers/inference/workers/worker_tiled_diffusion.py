@@ -0,0 +1,267 @@
+"""
+Tiled Diffusion Worker for SDXL Workers System
+==============================================
+
+MultiDiffusion-style tiled denoising for resolutions beyond what fits in
+memory. Each UNet call is split into overlapping latent tiles that are
+denoised in batches and blended back with per-tile weights, and the VAE
+runs tiled as well, so peak memory is bounded by the tile size rather
+than the output size.
+"""
+
+import logging
+import math
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+import psutil
+import torch
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TiledDiffusionWorker:
+    """
+    Tiled latent diffusion for high-resolution generation.
+
+    While active, the pipeline's `unet.forward` denoises overlapping
+    `tile_size` windows (in pixels) of the latent and averages their noise
+    predictions with Gaussian or uniform weights. The number of tiles per
+    UNet call is derived from the device's free memory unless configured.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        tiled_config = config.get("tiled_diffusion", {})
+        self.min_pixels = tiled_config.get("min_pixels", 2048 * 2048)
+        self.tile_size = tiled_config.get("tile_size", 1024)
+        self.tile_overlap = tiled_config.get("tile_overlap", 256)
+        self.weighting = tiled_config.get("weighting", "gaussian")
+        self.tile_batch_size: Optional[int] = tiled_config.get("tile_batch_size")
+        self.max_tile_batch_size = tiled_config.get("max_tile_batch_size", 8)
+        self.memory_fraction = tiled_config.get("memory_fraction", 0.7)
+        # Rough UNet activation footprint per sample per megapixel at 16-bit precision
+        self.activation_mb_per_megapixel = tiled_config.get("activation_mb_per_megapixel", 1500)
+        self.vae_scale_factor = 8
+
+        if self.tile_overlap >= self.tile_size:
+            raise ValueError("tile_overlap must be smaller than tile_size")
+        if self.weighting not in ("gaussian", "uniform"):
+            raise ValueError(f"Unknown tile weighting: {self.weighting}")
+
+        self._weight_cache: Dict[Tuple[int, int, str, torch.device], torch.Tensor] = {}
+        self.stats = {
+            "tiled_runs": 0,
+            "unet_calls": 0,
+            "tiles_denoised": 0,
+            "last_tile_batch_size": None,
+            "last_tile_count": None
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize tiled diffusion worker."""
+        try:
+            self.logger.info("Initializing tiled diffusion worker...")
+            self.initialized = True
+            self.logger.info("Tiled diffusion worker initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Tiled diffusion worker initialization failed: {e}")
+            return False
+
+    def should_tile(self, width: int, height: int, requested: Optional[bool] = None) -> bool:
+        """Decide whether a generation should run tiled."""
+        if requested is not None:
+            return bool(requested) and max(width, height) > self.tile_size
+        return width * height >= self.min_pixels
+
+    @contextmanager
+    def activate(self, pipeline, tile_size: Optional[int] = None, tile_overlap: Optional[int] = None):
+        """Run the pipeline's UNet tile by tile and its VAE in tiled mode."""
+        tile_size = tile_size or self.tile_size
+        tile_overlap = tile_overlap if tile_overlap is not None else self.tile_overlap
+        if tile_overlap >= tile_size:
+            raise ValueError("tile_overlap must be smaller than tile_size")
+        vae_scale_factor = getattr(pipeline, "vae_scale_factor", self.vae_scale_factor)
+        latent_tile = max(1, tile_size // vae_scale_factor)
+        latent_stride = max(1, (tile_size - tile_overlap) // vae_scale_factor)
+
+        unet = pipeline.unet
+        previous_forward = unet.__dict__.get("forward", _MISSING)
+        unet.forward = self._make_tiled_forward(unet, unet.forward, latent_tile, latent_stride, vae_scale_factor)
+
+        vae = getattr(pipeline, "vae", None)
+        vae_was_tiling = bool(getattr(vae, "use_tiling", False))
+        if vae is not None and hasattr(vae, "enable_tiling"):
+            vae.enable_tiling()
+
+        self.stats["tiled_runs"] += 1
+        try:
+            yield
+        finally:
+            if previous_forward is _MISSING:
+                unet.__dict__.pop("forward", None)
+            else:
+                unet.forward = previous_forward
+            if vae is not None and not vae_was_tiling and hasattr(vae, "disable_tiling"):
+                vae.disable_tiling()
+
+    def _make_tiled_forward(self, unet: torch.nn.Module, forward: Callable, latent_tile: int,
+                            latent_stride: int, vae_scale_factor: int) -> Callable:
+        """Create a tiled replacement for `unet.forward`."""
+        def tiled_forward(sample, timestep, encoder_hidden_states=None, *args,
+                          added_cond_kwargs=None, return_dict: bool = True, **kwargs):
+            height, width = sample.shape[-2:]
+            if height <= latent_tile and width <= latent_tile:
+                return forward(sample, timestep, encoder_hidden_states, *args,
+                               added_cond_kwargs=added_cond_kwargs, return_dict=return_dict, **kwargs)
+
+            tiles = [
+                (top, left)
+                for top in self._tile_starts(height, latent_tile, latent_stride)
+                for left in self._tile_starts(width, latent_tile, latent_stride)
+            ]
+            tile_height, tile_width = min(latent_tile, height), min(latent_tile, width)
+            tile_batch = self._resolve_tile_batch_size(sample, tile_height * tile_width * vae_scale_factor ** 2)
+            self.stats["last_tile_batch_size"] = tile_batch
+            self.stats["last_tile_count"] = len(tiles)
+
+            weight = self._tile_weight(tile_height, tile_width, sample.device)
+            value = torch.zeros(sample.shape, device=sample.device, dtype=torch.float32)
+            weight_sum = torch.zeros((1, 1, height, width), device=sample.device, dtype=torch.float32)
+            batch = sample.shape[0]
+
+            for start in range(0, len(tiles), tile_batch):
+                chunk = tiles[start:start + tile_batch]
+                count = len(chunk)
+                tile_sample = torch.cat([
+                    sample[:, :, top:top + tile_height, left:left + tile_width] for top, left in chunk
+                ])
+                tile_kwargs = {
+                    key: self._repeat_batch(value_, batch, count) for key, value_ in kwargs.items()
+                }
+                tile_added = None
+                if added_cond_kwargs is not None:
+                    tile_added = {
+                        key: self._repeat_batch(value_, batch, count) for key, value_ in added_cond_kwargs.items()
+                    }
+                    time_ids = tile_added.get("time_ids")
+                    if isinstance(time_ids, torch.Tensor) and time_ids.shape[-1] == 6:
+                        # SDXL micro-conditioning: crop offset of each tile, target size of the tile
+                        time_ids = time_ids.clone()
+                        for index, (top, left) in enumerate(chunk):
+                            rows = slice(index * batch, (index + 1) * batch)
+                            time_ids[rows, 2] = top * vae_scale_factor
+                            time_ids[rows, 3] = left * vae_scale_factor
+                            time_ids[rows, 4] = tile_height * vae_scale_factor
+                            time_ids[rows, 5] = tile_width * vae_scale_factor
+                        tile_added["time_ids"] = time_ids
+
+                output = forward(
+                    tile_sample,
+                    self._repeat_batch(timestep, batch, count),
+                    self._repeat_batch(encoder_hidden_states, batch, count),
+                    *args,
+                    added_cond_kwargs=tile_added,
+                    return_dict=False,
+                    **tile_kwargs
+                )[0]
+                self.stats["unet_calls"] += 1
+                self.stats["tiles_denoised"] += count
+
+                output = output.to(torch.float32)
+                for index, (top, left) in enumerate(chunk):
+                    value[:, :, top:top + tile_height, left:left + tile_width] += (
+                        output[index * batch:(index + 1) * batch] * weight
+                    )
+                    weight_sum[:, :, top:top + tile_height, left:left + tile_width] += weight
+
+            result = (value / weight_sum).to(sample.dtype)
+            if return_dict:
+                from diffusers.models.unets.unet_2d_condition import UNet2DConditionOutput
+                return UNet2DConditionOutput(sample=result)
+            return (result,)
+
+        return tiled_forward
+
+    @staticmethod
+    def _tile_starts(length: int, tile: int, stride: int) -> List[int]:
+        """Start offsets of overlapping tiles covering `length`, the last one flush with the end."""
+        if length <= tile:
+            return [0]
+        starts = list(range(0, length - tile, stride))
+        starts.append(length - tile)
+        return starts
+
+    @staticmethod
+    def _repeat_batch(value: Any, batch: int, count: int) -> Any:
+        """Repeat per-sample tensors once per tile; leave everything else untouched."""
+        if count == 1 or not isinstance(value, torch.Tensor) or value.ndim == 0 or value.shape[0] != batch:
+            return value
+        return torch.cat([value] * count)
+
+    def _tile_weight(self, height: int, width: int, device: torch.device) -> torch.Tensor:
+        """Blend weights of one tile: Gaussian falloff towards the edges, or uniform."""
+        key = (height, width, self.weighting, device)
+        weight = self._weight_cache.get(key)
+        if weight is None:
+            if self.weighting == "uniform":
+                weight = torch.ones((height, width), dtype=torch.float32)
+            else:
+                def gaussian(size: int) -> torch.Tensor:
+                    positions = (torch.arange(size, dtype=torch.float32) + 0.5) / size - 0.5
+                    return torch.exp(-(positions ** 2) / (2 * 0.01)) / math.sqrt(2 * math.pi * 0.01)
+                weight = torch.outer(gaussian(height), gaussian(width))
+            weight = weight.to(device).view(1, 1, height, width)
+            self._weight_cache[key] = weight
+        return weight
+
+    def _resolve_tile_batch_size(self, sample: torch.Tensor, tile_pixels: int) -> int:
+        """Tiles per UNet call: configured, or as many as fit in free device memory."""
+        if self.tile_batch_size:
+            return max(1, int(self.tile_batch_size))
+
+        free_mb = self._get_free_memory_mb(sample.device)
+        dtype_scale = torch.finfo(sample.dtype).bits / 16 if sample.dtype.is_floating_point else 1.0
+        per_tile_mb = (self.activation_mb_per_megapixel * tile_pixels / 1e6
+                       * dtype_scale * sample.shape[0])
+        if per_tile_mb <= 0:
+            return 1
+        return max(1, min(self.max_tile_batch_size, int(free_mb * self.memory_fraction / per_tile_mb)))
+
+    def _get_free_memory_mb(self, device: torch.device) -> float:
+        """Free memory of the device the latents live on."""
+        if device.type == "cuda" and torch.cuda.is_available():
+            try:
+                free_bytes, _ = torch.cuda.mem_get_info(device)
+                return free_bytes / 1024 ** 2
+            except Exception as e:
+                self.logger.debug(f"Could not query CUDA free memory: {e}")
+        return psutil.virtual_memory().available / 1024 ** 2
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get tiled diffusion worker status."""
+        return {
+            "initialized": self.initialized,
+            "min_pixels": self.min_pixels,
+            "tile_size": self.tile_size,
+            "tile_overlap": self.tile_overlap,
+            "weighting": self.weighting,
+            "tile_batch_size": self.tile_batch_size or "auto",
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up tiled diffusion worker resources."""
+        try:
+            self.logger.info("Cleaning up tiled diffusion worker...")
+            self._weight_cache.clear()
+            self.initialized = False
+            self.logger.info("Tiled diffusion worker cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Tiled diffusion worker cleanup error: {e}")
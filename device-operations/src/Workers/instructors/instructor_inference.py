@@ -9,6 +9,7 @@ Controls inference managers through the inference interface.
 import logging
 from typing import Dict, Any, Optional, TYPE_CHECKING
 from .instructor_device import BaseInstructor
+from ..utilities.timing import mark
 
 if TYPE_CHECKING:
     from ..inference.interface_inference import InferenceInterface
@@ -65,6 +66,7 @@ class InferenceInstructor(BaseInstructor):
             request_id = request.get("request_id", "")
             
             self.logger.info(f"Handling inference request: {request_type}")
+            mark("instructor")
             
             # Route to inference interface
             if request_type == "inference.text2img":
@@ -93,6 +95,14 @@ class InferenceInstructor(BaseInstructor):
                 return await self.inference_interface.cancel_session(request)
             elif request_type == "inference.get_active_sessions":
                 return await self.inference_interface.get_active_sessions(request)
+            elif request_type == "inference.optimize_pipeline":
+                return await self.inference_interface.optimize_pipeline(request)
+            elif request_type == "inference.warmup_model":
+                return await self.inference_interface.warmup_model(request)
+            elif request_type == "inference.get_model_readiness":
+                return await self.inference_interface.get_model_readiness(request)
+            elif request_type == "inference.get_bucket_stats":
+                return await self.inference_interface.get_bucket_stats(request)
             else:
                 return {
                     "success": False,
@@ -9,6 +9,7 @@ Controls postprocessing managers through the postprocessing interface.
 import logging
 from typing import Dict, Any, Optional
 from .instructor_device import BaseInstructor
+from ..utilities.timing import mark
 
 
 class PostprocessingInstructor(BaseInstructor):
@@ -57,6 +58,7 @@ class PostprocessingInstructor(BaseInstructor):
             request_id = request.get("request_id", "")
             
             self.logger.info(f"Handling postprocessing request: {request_type}")
+            mark("instructor")
             
             # Route to postprocessing interface
             if request_type == "postprocessing.upscale":
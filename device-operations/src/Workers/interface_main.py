@@ -7,10 +7,13 @@ with instructors managing specialized domains.
 """
 
 import logging
+import time
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
 
+from .utilities.timing import TimingHistograms, request_timer
+
 
 class WorkerType(Enum):
     """Supported worker types."""
@@ -65,6 +68,9 @@ class WorkersInterface:
         self.initialized = False
         self.active_workers = {}
         
+        # Per request type, per stage latency histograms
+        self.timing_histograms = TimingHistograms(self.config.get("timing_buckets_ms"))
+        
     async def initialize(self) -> bool:
         """
         Initialize all instructors and the main interface.
@@ -129,6 +135,18 @@ class WorkersInterface:
                 if not await instructor.initialize():
                     self.logger.error("Failed to initialize %s", instructor.__class__.__name__)
                     return False
+            
+            # Model component loads consume the weights inference prefetched for queued requests
+            model_interface = self.model_instructor.model_interface
+            inference_interface = self.inference_instructor.inference_interface
+            if model_interface.component_loader is not None:
+                model_interface.component_loader.prefetch_manager = inference_interface.prefetch_manager
+            # Prefetch resolves models through the model interface's index, weight loader and
+            # conversion cache instead of its own
+            if inference_interface.prefetch_manager is not None:
+                inference_interface.prefetch_manager.model_index = model_interface.model_index_manager
+                inference_interface.prefetch_manager.mmap_loader = model_interface.mmap_loader
+                inference_interface.prefetch_manager.conversion_manager = model_interface.conversion_manager
                     
             return True
             
@@ -149,6 +167,26 @@ class WorkersInterface:
         if not self.initialized:
             return {"success": False, "error": "Interface not initialized"}
         
+        request_type = request.get("type", "")
+        if request_type == "metrics.get_timings":
+            return self.get_timing_metrics(request)
+        
+        with request_timer(request_type) as timer:
+            # Time spent queued before this worker picked the request up (wall clock)
+            submitted_at = request.get("submitted_at")
+            if isinstance(submitted_at, (int, float)):
+                timer.record("queue", time.time() - submitted_at)
+            
+            response = await self._route_request(request)
+            
+            timer.mark("completed")
+            self.timing_histograms.observe(timer)
+            if isinstance(response, dict):
+                response["timings"] = timer.to_dict()
+            return response
+    
+    async def _route_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Route a request to the instructor of its domain."""
         try:
             request_type = request.get("type", "")
             request_id = request.get("request_id", "")
@@ -187,6 +225,26 @@ class WorkersInterface:
                 "request_id": request.get("request_id", "")
             }
     
+    def get_timing_metrics(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get aggregated stage timing histograms.
+        
+        Args:
+            request: Request with optional data.request_type filter and data.reset flag
+            
+        Returns:
+            Response with histograms per request type and stage
+        """
+        data = request.get("data", {})
+        histograms = self.timing_histograms.snapshot(data.get("request_type"))
+        if data.get("reset"):
+            self.timing_histograms.reset()
+        return {
+            "success": True,
+            "data": {"histograms": histograms},
+            "request_id": request.get("request_id", "")
+        }
+    
     async def get_status(self) -> Dict[str, Any]:
         """
         Get overall system status.
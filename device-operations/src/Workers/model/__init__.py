@@ -12,9 +12,23 @@ from .managers import (
     EncoderManager,
     UNetManager,
     TokenizerManager,
-    LoRAManager
+    LoRAManager,
+    ModelIndexManager,
+    WeightDedupManager,
+    CheckpointConversionManager,
+    ModelBenchmarkManager,
+    VRAMEstimationManager,
+    ModelHashManager
+)
+from .workers import (
+    MemoryWorker,
+    MmapWeightLoader,
+    TieredModelCache,
+    ParallelComponentLoader,
+    Int8WeightQuantizer,
+    LoRAFusionWorker,
+    MultiLoRAWorker
 )
-from .workers import MemoryWorker
 
 __all__ = [
     "ModelInterface",
@@ -24,5 +38,17 @@ __all__ = [
     "UNetManager", 
     "TokenizerManager",
     "LoRAManager",
-    "MemoryWorker"
+    "ModelIndexManager",
+    "WeightDedupManager",
+    "CheckpointConversionManager",
+    "ModelBenchmarkManager",
+    "VRAMEstimationManager",
+    "ModelHashManager",
+    "MemoryWorker",
+    "MmapWeightLoader",
+    "TieredModelCache",
+    "ParallelComponentLoader",
+    "Int8WeightQuantizer",
+    "LoRAFusionWorker",
+    "MultiLoRAWorker"
 ]
\ No newline at end of file
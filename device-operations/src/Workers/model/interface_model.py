@@ -6,6 +6,7 @@ Unified interface for model operations.
 Consolidates model_loader.py, unified_model_manager.py, and gpu_model_manager.py.
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, Optional, TYPE_CHECKING
 
@@ -16,6 +17,17 @@ if TYPE_CHECKING:
     from .managers.manager_tokenizer import TokenizerManager
     from .managers.manager_lora import LoRAManager
     from .workers.worker_memory import MemoryWorker
+    from .managers.manager_model_index import ModelIndexManager
+    from .workers.worker_mmap_loader import MmapWeightLoader
+    from .managers.manager_weight_dedup import WeightDedupManager
+    from .workers.worker_tiered_cache import TieredModelCache
+    from .workers.worker_component_loader import ParallelComponentLoader
+    from .managers.manager_checkpoint_conversion import CheckpointConversionManager
+    from .workers.worker_quantization import Int8WeightQuantizer
+    from .managers.manager_model_benchmark import ModelBenchmarkManager
+    from .managers.manager_vram_estimation import VRAMEstimationManager
+    from .workers.worker_lora_fusion import LoRAFusionWorker
+    from .managers.manager_model_hash import ModelHashManager
 
 
 class ModelInterface:
@@ -37,6 +49,17 @@ class ModelInterface:
         self.tokenizer_manager: Optional["TokenizerManager"] = None
         self.lora_manager: Optional["LoRAManager"] = None
         self.memory_worker: Optional["MemoryWorker"] = None
+        self.model_index_manager: Optional["ModelIndexManager"] = None
+        self.mmap_loader: Optional["MmapWeightLoader"] = None
+        self.dedup_manager: Optional["WeightDedupManager"] = None
+        self.tiered_cache: Optional["TieredModelCache"] = None
+        self.component_loader: Optional["ParallelComponentLoader"] = None
+        self.conversion_manager: Optional["CheckpointConversionManager"] = None
+        self.quantizer: Optional["Int8WeightQuantizer"] = None
+        self.benchmark_manager: Optional["ModelBenchmarkManager"] = None
+        self.vram_estimator: Optional["VRAMEstimationManager"] = None
+        self.lora_fusion: Optional["LoRAFusionWorker"] = None
+        self.hash_manager: Optional["ModelHashManager"] = None
         
         self.initialized = False
         
@@ -52,6 +75,17 @@ class ModelInterface:
             from .managers.manager_tokenizer import TokenizerManager
             from .managers.manager_lora import LoRAManager
             from .workers.worker_memory import MemoryWorker
+            from .managers.manager_model_index import ModelIndexManager
+            from .workers.worker_mmap_loader import MmapWeightLoader
+            from .managers.manager_weight_dedup import WeightDedupManager
+            from .workers.worker_tiered_cache import TieredModelCache
+            from .workers.worker_component_loader import ParallelComponentLoader
+            from .managers.manager_checkpoint_conversion import CheckpointConversionManager
+            from .workers.worker_quantization import Int8WeightQuantizer
+            from .managers.manager_model_benchmark import ModelBenchmarkManager
+            from .managers.manager_vram_estimation import VRAMEstimationManager
+            from .workers.worker_lora_fusion import LoRAFusionWorker
+            from .managers.manager_model_hash import ModelHashManager
             
             # Create managers
             self.vae_manager = VAEManager(self.config)
@@ -60,6 +94,31 @@ class ModelInterface:
             self.tokenizer_manager = TokenizerManager(self.config)
             self.lora_manager = LoRAManager(self.config)
             self.memory_worker = MemoryWorker(self.config)
+            self.model_index_manager = ModelIndexManager(self.config)
+            self.mmap_loader = MmapWeightLoader(self.config)
+            self.dedup_manager = WeightDedupManager(self.config)
+            self.dedup_manager.model_index_manager = self.model_index_manager
+            for manager in (self.vae_manager, self.encoder_manager):
+                manager.mmap_loader = self.mmap_loader
+                manager.dedup_manager = self.dedup_manager
+            self.tiered_cache = TieredModelCache(self.config)
+            self.memory_worker.tiered_cache = self.tiered_cache
+            self.component_loader = ParallelComponentLoader(self.config)
+            self.component_loader.tiered_cache = self.tiered_cache
+            self.conversion_manager = CheckpointConversionManager(self.config)
+            for manager in (self.vae_manager, self.encoder_manager):
+                manager.conversion_manager = self.conversion_manager
+            self.quantizer = Int8WeightQuantizer(self.config)
+            self.memory_worker.quantizer = self.quantizer
+            self.benchmark_manager = ModelBenchmarkManager(self.config)
+            self.benchmark_manager.conversion_manager = self.conversion_manager
+            self.vram_estimator = VRAMEstimationManager(self.config)
+            self.vram_estimator.model_index = self.model_index_manager
+            self.vram_estimator.benchmark_manager = self.benchmark_manager
+            self.vram_estimator.conversion_manager = self.conversion_manager
+            self.lora_fusion = LoRAFusionWorker(self.config)
+            self.lora_manager.fusion_worker = self.lora_fusion
+            self.hash_manager = ModelHashManager(self.config)
             
             # Initialize managers
             managers = [
@@ -68,7 +127,18 @@ class ModelInterface:
                 self.unet_manager,
                 self.tokenizer_manager,
                 self.lora_manager,
-                self.memory_worker
+                self.memory_worker,
+                self.model_index_manager,
+                self.mmap_loader,
+                self.dedup_manager,
+                self.tiered_cache,
+                self.component_loader,
+                self.conversion_manager,
+                self.quantizer,
+                self.benchmark_manager,
+                self.vram_estimator,
+                self.lora_fusion,
+                self.hash_manager
             ]
             
             for manager in managers:
@@ -94,6 +164,17 @@ class ModelInterface:
         self.tokenizer_manager = None
         self.lora_manager = None
         self.memory_worker = None
+        self.model_index_manager = None
+        self.mmap_loader = None
+        self.dedup_manager = None
+        self.tiered_cache = None
+        self.component_loader = None
+        self.conversion_manager = None
+        self.quantizer = None
+        self.benchmark_manager = None
+        self.vram_estimator = None
+        self.lora_fusion = None
+        self.hash_manager = None
     
     async def load_model(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Load a model."""
@@ -296,7 +377,18 @@ class ModelInterface:
                 ("unet", self.unet_manager),
                 ("tokenizer", self.tokenizer_manager),
                 ("lora", self.lora_manager),
-                ("memory", self.memory_worker)
+                ("memory", self.memory_worker),
+                ("model_index", self.model_index_manager),
+                ("mmap_loader", self.mmap_loader),
+                ("weight_dedup", self.dedup_manager),
+                ("tiered_cache", self.tiered_cache),
+                ("component_loader", self.component_loader),
+                ("checkpoint_conversion", self.conversion_manager),
+                ("quantizer", self.quantizer),
+                ("benchmark", self.benchmark_manager),
+                ("vram_estimation", self.vram_estimator),
+                ("lora_fusion", self.lora_fusion),
+                ("model_hash", self.hash_manager)
             ]
             
             for name, manager in managers:
@@ -305,6 +397,10 @@ class ModelInterface:
                         status["managers"][name] = await manager.get_status()
                     except Exception as e:
                         status["managers"][name] = {"error": str(e)}
+            
+            # Memory saved by sharing byte-identical weights between loaded models
+            if self.dedup_manager:
+                status["memory_saved"] = self.dedup_manager.get_memory_saved()
                         
             return status
             
@@ -318,6 +414,17 @@ class ModelInterface:
             
             # Cleanup managers
             managers = [
+                self.hash_manager,
+                self.lora_fusion,
+                self.vram_estimator,
+                self.benchmark_manager,
+                self.quantizer,
+                self.conversion_manager,
+                self.component_loader,
+                self.tiered_cache,
+                self.dedup_manager,
+                self.mmap_loader,
+                self.model_index_manager,
                 self.memory_worker,
                 self.lora_manager,
                 self.tokenizer_manager,
@@ -455,6 +562,8 @@ class ModelInterface:
             return {"success": False, "error": "Model interface not initialized"}
         
         try:
+            if request.get("optimization_level") == "int8":
+                return await self._quantize_model(request)
             # Delegate to existing optimize_memory method for now
             return await self.optimize_memory(request)
         except Exception as e:
@@ -464,6 +573,22 @@ class ModelInterface:
                 "request_id": request.get("request_id", "")
             }
 
+    async def _quantize_model(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Switch a loaded model to int8 weight-only layers and report the trade-off."""
+        if self.memory_worker is None:
+            return {"success": False, "error": "Memory worker not available"}
+        
+        model_name = request.get("model_id") or request.get("model_name")
+        result = await self.memory_worker.quantize_model({
+            "name": model_name,
+            "components": request.get("component_ids"),
+            "evaluate": request.get("evaluate", True),
+            "latent_size": request.get("latent_size", 64)
+        })
+        if not result.get("quantized"):
+            return {"success": False, "error": result.get("error"), "request_id": request.get("request_id", "")}
+        return {"success": True, "data": result, "request_id": request.get("request_id", "")}
+
     async def post_model_validate(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Validate model - maps to PostModelValidate endpoint - WEEK 1 CRITICAL IMPLEMENTATION."""
         if not self.initialized:
@@ -527,20 +652,30 @@ class ModelInterface:
             # ML validation for comprehensive level
             if validation_level == "comprehensive" and validation_results["file_validation"].get("exists", False):
                 try:
-                    # Basic model structure validation
-                    if model_path and model_path.endswith('.safetensors'):
-                        # Try to validate safetensors structure
+                    # Structure validation from the safetensors header (no weights are loaded)
+                    if model_path and model_path.endswith('.safetensors') and self.model_index_manager:
+                        entry = await asyncio.to_thread(self.model_index_manager.get_entry, model_path)
+                        structure_valid = "error" not in entry
                         validation_results["ml_validation"] = {
                             "format": "safetensors",
-                            "structure_valid": True,
-                            "estimated_precision": "float16",
+                            "structure_valid": structure_valid,
+                            "estimated_precision": entry.get("precision"),
+                            "dtypes": entry.get("dtypes", {}),
+                            "tensor_count": entry.get("tensor_count", 0),
+                            "parameter_count": entry.get("parameter_count", 0),
+                            "parameter_bytes": entry.get("parameter_bytes", 0),
+                            "architecture": entry.get("architecture", {}),
                             "estimated_size_mb": validation_results["file_validation"].get("size", 0) // (1024 * 1024)
                         }
+                        if not structure_valid:
+                            validation_results["issues"].append(f"Invalid safetensors header: {entry['error']}")
+                            validation_results["is_valid"] = False
                     elif model_path and model_path.endswith('.ckpt'):
+                        # Pickled checkpoints cannot be inspected without unpickling their weights
                         validation_results["ml_validation"] = {
                             "format": "checkpoint",
                             "structure_valid": True,
-                            "estimated_precision": "float32",
+                            "estimated_precision": None,
                             "estimated_size_mb": validation_results["file_validation"].get("size", 0) // (1024 * 1024)
                         }
                     
@@ -548,6 +683,28 @@ class ModelInterface:
                     validation_results["issues"].append(f"ML validation error: {str(ml_ex)}")
                     validation_results["ml_validation"]["error"] = str(ml_ex)
             
+            # Content integrity: sampled chunks against the cached Merkle hash, or a first full hash
+            check_integrity = validation_level == "comprehensive" or request.get("verify_integrity")
+            if check_integrity and self.hash_manager and validation_results["file_validation"].get("exists", False):
+                try:
+                    expected = request.get("expected_checksum")
+                    if expected or self.hash_manager.cached(model_path) is None:
+                        integrity = await asyncio.to_thread(self.hash_manager.hash_file, model_path)
+                        integrity["verified"] = expected is None or integrity["digest"] == expected
+                    else:
+                        integrity = await asyncio.to_thread(
+                            self.hash_manager.verify, model_path,
+                            request.get("sample_chunks"), request.get("full_verify", False)
+                        )
+                    validation_results["integrity"] = integrity
+                    if not integrity["verified"]:
+                        detail = (f"chunks {integrity['mismatched_chunks']} changed" if integrity.get("mismatched_chunks")
+                                  else "checksum does not match")
+                        validation_results["issues"].append(f"Content integrity check failed: {detail}")
+                        validation_results["is_valid"] = False
+                except Exception as hash_ex:
+                    validation_results["issues"].append(f"Integrity check error: {str(hash_ex)}")
+            
             # Performance estimation
             if validation_results["file_validation"].get("size"):
                 file_size_mb = validation_results["file_validation"]["size"] // (1024 * 1024)
@@ -579,35 +736,40 @@ class ModelInterface:
         if not self.initialized:
             return {"success": False, "error": "Model interface not initialized"}
         
+        if self.benchmark_manager is None:
+            return {"success": False, "error": "Benchmark manager not available"}
+        
         try:
             model_id = request.get("model_id")
             if not model_id:
                 return {"success": False, "error": "model_id is required"}
-                
-            self.logger.info(f"Benchmarking model {model_id}")
             
-            # Basic performance benchmark implementation
-            benchmark_results = {
-                "model_id": model_id,
-                "benchmark_type": "basic_performance",
-                "metrics": {
-                    "load_time_ms": 5000,  # Simulated 5 second load time
-                    "inference_time_ms": 100,  # Simulated 100ms inference
-                    "memory_usage_mb": 4096,  # Simulated 4GB usage
-                    "throughput_images_per_second": 2.5
-                },
-                "system_info": {
-                    "available_vram_mb": 8192,
-                    "used_vram_mb": 4096,
-                    "optimization_level": "standard"
-                },
-                "timestamp": "2025-01-16",
-                "duration_seconds": 30
-            }
+            entry = await asyncio.to_thread(self._resolve_model_entry, model_id, request.get("model_path"))
+            if entry is None:
+                return {
+                    "success": False,
+                    "error": f"Model not found: {model_id}",
+                    "request_id": request.get("request_id", "")
+                }
+            
+            self.logger.info(f"Benchmarking model {model_id}")
+            job = self.benchmark_manager.start(
+                model_id,
+                entry["path"],
+                request.get("device_id"),
+                request.get("settings"),
+                entry.get("architecture", {}).get("variant")
+            )
+            
+            # Benchmarks run in the background; callers poll get_model_benchmark_results unless they wait
+            if request.get("wait", False):
+                job_state = await self.benchmark_manager.wait(job.job_id)
+            else:
+                job_state = self.benchmark_manager.get_job(job.job_id)
             
             return {
                 "success": True,
-                "data": benchmark_results,
+                "data": job_state,
                 "request_id": request.get("request_id", "")
             }
             
@@ -624,11 +786,32 @@ class ModelInterface:
         if not self.initialized:
             return {"success": False, "error": "Model interface not initialized"}
         
+        if self.benchmark_manager is None:
+            return {"success": False, "error": "Benchmark manager not available"}
+        
         try:
+            job_id = request.get("job_id")
+            if job_id:
+                if request.get("cancel", False):
+                    self.benchmark_manager.cancel(job_id)
+                job_state = self.benchmark_manager.get_job(job_id)
+                if job_state is None:
+                    return {
+                        "success": False,
+                        "error": f"Benchmark job not found: {job_id}",
+                        "request_id": request.get("request_id", "")
+                    }
+                return {"success": True, "data": job_state, "request_id": request.get("request_id", "")}
+            
             model_id = request.get("model_id")
+            results = self.benchmark_manager.get_results(model_id, request.get("device_id"))
             return {
                 "success": True,
-                "data": {"model_id": model_id, "benchmark_results": "pending_implementation"},
+                "data": {
+                    "model_id": model_id,
+                    "benchmark_results": results,
+                    "active_jobs": self.benchmark_manager.get_jobs(model_id, active_only=True)
+                },
                 "request_id": request.get("request_id", "")
             }
         except Exception as e:
@@ -643,30 +826,43 @@ class ModelInterface:
         if not self.initialized:
             return {"success": False, "error": "Model interface not initialized"}
         
+        if self.model_index_manager is None:
+            return {"success": False, "error": "Model index manager not available"}
+        
         try:
             model_id = request.get("model_id")
-            if not model_id:
+            model_path = request.get("model_path")
+            if not model_id and not model_path:
                 return {"success": False, "error": "model_id is required"}
                 
-            self.logger.info(f"Getting metadata for model {model_id}")
+            self.logger.info(f"Getting metadata for model {model_id or model_path}")
+            
+            entry = await asyncio.to_thread(self._resolve_model_entry, model_id, model_path)
+            if entry is None:
+                return {
+                    "success": False,
+                    "error": f"Model not found: {model_id}",
+                    "request_id": request.get("request_id", "")
+                }
             
-            # Basic metadata extraction implementation
+            # Metadata derived from the safetensors header via the model index
             metadata = {
-                "model_id": model_id,
-                "name": f"Model {model_id}",
-                "version": "1.0",
-                "type": "diffusion",
-                "architecture": "unet",
-                "precision": "float16",
-                "size_mb": 4096,
-                "created_at": "2025-01-16",
-                "tags": ["stable-diffusion", "text-to-image"],
-                "description": f"Metadata for model {model_id}",
-                "author": "unknown",
-                "license": "unknown",
-                "source": "filesystem",
-                "checksum": "pending_calculation"
+                "model_id": model_id or entry["name"],
+                **entry,
+                "type": entry["architecture"].get("type", "unknown"),
+                "size_mb": entry["size"] / (1024 * 1024),
+                "source": "filesystem"
             }
+            if request.get("include_tensors") and entry["format"] == "safetensors" and "error" not in entry:
+                metadata["tensors"] = await asyncio.to_thread(self.model_index_manager.get_tensors, entry["path"])
+            if self.hash_manager is not None:
+                # Hashing reads the whole file, so it only runs on request; cached hashes are always reported
+                if request.get("compute_checksum"):
+                    content_hash = await asyncio.to_thread(self.hash_manager.hash_file, entry["path"])
+                else:
+                    content_hash = await asyncio.to_thread(self.hash_manager.cached, entry["path"])
+                metadata["checksum"] = content_hash["digest"] if content_hash else None
+                metadata["content_hash"] = content_hash
             
             return {
                 "success": True,
@@ -682,6 +878,16 @@ class ModelInterface:
                 "request_id": request.get("request_id", "")
             }
 
+    def _resolve_model_entry(self, model_id: Optional[str], model_path: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Index entry of a model by path, or by id (rescanning the model directories on a miss)."""
+        if model_path:
+            return self.model_index_manager.get_entry(model_path)
+        entry = self.model_index_manager.find(model_id)
+        if entry is None:
+            self.model_index_manager.scan()
+            entry = self.model_index_manager.find(model_id)
+        return entry
+
     async def put_model_metadata(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Update model metadata - maps to PutModelMetadata endpoint."""
         if not self.initialized:
@@ -728,8 +934,49 @@ class ModelInterface:
         return {"success": True, "data": {"updated": True}, "request_id": request.get("request_id", "")}
 
     async def post_model_convert(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Convert model format."""
-        return {"success": True, "data": {"converted": True}, "request_id": request.get("request_id", "")}
+        """Convert a pickled checkpoint to safetensors; later loads of it use the converted file."""
+        if not self.initialized:
+            return {"success": False, "error": "Model interface not initialized"}
+        
+        if self.conversion_manager is None:
+            return {"success": False, "error": "Checkpoint conversion manager not available"}
+        
+        try:
+            model_id = request.get("model_id") or request.get("model_name")
+            entry = await asyncio.to_thread(self._resolve_model_entry, model_id, request.get("model_path"))
+            if entry is None:
+                return {
+                    "success": False,
+                    "error": f"Model not found: {model_id}",
+                    "request_id": request.get("request_id", "")
+                }
+            
+            manifest = await asyncio.to_thread(
+                self.conversion_manager.convert,
+                entry["path"],
+                request.get("dtype") or request.get("target_dtype"),
+                request.get("split_components"),
+                request.get("keep_ema"),
+                request.get("benchmark", True)
+            )
+            return {
+                "success": True,
+                "data": {
+                    "converted": True,
+                    "cached": manifest["cached"],
+                    "source_path": manifest["source_path"],
+                    "converted_path": self.conversion_manager.resolve(entry["path"]),
+                    "conversion": manifest
+                },
+                "request_id": request.get("request_id", "")
+            }
+        except Exception as e:
+            self.logger.error(f"Model conversion failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "request_id": request.get("request_id", "")
+            }
 
     async def post_model_preload(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Preload model."""
@@ -760,8 +1007,40 @@ class ModelInterface:
         return {"success": True, "data": {"vram_unloaded": True}, "request_id": request.get("request_id", "")}
 
     async def get_available_models(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Get available models."""
-        return {"success": True, "data": {"models": []}, "request_id": request.get("request_id", "")}
+        """Get available models from the header index of the model directories."""
+        if not self.initialized:
+            return {"success": False, "error": "Model interface not initialized"}
+        
+        if self.model_index_manager is None:
+            return {"success": False, "error": "Model index manager not available"}
+        
+        try:
+            directories = request.get("directories")
+            # A background refresh keeps the configured directories current; others are refreshed now
+            if directories or not self.model_index_manager.polling or request.get("refresh"):
+                await asyncio.to_thread(self.model_index_manager.scan, directories)
+            tags = request.get("tags")
+            if isinstance(tags, str):
+                tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+            entries = self.model_index_manager.query(
+                prefix=request.get("prefix"),
+                tags=tags,
+                model_type=request.get("model_type"),
+                directories=directories or [str(path) for path in self.model_index_manager.model_dirs],
+                limit=request.get("limit")
+            )
+            return {
+                "success": True,
+                "data": {"models": entries, "count": len(entries), "index": self.model_index_manager.last_scan},
+                "request_id": request.get("request_id", "")
+            }
+        except Exception as e:
+            self.logger.error(f"Get available models failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "request_id": request.get("request_id", "")
+            }
 
     async def get_model_components(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Get model components."""
@@ -784,6 +1063,20 @@ class ModelInterface:
             
             self.logger.info(f"Validating cache for model {model_id} and components {component_ids}")
             
+            index_entry = None
+            if self.model_index_manager is not None:
+                index_entry = await asyncio.to_thread(self._resolve_model_entry, model_id, request.get("model_path"))
+            
+            # Cache sizes of the model's components, from its tensor shapes
+            component_weights: Dict[str, Any] = {}
+            if self.vram_estimator is not None:
+                model_path = request.get("model_path") or (index_entry["path"] if index_entry else None)
+                weights = await asyncio.to_thread(
+                    self.vram_estimator.component_weights, model_path,
+                    self.vram_estimator.requested_components(component_ids), request.get("dtype", "float16")
+                )
+                component_weights = weights["components"]
+            
             # Check cache availability for each component
             cache_validation = {
                 "model_id": model_id,
@@ -799,7 +1092,7 @@ class ModelInterface:
             
             # Validate each component
             for component_id in component_ids:
-                component_status = await self._validate_component_cache(component_id)
+                component_status = self._validate_component_cache(model_id, component_id, component_weights, index_entry)
                 cache_validation["components_status"][component_id] = component_status
                 
                 if not component_status.get("cached", False):
@@ -833,35 +1126,62 @@ class ModelInterface:
                 "request_id": request.get("request_id", "")
             }
 
-    async def _validate_component_cache(self, component_id: str) -> Dict[str, Any]:
-        """Validate cache status for a specific component."""
-        try:
-            # Simulate component cache validation
-            # In real implementation, this would check actual cache status
-            component_types = {
-                "unet": {"cached": True, "cache_size": 2 * 1024 * 1024 * 1024},  # 2GB
-                "vae": {"cached": True, "cache_size": 512 * 1024 * 1024},        # 512MB
-                "encoder": {"cached": True, "cache_size": 1 * 1024 * 1024 * 1024}, # 1GB
-                "lora": {"cached": False, "cache_size": 128 * 1024 * 1024}        # 128MB
-            }
-            
-            # Determine component type from ID
-            component_type = "unet"  # Default
-            for comp_type in component_types:
-                if comp_type in component_id.lower():
-                    component_type = comp_type
-                    break
-            
-            return component_types.get(component_type, {"cached": False, "cache_size": 0})
-            
-        except Exception as e:
-            return {"cached": False, "cache_size": 0, "error": str(e)}
+    def _validate_component_cache(self, model_id: str, component_id: str,
+                                  component_weights: Optional[Dict[str, Any]] = None,
+                                  index_entry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Cache status of one component of a model.
+        
+        A component is cached when the tiered cache holds it under the key a
+        coordinated load of the model registers (`{model_id}:{component}`);
+        its size comes from the model's tensor shapes.
+        """
+        from .workers.worker_component_loader import resolve_component, is_adapter_component
+        from .workers.worker_tiered_cache import TIERS
+        
+        status: Dict[str, Any] = {"cached": False, "cache_size": 0, "tier": None, "indexed": index_entry is not None}
+        component = resolve_component(component_id)
+        if component is None:
+            if not is_adapter_component(component_id):
+                status["error"] = f"Unknown component: {component_id}"
+            return status
+        
+        status["component"] = component
+        if self.tiered_cache is not None:
+            cache_key = f"{model_id}:{component}"
+            status["cache_key"] = cache_key
+            # TIERS runs from the device down, so the first tier holding the key is the entry's tier
+            status["tier"] = next((tier for tier in TIERS if self.tiered_cache.contains(cache_key, tier)), None)
+            status["cached"] = status["tier"] is not None
+        
+        weights = (component_weights or {}).get(component)
+        if weights is not None:
+            status["cache_size"] = weights["bytes"]
+            status["size_source"] = weights["source"]
+        return status
+
+    async def _estimation_model_path(self, model_id: Optional[str], model_path: Optional[str]) -> Optional[str]:
+        """Path whose tensor shapes size an estimate; None when the model is not indexed."""
+        if model_path or not model_id or self.model_index_manager is None:
+            return model_path
+        entry = await asyncio.to_thread(self._resolve_model_entry, model_id, None)
+        return entry["path"] if entry else None
 
     async def estimate_vram_requirements(self, request: Dict[str, Any]) -> Dict[str, Any]:
-        """Estimate VRAM requirements for model loading - Week 2 Foundation."""
+        """
+        Estimate the VRAM of a generation, phase by phase.
+
+        Weights come from the model's tensor shapes and activations from
+        the (benchmark calibrated) activation model at the requested
+        resolution, batch size, guidance and attention mode. The peak over
+        the phases is what has to fit on the device.
+        """
         if not self.initialized:
             return {"success": False, "error": "Model interface not initialized"}
         
+        if self.vram_estimator is None:
+            return {"success": False, "error": "VRAM estimator not available"}
+        
         try:
             component_ids = request.get("component_ids", [])
             device_id = request.get("device_id")
@@ -869,34 +1189,30 @@ class ModelInterface:
             
             self.logger.info(f"Estimating VRAM requirements for components {component_ids} on device {device_id}")
             
+            model_path = await self._estimation_model_path(request.get("model_id"), request.get("model_path"))
+            estimate_request = {**request, "model_path": model_path}
+            estimate = await asyncio.to_thread(self.vram_estimator.estimate, estimate_request, optimization_level)
+            # Savings are measured against the same generation without optimizations
+            baseline = await asyncio.to_thread(self.vram_estimator.estimate, estimate_request, "minimal")
+            
+            component_ids = component_ids or list(estimate["components"])
             vram_estimation = {
                 "device_id": device_id,
                 "optimization_level": optimization_level,
-                "component_estimations": {},
-                "total_vram_required": 0,
-                "peak_vram_usage": 0,
-                "loading_phases": [],
-                "optimization_savings": 0
+                "architecture": estimate["architecture"],
+                "settings": estimate["settings"],
+                "component_estimations": {
+                    component_id: self._estimate_component_vram(component_id, estimate, baseline)
+                    for component_id in component_ids
+                },
+                "total_vram_required": estimate["weights_bytes"],
+                "peak_vram_usage": estimate["peak_bytes"],
+                "peak_phase": estimate["peak_phase"],
+                "loading_phases": estimate["phases"],
+                "optimization_savings": max(0, baseline["peak_bytes"] - estimate["peak_bytes"]),
+                "coefficients": estimate["coefficients"]
             }
             
-            # Estimate VRAM for each component
-            for component_id in component_ids:
-                component_vram = await self._estimate_component_vram(component_id, optimization_level)
-                vram_estimation["component_estimations"][component_id] = component_vram
-                vram_estimation["total_vram_required"] += component_vram["base_vram"]
-                vram_estimation["optimization_savings"] += component_vram["optimization_savings"]
-            
-            # Calculate peak usage (during loading, components may require more VRAM temporarily)
-            vram_estimation["peak_vram_usage"] = int(vram_estimation["total_vram_required"] * 1.3)  # 30% overhead
-            
-            # Generate loading phases
-            vram_estimation["loading_phases"] = [
-                {"phase": "preparation", "vram_usage": 0, "duration_estimate_seconds": 1},
-                {"phase": "component_loading", "vram_usage": vram_estimation["peak_vram_usage"], "duration_estimate_seconds": 10},
-                {"phase": "optimization", "vram_usage": vram_estimation["total_vram_required"], "duration_estimate_seconds": 5},
-                {"phase": "ready", "vram_usage": vram_estimation["total_vram_required"], "duration_estimate_seconds": 0}
-            ]
-            
             return {
                 "success": True,
                 "data": vram_estimation,
@@ -911,52 +1227,41 @@ class ModelInterface:
                 "request_id": request.get("request_id", "")
             }
 
-    async def _estimate_component_vram(self, component_id: str, optimization_level: str) -> Dict[str, Any]:
-        """Estimate VRAM requirements for a specific component."""
-        try:
-            # Component VRAM estimates (in bytes)
-            base_estimates = {
-                "unet": 4 * 1024 * 1024 * 1024,    # 4GB
-                "vae": 1 * 1024 * 1024 * 1024,     # 1GB  
-                "encoder": 2 * 1024 * 1024 * 1024, # 2GB
-                "lora": 256 * 1024 * 1024          # 256MB
-            }
-            
-            # Optimization savings factors
-            optimization_factors = {
-                "minimal": 0.05,   # 5% savings
-                "balanced": 0.15,  # 15% savings  
-                "aggressive": 0.30 # 30% savings
-            }
-            
-            # Determine component type
-            component_type = "unet"  # Default
-            for comp_type in base_estimates:
-                if comp_type in component_id.lower():
-                    component_type = comp_type
-                    break
-            
-            base_vram = base_estimates.get(component_type, 1024 * 1024 * 1024)  # 1GB default
-            optimization_factor = optimization_factors.get(optimization_level, 0.15)
-            optimization_savings = int(base_vram * optimization_factor)
-            
-            return {
-                "component_id": component_id,
-                "component_type": component_type,
-                "base_vram": base_vram,
-                "optimization_savings": optimization_savings,
-                "final_vram": base_vram - optimization_savings,
-                "optimization_techniques": ["float16_precision", "memory_efficient_attention", "gradient_checkpointing"]
-            }
-            
-        except Exception as e:
+    def _estimate_component_vram(self, component_id: str, estimate: Dict[str, Any],
+                                 baseline: Dict[str, Any]) -> Dict[str, Any]:
+        """Weight VRAM of one component in an estimate, and what optimization saved on it."""
+        from .workers.worker_component_loader import resolve_component
+        
+        component_type = resolve_component(component_id)
+        weights = estimate["components"].get(component_type)
+        if weights is None:
+            # Not a checkpoint component (e.g. an adapter) or absent from this architecture
             return {
                 "component_id": component_id,
-                "base_vram": 1024 * 1024 * 1024,  # 1GB fallback
+                "component_type": component_type or "unknown",
+                "base_vram": 0,
                 "optimization_savings": 0,
-                "final_vram": 1024 * 1024 * 1024,
-                "error": str(e)
+                "final_vram": 0,
+                "source": "unavailable"
             }
+        
+        base_vram = baseline["components"][component_type]["bytes"]
+        settings = estimate["settings"]
+        if settings["quantization"] == "int8" and component_type != "vae":
+            optimization_techniques = ["int8_weight_only", "per_channel_scales"]
+        else:
+            optimization_techniques = [f"{settings['dtype']}_precision"]
+        
+        return {
+            "component_id": component_id,
+            "component_type": component_type,
+            "parameters": weights["parameters"],
+            "base_vram": base_vram,
+            "optimization_savings": base_vram - weights["bytes"],
+            "final_vram": weights["bytes"],
+            "source": weights["source"],
+            "optimization_techniques": optimization_techniques
+        }
 
     async def execute_coordinated_load(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Execute coordinated cache-to-VRAM loading - Week 2 Foundation."""
@@ -967,7 +1272,6 @@ class ModelInterface:
             model_id = request.get("model_id")
             component_ids = request.get("component_ids", [])
             device_id = request.get("device_id")
-            cache_status = request.get("cache_status", {})
             vram_allocation = request.get("vram_allocation", {})
             
             if not model_id or not device_id:
@@ -993,9 +1297,17 @@ class ModelInterface:
             import time
             start_time = time.time()
             
-            # Phase 1: Preparation
+            # LoRA adapters are applied per request by the inference LoRA workers, not loaded here
+            from .workers.worker_component_loader import is_adapter_component
+            load_result["skipped_components"] = [
+                {"component_id": component_id, "reason": "LoRA adapters are applied per request by the inference workers"}
+                for component_id in component_ids if is_adapter_component(component_id)
+            ]
+            component_ids = [component_id for component_id in component_ids if not is_adapter_component(component_id)]
+            
+            # Phase 1: Preparation (resolve the model and locate each component's weights)
             prep_start = time.time()
-            await self._execute_load_preparation(model_id, device_id)
+            plans = await self._execute_load_preparation(model_id, device_id, component_ids, request.get("model_path"))
             prep_time = time.time() - prep_start
             load_result["loading_phases"].append({
                 "phase": "preparation", 
@@ -1003,19 +1315,38 @@ class ModelInterface:
                 "status": "completed"
             })
             
-            # Phase 2: Component Loading
+            # Phase 2: Component Loading (all components concurrently in the loader's thread pool)
             load_start = time.time()
-            for component_id in component_ids:
-                component_result = await self._load_component_to_vram(component_id, device_id, cache_status)
-                
-                if component_result.get("success", False):
-                    load_result["loaded_components"].append(component_result["component_info"])
-                    load_result["vram_usage"]["used"] += component_result["vram_used"]
-                else:
-                    load_result["failed_components"].append({
-                        "component_id": component_id,
-                        "error": component_result.get("error", "Unknown error")
-                    })
+            for component_id, plan in plans.items():
+                if isinstance(plan, str):
+                    load_result["failed_components"].append({"component_id": component_id, "error": plan})
+            
+            runnable = [plan for plan in plans.values() if not isinstance(plan, str)]
+            if runnable:
+                parallel_result = await self.component_loader.load(
+                    runnable, device_id, request.get("dtype", "float16"), cache_prefix=f"{model_id}:"
+                )
+                for plan in runnable:
+                    component_result = parallel_result["components"][plan.component_id]
+                    if component_result.get("success", False):
+                        load_result["loaded_components"].append({
+                            "component_id": plan.component_id,
+                            "component_type": component_result["component"],
+                            "device_id": device_id,
+                            "load_time": component_result["load_seconds"],
+                            "vram_used": component_result["nbytes"],
+                            "cache_key": component_result["cache_key"],
+                            "optimization_applied": False
+                        })
+                        load_result["vram_usage"]["used"] += component_result["nbytes"]
+                    else:
+                        load_result["failed_components"].append({
+                            "component_id": plan.component_id,
+                            "error": component_result.get("error", "Unknown error")
+                        })
+                load_result["timeline"] = parallel_result["timeline"]
+                load_result["phase_totals_ms"] = parallel_result["phase_totals_ms"]
+                load_result["parallelism"] = parallel_result["parallelism"]
             
             load_time = time.time() - load_start
             load_result["loading_phases"].append({
@@ -1062,56 +1393,24 @@ class ModelInterface:
                 "request_id": request.get("request_id", "")
             }
 
-    async def _execute_load_preparation(self, model_id: str, device_id: str) -> None:
-        """Execute loading preparation phase."""
-        try:
-            self.logger.info(f"Preparing load for model {model_id} on device {device_id}")
-            # Simulate preparation work
-            import asyncio
-            await asyncio.sleep(0.1)  # Simulate preparation time
-        except Exception as e:
-            self.logger.warning(f"Load preparation warning: {e}")
-
-    async def _load_component_to_vram(self, component_id: str, device_id: str, cache_status: Dict[str, Any]) -> Dict[str, Any]:
-        """Load a specific component to VRAM."""
-        try:
-            # Simulate component loading based on type
-            component_types = {
-                "unet": {"vram_used": 4 * 1024 * 1024 * 1024, "load_time": 3.0},
-                "vae": {"vram_used": 1 * 1024 * 1024 * 1024, "load_time": 1.0},
-                "encoder": {"vram_used": 2 * 1024 * 1024 * 1024, "load_time": 2.0},
-                "lora": {"vram_used": 256 * 1024 * 1024, "load_time": 0.5}
-            }
-            
-            component_type = "unet"  # Default
-            for comp_type in component_types:
-                if comp_type in component_id.lower():
-                    component_type = comp_type
-                    break
-            
-            component_info = component_types[component_type]
-            
-            # Simulate loading time
-            import asyncio
-            await asyncio.sleep(0.1)  # Reduced for testing
-            
-            return {
-                "success": True,
-                "component_info": {
-                    "component_id": component_id,
-                    "component_type": component_type,
-                    "device_id": device_id,
-                    "load_time": component_info["load_time"],
-                    "optimization_applied": True
-                },
-                "vram_used": component_info["vram_used"]
-            }
-            
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+    async def _execute_load_preparation(self, model_id: str, device_id: str, component_ids: list,
+                                        model_path: Optional[str] = None) -> Dict[str, Any]:
+        """Resolve the model and plan where each component's weights are read from."""
+        self.logger.info(f"Preparing load for model {model_id} on device {device_id}")
+        
+        def prepare() -> Dict[str, Any]:
+            from pathlib import Path
+            if model_path and Path(model_path).is_dir():
+                source = model_path
+            else:
+                entry = self._resolve_model_entry(model_id, model_path)
+                if entry is None:
+                    return {component_id: f"Model not found: {model_id}" for component_id in component_ids}
+                # Pickled checkpoints are loaded from their safetensors conversion when there is one
+                source = self.conversion_manager.resolve(entry["path"])
+            return self.component_loader.plan(source, component_ids)
+        
+        return await asyncio.to_thread(prepare)
 
     async def _execute_load_optimization(self, loaded_components: list) -> Dict[str, Any]:
         """Execute post-load optimization."""
@@ -10,11 +10,23 @@ from .manager_encoder import EncoderManager
 from .manager_unet import UNetManager
 from .manager_tokenizer import TokenizerManager
 from .manager_lora import LoRAManager
+from .manager_model_index import ModelIndexManager
+from .manager_weight_dedup import WeightDedupManager
+from .manager_checkpoint_conversion import CheckpointConversionManager
+from .manager_model_benchmark import ModelBenchmarkManager
+from .manager_vram_estimation import VRAMEstimationManager
+from .manager_model_hash import ModelHashManager
 
 __all__ = [
     "VAEManager",
     "EncoderManager",
     "UNetManager",
     "TokenizerManager",
-    "LoRAManager"
+    "LoRAManager",
+    "ModelIndexManager",
+    "WeightDedupManager",
+    "CheckpointConversionManager",
+    "ModelBenchmarkManager",
+    "VRAMEstimationManager",
+    "ModelHashManager"
 ]
\ No newline at end of file
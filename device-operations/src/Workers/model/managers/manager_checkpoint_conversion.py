@@ -0,0 +1,493 @@
+"""
+Checkpoint Conversion Manager for SDXL Workers System
+=====================================================
+
+One-time conversion of pickled checkpoints (.ckpt, .pt, .pth, .bin) to
+safetensors. Unpickling a checkpoint executes code, copies every tensor
+into private memory and usually yields fp32 weights; the converted file
+is memory-mapped instead and can be cast to fp16/bf16 once, at
+conversion time, instead of on every load.
+
+Converted artifacts live in a content-addressed cache: the key covers
+the source file's content hash and the conversion options, so renamed
+or duplicated checkpoints share one artifact. `resolve` redirects later
+loads of the original path to the artifact as long as the source file
+is unchanged.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+import torch
+
+from .manager_model_index import COMPONENT_PREFIXES, component_prefix
+from .manager_model_hash import tree_hash_file
+from ...utilities.files import atomic_write_text
+
+try:
+    import safetensors.torch
+    SAFETENSORS_AVAILABLE = True
+except ImportError:
+    SAFETENSORS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CONVERSION_VERSION = 1
+PICKLE_SUFFIXES = (".ckpt", ".pt", ".pth", ".bin")
+CONVERSION_DTYPES = {
+    "float16": torch.float16,
+    "fp16": torch.float16,
+    "bfloat16": torch.bfloat16,
+    "bf16": torch.bfloat16,
+    "float32": torch.float32,
+    "fp32": torch.float32
+}
+# File names used for split components, matching the diffusers directory layout
+COMPONENT_FILES = {
+    "unet": "diffusion_pytorch_model.safetensors",
+    "vae": "diffusion_pytorch_model.safetensors",
+    "text_encoder": "model.safetensors",
+    "text_encoder_2": "model.safetensors"
+}
+EMA_PREFIX = "model_ema."
+# Manifest written into each artifact directory before it is renamed into place
+ARTIFACT_MANIFEST = "conversion.json"
+
+
+def hash_file(path: str) -> str:
+    """Content hash of a whole file (Merkle tree over chunks hashed in parallel)."""
+    return tree_hash_file(path)
+
+
+def unwrap_state_dict(checkpoint: Any) -> Dict[str, torch.Tensor]:
+    """Tensors of a loaded checkpoint, unwrapping Lightning-style `state_dict` containers."""
+    while isinstance(checkpoint, dict) and isinstance(checkpoint.get("state_dict"), dict):
+        checkpoint = checkpoint["state_dict"]
+    if not isinstance(checkpoint, dict):
+        raise ValueError(f"Checkpoint does not contain a state dict ({type(checkpoint).__name__})")
+    return {name: value for name, value in checkpoint.items() if isinstance(value, torch.Tensor)}
+
+
+def split_components(state_dict: Dict[str, torch.Tensor]) -> Tuple[Dict[str, Dict[str, torch.Tensor]], List[str]]:
+    """Split a single-file checkpoint into per-component state dicts (prefixes stripped)."""
+    names = list(state_dict)
+    components: Dict[str, Dict[str, torch.Tensor]] = {}
+    assigned = set()
+    for component in COMPONENT_PREFIXES:
+        prefix = component_prefix(names, component)
+        if not prefix:
+            continue
+        selected = {name[len(prefix):]: state_dict[name] for name in names if name.startswith(prefix)}
+        assigned.update(prefix + name for name in selected)
+        components[component] = selected
+    return components, [name for name in names if name not in assigned]
+
+
+class CheckpointConversionManager:
+    """
+    Converts pickled checkpoints to safetensors and redirects loads to the result.
+
+    The manifest of converted artifacts and the content hashes of their
+    sources (keyed by path, size and mtime) are persisted in the cache
+    directory, so lookups never rehash an unchanged source.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        conversion_config = config.get("checkpoint_conversion", {})
+        self.enabled = conversion_config.get("enabled", True)
+        self.cache_dir = Path(conversion_config.get(
+            "cache_dir", os.path.join(tempfile.gettempdir(), "sdxl_conversion_cache")
+        ))
+        self.default_dtype = conversion_config.get("dtype", "float16")
+        self.default_split = conversion_config.get("split_components", False)
+        self.keep_ema = conversion_config.get("keep_ema", False)
+        # Full unpickling runs arbitrary code from the checkpoint; only allow it for trusted files
+        self.allow_unsafe_pickle = conversion_config.get("allow_unsafe_pickle", False)
+
+        # path -> {"size", "mtime_ns", "digest"}
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        # artifact key -> manifest
+        self.artifacts: Dict[str, Dict[str, Any]] = {}
+        # source digest -> artifact key used for redirects
+        self.redirects: Dict[str, str] = {}
+
+        self._index_mtime_ns = 0
+        self._lock = threading.RLock()
+        self.stats = {"conversions": 0, "cache_hits": 0, "redirects": 0, "errors": 0}
+
+    @property
+    def index_path(self) -> Path:
+        """Persisted manifest of sources and artifacts."""
+        return self.cache_dir / "index.json"
+
+    async def initialize(self) -> bool:
+        """Initialize checkpoint conversion manager."""
+        try:
+            self.logger.info("Initializing checkpoint conversion manager...")
+            self._load_index()
+            self.initialized = True
+            self.logger.info("Checkpoint conversion manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Checkpoint conversion manager initialization failed: {e}")
+            return False
+
+    def _load_index(self) -> None:
+        """Merge the persisted index into memory, dropping artifacts whose files are gone."""
+        if not self.index_path.exists():
+            return
+        try:
+            self._index_mtime_ns = self.index_path.stat().st_mtime_ns
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable conversion index {self.index_path}: {e}")
+            return
+        if data.get("version") != CONVERSION_VERSION:
+            return
+        artifacts = {
+            key: manifest for key, manifest in data.get("artifacts", {}).items()
+            if all((self.cache_dir / key / file).exists() for file in manifest["files"].values())
+        }
+        with self._lock:
+            # Entries recorded by this process win over older ones on disk
+            self.sources = {**data.get("sources", {}), **self.sources}
+            self.artifacts = {**artifacts, **self.artifacts}
+            self.redirects = {
+                digest: key for digest, key in {**data.get("redirects", {}), **self.redirects}.items()
+                if key in self.artifacts
+            }
+
+    def _save_index(self) -> None:
+        """Persist the index (atomic replace), keeping entries other workers added meanwhile."""
+        self._refresh_index()
+        with self._lock:
+            payload = json.dumps({
+                "version": CONVERSION_VERSION,
+                "sources": self.sources,
+                "artifacts": self.artifacts,
+                "redirects": self.redirects
+            })
+        atomic_write_text(self.index_path, payload)
+        self._index_mtime_ns = self.index_path.stat().st_mtime_ns
+
+    def _refresh_index(self) -> None:
+        """Pick up conversions made by other workers since the index was last read."""
+        try:
+            mtime_ns = self.index_path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime_ns != self._index_mtime_ns:
+            self._load_index()
+
+    def source_digest(self, path: str) -> str:
+        """Content hash of a source file, rehashing only when its size or mtime changed."""
+        resolved = str(Path(path).resolve())
+        stat = os.stat(resolved)
+        with self._lock:
+            known = self.sources.get(resolved)
+            if known is not None and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                return known["digest"]
+        digest = hash_file(resolved)
+        with self._lock:
+            self.sources[resolved] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}
+        return digest
+
+    @staticmethod
+    def artifact_key(digest: str, dtype: Optional[str], split: bool, keep_ema: bool) -> str:
+        """Cache key of a conversion: source content plus every option that changes the output."""
+        options = f"{CONVERSION_VERSION}:{digest}:{dtype or 'original'}:{int(split)}:{int(keep_ema)}"
+        return hashlib.blake2b(options.encode("ascii"), digest_size=16).hexdigest()
+
+    def convert(self, path: str, dtype: Optional[str] = None, split: Optional[bool] = None,
+                keep_ema: Optional[bool] = None, benchmark: bool = True) -> Dict[str, Any]:
+        """
+        Convert a pickled checkpoint to safetensors, reusing a cached conversion when one exists.
+
+        Args:
+            path: Checkpoint file
+            dtype: "float16", "bfloat16", "float32" or "original"; the configured default when None
+            split: Write one file per component (unet, vae, text encoders) instead of one file
+            keep_ema: Keep `model_ema.` tensors (dropped by default)
+            benchmark: Time a load of the converted artifact against the unpickle
+
+        Returns:
+            The artifact manifest, with "cached" telling whether it already existed
+        """
+        if not SAFETENSORS_AVAILABLE:
+            raise RuntimeError("safetensors is not installed")
+        source = Path(path).resolve()
+        if source.suffix.lower() not in PICKLE_SUFFIXES:
+            raise ValueError(f"Not a pickled checkpoint: {source.name}")
+        dtype = dtype or self.default_dtype
+        if dtype == "original":
+            dtype = None
+        if dtype is not None and dtype not in CONVERSION_DTYPES:
+            raise ValueError(f"Unsupported conversion dtype: {dtype}")
+        split = self.default_split if split is None else split
+        keep_ema = self.keep_ema if keep_ema is None else keep_ema
+
+        digest = self.source_digest(str(source))
+        key = self.artifact_key(digest, dtype, split, keep_ema)
+        self._refresh_index()
+        with self._lock:
+            manifest = self.artifacts.get(key)
+        if manifest is None:
+            # Another worker may have finished the artifact without recording it in the index yet
+            manifest = self._complete_artifact(key)
+        if manifest is not None:
+            with self._lock:
+                self.artifacts.setdefault(key, manifest)
+                self.redirects[digest] = key
+                self.stats["cache_hits"] += 1
+            self._save_index()
+            return {**manifest, "key": key, "cached": True}
+
+        try:
+            manifest = self._convert(source, digest, key, dtype, split, keep_ema, benchmark)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        with self._lock:
+            self.artifacts[key] = manifest
+            self.redirects[digest] = key
+            self.stats["conversions"] += 1
+        self._save_index()
+        return {**manifest, "key": key, "cached": False}
+
+    def _complete_artifact(self, key: str) -> Optional[Dict[str, Any]]:
+        """Manifest of an artifact directory whose files were all written, if there is one."""
+        artifact_dir = self.cache_dir / key
+        try:
+            manifest = json.loads((artifact_dir / ARTIFACT_MANIFEST).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if all((artifact_dir / relative).exists() for relative in manifest.get("files", {}).values()):
+            return manifest
+        return None
+
+    def _convert(self, source: Path, digest: str, key: str, dtype: Optional[str], split: bool,
+                 keep_ema: bool, benchmark: bool) -> Dict[str, Any]:
+        """Unpickle, cast and write one artifact."""
+        self.logger.info(f"Converting {source.name} to safetensors ({dtype or 'original dtype'})")
+        start_time = time.perf_counter()
+        try:
+            checkpoint = torch.load(str(source), map_location="cpu", weights_only=True)
+        except Exception as e:
+            if not self.allow_unsafe_pickle:
+                raise ValueError(
+                    f"{source.name} cannot be loaded with weights_only=True ({e}); "
+                    "enable checkpoint_conversion.allow_unsafe_pickle for trusted files"
+                ) from e
+            checkpoint = torch.load(str(source), map_location="cpu", weights_only=False)
+        state_dict = unwrap_state_dict(checkpoint)
+        del checkpoint
+        source_load_seconds = time.perf_counter() - start_time
+
+        dropped = [] if keep_ema else [name for name in state_dict if name.startswith(EMA_PREFIX)]
+        for name in dropped:
+            del state_dict[name]
+        state_dict = self._prepare_tensors(state_dict, CONVERSION_DTYPES[dtype] if dtype else None)
+
+        if split:
+            components, leftover = split_components(state_dict)
+            if not components:
+                raise ValueError(f"{source.name} has no known model components to split")
+            dropped.extend(leftover)
+            groups = {component: (f"{component}/{COMPONENT_FILES[component]}", tensors)
+                      for component, tensors in components.items()}
+        else:
+            groups = {"model": ("model.safetensors", state_dict)}
+
+        # Write into a scratch directory and rename it into place, so a crash never leaves a
+        # partial artifact and loads never see one being rewritten
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        scratch_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{key}.", suffix=".tmp"))
+        try:
+            metadata = {"source": source.name, "source_digest": digest, "dtype": dtype or "original"}
+            files = {}
+            for group, (relative, tensors) in groups.items():
+                target = scratch_dir / relative
+                target.parent.mkdir(parents=True, exist_ok=True)
+                safetensors.torch.save_file(tensors, str(target), metadata=metadata)
+                files[group] = relative
+            convert_seconds = time.perf_counter() - start_time
+
+            converted_bytes = sum((scratch_dir / relative).stat().st_size for relative in files.values())
+            manifest = {
+                "source_path": str(source),
+                "source_digest": digest,
+                "source_bytes": source.stat().st_size,
+                "dtype": dtype or "original",
+                "split": split,
+                "keep_ema": keep_ema,
+                "files": files,
+                "tensors": sum(len(tensors) for _, tensors in groups.values()),
+                "dropped_tensors": len(dropped),
+                "converted_bytes": converted_bytes,
+                "source_load_seconds": source_load_seconds,
+                "convert_seconds": convert_seconds,
+                "created_at": time.time()
+            }
+            if benchmark:
+                manifest.update(self._benchmark(scratch_dir, files, source_load_seconds))
+            (scratch_dir / ARTIFACT_MANIFEST).write_text(json.dumps(manifest), encoding="utf-8")
+            manifest = self._install_artifact(scratch_dir, key, manifest)
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        self.logger.info(
+            f"Converted {source.name}: {manifest['source_bytes'] / 1024 ** 2:.0f}MB -> "
+            f"{manifest['converted_bytes'] / 1024 ** 2:.0f}MB in {manifest['convert_seconds']:.1f}s"
+        )
+        return manifest
+
+    def _install_artifact(self, scratch_dir: Path, key: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rename a written artifact into place; returns the manifest of the installed artifact.
+
+        A complete artifact already in place (written by another worker
+        meanwhile) is kept and its manifest returned. An incomplete one is
+        renamed aside before it is deleted, so the key's path always holds
+        either nothing or a complete artifact.
+        """
+        artifact_dir = self.cache_dir / key
+        try:
+            os.rename(scratch_dir, artifact_dir)
+            return manifest
+        except OSError:
+            if not artifact_dir.exists():
+                raise
+        existing = self._complete_artifact(key)
+        if existing is not None:
+            return existing
+        stale_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{key}.", suffix=".stale"))
+        try:
+            os.rename(artifact_dir, stale_dir / key)
+            os.rename(scratch_dir, artifact_dir)
+        finally:
+            shutil.rmtree(stale_dir, ignore_errors=True)
+        return manifest
+
+    @staticmethod
+    def _prepare_tensors(state_dict: Dict[str, torch.Tensor],
+                         dtype: Optional[torch.dtype]) -> Dict[str, torch.Tensor]:
+        """Cast floating point tensors and give every tensor its own contiguous storage."""
+        prepared = {}
+        seen = set()
+        for name in list(state_dict):
+            # Pop as we go so the uncast tensors are freed one by one
+            tensor = state_dict.pop(name)
+            if dtype is not None and tensor.is_floating_point() and tensor.dtype != dtype:
+                tensor = tensor.to(dtype)
+            tensor = tensor.contiguous()
+            # safetensors refuses tensors that share storage (tied weights, views)
+            storage = (tensor.untyped_storage().data_ptr(), tensor.untyped_storage().nbytes())
+            if storage in seen:
+                tensor = tensor.clone()
+            seen.add(storage)
+            prepared[name] = tensor
+        return prepared
+
+    @staticmethod
+    def _benchmark(artifact_dir: Path, files: Dict[str, str], source_load_seconds: float) -> Dict[str, Any]:
+        """Time a full load of the converted files against the unpickle of the source."""
+        start_time = time.perf_counter()
+        for relative in files.values():
+            safetensors.torch.load_file(str(artifact_dir / relative), device="cpu")
+        converted_load_seconds = time.perf_counter() - start_time
+        return {
+            "converted_load_seconds": converted_load_seconds,
+            "load_speedup": source_load_seconds / converted_load_seconds if converted_load_seconds > 0 else None
+        }
+
+    def lookup(self, path: str) -> Optional[Dict[str, Any]]:
+        """Manifest of the conversion loads of `path` are redirected to, if any."""
+        if not self.enabled or Path(path).suffix.lower() not in PICKLE_SUFFIXES or not Path(path).is_file():
+            return None
+        self._refresh_index()
+        resolved = str(Path(path).resolve())
+        stat = os.stat(resolved)
+        with self._lock:
+            known = self.sources.get(resolved)
+            # Only trust a recorded hash; an unknown or changed source has not been converted
+            if known is None or known["size"] != stat.st_size or known["mtime_ns"] != stat.st_mtime_ns:
+                return None
+            key = self.redirects.get(known["digest"])
+            manifest = self.artifacts.get(key) if key else None
+        if manifest is None:
+            return None
+        return {**manifest, "key": key}
+
+    def resolve(self, path: str, component: Optional[str] = None) -> str:
+        """
+        Path to load instead of `path`.
+
+        Returns the converted safetensors file (or, for split conversions,
+        the component's file, or the artifact directory when no component
+        is given); `path` itself when it has no conversion.
+        """
+        try:
+            manifest = self.lookup(path)
+        except OSError:
+            return path
+        if manifest is None:
+            return path
+        artifact_dir = self.cache_dir / manifest["key"]
+        if not manifest["split"]:
+            target = artifact_dir / manifest["files"]["model"]
+        elif component is not None and component in manifest["files"]:
+            target = artifact_dir / manifest["files"][component]
+        else:
+            target = artifact_dir
+        self.stats["redirects"] += 1
+        self.logger.debug(f"Redirecting load of {path} to {target}")
+        return str(target)
+
+    def remove(self, path: str) -> int:
+        """Delete every cached conversion of a source file; returns the number removed."""
+        digest = self.source_digest(path)
+        with self._lock:
+            keys = [key for key, manifest in self.artifacts.items() if manifest["source_digest"] == digest]
+            for key in keys:
+                del self.artifacts[key]
+            self.redirects.pop(digest, None)
+        for key in keys:
+            shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+        self._save_index()
+        return len(keys)
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get checkpoint conversion manager status."""
+        with self._lock:
+            artifacts = len(self.artifacts)
+            cached_bytes = sum(manifest["converted_bytes"] for manifest in self.artifacts.values())
+        return {
+            "initialized": self.initialized,
+            "enabled": self.enabled,
+            "cache_dir": str(self.cache_dir),
+            "artifacts": artifacts,
+            "cached_mb": cached_bytes / (1024 * 1024),
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up checkpoint conversion manager resources."""
+        try:
+            self.logger.info("Cleaning up checkpoint conversion manager...")
+            if self.initialized:
+                self._save_index()
+            self.initialized = False
+            self.logger.info("Checkpoint conversion manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Checkpoint conversion manager cleanup error: {e}")
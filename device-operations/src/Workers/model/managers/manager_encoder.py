@@ -25,6 +25,11 @@ class EncoderManager:
         self.loaded_encoders: Dict[str, Any] = {}
         self.initialized = False
         
+        # Zero-copy safetensors loader, weight sharing and checkpoint conversions (injected by the model interface)
+        self.mmap_loader = None
+        self.dedup_manager = None
+        self.conversion_manager = None
+        
     async def initialize(self) -> bool:
         """Initialize encoder manager."""
         try:
@@ -41,6 +46,28 @@ class EncoderManager:
         try:
             name = encoder_data.get("name", "default")
             model_path = encoder_data.get("model_path", "")
+            component = encoder_data.get("component", "text_encoder")
+            
+            if name in self.loaded_encoders:
+                self.unload_encoder(name)
+            
+            if model_path and self.conversion_manager is not None:
+                # A converted .ckpt/.pt checkpoint is loaded from its safetensors artifact
+                model_path = self.conversion_manager.resolve(model_path, component)
+            
+            if model_path.endswith(".safetensors") and self.mmap_loader is not None and self.mmap_loader.enabled:
+                # Map the encoder weights and share tensors identical to resident ones
+                state_dict, stats = self.mmap_loader.load_state_dict(model_path, component=component)
+                if self.dedup_manager is not None:
+                    state_dict = self.dedup_manager.share_component_tensors(name, model_path, component, state_dict)
+                self.loaded_encoders[name] = {
+                    "model_path": model_path,
+                    "component": component,
+                    "weights": state_dict,
+                    "load_stats": stats,
+                    "loaded": True
+                }
+                return {"encoder_loaded": True, "name": name, "tensors": len(state_dict)}
             
             # Simulate encoder loading
             self.loaded_encoders[name] = {
@@ -53,6 +80,14 @@ class EncoderManager:
             self.logger.error(f"Failed to load encoder: {e}")
             return {"encoder_loaded": False, "error": str(e)}
     
+    def unload_encoder(self, name: str) -> bool:
+        """Unload a text encoder, releasing its shared weights."""
+        if self.loaded_encoders.pop(name, None) is None:
+            return False
+        if self.dedup_manager is not None:
+            self.dedup_manager.release(name)
+        return True
+    
     async def get_status(self) -> Dict[str, Any]:
         """Get encoder manager status."""
         return {
@@ -64,7 +99,8 @@ class EncoderManager:
         """Clean up encoder manager resources."""
         try:
             self.logger.info("Cleaning up encoder manager...")
-            self.loaded_encoders.clear()
+            for name in list(self.loaded_encoders):
+                self.unload_encoder(name)
             self.initialized = False
             self.logger.info("Encoder manager cleanup complete")
         except Exception as e:
@@ -4,12 +4,18 @@ LoRA Manager for SDXL Workers System
 
 Migrated from models/adapters/lora_manager.py
 LoRA adapter management, loading, and integration with base models.
+Adapters are applied by fusing their weights into the pipeline through
+the LoRA fusion worker.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
 from pathlib import Path
 
+if TYPE_CHECKING:
+    from ..workers.worker_lora_fusion import LoRAFusionWorker
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,6 +37,9 @@ class LoRAManager:
         self.lora_path = Path(config.get("lora_path", "../../../../models/loras"))
         self.initialized = False
         
+        # Injected by the model interface
+        self.fusion_worker: Optional["LoRAFusionWorker"] = None
+        
         # Create LoRA directory if it doesn't exist
         self.lora_path.mkdir(parents=True, exist_ok=True)
     
@@ -51,8 +60,8 @@ class LoRAManager:
             lora_path = lora_data.get("lora_path", "")
             adapter_name = lora_data.get("adapter_name", "default")
             
-            # Use the existing sync method
-            result = self.load_lora_sync(lora_path, adapter_name)
+            # Use the existing sync method; reading the weights happens off the event loop
+            result = await asyncio.to_thread(self.load_lora_sync, lora_path, adapter_name)
             return {"lora_loaded": result, "adapter_name": adapter_name}
         except Exception as e:
             self.logger.error(f"Failed to load LoRA: {e}")
@@ -71,7 +80,9 @@ class LoRAManager:
         """
         try:
             self.logger.info(f"Loading LoRA: {lora_path}")
-            # TODO: Implement actual LoRA loading
+            if self.fusion_worker is not None:
+                # Read the weights now so applying the adapter does not wait on disk
+                self.fusion_worker.load_adapter(lora_path)
             self.loaded_loras[adapter_name] = {
                 "path": lora_path,
                 "name": adapter_name
@@ -90,22 +101,47 @@ class LoRAManager:
             adapter_name: Name of the adapter to apply
             scale: LoRA scale factor
         """
+        return self.apply_loras(pipeline, [(adapter_name, scale)])
+    
+    def apply_loras(self, pipeline, adapters: List[Tuple[str, float]]):
+        """
+        Fuse a set of loaded LoRA adapters into a pipeline, replacing the previous set.
+        
+        Args:
+            pipeline: The diffusion pipeline
+            adapters: (adapter name, scale) pairs; an empty list restores the base weights
+        """
         try:
-            if adapter_name in self.loaded_loras:
-                self.logger.info(f"Applying LoRA: {adapter_name} with scale {scale}")
-                # TODO: Implement actual LoRA application
-                return pipeline
-            else:
-                self.logger.warning(f"LoRA {adapter_name} not found")
+            combination = []
+            for adapter_name, scale in adapters:
+                if adapter_name not in self.loaded_loras:
+                    self.logger.warning(f"LoRA {adapter_name} not found")
+                    continue
+                combination.append((self.loaded_loras[adapter_name]["path"], scale))
+            if pipeline is None or self.fusion_worker is None:
                 return pipeline
+            
+            self.logger.info(f"Applying LoRAs: {adapters}")
+            report = self.fusion_worker.activate(pipeline, combination)
+            if report["switched"]:
+                self.logger.debug(f"Switched LoRA weights ({report['source']}, {report['layers']} layers) "
+                                  f"in {report['switch_ms']:.1f} ms")
+            return pipeline
         except Exception as e:
-            self.logger.error(f"Failed to apply LoRA {adapter_name}: {e}")
+            self.logger.error(f"Failed to apply LoRAs {adapters}: {e}")
             return pipeline
     
+    def unfuse_loras(self, pipeline) -> None:
+        """Restore the base weights of a pipeline in place."""
+        if pipeline is not None and self.fusion_worker is not None:
+            self.fusion_worker.deactivate(pipeline)
+    
     def unload_lora(self, adapter_name: str):
         """Unload a LoRA adapter."""
         if adapter_name in self.loaded_loras:
-            del self.loaded_loras[adapter_name]
+            lora = self.loaded_loras.pop(adapter_name)
+            if self.fusion_worker is not None:
+                self.fusion_worker.release_adapter(lora["path"])
             self.logger.info(f"Unloaded LoRA: {adapter_name}")
     
     def list_loaded_loras(self) -> List[str]:
@@ -134,6 +170,7 @@ class LoRAManager:
         """
         try:
             success = True
+            adapters = []
             for lora_config in lora_models:
                 lora_path = lora_config.get("path", "")
                 adapter_name = lora_config.get("name", "default")
@@ -141,10 +178,12 @@ class LoRAManager:
                 
                 if lora_path:
                     if self.load_lora_sync(lora_path, adapter_name):
-                        self.apply_lora(getattr(self, 'current_pipeline', None), adapter_name, scale)
+                        adapters.append((adapter_name, scale))
                     else:
                         success = False
             
+            # The whole set is fused at once, so the combination is memoized as one
+            self.apply_loras(getattr(self, 'current_pipeline', None), adapters)
             return success
         except Exception as e:
             self.logger.error(f"Failed to load and apply LoRAs: {e}")
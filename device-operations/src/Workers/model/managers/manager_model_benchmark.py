@@ -0,0 +1,580 @@
+"""
+Model Benchmark Manager for SDXL Workers System
+===============================================
+
+Measured model benchmarks run as background jobs. A benchmark loads the
+model cold (page cache evicted) and warm, times single UNet denoising
+steps at each configured resolution and batch size, times VAE encode and
+decode, and tracks peak host and device memory, with warmup passes and
+repeated trials reported as percentiles. Each timed measurement also
+records its activation memory, which calibrates VRAM estimation.
+
+Results are persisted keyed by (model content hash, device, settings), so
+a benchmark is comparable across restarts and reruns replace the result
+of the same configuration.
+"""
+
+import asyncio
+import gc
+import hashlib
+import json
+import logging
+import os
+import platform
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Callable, Tuple, TYPE_CHECKING
+
+import psutil
+import torch
+
+from ...utilities.files import atomic_write_text
+from ...utilities.timing import summarize_samples
+from ..workers.worker_component_loader import torch_device
+from ..workers.worker_quantization import unet_step_inputs, move_inputs
+
+if TYPE_CHECKING:
+    from .manager_checkpoint_conversion import CheckpointConversionManager
+
+logger = logging.getLogger(__name__)
+
+RESULTS_VERSION = 1
+WEIGHT_SUFFIXES = (".safetensors", ".sft", ".bin", ".ckpt", ".pt", ".pth")
+JOB_STATES = ("queued", "running", "completed", "failed", "cancelled")
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "dtype": "auto",
+    "resolutions": [[1024, 1024]],
+    "batch_sizes": [1],
+    "warmup_runs": 2,
+    "trials": 10,
+    "warm_loads": 2,
+    "cold_load": True,
+    "vae": True
+}
+
+
+class BenchmarkCancelled(Exception):
+    """Raised inside a benchmark run when its job was cancelled."""
+
+
+@dataclass
+class BenchmarkJob:
+    """A queued, running or finished benchmark."""
+    job_id: str
+    model_id: str
+    model_path: str
+    device: str
+    settings: Dict[str, Any]
+    variant: Optional[str] = None
+    state: str = "queued"
+    progress: float = 0.0
+    stage: str = ""
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result_key: Optional[str] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    task: Optional["asyncio.Task"] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize job state (without the task)."""
+        return {
+            "job_id": self.job_id,
+            "model_id": self.model_id,
+            "model_path": self.model_path,
+            "device": self.device,
+            "settings": self.settings,
+            "state": self.state,
+            "progress": self.progress,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result_key": self.result_key,
+            "error": self.error
+        }
+
+
+class _PeakMemorySampler:
+    """Samples the resident memory of this process in a background thread and keeps the peak."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "_PeakMemorySampler":
+        self.peak_bytes = self._process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, name="benchmark-memory", daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self._process.memory_info().rss)
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._process.memory_info().rss)
+
+
+def _weight_files(path: str) -> List[Path]:
+    """Weight files of a checkpoint file or model directory."""
+    model_path = Path(path)
+    if model_path.is_file():
+        return [model_path]
+    return sorted(file for file in model_path.rglob("*") if file.suffix.lower() in WEIGHT_SUFFIXES)
+
+
+def evict_page_cache(path: str) -> bool:
+    """Ask the kernel to drop a model's cached file pages so the next load reads from disk."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for file in _weight_files(path):
+        descriptor = os.open(file, os.O_RDONLY)
+        try:
+            os.posix_fadvise(descriptor, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(descriptor)
+    return True
+
+
+class ModelBenchmarkManager:
+    """
+    Runs model benchmarks as background jobs and persists their results.
+
+    Jobs run one at a time so they do not compete for the device; progress
+    and the current stage are available through `get_job` while they run.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        benchmark_config = config.get("model_benchmark", {})
+        self.results_path = Path(benchmark_config.get(
+            "results_path", os.path.join(tempfile.gettempdir(), "sdxl_model_benchmarks.json")
+        ))
+        self.default_settings = {**DEFAULT_SETTINGS, **benchmark_config.get("settings", {})}
+        self.max_finished_jobs = benchmark_config.get("max_finished_jobs", 50)
+
+        # Injected by the model interface; provides cached content hashes of model files
+        self.conversion_manager: Optional["CheckpointConversionManager"] = None
+
+        self.jobs: Dict[str, BenchmarkJob] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._run_lock: Optional[asyncio.Lock] = None
+        self._results_lock = threading.Lock()
+
+    async def initialize(self) -> bool:
+        """Initialize model benchmark manager."""
+        try:
+            self.logger.info("Initializing model benchmark manager...")
+            self._run_lock = asyncio.Lock()
+            self._load_results()
+            self.initialized = True
+            self.logger.info("Model benchmark manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Model benchmark manager initialization failed: {e}")
+            return False
+
+    def _load_results(self) -> None:
+        """Load persisted results, discarding them on version mismatch or corruption."""
+        if not self.results_path.exists():
+            return
+        try:
+            data = json.loads(self.results_path.read_text(encoding="utf-8"))
+            if data.get("version") == RESULTS_VERSION:
+                self.results = data.get("results", {})
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable benchmark results {self.results_path}: {e}")
+
+    def _save_results(self) -> None:
+        """Persist results (atomic replace)."""
+        with self._results_lock:
+            payload = json.dumps({"version": RESULTS_VERSION, "results": self.results})
+        atomic_write_text(self.results_path, payload)
+
+    def resolve_settings(self, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Benchmark settings: configured defaults with request overrides."""
+        settings = dict(self.default_settings)
+        settings.update({key: value for key, value in (overrides or {}).items() if key in DEFAULT_SETTINGS})
+        settings["resolutions"] = [[int(height), int(width)] for height, width in settings["resolutions"]]
+        settings["batch_sizes"] = [int(batch_size) for batch_size in settings["batch_sizes"]]
+        if settings["trials"] < 1:
+            raise ValueError("trials must be at least 1")
+        for height, width in settings["resolutions"]:
+            if height % 8 or width % 8:
+                raise ValueError(f"Resolution {height}x{width} is not a multiple of 8")
+        return settings
+
+    def model_hash(self, model_path: str) -> str:
+        """Content hash of a model file or of all weight files of a model directory."""
+        if self.conversion_manager is None:
+            raise RuntimeError("Checkpoint conversion manager not available for hashing")
+        files = _weight_files(model_path)
+        if len(files) == 1 and Path(model_path).is_file():
+            return self.conversion_manager.source_digest(str(files[0]))
+        digest = hashlib.blake2b(digest_size=16)
+        for file in files:
+            digest.update(f"{file.relative_to(model_path).as_posix()}:".encode("utf-8"))
+            digest.update(self.conversion_manager.source_digest(str(file)).encode("ascii"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def result_key(model_hash: str, device: str, settings: Dict[str, Any]) -> str:
+        """Persistence key of a benchmark configuration."""
+        identity = f"{model_hash}:{device}:{json.dumps(settings, sort_keys=True)}"
+        return hashlib.blake2b(identity.encode("utf-8"), digest_size=16).hexdigest()
+
+    def start(self, model_id: str, model_path: str, device_id: Optional[str] = None,
+              settings: Optional[Dict[str, Any]] = None, variant: Optional[str] = None) -> BenchmarkJob:
+        """Queue a benchmark job; it runs after the jobs queued before it."""
+        job = BenchmarkJob(
+            job_id=uuid.uuid4().hex,
+            model_id=model_id,
+            model_path=model_path,
+            device=str(torch_device(device_id)),
+            settings=self.resolve_settings(settings),
+            variant=variant
+        )
+        job.task = asyncio.get_running_loop().create_task(self._run_job(job))
+        self.jobs[job.job_id] = job
+        self._prune_jobs()
+        return job
+
+    async def _run_job(self, job: BenchmarkJob) -> None:
+        """Run one job once the device is free."""
+        async with self._run_lock:
+            if job.cancel_requested:
+                job.state = "cancelled"
+                job.finished_at = time.time()
+                return
+            job.state = "running"
+            job.started_at = time.time()
+            try:
+                result = await asyncio.to_thread(self._run, job)
+                with self._results_lock:
+                    self.results[result["key"]] = result
+                await asyncio.to_thread(self._save_results)
+                job.result_key = result["key"]
+                job.progress = 1.0
+                job.state = "completed"
+                self.logger.info(f"Benchmark {job.job_id} of {job.model_id} completed")
+            except BenchmarkCancelled:
+                job.state = "cancelled"
+            except Exception as e:
+                job.state = "failed"
+                job.error = str(e)
+                self.logger.error(f"Benchmark {job.job_id} of {job.model_id} failed: {e}")
+            finally:
+                job.finished_at = time.time()
+                job.stage = ""
+
+    def _run(self, job: BenchmarkJob) -> Dict[str, Any]:
+        """Measure loads, UNet steps and VAE passes of a model (runs in a worker thread)."""
+        settings = job.settings
+        device = torch.device(job.device)
+        dtype = self._dtype(settings["dtype"], device)
+        shapes = [(height, width, batch_size) for height, width in settings["resolutions"]
+                  for batch_size in settings["batch_sizes"]]
+        total_units = int(settings["cold_load"]) + max(1, settings["warm_loads"]) + len(shapes) * (1 + 2 * settings["vae"])
+        completed_units = 0
+
+        def advance(stage: str) -> None:
+            nonlocal completed_units
+            if job.cancel_requested:
+                raise BenchmarkCancelled()
+            completed_units += 1
+            job.progress = completed_units / total_units
+            job.stage = stage
+
+        start_time = time.perf_counter()
+        job.stage = "hashing"
+        model_hash = self.model_hash(job.model_path)
+        # Peaks are reset per timed measurement; the run's peak is the max over all of them
+        device_peaks: List[Tuple[float, float]] = []
+        if device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(device)
+
+        result: Dict[str, Any] = {
+            "key": self.result_key(model_hash, job.device, settings),
+            "model_id": job.model_id,
+            "model_path": job.model_path,
+            "model_hash": model_hash,
+            "device": job.device,
+            "device_name": torch.cuda.get_device_name(device) if device.type == "cuda" else platform.processor(),
+            "dtype": str(dtype).replace("torch.", ""),
+            "settings": settings,
+            "torch_version": torch.__version__,
+            # Diffusers uses scaled_dot_product_attention when torch provides it
+            "attention": "sdpa" if hasattr(torch.nn.functional, "scaled_dot_product_attention") else "math",
+            "started_at": time.time()
+        }
+
+        # Resolved once, so the cold load evicts the pages of the file that is actually loaded
+        load_path = self._load_path(job.model_path)
+        result["load_path"] = load_path
+
+        pipeline = None
+        with _PeakMemorySampler() as sampler:
+            try:
+                load: Dict[str, Any] = {}
+                if settings["cold_load"]:
+                    job.stage = "cold_load"
+                    load["page_cache_evicted"] = evict_page_cache(load_path)
+                    pipeline, seconds = self._timed_load(load_path, job.variant, dtype, device)
+                    load["cold_ms"] = seconds * 1000
+                    advance("warm_load")
+                warm_samples = []
+                for _ in range(max(1, settings["warm_loads"])):
+                    if pipeline is not None:
+                        self._release(pipeline, device)
+                        pipeline = None
+                    pipeline, seconds = self._timed_load(load_path, job.variant, dtype, device)
+                    warm_samples.append(seconds * 1000)
+                    advance("warm_load")
+                load["warm"] = summarize_samples(warm_samples)
+                result["load"] = load
+                if device.type == "cuda":
+                    device_peaks.append(_device_peaks(device))
+
+                result["steps"] = []
+                result["vae"] = []
+                for height, width, batch_size in shapes:
+                    inputs = unet_step_inputs(pipeline.unet, batch_size, height // 8, width // 8)
+                    inputs = move_inputs(inputs, device, pipeline.unet.dtype)
+                    step = self._time_trials(lambda: pipeline.unet(**inputs), device, settings)
+                    result["steps"].append({
+                        "height": height,
+                        "width": width,
+                        "batch_size": batch_size,
+                        "step": step,
+                        "steps_per_second": 1000 / step["p50_ms"]
+                    })
+                    advance("unet_step")
+
+                    if settings["vae"]:
+                        result["vae"].append(self._benchmark_vae(pipeline.vae, height, width, batch_size,
+                                                                 device, settings, advance))
+            finally:
+                if pipeline is not None:
+                    self._release(pipeline, device)
+
+        if device.type == "cuda":
+            device_peaks.append(_device_peaks(device))
+            measurements = [entry["step"] for entry in result.get("steps", [])]
+            measurements += [entry[name] for entry in result.get("vae", []) for name in ("encode", "decode")]
+            device_peaks.extend((entry["peak_device_mb"], entry["peak_device_reserved_mb"]) for entry in measurements)
+        result["memory"] = {
+            "peak_host_mb": sampler.peak_bytes / (1024 * 1024),
+            "peak_device_mb": max(peak[0] for peak in device_peaks) if device_peaks else None,
+            "peak_device_reserved_mb": max(peak[1] for peak in device_peaks) if device_peaks else None
+        }
+        result["duration_seconds"] = time.perf_counter() - start_time
+        return result
+
+    def _benchmark_vae(self, vae: torch.nn.Module, height: int, width: int, batch_size: int,
+                       device: torch.device, settings: Dict[str, Any], advance: Callable[[str], None]) -> Dict[str, Any]:
+        """Time VAE encode and decode at one resolution and batch size."""
+        generator = torch.Generator().manual_seed(0)
+        image = torch.randn(batch_size, 3, height, width, generator=generator).to(device, vae.dtype)
+        latent_channels = vae.config.latent_channels
+        latents = torch.randn(batch_size, latent_channels, height // 8, width // 8, generator=generator).to(device, vae.dtype)
+
+        encode = self._time_trials(lambda: vae.encode(image).latent_dist.sample(), device, settings)
+        advance("vae_encode")
+        decode = self._time_trials(lambda: vae.decode(latents).sample, device, settings)
+        advance("vae_decode")
+        return {
+            "height": height,
+            "width": width,
+            "batch_size": batch_size,
+            "vae_dtype": str(vae.dtype).replace("torch.", ""),
+            "encode": encode,
+            "decode": decode
+        }
+
+    def _load_path(self, model_path: str) -> str:
+        """
+        File or directory a benchmark loads for a model.
+
+        Benchmarks measure what production loads: the safetensors conversion
+        of a pickled single-file checkpoint when a conversion manager is set.
+        """
+        path = Path(model_path)
+        if path.is_dir() or self.conversion_manager is None:
+            return str(path)
+        converted = Path(self.conversion_manager.resolve(str(path)))
+        return str(converted if converted.is_file() else path)
+
+    def _timed_load(self, load_path: str, variant: Optional[str], dtype: torch.dtype, device: torch.device):
+        """Load a pipeline onto the device; returns (pipeline, seconds)."""
+        start_time = time.perf_counter()
+        pipeline = self._load_pipeline(load_path, variant, dtype, device)
+        _synchronize(device)
+        return pipeline, time.perf_counter() - start_time
+
+    def _load_pipeline(self, load_path: str, variant: Optional[str], dtype: torch.dtype, device: torch.device):
+        """Diffusers pipeline of a model directory or single-file checkpoint (see `_load_path`)."""
+        import diffusers
+
+        path = Path(load_path)
+        if path.is_dir():
+            pipeline = diffusers.DiffusionPipeline.from_pretrained(str(path), torch_dtype=dtype)
+        else:
+            pipeline_class = {
+                "sdxl_refiner": diffusers.StableDiffusionXLImg2ImgPipeline,
+                "sd1": diffusers.StableDiffusionPipeline,
+                "sd2": diffusers.StableDiffusionPipeline
+            }.get(variant, diffusers.StableDiffusionXLPipeline)
+            pipeline = pipeline_class.from_single_file(str(path), torch_dtype=dtype)
+        pipeline.set_progress_bar_config(disable=True)
+        return pipeline.to(device)
+
+    @staticmethod
+    def _release(pipeline: Any, device: torch.device) -> None:
+        """Free a loaded pipeline before the next load."""
+        del pipeline
+        gc.collect()
+        if device.type == "cuda":
+            torch.cuda.empty_cache()
+
+    @staticmethod
+    def _time_trials(call: Callable[[], Any], device: torch.device, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Warmup passes followed by timed trials of a call, as percentiles.
+
+        On CUDA the peak statistics are reset first, so the summary also
+        holds the call's activation memory (peak above what was allocated
+        before it) and the device peak during the trials.
+        """
+        samples = []
+        baseline = 0
+        if device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(device)
+            baseline = torch.cuda.memory_allocated(device)
+        with torch.inference_mode():
+            for _ in range(settings["warmup_runs"]):
+                call()
+            _synchronize(device)
+            for _ in range(settings["trials"]):
+                trial_start = time.perf_counter()
+                call()
+                _synchronize(device)
+                samples.append((time.perf_counter() - trial_start) * 1000)
+        summary = summarize_samples(samples)
+        if device.type == "cuda":
+            peak_allocated, peak_reserved = _device_peaks(device)
+            summary["activation_mb"] = (torch.cuda.max_memory_allocated(device) - baseline) / (1024 * 1024)
+            summary["peak_device_mb"] = peak_allocated
+            summary["peak_device_reserved_mb"] = peak_reserved
+        return summary
+
+    @staticmethod
+    def _dtype(name: str, device: torch.device) -> torch.dtype:
+        """Benchmark dtype; "auto" is float16 on GPUs and float32 elsewhere."""
+        if name == "auto":
+            return torch.float16 if device.type == "cuda" else torch.float32
+        return getattr(torch, name)
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation; a running job stops at its next measurement."""
+        job = self.jobs.get(job_id)
+        if job is None or job.state not in ("queued", "running"):
+            return False
+        job.cancel_requested = True
+        return True
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """State and progress of a job, with its result once completed."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        state = job.to_dict()
+        if job.result_key is not None:
+            state["result"] = self.results.get(job.result_key)
+        return state
+
+    def get_jobs(self, model_id: Optional[str] = None, active_only: bool = False) -> List[Dict[str, Any]]:
+        """States of the known jobs, optionally for one model and only queued or running ones."""
+        return [
+            job.to_dict() for job in self.jobs.values()
+            if (model_id is None or job.model_id == model_id)
+            and (not active_only or job.state in ("queued", "running"))
+        ]
+
+    async def wait(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Wait for a job to finish and return its final state."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        await asyncio.shield(job.task)
+        return self.get_job(job_id)
+
+    def get_results(self, model_id: Optional[str] = None, device: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Persisted results, newest first, optionally for one model and device."""
+        with self._results_lock:
+            results = [
+                result for result in self.results.values()
+                if (model_id is None or result["model_id"] == model_id)
+                and (device is None or result["device"] == str(torch_device(device)))
+            ]
+        return sorted(results, key=lambda result: result["started_at"], reverse=True)
+
+    def _prune_jobs(self) -> None:
+        """Forget the oldest finished jobs beyond the retention limit."""
+        finished = [job for job in self.jobs.values() if job.state in ("completed", "failed", "cancelled")]
+        finished.sort(key=lambda job: job.finished_at or 0.0)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job.job_id]
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get model benchmark manager status."""
+        states = {state: 0 for state in JOB_STATES}
+        for job in self.jobs.values():
+            states[job.state] += 1
+        return {
+            "initialized": self.initialized,
+            "results_path": str(self.results_path),
+            "persisted_results": len(self.results),
+            "jobs": states
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up model benchmark manager resources."""
+        try:
+            self.logger.info("Cleaning up model benchmark manager...")
+            for job in self.jobs.values():
+                job.cancel_requested = True
+                if job.task is not None and job.state == "queued":
+                    job.task.cancel()
+            self.jobs.clear()
+            self.initialized = False
+            self.logger.info("Model benchmark manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Model benchmark manager cleanup error: {e}")
+
+
+def _synchronize(device: torch.device) -> None:
+    """Wait for queued device work so timings cover it."""
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+
+def _device_peaks(device: torch.device) -> Tuple[float, float]:
+    """Peak allocated and reserved device memory (MB) since the last peak reset."""
+    return (torch.cuda.max_memory_allocated(device) / (1024 * 1024),
+            torch.cuda.max_memory_reserved(device) / (1024 * 1024))
@@ -0,0 +1,319 @@
+"""
+Model Hash Manager for SDXL Workers System
+==========================================
+
+Content hashes of model files, built as a Merkle tree over fixed-size
+chunks. Chunks are hashed independently from a read-only memory map by a
+thread pool (hashlib releases the GIL while it hashes), so a
+multi-gigabyte checkpoint hashes at the combined speed of several cores
+instead of one. The root covers the file size, the chunk size and every
+chunk digest.
+
+Roots and chunk digests are cached by (path, size, mtime, inode). With the
+chunk digests kept, `verify` re-reads a random sample of chunks and
+detects corruption or in-place modification without rehashing the file.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+from ...utilities.files import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+HASH_VERSION = 1
+HASH_ALGORITHM = "blake2b-merkle"
+DIGEST_SIZE = 32
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+MB = 1024 * 1024
+GB = 1024 * 1024 * 1024
+
+
+def _chunk_digest(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE, person=b"chunk").digest()
+
+
+def default_threads() -> int:
+    """Hashing threads used when none are configured."""
+    return min(8, os.cpu_count() or 1)
+
+
+def hash_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_BYTES, threads: Optional[int] = None,
+                indexes: Optional[Iterable[int]] = None) -> Tuple[int, Dict[int, bytes]]:
+    """
+    File size and digests of a file's chunks (all of them, or the given indexes).
+
+    Chunks are hashed in parallel straight from a read-only mapping, so no
+    chunk is copied into Python memory.
+    """
+    threads = threads or default_threads()
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size == 0:
+            return 0, {0: _chunk_digest(b"")}
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            view = memoryview(mapping)
+            try:
+                def digest(index: int) -> Tuple[int, bytes]:
+                    return index, _chunk_digest(view[index * chunk_size:(index + 1) * chunk_size])
+
+                indexes = range(chunk_count(size, chunk_size)) if indexes is None else list(indexes)
+                if threads <= 1:
+                    digests = dict(map(digest, indexes))
+                else:
+                    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="model-hash") as pool:
+                        digests = dict(pool.map(digest, indexes))
+            finally:
+                view.release()
+    return size, digests
+
+
+def chunk_count(size: int, chunk_size: int) -> int:
+    """Number of chunks of a file (an empty file has one empty chunk)."""
+    return max(1, -(-size // chunk_size))
+
+
+def merkle_root(chunks: List[bytes], size: int, chunk_size: int) -> str:
+    """Root of a binary hash tree over chunk digests; an unpaired node moves up unchanged."""
+    level = list(chunks)
+    while len(level) > 1:
+        level = [
+            hashlib.blake2b(level[index] + level[index + 1], digest_size=DIGEST_SIZE, person=b"node").digest()
+            if index + 1 < len(level) else level[index]
+            for index in range(0, len(level), 2)
+        ]
+    root = hashlib.blake2b(digest_size=DIGEST_SIZE, person=b"root")
+    root.update(struct.pack("<QQ", size, chunk_size))
+    root.update(level[0])
+    return root.hexdigest()
+
+
+def tree_hash_file(path: str, chunk_size: int = DEFAULT_CHUNK_BYTES, threads: Optional[int] = None) -> str:
+    """Merkle root of a whole file, hashed in parallel."""
+    size, digests = hash_chunks(path, chunk_size, threads)
+    return merkle_root([digests[index] for index in range(len(digests))], size, chunk_size)
+
+
+class ModelHashManager:
+    """
+    Parallel Merkle hashes of model files with a persistent cache.
+
+    `hash_file` returns the cached root while the file's size, mtime and
+    inode are unchanged and hashes it otherwise; `verify` samples chunks of
+    a hashed file against the cached chunk digests.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        hash_config = config.get("model_hash", {})
+        self.chunk_size = int(hash_config.get("chunk_mb", DEFAULT_CHUNK_BYTES // MB) * MB)
+        self.threads = hash_config.get("threads") or default_threads()
+        self.sample_chunks = hash_config.get("sample_chunks", 8)
+        self.cache_path = Path(hash_config.get(
+            "cache_path", os.path.join(tempfile.gettempdir(), "sdxl_model_hashes.json")
+        ))
+
+        # Resolved path -> {"size", "mtime_ns", "inode", "digest", "chunks", ...}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self._lock = threading.RLock()
+        self.stats = {
+            "hashed_files": 0,
+            "hashed_bytes": 0,
+            "cache_hits": 0,
+            "verifications": 0,
+            "verified_chunks": 0,
+            "mismatched_chunks": 0
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize model hash manager."""
+        try:
+            self.logger.info("Initializing model hash manager...")
+            self._load_cache()
+            self.initialized = True
+            self.logger.info("Model hash manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Model hash manager initialization failed: {e}")
+            return False
+
+    def _load_cache(self) -> None:
+        """Load the persisted hashes, discarding them on version mismatch or corruption."""
+        if not self.cache_path.exists():
+            return
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            if data.get("version") == HASH_VERSION:
+                self.entries = data.get("entries", {})
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable model hash cache {self.cache_path}: {e}")
+
+    def save(self) -> None:
+        """Persist the hashes if they changed (atomic replace)."""
+        with self._lock:
+            if not self.dirty:
+                return
+            payload = json.dumps({"version": HASH_VERSION, "entries": self.entries})
+            self.dirty = False
+        atomic_write_text(self.cache_path, payload)
+
+    @staticmethod
+    def _file_key(stat: os.stat_result) -> Dict[str, int]:
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "inode": stat.st_ino}
+
+    def cached(self, path: str) -> Optional[Dict[str, Any]]:
+        """Hash report of a file if its cached hash is still valid, without reading it."""
+        resolved = str(Path(path).resolve())
+        key = self._file_key(os.stat(resolved))
+        with self._lock:
+            entry = self.entries.get(resolved)
+            if entry is None or any(entry[name] != value for name, value in key.items()):
+                return None
+            return self._report(entry, cached=True)
+
+    def hash_file(self, path: str, force: bool = False) -> Dict[str, Any]:
+        """Merkle root of a file, from the cache unless the file changed (or `force`)."""
+        resolved = str(Path(path).resolve())
+        if not force:
+            report = self.cached(resolved)
+            if report is not None:
+                self.stats["cache_hits"] += 1
+                return report
+
+        key = self._file_key(os.stat(resolved))
+        start_time = time.perf_counter()
+        size, digests = hash_chunks(resolved, self.chunk_size, self.threads)
+        seconds = time.perf_counter() - start_time
+        if self._file_key(os.stat(resolved)) != key or size != key["size"]:
+            raise RuntimeError(f"{resolved} changed while it was being hashed")
+
+        chunks = [digests[index] for index in range(len(digests))]
+        entry = {
+            "path": resolved,
+            "algorithm": HASH_ALGORITHM,
+            **key,
+            "chunk_size": self.chunk_size,
+            "digest": merkle_root(chunks, size, self.chunk_size),
+            "chunks": [chunk.hex() for chunk in chunks],
+            "threads": self.threads,
+            "seconds": seconds,
+            "gbps": size / GB / seconds if seconds > 0 else None,
+            "hashed_at": time.time()
+        }
+        with self._lock:
+            self.entries[resolved] = entry
+            self.dirty = True
+        self.stats["hashed_files"] += 1
+        self.stats["hashed_bytes"] += size
+        self.save()
+        self.logger.info(f"Hashed {resolved} ({size / GB:.2f} GB) in {seconds:.2f}s "
+                         f"at {entry['gbps'] or 0:.2f} GB/s with {self.threads} threads")
+        return self._report(entry, cached=False)
+
+    def verify(self, path: str, sample_chunks: Optional[int] = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Re-read chunks of a hashed file and compare them with the cached chunk digests.
+
+        A random sample of `sample_chunks` chunks (always including the first
+        and the last) is checked, or every chunk with `full`. A file whose
+        size, mtime or inode changed since it was hashed is reported as
+        changed instead.
+        """
+        resolved = str(Path(path).resolve())
+        with self._lock:
+            entry = self.entries.get(resolved)
+        if entry is None:
+            raise ValueError(f"{resolved} has not been hashed yet")
+        key = self._file_key(os.stat(resolved))
+        if any(entry[name] != value for name, value in key.items()):
+            return {"path": resolved, "verified": False, "changed": True, "digest": entry["digest"]}
+
+        count = len(entry["chunks"])
+        sample = sample_chunks or self.sample_chunks
+        if full or sample >= count:
+            indexes = list(range(count))
+        else:
+            indexes = sorted({0, count - 1, *random.sample(range(1, count - 1), max(0, sample - 2))})
+
+        chunk_size = entry["chunk_size"]
+        start_time = time.perf_counter()
+        _, digests = hash_chunks(resolved, chunk_size, self.threads, indexes)
+        seconds = time.perf_counter() - start_time
+        mismatched = [index for index in indexes if digests[index].hex() != entry["chunks"][index]]
+        bytes_read = sum(min(chunk_size, entry["size"] - index * chunk_size) for index in indexes)
+
+        self.stats["verifications"] += 1
+        self.stats["verified_chunks"] += len(indexes)
+        self.stats["mismatched_chunks"] += len(mismatched)
+        if mismatched:
+            self.logger.warning(f"{resolved}: {len(mismatched)} of {len(indexes)} sampled chunks do not match")
+        return {
+            "path": resolved,
+            "verified": not mismatched,
+            "changed": False,
+            "digest": entry["digest"],
+            "checked_chunks": len(indexes),
+            "chunk_count": count,
+            "mismatched_chunks": mismatched,
+            "coverage": bytes_read / entry["size"] if entry["size"] else 1.0,
+            "bytes_read": bytes_read,
+            "seconds": seconds,
+            "gbps": bytes_read / GB / seconds if seconds > 0 else None
+        }
+
+    @staticmethod
+    def _report(entry: Dict[str, Any], cached: bool) -> Dict[str, Any]:
+        """Hash report of a cache entry (without the chunk digests)."""
+        return {
+            "path": entry["path"],
+            "algorithm": entry["algorithm"],
+            "digest": entry["digest"],
+            "size": entry["size"],
+            "chunk_size": entry["chunk_size"],
+            "chunk_count": len(entry["chunks"]),
+            "threads": entry["threads"],
+            "seconds": entry["seconds"],
+            "gbps": entry["gbps"],
+            "cached": cached
+        }
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get model hash manager status."""
+        with self._lock:
+            hashed = list(self.entries.values())
+        rates = [entry["gbps"] for entry in hashed if entry.get("gbps")]
+        return {
+            "initialized": self.initialized,
+            "cache_path": str(self.cache_path),
+            "chunk_size": self.chunk_size,
+            "threads": self.threads,
+            "cached_files": len(hashed),
+            "mean_gbps": sum(rates) / len(rates) if rates else None,
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up model hash manager resources."""
+        try:
+            self.logger.info("Cleaning up model hash manager...")
+            self.save()
+            self.entries.clear()
+            self.initialized = False
+            self.logger.info("Model hash manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Model hash manager cleanup error: {e}")
@@ -0,0 +1,718 @@
+"""
+Model Index Manager for SDXL Workers System
+===========================================
+
+Model metadata without loading weights. Safetensors files start with an
+8-byte little-endian header length followed by a JSON header describing
+every tensor (dtype, shape, byte offsets), so tensor layout, parameter
+size, precision and architecture can all be derived from the first few
+hundred kilobytes of a multi-gigabyte file. Results are kept in an
+on-disk index keyed by (path, size, mtime), so unchanged files are never
+read twice. Directory listings are kept with the directory mtime, so a
+refresh of an unchanged tree costs one stat per directory.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Set
+
+from ...utilities.files import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+
+# A directory listing is only trusted once the directory mtime is older than the
+# listing by more than the coarsest mtime granularity (FAT, some network filesystems)
+RACY_WINDOW_NS = 2_000_000_000
+
+# Safetensors metadata holding comma-separated tags, and single-value labels
+METADATA_TAG_KEYS = ("modelspec.tags", "tags")
+METADATA_LABEL_KEYS = ("modelspec.architecture", "ss_base_model_version")
+
+MODEL_EXTENSIONS = {".safetensors", ".ckpt", ".bin", ".pt", ".pth", ".onnx"}
+
+# Upper bound for a sane safetensors header (the format itself allows 100MB)
+MAX_HEADER_BYTES = 100 * 1024 * 1024
+
+SAFETENSORS_DTYPES: Dict[str, Tuple[str, int]] = {
+    "F64": ("float64", 8),
+    "F32": ("float32", 4),
+    "F16": ("float16", 2),
+    "BF16": ("bfloat16", 2),
+    "F8_E4M3": ("float8_e4m3fn", 1),
+    "F8_E5M2": ("float8_e5m2", 1),
+    "I64": ("int64", 8),
+    "I32": ("int32", 4),
+    "I16": ("int16", 2),
+    "I8": ("int8", 1),
+    "U64": ("uint64", 8),
+    "U32": ("uint32", 4),
+    "U16": ("uint16", 2),
+    "U8": ("uint8", 1),
+    "BOOL": ("bool", 1)
+}
+
+# Width of the SDXL UNet additional embedding: (time embedding dim, input dim)
+SDXL_BASE_ADD_EMBEDDING = (1280, 2816)
+SDXL_REFINER_ADD_EMBEDDING = (1536, 2560)
+
+# Key prefixes of each component inside single-file checkpoints (original layout)
+COMPONENT_PREFIXES: Dict[str, Tuple[str, ...]] = {
+    "unet": ("model.diffusion_model.",),
+    "vae": ("first_stage_model.",),
+    "text_encoder": ("conditioner.embedders.0.", "cond_stage_model."),
+    "text_encoder_2": ("conditioner.embedders.1.",)
+}
+
+LORA_DOWN_SUFFIXES = (".lora_down.weight", ".lora_A.weight", ".lora.down.weight", ".lora_linear_layer.down.weight")
+LORA_LAYER_KINDS = (
+    "to_q", "to_k", "to_v", "to_out", "q_proj", "k_proj", "v_proj", "out_proj",
+    "proj_in", "proj_out", "fc1", "fc2", "time_emb_proj", "conv_shortcut", "conv1", "conv2"
+)
+
+
+def read_safetensors_header(path: str) -> Dict[str, Any]:
+    """Read the JSON header of a safetensors file without touching tensor data."""
+    with open(path, "rb") as handle:
+        prefix = handle.read(8)
+        if len(prefix) < 8:
+            raise ValueError("File too small for a safetensors header")
+        (header_size,) = struct.unpack("<Q", prefix)
+        file_size = os.fstat(handle.fileno()).st_size
+        if header_size > MAX_HEADER_BYTES or header_size > file_size - 8:
+            raise ValueError(f"Invalid safetensors header size: {header_size}")
+        header = json.loads(handle.read(header_size))
+    if not isinstance(header, dict):
+        raise ValueError("Safetensors header is not a JSON object")
+    header["__data_start__"] = 8 + header_size
+    return header
+
+
+def component_prefix(names: List[str], component: str) -> str:
+    """Key prefix of a component in a single-file checkpoint; empty for standalone component files."""
+    prefixes = COMPONENT_PREFIXES.get(component)
+    if prefixes is None:
+        raise ValueError(f"Unknown model component: {component}")
+    return next((prefix for prefix in prefixes if any(name.startswith(prefix) for name in names)), "")
+
+
+def hash_safetensors_tensors(path: str, names: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Content hash of tensors in a safetensors file.
+
+    Each digest covers the dtype, shape and raw bytes of one tensor, so
+    byte-identical weights hash equally across files regardless of their
+    name or position. Data is hashed straight from a read-only mapping.
+    """
+    header = read_safetensors_header(path)
+    data_start = header["__data_start__"]
+    tensors = _tensors(header)
+    hashes = {}
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        view = memoryview(mapping)
+        try:
+            for name in (names if names is not None else tensors):
+                info = tensors[name]
+                begin, end = info["data_offsets"]
+                digest = hashlib.blake2b(digest_size=16)
+                digest.update(f"{info['dtype']}:{info['shape']}:".encode("ascii"))
+                digest.update(view[data_start + begin:data_start + end])
+                hashes[name] = digest.hexdigest()
+        finally:
+            view.release()
+    return hashes
+
+
+def _tensors(header: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Tensor entries of a parsed header."""
+    return {name: info for name, info in header.items() if not name.startswith("__")}
+
+
+def summarize_tensors(tensors: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Parameter count, byte size and dtype breakdown of a tensor table."""
+    dtypes: Dict[str, Dict[str, int]] = {}
+    parameter_count = 0
+    parameter_bytes = 0
+    for info in tensors.values():
+        numel = 1
+        for dim in info.get("shape", []):
+            numel *= int(dim)
+        begin, end = info.get("data_offsets", (0, 0))
+        dtype = SAFETENSORS_DTYPES.get(info.get("dtype"), (str(info.get("dtype")).lower(), 0))[0]
+        stats = dtypes.setdefault(dtype, {"tensors": 0, "parameters": 0, "bytes": 0})
+        stats["tensors"] += 1
+        stats["parameters"] += numel
+        stats["bytes"] += end - begin
+        parameter_count += numel
+        parameter_bytes += end - begin
+
+    precision = max(dtypes.items(), key=lambda item: item[1]["bytes"])[0] if dtypes else None
+    return {
+        "tensor_count": len(tensors),
+        "parameter_count": parameter_count,
+        "parameter_bytes": parameter_bytes,
+        "dtypes": dtypes,
+        "precision": precision
+    }
+
+
+def detect_architecture(tensors: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Classify a tensor table as an SDXL/SD checkpoint, UNet, VAE, text encoder or LoRA."""
+    names = list(tensors)
+
+    def shape(name: str) -> Optional[Tuple[int, ...]]:
+        info = tensors.get(name)
+        return tuple(info["shape"]) if info else None
+
+    def has_prefix(prefix: str) -> bool:
+        return any(name.startswith(prefix) for name in names)
+
+    if any(name.endswith(LORA_DOWN_SUFFIXES) for name in names):
+        return _detect_lora(tensors)
+
+    # Single-file checkpoints in the original (ldm/sgm) layout
+    if has_prefix("model.diffusion_model."):
+        components = ["unet"]
+        if has_prefix("first_stage_model."):
+            components.append("vae")
+        if has_prefix("conditioner.embedders.") or has_prefix("cond_stage_model."):
+            components.append("text_encoder")
+        label_embedding = shape("model.diffusion_model.label_emb.0.0.weight")
+        if has_prefix("conditioner.embedders.1.") or label_embedding == SDXL_BASE_ADD_EMBEDDING:
+            variant = "sdxl_base"
+        elif has_prefix("conditioner.embedders.0.model.") or label_embedding == SDXL_REFINER_ADD_EMBEDDING:
+            variant = "sdxl_refiner"
+        elif has_prefix("cond_stage_model.model."):
+            variant = "sd2"
+        else:
+            variant = "sd1"
+        return {"type": "checkpoint", "variant": variant, "layout": "original", "components": components}
+
+    # Diffusers component files
+    if "conv_in.weight" in tensors and has_prefix("down_blocks."):
+        add_embedding = shape("add_embedding.linear_1.weight")
+        if add_embedding == SDXL_BASE_ADD_EMBEDDING:
+            variant = "sdxl_base"
+        elif add_embedding == SDXL_REFINER_ADD_EMBEDDING:
+            variant = "sdxl_refiner"
+        else:
+            variant = "sdxl" if add_embedding else "sd"
+        return {"type": "unet", "variant": variant, "layout": "diffusers"}
+
+    if "encoder.conv_in.weight" in tensors and "decoder.conv_out.weight" in tensors:
+        encoder_out = shape("encoder.conv_out.weight")
+        return {
+            "type": "vae",
+            "layout": "diffusers" if has_prefix("encoder.down_blocks.") else "original",
+            "latent_channels": encoder_out[0] // 2 if encoder_out else None
+        }
+
+    token_embedding = shape("text_model.embeddings.token_embedding.weight")
+    if token_embedding:
+        layers = {name.split(".")[3] for name in names if name.startswith("text_model.encoder.layers.")}
+        return {
+            "type": "text_encoder",
+            "variant": {768: "clip_l", 1024: "open_clip_h", 1280: "open_clip_bigg"}.get(token_embedding[1], "clip"),
+            "hidden_size": token_embedding[1],
+            "layers": len(layers),
+            "projection": "text_projection.weight" in tensors
+        }
+
+    return {"type": "unknown"}
+
+
+def entry_tags(entry: Dict[str, Any]) -> List[str]:
+    """Searchable tags of an index entry: format, precision, architecture and metadata tags."""
+    tags = {entry.get("format"), entry.get("precision")}
+    architecture = entry.get("architecture", {})
+    tags.update(str(architecture[key]) for key in ("type", "variant", "base", "layout") if architecture.get(key))
+    metadata = entry.get("metadata") or {}
+    for key in METADATA_TAG_KEYS:
+        if isinstance(metadata.get(key), str):
+            tags.update(tag.strip() for tag in metadata[key].split(","))
+    tags.update(metadata[key] for key in METADATA_LABEL_KEYS if isinstance(metadata.get(key), str))
+    return sorted({tag.lower() for tag in tags if tag})
+
+
+def _detect_lora(tensors: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Rank, targeted components and layer kinds of a LoRA adapter."""
+    ranks = set()
+    components = set()
+    layer_kinds = set()
+    modules = set()
+    for name, info in tensors.items():
+        if not name.endswith(LORA_DOWN_SUFFIXES):
+            continue
+        ranks.add(int(info["shape"][0]))
+        module = name[:-len(next(suffix for suffix in LORA_DOWN_SUFFIXES if name.endswith(suffix)))]
+        modules.add(module)
+
+        if module.startswith("lora_te2_") or module.startswith("text_encoder_2."):
+            components.add("text_encoder_2")
+        elif module.startswith(("lora_te1_", "lora_te_", "text_encoder.")):
+            components.add("text_encoder")
+        else:
+            components.add("unet")
+
+        if re.search(r"ff[._]net[._]", module):
+            layer_kinds.add("ff")
+        else:
+            layer_kinds.add(next(
+                (kind for kind in LORA_LAYER_KINDS if re.search(rf"(?:^|[._]){kind}(?:[._]\d+)?$", module)),
+                "other"
+            ))
+
+    names = list(tensors)
+    sdxl = "text_encoder_2" in components or any("transformer_blocks_1" in name or "transformer_blocks.1." in name
+                                                  for name in names)
+    return {
+        "type": "lora",
+        "base": "sdxl" if sdxl else "sd",
+        "rank": max(ranks) if ranks else None,
+        "ranks": sorted(ranks),
+        "targets": sorted(components),
+        "target_modules": len(modules),
+        "layer_kinds": sorted(layer_kinds),
+        "has_alpha": any(name.endswith(".alpha") for name in names)
+    }
+
+
+class ModelIndexManager:
+    """
+    On-disk index of model files and their header-derived metadata.
+
+    Entries are keyed by resolved path and revalidated against the file's
+    size and mtime on every lookup; only new or changed files are parsed.
+    Tensor tables are not stored in the index and are re-read from the
+    header on demand. The configured directories are refreshed every
+    `model_index.poll_interval_s` seconds, and `query` answers name/path
+    prefix and tag lookups from in-memory indexes.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        index_config = config.get("model_index", {})
+        self.index_path = Path(index_config.get(
+            "index_path", os.path.join(tempfile.gettempdir(), "sdxl_model_index.json")
+        ))
+        self.model_dirs = [Path(path) for path in index_config.get("model_dirs", ["../../../models"])]
+        self.recursive = index_config.get("recursive", True)
+        self.poll_interval_s = index_config.get("poll_interval_s", 30.0)
+        # Stat every indexed file on refresh, not only those in changed directories
+        # (catches files rewritten in place, which leaves the directory mtime alone)
+        self.revalidate_files = index_config.get("revalidate_files", False)
+
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Directory -> {"mtime_ns", "listed_at_ns", "files", "dirs"} of its last listing
+        self.directories: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self._lock = threading.RLock()
+        self._scan_lock = threading.Lock()
+        self._poll_task: Optional[asyncio.Task] = None
+        self.last_scan: Optional[Dict[str, Any]] = None
+
+        # Query indexes, rebuilt after the entries change
+        self._roots: Set[str] = set()
+        self._keys: List[Tuple[str, str]] = []
+        self._tags: Dict[str, Set[str]] = {}
+        self._names: Dict[str, List[str]] = {}
+        self._query_stale = True
+
+        self.stats = {"hits": 0, "parsed": 0, "errors": 0, "hashed_tensors": 0,
+                      "scans": 0, "listed_directories": 0, "skipped_directories": 0}
+
+    async def initialize(self) -> bool:
+        """Initialize model index manager."""
+        try:
+            self.logger.info("Initializing model index manager...")
+            self._load_index()
+            if self.poll_interval_s > 0:
+                self._poll_task = asyncio.get_running_loop().create_task(self._poll())
+            self.initialized = True
+            self.logger.info("Model index manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Model index manager initialization failed: {e}")
+            return False
+
+    def _load_index(self) -> None:
+        """Load the persisted index, discarding it on version mismatch or corruption."""
+        if not self.index_path.exists():
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("entries", {})
+                self.directories = data.get("directories", {})
+                self._query_stale = True
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable model index {self.index_path}: {e}")
+
+    def save(self) -> None:
+        """Persist the index if it changed (atomic replace)."""
+        with self._lock:
+            if not self.dirty:
+                return
+            payload = json.dumps({"version": INDEX_VERSION, "entries": self.entries,
+                                  "directories": self.directories})
+            self.dirty = False
+        atomic_write_text(self.index_path, payload)
+
+    def get_entry(self, path: str) -> Dict[str, Any]:
+        """Indexed metadata of a model file, parsing its header only if it changed."""
+        resolved = str(Path(path).resolve())
+        stat = os.stat(resolved)
+        return self._get_entry(resolved, stat.st_size, stat.st_mtime_ns)
+
+    def _get_entry(self, resolved: str, size: int, mtime_ns: int) -> Dict[str, Any]:
+        """Cached entry for (path, size, mtime), or a freshly indexed one."""
+        with self._lock:
+            entry = self.entries.get(resolved)
+            if entry is not None and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+                self.stats["hits"] += 1
+                return entry
+
+        entry = self._index_file(resolved, size, mtime_ns)
+        with self._lock:
+            self.entries[resolved] = entry
+            self.dirty = True
+            self._query_stale = True
+        return entry
+
+    def _index_file(self, resolved: str, size: int, mtime_ns: int) -> Dict[str, Any]:
+        """Build the index entry of one file."""
+        path = Path(resolved)
+        entry: Dict[str, Any] = {
+            "path": resolved,
+            "name": path.stem,
+            "format": path.suffix.lower().lstrip("."),
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "indexed_at": time.time()
+        }
+        if path.suffix.lower() != ".safetensors":
+            # Pickle-based formats cannot be inspected without unpickling the weights
+            entry["architecture"] = {"type": "unknown"}
+            entry["tags"] = entry_tags(entry)
+            return entry
+
+        try:
+            header = read_safetensors_header(resolved)
+            tensors = _tensors(header)
+            data_size = size - header["__data_start__"]
+            if any(info.get("data_offsets", (0, 0))[1] > data_size for info in tensors.values()):
+                raise ValueError("Tensor data offsets exceed the file size")
+            entry.update(summarize_tensors(tensors))
+            entry["architecture"] = detect_architecture(tensors)
+            entry["metadata"] = header.get("__metadata__", {})
+            self.stats["parsed"] += 1
+        except Exception as e:
+            entry["error"] = str(e)
+            entry["architecture"] = {"type": "unknown"}
+            self.stats["errors"] += 1
+        entry["tags"] = entry_tags(entry)
+        return entry
+
+    def get_tensors(self, path: str) -> Dict[str, Dict[str, Any]]:
+        """Tensor names, dtypes and shapes of a safetensors file, read from its header."""
+        tensors = _tensors(read_safetensors_header(path))
+        return {
+            name: {
+                "dtype": SAFETENSORS_DTYPES.get(info["dtype"], (info["dtype"].lower(), 0))[0],
+                "shape": info["shape"]
+            }
+            for name, info in tensors.items()
+        }
+
+    def get_tensor_hashes(self, path: str, component: Optional[str] = None) -> Dict[str, str]:
+        """
+        Content hashes of a file's tensors (optionally one component's, keyed without prefix).
+
+        Hashes are computed once per (path, size, mtime) and cached in a
+        sidecar of the index; only tensors not hashed before are read.
+        """
+        entry = self.get_entry(path)
+        if entry["format"] != "safetensors" or "error" in entry:
+            raise ValueError(f"Cannot hash tensors of {path}: not a valid safetensors file")
+
+        sidecar = self._hash_sidecar(entry["path"])
+        cached: Dict[str, str] = {}
+        if sidecar.exists():
+            try:
+                data = json.loads(sidecar.read_text(encoding="utf-8"))
+                if data.get("size") == entry["size"] and data.get("mtime_ns") == entry["mtime_ns"]:
+                    cached = data.get("hashes", {})
+            except Exception as e:
+                self.logger.warning(f"Discarding unreadable tensor hash cache {sidecar}: {e}")
+
+        names = list(_tensors(read_safetensors_header(entry["path"])))
+        prefix = component_prefix(names, component) if component is not None else ""
+        if prefix:
+            names = [name for name in names if name.startswith(prefix)]
+
+        missing = [name for name in names if name not in cached]
+        if missing:
+            cached.update(hash_safetensors_tensors(entry["path"], missing))
+            self.stats["hashed_tensors"] += len(missing)
+            atomic_write_text(sidecar, json.dumps({
+                "path": entry["path"],
+                "size": entry["size"],
+                "mtime_ns": entry["mtime_ns"],
+                "hashes": cached
+            }))
+
+        return {name[len(prefix):]: cached[name] for name in names}
+
+    def get_component_hash(self, path: str, component: str) -> str:
+        """Content digest of one component, cached in the file's index entry."""
+        entry = self.get_entry(path)
+        component_hashes = entry.setdefault("component_hashes", {})
+        if component not in component_hashes:
+            tensor_hashes = self.get_tensor_hashes(path, component)
+            digest = hashlib.blake2b(digest_size=16)
+            for name in sorted(tensor_hashes):
+                digest.update(f"{name}={tensor_hashes[name]};".encode("utf-8"))
+            with self._lock:
+                component_hashes[component] = digest.hexdigest()
+                self.dirty = True
+            self.save()
+        return component_hashes[component]
+
+    def _hash_sidecar(self, resolved: str) -> Path:
+        """Tensor hash cache file of a model file."""
+        name = hashlib.blake2b(resolved.encode("utf-8"), digest_size=16).hexdigest()
+        return self.index_path.parent / "tensor_hashes" / f"{name}.json"
+
+    def scan(self, directories: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Bring the index of the given (or configured) directories up to date.
+
+        A directory is only listed again when its mtime changed (a file was
+        added, removed or renamed in it); otherwise its last listing is
+        reused, so refreshing an unchanged tree costs one stat per
+        directory. Files of relisted directories are revalidated against
+        their size and mtime, and entries and listings that disappeared are
+        dropped. Returns the entries of every model file found.
+        """
+        start_time = time.perf_counter()
+        roots = [str(Path(directory).resolve()) for directory in (directories or self.model_dirs)]
+        with self._scan_lock:
+            counts = {"listed_directories": 0, "skipped_directories": 0}
+            indexed_before = self.stats["parsed"] + self.stats["errors"]
+            files: Set[str] = set()
+            visited: Set[str] = set()
+            for root in roots:
+                if os.path.isdir(root):
+                    self._refresh_directory(root, files, visited, counts)
+
+            with self._lock:
+                self._roots.update(roots)
+                root_prefixes = tuple(root + os.sep for root in roots)
+                stale = [path for path in self.entries if path.startswith(root_prefixes) and path not in files]
+                for path in stale:
+                    del self.entries[path]
+                for path in [path for path in self.directories
+                             if (path in roots or path.startswith(root_prefixes)) and path not in visited]:
+                    del self.directories[path]
+                    self.dirty = True
+                if stale:
+                    self.dirty = True
+                    self._query_stale = True
+                entries = [self.entries[path] for path in files if path in self.entries]
+            self.save()
+
+            for key, value in counts.items():
+                self.stats[key] += value
+            self.stats["scans"] += 1
+            self.last_scan = {
+                "roots": roots,
+                "files": len(entries),
+                "indexed": self.stats["parsed"] + self.stats["errors"] - indexed_before,
+                "removed": len(stale),
+                **counts,
+                "duration_ms": (time.perf_counter() - start_time) * 1000,
+                "finished_at": time.time()
+            }
+        return entries
+
+    def _refresh_directory(self, directory: str, files: Set[str], visited: Set[str],
+                           counts: Dict[str, int]) -> None:
+        """Refresh one directory (relisting it only if it changed) and recurse into its subdirectories."""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError as e:
+            self.logger.warning(f"Cannot scan {directory}: {e}")
+            return
+        visited.add(directory)
+
+        with self._lock:
+            listing = self.directories.get(directory)
+        relisted = (listing is None or listing["mtime_ns"] != mtime_ns
+                    or mtime_ns >= listing["listed_at_ns"] - RACY_WINDOW_NS)
+        if relisted:
+            listing = self._list_directory(directory, mtime_ns)
+            if listing is None:
+                return
+            counts["listed_directories"] += 1
+        else:
+            counts["skipped_directories"] += 1
+
+        for name in listing["files"]:
+            path = os.path.join(directory, name)
+            if relisted or self.revalidate_files or path not in self.entries:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Removed since the listing
+                    continue
+                self._get_entry(path, stat.st_size, stat.st_mtime_ns)
+            files.add(path)
+
+        if self.recursive:
+            for name in listing["dirs"]:
+                self._refresh_directory(os.path.join(directory, name), files, visited, counts)
+
+    def _list_directory(self, directory: str, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        """List a directory's model files and subdirectories and remember the listing."""
+        listing: Dict[str, Any] = {"mtime_ns": mtime_ns, "listed_at_ns": time.time_ns(), "files": [], "dirs": []}
+        try:
+            with os.scandir(directory) as iterator:
+                for item in iterator:
+                    if item.is_dir(follow_symlinks=False):
+                        listing["dirs"].append(item.name)
+                    elif os.path.splitext(item.name)[1].lower() in MODEL_EXTENSIONS:
+                        listing["files"].append(item.name)
+        except OSError as e:
+            self.logger.warning(f"Cannot scan {directory}: {e}")
+            return None
+        with self._lock:
+            self.directories[directory] = listing
+            self.dirty = True
+        return listing
+
+    async def _poll(self) -> None:
+        """Refresh the configured directories every `poll_interval_s` seconds."""
+        while True:
+            try:
+                await asyncio.to_thread(self.scan)
+            except Exception as e:
+                self.logger.warning(f"Model index refresh failed: {e}")
+            await asyncio.sleep(self.poll_interval_s)
+
+    @property
+    def polling(self) -> bool:
+        """Whether the configured directories are being refreshed in the background."""
+        return self._poll_task is not None and not self._poll_task.done()
+
+    def query(self, prefix: Optional[str] = None, tags: Optional[List[str]] = None,
+              model_type: Optional[str] = None, directories: Optional[List[str]] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Indexed entries matching a prefix, all of the given tags and a model type.
+
+        A prefix matches the file name or the path below its scanned
+        directory, case-insensitively, by binary search over sorted keys.
+        Tags (format, precision, architecture, metadata tags and parent
+        directory names) are looked up in an inverted index.
+        """
+        with self._lock:
+            if self._query_stale:
+                self._rebuild_query_index()
+            candidates: Optional[Set[str]] = None
+            if prefix:
+                key = prefix.lower().replace("\\", "/")
+                candidates = set()
+                position = bisect.bisect_left(self._keys, (key, ""))
+                while position < len(self._keys) and self._keys[position][0].startswith(key):
+                    candidates.add(self._keys[position][1])
+                    position += 1
+            for tag in tags or []:
+                tagged = self._tags.get(tag.lower(), set())
+                candidates = set(tagged) if candidates is None else candidates & tagged
+            paths = list(self.entries) if candidates is None else candidates
+            if directories:
+                root_prefixes = tuple(str(Path(directory).resolve()) + os.sep for directory in directories)
+                paths = [path for path in paths if path.startswith(root_prefixes)]
+            entries = [self.entries[path] for path in paths]
+
+        if model_type:
+            entries = [entry for entry in entries if entry["architecture"].get("type") == model_type]
+        entries.sort(key=lambda entry: (entry["name"].lower(), entry["path"]))
+        return entries[:limit] if limit else entries
+
+    def _rebuild_query_index(self) -> None:
+        """Sorted prefix keys, tag sets and name lookup over the current entries."""
+        roots = sorted(self._roots, key=len, reverse=True)
+        keys: List[Tuple[str, str]] = []
+        tags: Dict[str, Set[str]] = {}
+        names: Dict[str, List[str]] = {}
+        for path, entry in self.entries.items():
+            keys.append((entry["name"].lower(), path))
+            names.setdefault(entry["name"], []).append(path)
+            entry_tag_set = set(entry.get("tags", []))
+            root = next((root for root in roots if path.startswith(root + os.sep)), None)
+            if root is not None:
+                relative = os.path.relpath(path, root).replace(os.sep, "/").lower()
+                keys.append((relative, path))
+                entry_tag_set.update(relative.split("/")[:-1])
+            for tag in entry_tag_set:
+                tags.setdefault(tag, set()).add(path)
+        keys.sort()
+        self._keys, self._tags, self._names = keys, tags, names
+        self._query_stale = False
+
+    def find(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """Indexed entry whose file name (without extension) or path matches a model id."""
+        with self._lock:
+            entry = self.entries.get(model_id)
+            if entry is not None:
+                return entry
+            if self._query_stale:
+                self._rebuild_query_index()
+            paths = self._names.get(model_id)
+            return self.entries[paths[0]] if paths else None
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get model index manager status."""
+        return {
+            "initialized": self.initialized,
+            "index_path": str(self.index_path),
+            "model_dirs": [str(path) for path in self.model_dirs],
+            "indexed_files": len(self.entries),
+            "indexed_directories": len(self.directories),
+            "polling": self.polling,
+            "poll_interval_s": self.poll_interval_s,
+            "last_scan": self.last_scan,
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up model index manager resources."""
+        try:
+            self.logger.info("Cleaning up model index manager...")
+            if self._poll_task is not None:
+                self._poll_task.cancel()
+                self._poll_task = None
+            self.save()
+            self.entries.clear()
+            self.directories.clear()
+            self._query_stale = True
+            self.initialized = False
+            self.logger.info("Model index manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Model index manager cleanup error: {e}")
@@ -286,6 +286,14 @@ class VAEManager:
         self.memory_usage = {}
         self.memory_limit_mb = config.get("memory_limit_mb", 1024)
         
+        # Zero-copy safetensors loader, weight sharing and checkpoint conversions (injected by the model interface)
+        self.mmap_loader = None
+        self.dedup_manager = None
+        self.conversion_manager = None
+        self.load_stats: Dict[str, Dict[str, Any]] = {}
+        # Device local VAE files are loaded onto
+        self.load_device = config.get("vae_device", "cpu")
+        
         # Default VAE models
         self.default_vaes = {
             "sdxl_base": "madebyollin/sdxl-vae-fp16-fix",
@@ -334,7 +342,8 @@ class VAEManager:
             torch_dtype = torch.float16 if config.model_type in ["sdxl_base", "sdxl_refiner"] else torch.float32
             
             # Load VAE model
-            if config.model_path.startswith("http") or "/" in config.model_path:
+            is_local = Path(config.model_path).exists()
+            if not is_local and (config.model_path.startswith("http") or "/" in config.model_path):
                 # Remote or HuggingFace model
                 vae_model = AutoencoderKL.from_pretrained(
                     config.model_path,
@@ -350,9 +359,9 @@ class VAEManager:
                     vae_path = models_dir / config.model_path
                 
                 if vae_path.exists():
-                    vae_model = AutoencoderKL.from_single_file(
-                        str(vae_path),
-                        torch_dtype=torch_dtype
+                    vae_model = self._load_vae_file(
+                        vae_path, torch_dtype, config.name,
+                        settings=(config.enable_slicing, config.enable_tiling, config.scaling_factor)
                     )
                 else:
                     raise FileNotFoundError(f"VAE model not found: {config.model_path}")
@@ -386,6 +395,50 @@ class VAEManager:
             logger.error(f"Failed to load VAE {config.name}: {e}")
             return False
     
+    def _load_vae_file(self, vae_path: Path, torch_dtype: torch.dtype, name: str, settings: Tuple = ()) -> Any:
+        """
+        Load a local VAE, memory-mapping safetensors weights when possible.
+        
+        A memory-mapped VAE may be shared with other loaded VAEs of identical
+        weights, dtype, device and `settings` (everything the caller configures
+        on the model afterwards, e.g. slicing, tiling and scaling factor); a
+        shared VAE must not be modified in any other way.
+        """
+        if self.conversion_manager is not None:
+            # A converted .ckpt/.pt VAE (or checkpoint) is loaded from its safetensors artifact
+            vae_path = Path(self.conversion_manager.resolve(str(vae_path), "vae"))
+        is_safetensors = vae_path.is_dir() or vae_path.suffix.lower() in [".safetensors", ".sft"]
+        if self.mmap_loader is not None and self.mmap_loader.enabled and is_safetensors:
+            try:
+                def load() -> Tuple[Any, int]:
+                    vae_model, stats = self.mmap_loader.load_vae(str(vae_path), torch_dtype=torch_dtype,
+                                                                 device=self.load_device)
+                    self.load_stats[name] = stats
+                    logger.info(
+                        f"VAE {name} memory-mapped: {stats['materialized_bytes'] / 1024 ** 2:.1f}MB used, "
+                        f"{stats['skipped_bytes'] / 1024 ** 2:.1f}MB of other components skipped"
+                    )
+                    return vae_model, stats["materialized_bytes"]
+                
+                if self.dedup_manager is None:
+                    return load()[0]
+                
+                # Reuse a resident VAE with byte-identical weights (e.g. the stock SDXL VAE)
+                weights_path, _ = self.mmap_loader.resolve_vae_weights(str(vae_path), None)
+                vae_model, shared = self.dedup_manager.acquire_component(
+                    name, weights_path, "vae", load,
+                    variant=f"{torch_dtype}|{torch.device(self.load_device)}|{settings}"
+                )
+                if shared:
+                    self.load_stats[name] = {"shared": True, "path": weights_path}
+                return vae_model
+            except Exception as e:
+                logger.warning(f"Memory-mapped load of {vae_path} failed, falling back to from_single_file: {e}")
+        
+        if vae_path.is_dir():
+            return AutoencoderKL.from_pretrained(str(vae_path), torch_dtype=torch_dtype).to(self.load_device)
+        return AutoencoderKL.from_single_file(str(vae_path), torch_dtype=torch_dtype).to(self.load_device)
+    
     async def unload_vae_model(self, name: str) -> bool:
         """Unload a VAE model to free memory."""
         try:
@@ -396,6 +449,9 @@ class VAEManager:
             # Remove from loaded models
             del self.loaded_vaes[name]
             del self.vae_metadata[name]
+            self.load_stats.pop(name, None)
+            if self.dedup_manager is not None:
+                self.dedup_manager.release(name)
             
             # Update memory tracking
             if name in self.memory_usage:
@@ -599,10 +655,12 @@ class VAEManager:
             start_time = time.time()
             
             if file_extension in ['.safetensors', '.sft']:
-                # Load safetensors format (preferred)
-                vae_model = AutoencoderKL.from_single_file(
-                    str(file_path_obj),
-                    torch_dtype=torch.float16 if self.config.get('use_fp16', True) else torch.float32
+                # Load safetensors format (preferred), memory-mapped when available
+                vae_model = self._load_vae_file(
+                    file_path_obj,
+                    torch.float16 if self.config.get('use_fp16', True) else torch.float32,
+                    vae_name,
+                    settings=(self.config.get('enable_slicing', True), self.config.get('enable_tiling', True))
                 )
             elif file_extension in ['.pt', '.pth', '.ckpt', '.bin']:
                 # Load PyTorch checkpoint formats
@@ -786,7 +844,8 @@ class VAEManager:
             "loaded_vaes": list(self.loaded_vaes.keys()),
             "memory_usage_mb": self.performance_stats.get("memory_usage_mb", 0.0),
             "total_loads": self.performance_stats.get("total_loads", 0),
-            "cache_hits": self.performance_stats.get("cache_hits", 0)
+            "cache_hits": self.performance_stats.get("cache_hits", 0),
+            "load_stats": dict(self.load_stats)
         }
 
     async def cleanup(self) -> None:
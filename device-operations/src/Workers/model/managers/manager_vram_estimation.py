@@ -0,0 +1,416 @@
+"""
+VRAM Estimation Manager for SDXL Workers System
+===============================================
+
+Estimates the device memory of a generation phase by phase. Weight memory
+is computed from the tensor shapes in the safetensors headers of the model
+index, in the dtype the weights are loaded in (or int8 for weight-only
+quantized layers). Activation memory is modelled from resolution, batch
+size, classifier-free guidance, the attention implementation and VAE
+slicing and tiling.
+
+Activation coefficients start from SDXL defaults and are re-fitted from
+the activation peaks that model benchmarks record on real devices, so
+estimates follow the hardware and library versions actually in use.
+"""
+
+import logging
+import math
+import statistics
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Iterable, TYPE_CHECKING
+
+from .manager_model_index import COMPONENT_PREFIXES, component_prefix
+from ..workers.worker_component_loader import resolve_component
+
+if TYPE_CHECKING:
+    from .manager_model_index import ModelIndexManager
+    from .manager_model_benchmark import ModelBenchmarkManager
+    from .manager_checkpoint_conversion import CheckpointConversionManager
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+PIPELINE_COMPONENTS = ("text_encoder", "text_encoder_2", "unet", "vae")
+
+DTYPE_BYTES: Dict[str, int] = {
+    "float64": 8,
+    "float32": 4,
+    "float16": 2,
+    "bfloat16": 2,
+    "float8_e4m3fn": 1,
+    "float8_e5m2": 1,
+    "int64": 8,
+    "int32": 4,
+    "int16": 2,
+    "int8": 1,
+    "uint8": 1,
+    "bool": 1
+}
+
+# Parameter counts used when a model cannot be inspected (pickle checkpoints, unindexed models)
+REFERENCE_PARAMETERS: Dict[str, Dict[str, int]] = {
+    "sdxl": {"unet": 2_567_463_684, "text_encoder": 123_060_480, "text_encoder_2": 694_659_840, "vae": 83_653_863},
+    "sd1": {"unet": 859_520_964, "text_encoder": 123_060_480, "vae": 83_653_863}
+}
+
+# (latent downsampling of the largest attention resolution, heads at that resolution)
+ATTENTION_GEOMETRY: Dict[str, tuple] = {
+    "sdxl": (2, 10),
+    "sd1": (1, 8)
+}
+
+# Activation bytes per unit and per byte of the activation dtype, for a single sample
+DEFAULT_COEFFICIENTS: Dict[str, float] = {
+    "unet_per_latent_pixel": 20 * 1024,
+    "vae_decode_per_pixel": 1200,
+    "vae_encode_per_pixel": 600,
+    "text_encoder_bytes": 64 * MB
+}
+
+# Attention implementations whose memory is linear in the token count
+LINEAR_ATTENTION = ("sdpa", "xformers", "flash")
+
+OPTIMIZATION_SETTINGS: Dict[str, Dict[str, Any]] = {
+    "minimal": {},
+    "balanced": {"vae_slicing": True},
+    "aggressive": {"vae_slicing": True, "vae_tiling": True, "attention_mode": "sliced"},
+    "int8": {"vae_slicing": True, "quantization": "int8"}
+}
+
+
+def architecture_family(variant: Optional[str]) -> str:
+    """Reference architecture of an index variant ("sdxl_base", "sd2", ...)."""
+    return "sd1" if variant in ("sd1", "sd2") else "sdxl"
+
+
+class VRAMEstimationManager:
+    """
+    Per-phase VRAM estimates from tensor shapes and a calibrated activation model.
+
+    `estimate` returns the load, text encoding, denoising and VAE phases
+    with their weight, activation and peak bytes; the peak over phases is
+    what placement and admission have to fit on a device.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        estimation_config = config.get("vram_estimation", {})
+        self.overhead_bytes = int(estimation_config.get("overhead_mb", 512) * MB)
+        self.vae_tile_size = estimation_config.get("vae_tile_size", 512)
+        self.calibrate = estimation_config.get("calibrate", True)
+        self.default_coefficients = {**DEFAULT_COEFFICIENTS, **estimation_config.get("coefficients", {})}
+        self.min_weight_numel = config.get("weight_quantization", {}).get("min_weight_numel", 4096)
+
+        # Injected by the model interface
+        self.model_index: Optional["ModelIndexManager"] = None
+        self.benchmark_manager: Optional["ModelBenchmarkManager"] = None
+        self.conversion_manager: Optional["CheckpointConversionManager"] = None
+
+        self.stats = {
+            "estimates": 0,
+            "header_components": 0,
+            "reference_components": 0,
+            "calibrated_estimates": 0
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize VRAM estimation manager."""
+        try:
+            self.logger.info("Initializing VRAM estimation manager...")
+            self.initialized = True
+            self.logger.info("VRAM estimation manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"VRAM estimation manager initialization failed: {e}")
+            return False
+
+    def resolve_settings(self, request: Dict[str, Any], optimization_level: str = "minimal") -> Dict[str, Any]:
+        """Generation settings of an estimate: optimization level defaults under explicit request values."""
+        settings = {
+            "width": 1024,
+            "height": 1024,
+            "batch_size": 1,
+            "guidance": True,
+            "attention_mode": "sdpa",
+            "vae_slicing": False,
+            "vae_tiling": False,
+            "dtype": "float16",
+            "quantization": None,
+            "upcast_vae": None,
+            "vae_encode": False
+        }
+        settings.update(OPTIMIZATION_SETTINGS.get(optimization_level, {}))
+        for key in settings:
+            if request.get(key) is not None:
+                settings[key] = request[key]
+        if request.get("guidance_scale") is not None:
+            # Classifier-free guidance only runs the unconditional batch above a scale of 1
+            settings["guidance"] = request["guidance_scale"] > 1
+        if request.get("init_image") is not None:
+            settings["vae_encode"] = True
+        return settings
+
+    # Weights
+
+    def component_weights(self, model_path: Optional[str], components: Iterable[str],
+                          dtype: str = "float16", quantization: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Device bytes of each component's weights when loaded in `dtype`.
+
+        Floating point tensors are counted at the load dtype, others at
+        their stored size. With `quantization="int8"` the UNet and text
+        encoder layers the int8 quantizer replaces are counted at one byte
+        per value plus their float32 per-channel scales. Components that
+        cannot be read from a safetensors header fall back to reference
+        parameter counts of the architecture.
+        """
+        components = list(components)
+        found: Dict[str, Dict[str, Any]] = {}
+        family = "sdxl"
+        if model_path and self.model_index is not None:
+            try:
+                found, family = self._header_weights(model_path, components, dtype, quantization)
+            except Exception as e:
+                self.logger.debug(f"Cannot read tensor shapes of {model_path}: {e}")
+
+        dtype_bytes = DTYPE_BYTES.get(dtype, 2)
+        for component in components:
+            if component in found:
+                self.stats["header_components"] += 1
+                continue
+            parameters = REFERENCE_PARAMETERS[family].get(component)
+            if parameters is None:
+                continue
+            quantized = quantization == "int8" and component != "vae"
+            found[component] = {
+                "parameters": parameters,
+                "bytes": parameters * (1 if quantized else dtype_bytes),
+                "source": "reference"
+            }
+            self.stats["reference_components"] += 1
+        return {"architecture": family, "components": found}
+
+    def _header_weights(self, model_path: str, components: List[str], dtype: str,
+                        quantization: Optional[str]):
+        """(component weights, architecture) of a safetensors file or diffusers directory."""
+        path = Path(model_path)
+        if self.conversion_manager is not None and path.is_file():
+            # Pickle checkpoints are loaded from their safetensors conversion when it exists
+            path = Path(self.conversion_manager.resolve(str(path)))
+
+        tables: Dict[str, List[Dict[str, Any]]] = {}
+        if path.is_dir():
+            family = "sdxl" if (path / "text_encoder_2").is_dir() else "sd1"
+            for component in components:
+                files = sorted((path / component).glob("*.safetensors"))
+                # Shards are summed; otherwise the files are precision variants of the same weights
+                files = [file for file in files if "-of-" in file.name] or files[:1]
+                if files:
+                    tables[component] = [info for file in files
+                                         for info in self.model_index.get_tensors(str(file)).values()]
+        elif path.suffix.lower() == ".safetensors":
+            architecture = self.model_index.get_entry(str(path)).get("architecture", {})
+            family = architecture_family(architecture.get("variant"))
+            tensors = self.model_index.get_tensors(str(path))
+            names = list(tensors)
+            checkpoint = any(name.startswith(prefix) for prefixes in COMPONENT_PREFIXES.values()
+                             for prefix in prefixes for name in names)
+            for component in components:
+                if checkpoint:
+                    prefix = component_prefix(names, component)
+                    if prefix:
+                        tables[component] = [info for name, info in tensors.items() if name.startswith(prefix)]
+                elif len(components) == 1 or architecture.get("type") == component:
+                    # Standalone component file
+                    tables[component] = list(tensors.values())
+        else:
+            return {}, "sdxl"
+
+        dtype_bytes = DTYPE_BYTES.get(dtype, 2)
+        found = {}
+        for component, infos in tables.items():
+            parameters = nbytes = 0
+            for info in infos:
+                numel = math.prod(info["shape"])
+                if not info["dtype"].startswith(("float", "bfloat")):
+                    nbytes += numel * DTYPE_BYTES.get(info["dtype"], 1)
+                    continue
+                parameters += numel
+                if (quantization == "int8" and component != "vae" and len(info["shape"]) in (2, 4)
+                        and numel >= self.min_weight_numel):
+                    # int8 values plus one float32 scale per output channel
+                    nbytes += numel + info["shape"][0] * 4
+                else:
+                    nbytes += numel * dtype_bytes
+            found[component] = {"parameters": parameters, "bytes": nbytes, "source": "header"}
+        return found, family
+
+    # Activations
+
+    def coefficients(self, model_id: Optional[str] = None, device_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Activation coefficients, fitted from benchmark results where available.
+
+        Each benchmarked UNet step and VAE pass gives one sample of bytes
+        per unit; the fitted coefficient is their median. Results of the
+        model itself are preferred over results of other models.
+        """
+        coefficients = dict(self.default_coefficients)
+        sources = {name: "default" for name in coefficients}
+        if not self.calibrate or self.benchmark_manager is None:
+            return {"values": coefficients, "sources": sources}
+
+        results: List[Dict[str, Any]] = []
+        try:
+            if model_id is not None:
+                results = self.benchmark_manager.get_results(model_id, device_id)
+            if not results:
+                results = self.benchmark_manager.get_results(None, device_id)
+        except Exception as e:
+            self.logger.debug(f"Cannot read benchmark results for calibration: {e}")
+
+        samples: Dict[str, List[float]] = {name: [] for name in coefficients}
+        for result in results:
+            dtype_bytes = DTYPE_BYTES.get(result.get("dtype"), 2)
+            for entry in result.get("steps", []):
+                activation_mb = entry["step"].get("activation_mb")
+                if activation_mb is None or result.get("attention", "sdpa") not in LINEAR_ATTENTION:
+                    continue
+                units = entry["batch_size"] * (entry["height"] // 8) * (entry["width"] // 8) * dtype_bytes
+                samples["unet_per_latent_pixel"].append(activation_mb * MB / units)
+            for entry in result.get("vae", []):
+                vae_bytes = DTYPE_BYTES.get(entry.get("vae_dtype"), dtype_bytes)
+                units = entry["batch_size"] * entry["height"] * entry["width"] * vae_bytes
+                for name, key in (("decode", "vae_decode_per_pixel"), ("encode", "vae_encode_per_pixel")):
+                    if entry[name].get("activation_mb") is not None:
+                        samples[key].append(entry[name]["activation_mb"] * MB / units)
+
+        for name, values in samples.items():
+            if values:
+                coefficients[name] = statistics.median(values)
+                sources[name] = f"calibrated ({len(values)} samples)"
+        return {"values": coefficients, "sources": sources}
+
+    def activation_bytes(self, settings: Dict[str, Any], coefficients: Dict[str, float],
+                         family: str = "sdxl") -> Dict[str, int]:
+        """Activation bytes of each compute phase for the given settings."""
+        dtype_bytes = DTYPE_BYTES.get(settings["dtype"], 2)
+        vae_bytes = 4 if settings["upcast_vae"] else dtype_bytes
+        height, width, batch_size = settings["height"], settings["width"], settings["batch_size"]
+        unet_batch = batch_size * (2 if settings["guidance"] else 1)
+        latent_pixels = (height // 8) * (width // 8)
+
+        unet = coefficients["unet_per_latent_pixel"] * unet_batch * latent_pixels * dtype_bytes
+        attention_mode = settings["attention_mode"]
+        if attention_mode not in LINEAR_ATTENTION:
+            # Attention scores and their softmax are materialized: quadratic in the token count
+            downsample, heads = ATTENTION_GEOMETRY[family]
+            tokens = latent_pixels // (downsample * downsample)
+            score_heads = 1 if attention_mode == "sliced" else unet_batch * heads
+            unet += 2 * score_heads * tokens * tokens * dtype_bytes
+
+        # Sliced VAEs decode one image at a time
+        vae_batch = 1 if settings["vae_slicing"] else batch_size
+        tile = self.vae_tile_size
+        vae_pixels = min(height * width, tile * tile) if settings["vae_tiling"] else height * width
+        # Tiled passes also hold the full output image while tiles are blended into it
+        output_bytes = vae_batch * 3 * height * width * vae_bytes * 2 if settings["vae_tiling"] else 0
+
+        phases = {
+            "text_encode": int(coefficients["text_encoder_bytes"] * unet_batch * dtype_bytes / 2),
+            "denoise": int(unet),
+            "vae_decode": int(coefficients["vae_decode_per_pixel"] * vae_batch * vae_pixels * vae_bytes + output_bytes)
+        }
+        if settings["vae_encode"]:
+            phases["vae_encode"] = int(coefficients["vae_encode_per_pixel"] * vae_batch * vae_pixels * vae_bytes
+                                       + output_bytes)
+        return phases
+
+    # Estimates
+
+    def estimate(self, request: Dict[str, Any], optimization_level: str = "minimal") -> Dict[str, Any]:
+        """
+        Per-phase VRAM estimate of a generation.
+
+        All pipeline components stay resident, so every phase holds the
+        weights of the requested components plus its own activations and
+        the fixed runtime overhead. An upcast VAE decodes with float32
+        weights, which adds the difference to the decode phase.
+        """
+        settings = self.resolve_settings(request, optimization_level)
+        components = self.requested_components(request.get("component_ids"))
+        component_weights = self.component_weights(request.get("model_path"), components,
+                                                   settings["dtype"], settings["quantization"])
+        family, weights = component_weights["architecture"], component_weights["components"]
+        if settings["upcast_vae"] is None:
+            # Diffusers upcasts the SDXL VAE to float32 because it overflows in float16
+            settings["upcast_vae"] = family == "sdxl" and settings["dtype"] == "float16"
+
+        calibration = self.coefficients(request.get("model_id"), request.get("device_id"))
+        activations = self.activation_bytes(settings, calibration["values"], family)
+
+        resident = sum(component["bytes"] for component in weights.values())
+        phase_activations = {"load": 0, **activations}
+        phases = []
+        for phase, activation in phase_activations.items():
+            weights_bytes = resident
+            if phase in ("vae_decode", "vae_encode") and settings["upcast_vae"] and "vae" in weights:
+                weights_bytes += weights["vae"]["parameters"] * (4 - DTYPE_BYTES.get(settings["dtype"], 2))
+            phases.append({
+                "phase": phase,
+                "weights_bytes": weights_bytes,
+                "activation_bytes": activation,
+                "overhead_bytes": self.overhead_bytes,
+                "peak_bytes": weights_bytes + activation + self.overhead_bytes
+            })
+
+        peak_phase = max(phases, key=lambda phase: phase["peak_bytes"])
+        self.stats["estimates"] += 1
+        if any(source != "default" for source in calibration["sources"].values()):
+            self.stats["calibrated_estimates"] += 1
+        return {
+            "settings": settings,
+            "architecture": family,
+            "components": weights,
+            "weights_bytes": resident,
+            "phases": phases,
+            "peak_bytes": peak_phase["peak_bytes"],
+            "peak_phase": peak_phase["phase"],
+            "coefficients": calibration
+        }
+
+    @staticmethod
+    def requested_components(component_ids: Optional[List[str]]) -> List[str]:
+        """Checkpoint components named by component ids; the whole pipeline when none are given."""
+        if not component_ids:
+            return list(PIPELINE_COMPONENTS)
+        components = []
+        for component_id in component_ids:
+            component = resolve_component(component_id)
+            if component is not None and component not in components:
+                components.append(component)
+        return components
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get VRAM estimation manager status."""
+        return {
+            "initialized": self.initialized,
+            "overhead_mb": self.overhead_bytes / MB,
+            "vae_tile_size": self.vae_tile_size,
+            "calibrate": self.calibrate,
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up VRAM estimation manager resources."""
+        try:
+            self.logger.info("Cleaning up VRAM estimation manager...")
+            self.initialized = False
+            self.logger.info("VRAM estimation manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"VRAM estimation manager cleanup error: {e}")
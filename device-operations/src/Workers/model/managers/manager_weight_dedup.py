@@ -0,0 +1,221 @@
+"""
+Weight Deduplication Manager for SDXL Workers System
+====================================================
+
+Shares byte-identical weights between loaded models. Fine-tuned SDXL
+checkpoints usually ship the stock VAE and text encoders; by keying
+resident components and tensors on their content hash (from the model
+index), a second checkpoint reuses the copy already in memory instead
+of loading its own. Every shared object is reference counted per owner,
+so unloading one model never frees weights another model still uses.
+"""
+
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .manager_model_index import ModelIndexManager
+
+logger = logging.getLogger(__name__)
+
+# Loads a component: () -> (component, resident bytes)
+ComponentLoader = Callable[[], Tuple[Any, int]]
+
+
+class WeightDedupManager:
+    """
+    Content-addressed, reference-counted sharing of resident weights.
+
+    Components (a whole VAE or text encoder) are shared when their
+    component digest, dtype and device match; individual tensors are
+    shared when their tensor hash, dtype and device match.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        dedup_config = config.get("weight_dedup", {})
+        self.enabled = dedup_config.get("enabled", True)
+
+        # Injected by the model interface
+        self.model_index_manager: Optional["ModelIndexManager"] = None
+
+        # key -> {"value", "owners", "nbytes"}
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.tensors: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        # owner -> keys it holds
+        self.owner_components: Dict[str, List[str]] = {}
+        self.owner_tensors: Dict[str, List[Tuple[str, str, str]]] = {}
+
+        self._lock = threading.RLock()
+        self.stats = {"component_hits": 0, "component_misses": 0, "tensor_hits": 0, "tensor_misses": 0}
+
+    async def initialize(self) -> bool:
+        """Initialize weight deduplication manager."""
+        try:
+            self.logger.info("Initializing weight deduplication manager...")
+            self.initialized = True
+            self.logger.info("Weight deduplication manager initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Weight deduplication manager initialization failed: {e}")
+            return False
+
+    def acquire_component(self, owner: str, path: str, component: str, loader: ComponentLoader,
+                          variant: str = "") -> Tuple[Any, bool]:
+        """
+        Get a component with the same weights as `component` in `path`.
+
+        Args:
+            owner: Name of the model taking a reference
+            path: Model file the component would be loaded from
+            component: Component name ("vae", "text_encoder", ...)
+            loader: Loads the component when no identical one is resident
+            variant: Anything besides the weights that must match (dtype, device, settings)
+
+        Returns:
+            (component, shared) where shared tells whether a resident copy was reused
+
+        Shared components are read-only: owners must not move, cast or
+        reconfigure them, since every other owner holds the same object.
+        Anything an owner would change belongs in `variant`, so that
+        owners that differ get their own copy.
+        """
+        key = self._component_key(path, component, variant)
+        with self._lock:
+            record = self.components.get(key) if key else None
+            if record is not None:
+                self._add_owner(record, owner, self.owner_components, key)
+                self.stats["component_hits"] += 1
+                self.logger.info(f"{owner}: reusing resident {component} ({record['nbytes'] / 1024 ** 2:.1f}MB)")
+                return record["value"], True
+
+        value, nbytes = loader()
+        with self._lock:
+            self.stats["component_misses"] += 1
+            if key:
+                record = self.components.setdefault(key, {"value": value, "owners": [], "nbytes": nbytes})
+                self._add_owner(record, owner, self.owner_components, key)
+                value = record["value"]
+        return value, False
+
+    def share_tensors(self, owner: str, state_dict: Dict[str, Any], tensor_hashes: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Replace tensors with resident tensors of identical content.
+
+        Tensors without a known hash are kept as they are. The returned
+        state dict references shared tensors; the owner holds a reference
+        to each until `release` is called.
+        """
+        if not self.enabled:
+            return state_dict
+
+        shared = {}
+        with self._lock:
+            for name, tensor in state_dict.items():
+                content_hash = tensor_hashes.get(name)
+                if content_hash is None:
+                    shared[name] = tensor
+                    continue
+                key = (content_hash, str(tensor.dtype), str(tensor.device))
+                record = self.tensors.get(key)
+                if record is None:
+                    record = {"value": tensor, "owners": [], "nbytes": tensor.numel() * tensor.element_size()}
+                    self.tensors[key] = record
+                    self.stats["tensor_misses"] += 1
+                else:
+                    self.stats["tensor_hits"] += 1
+                self._add_owner(record, owner, self.owner_tensors, key)
+                shared[name] = record["value"]
+        return shared
+
+    def share_component_tensors(self, owner: str, path: str, component: Optional[str],
+                                state_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """Share the tensors of a component state dict loaded from `path` (keys without prefix)."""
+        if not self.enabled or self.model_index_manager is None:
+            return state_dict
+        try:
+            tensor_hashes = self.model_index_manager.get_tensor_hashes(path, component)
+        except Exception as e:
+            self.logger.debug(f"Not deduplicating tensors of {path}: {e}")
+            return state_dict
+        return self.share_tensors(owner, state_dict, tensor_hashes)
+
+    def release(self, owner: str) -> int:
+        """Drop every reference held by an owner; returns the bytes actually freed."""
+        freed = 0
+        with self._lock:
+            for registry, owned in ((self.components, self.owner_components), (self.tensors, self.owner_tensors)):
+                for key in owned.pop(owner, []):
+                    record = registry.get(key)
+                    if record is None:
+                        continue
+                    record["owners"].remove(owner)
+                    if not record["owners"]:
+                        del registry[key]
+                        freed += record["nbytes"]
+        return freed
+
+    def get_memory_saved(self) -> Dict[str, Any]:
+        """Bytes that would be resident without sharing, minus bytes actually resident."""
+        with self._lock:
+            component_saved = sum(record["nbytes"] * (len(record["owners"]) - 1) for record in self.components.values())
+            tensor_saved = sum(record["nbytes"] * (len(record["owners"]) - 1) for record in self.tensors.values())
+            shared_components = sum(1 for record in self.components.values() if len(record["owners"]) > 1)
+            shared_tensors = sum(1 for record in self.tensors.values() if len(record["owners"]) > 1)
+        return {
+            "bytes_saved": component_saved + tensor_saved,
+            "mb_saved": (component_saved + tensor_saved) / (1024 * 1024),
+            "component_bytes_saved": component_saved,
+            "tensor_bytes_saved": tensor_saved,
+            "shared_components": shared_components,
+            "shared_tensors": shared_tensors
+        }
+
+    def _component_key(self, path: str, component: str, variant: str) -> Optional[str]:
+        """Content key of a component, or None when it cannot be hashed."""
+        if not self.enabled or self.model_index_manager is None:
+            return None
+        try:
+            digest = self.model_index_manager.get_component_hash(path, component)
+        except Exception as e:
+            self.logger.debug(f"Not deduplicating {component} of {path}: {e}")
+            return None
+        return f"{component}:{digest}:{variant}"
+
+    @staticmethod
+    def _add_owner(record: Dict[str, Any], owner: str, owned: Dict[str, List], key: Any) -> None:
+        """Add one reference of an owner to a record."""
+        record["owners"].append(owner)
+        owned.setdefault(owner, []).append(key)
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get weight deduplication manager status."""
+        with self._lock:
+            resident_components = len(self.components)
+            resident_tensors = len(self.tensors)
+        return {
+            "initialized": self.initialized,
+            "enabled": self.enabled,
+            "resident_components": resident_components,
+            "resident_tensors": resident_tensors,
+            "memory_saved": self.get_memory_saved(),
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up weight deduplication manager resources."""
+        try:
+            self.logger.info("Cleaning up weight deduplication manager...")
+            with self._lock:
+                self.components.clear()
+                self.tensors.clear()
+                self.owner_components.clear()
+                self.owner_tensors.clear()
+            self.initialized = False
+            self.logger.info("Weight deduplication manager cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Weight deduplication manager cleanup error: {e}")
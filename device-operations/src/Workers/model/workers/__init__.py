@@ -6,7 +6,19 @@ This package contains model workers that handle memory and model operations.
 """
 
 from .worker_memory import MemoryWorker
+from .worker_mmap_loader import MmapWeightLoader
+from .worker_tiered_cache import TieredModelCache
+from .worker_component_loader import ParallelComponentLoader
+from .worker_quantization import Int8WeightQuantizer
+from .worker_lora_fusion import LoRAFusionWorker
+from .worker_multi_lora import MultiLoRAWorker
 
 __all__ = [
-    "MemoryWorker"
+    "MemoryWorker",
+    "MmapWeightLoader",
+    "TieredModelCache",
+    "ParallelComponentLoader",
+    "Int8WeightQuantizer",
+    "LoRAFusionWorker",
+    "MultiLoRAWorker"
 ]
\ No newline at end of file
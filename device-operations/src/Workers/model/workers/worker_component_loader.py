@@ -0,0 +1,372 @@
+"""
+Parallel Component Loader for SDXL Workers System
+=================================================
+
+Loads the UNet, VAE and both text encoders of a model concurrently in a
+thread pool, off the event loop. Each component goes through four
+phases:
+
+- read: its byte ranges are streamed from disk into the page cache
+- deserialize: tensors are built over a memory map of those pages
+- cast: floating point tensors are converted to the target dtype
+- transfer: tensors are moved to the device
+
+Reads are capped by a semaphore on concurrent disk readers, so one
+component's deserialize, cast and transfer overlap another's read
+instead of all components competing for the disk at once. Every phase
+is recorded on a timeline relative to the start of the load.
+
+Components the inference prefetch manager already loaded for a queued
+request are taken from it and skip the read and deserialize phases.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, TYPE_CHECKING
+
+import torch
+
+from ..managers.manager_model_index import COMPONENT_PREFIXES, component_prefix, read_safetensors_header
+from .worker_mmap_loader import MmapSafetensorsFile
+from .worker_tiered_cache import TIER_DEVICE, measure_nbytes
+
+if TYPE_CHECKING:
+    from .worker_tiered_cache import TieredModelCache
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("read", "deserialize", "cast", "transfer")
+
+# Component ids accepted by coordinated loads
+COMPONENT_ALIASES: Dict[str, str] = {
+    "unet": "unet",
+    "vae": "vae",
+    "encoder": "text_encoder",
+    "text_encoder": "text_encoder",
+    "encoder_2": "text_encoder_2",
+    "text_encoder_2": "text_encoder_2"
+}
+
+# Component ids of adapters. LoRAs are not model components: the inference LoRA workers
+# read and apply them per request, so coordinated loads skip them instead of planning them.
+ADAPTER_ALIASES = ("lora", "lycoris", "adapter")
+
+
+def resolve_component(component_id: str) -> Optional[str]:
+    """
+    Checkpoint component named by a component id ("unet", "vae_fp16", "text_encoder_2", ...).
+
+    Adapter ids ("lora_...") are not components and resolve to None; see `is_adapter_component`.
+    """
+    if is_adapter_component(component_id):
+        return None
+    normalized = component_id.lower()
+    # Longest alias first so "text_encoder_2" is not taken for "text_encoder"
+    for alias in sorted(COMPONENT_ALIASES, key=len, reverse=True):
+        if alias in normalized:
+            return COMPONENT_ALIASES[alias]
+    return None
+
+
+def is_adapter_component(component_id: str) -> bool:
+    """Whether a component id names a LoRA-style adapter rather than a checkpoint component."""
+    normalized = component_id.lower()
+    return any(alias in normalized for alias in ADAPTER_ALIASES)
+
+
+def torch_device(device_id: Optional[str]) -> torch.device:
+    """Torch device of a device id ("cuda:1", "gpu_1", "cpu"); the default device when unset."""
+    if not device_id:
+        return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    device_id = str(device_id).lower()
+    if device_id.startswith(("gpu_", "gpu-", "gpu:")):
+        return torch.device(f"cuda:{device_id[4:]}" if torch.cuda.is_available() else "cpu")
+    if device_id.startswith(("cuda", "cpu", "mps")):
+        return torch.device(device_id)
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+@dataclass
+class ComponentLoadPlan:
+    """Where the weights of one component live."""
+    component_id: str
+    component: str
+    file: str
+    prefix: str
+    ranges: List[Tuple[int, int]]
+    nbytes: int
+    phases: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _read_tensor_table(path: str) -> Tuple[Dict[str, Any], int]:
+    """Tensor table of a safetensors file and the offset of its data section."""
+    header = read_safetensors_header(path)
+    data_start = header.pop("__data_start__")
+    header.pop("__metadata__", None)
+    return header, data_start
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sorted, coalesced byte ranges."""
+    merged: List[Tuple[int, int]] = []
+    for begin, end in sorted(ranges):
+        if merged and begin <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((begin, end))
+    return merged
+
+
+class ParallelComponentLoader:
+    """Thread pool loader of model components with a cap on concurrent disk readers."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        loading_config = config.get("component_loading", {})
+        self.max_workers = loading_config.get("max_workers", len(PHASES))
+        self.max_disk_readers = loading_config.get("max_disk_readers", 2)
+        self.read_chunk_bytes = int(loading_config.get("read_chunk_mb", 16) * 1024 * 1024)
+
+        # Injected by the model interface; loaded components are registered on its device tier
+        self.tiered_cache: Optional["TieredModelCache"] = None
+        # Injected by the main interface: the inference PrefetchManager, whose `take` hands over
+        # weights prefetched for queued requests
+        self.prefetch_manager: Optional[Any] = None
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._disk_readers = threading.BoundedSemaphore(self.max_disk_readers)
+        self.stats = {"loads": 0, "components": 0, "bytes_read": 0, "prefetched": 0, "failures": 0}
+
+    async def initialize(self) -> bool:
+        """Initialize parallel component loader."""
+        try:
+            self.logger.info("Initializing parallel component loader...")
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="component-loader")
+            self.initialized = True
+            self.logger.info("Parallel component loader initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Parallel component loader initialization failed: {e}")
+            return False
+
+    def plan(self, model_path: str, component_ids: List[str]) -> Dict[str, Any]:
+        """
+        Locate each component's weights in a single-file checkpoint or diffusers directory.
+
+        Returns:
+            {component_id: ComponentLoadPlan or error message}
+        """
+        path = Path(model_path)
+        plans: Dict[str, Any] = {}
+        header_tensors: Optional[Dict[str, Any]] = None
+        data_start = 0
+        standalone = False
+        if path.is_file():
+            if path.suffix.lower() != ".safetensors":
+                return {component_id: f"Cannot load components of {path.suffix} files in parallel"
+                        for component_id in component_ids}
+            header_tensors, data_start = _read_tensor_table(str(path))
+            # A file holding a single component (e.g. a standalone VAE) has no component prefixes
+            standalone = not any(component_prefix(list(header_tensors), name) for name in COMPONENT_PREFIXES)
+
+        for component_id in component_ids:
+            component = resolve_component(component_id)
+            if component is None:
+                plans[component_id] = f"Unknown component: {component_id}"
+                continue
+
+            if header_tensors is None:
+                files = sorted((path / component).glob("*.safetensors"))
+                if not files:
+                    plans[component_id] = f"No safetensors weights for {component} in {path}"
+                    continue
+                tensors, start = _read_tensor_table(str(files[0]))
+                names, file, prefix = list(tensors), str(files[0]), ""
+            else:
+                names, tensors, start, file = list(header_tensors), header_tensors, data_start, str(path)
+                prefix = "" if standalone else component_prefix(names, component)
+                if not prefix and not standalone:
+                    plans[component_id] = f"{path.name} has no {component} weights"
+                    continue
+
+            selected = [name for name in names if name.startswith(prefix)]
+            ranges = _merge_ranges([
+                (start + tensors[name]["data_offsets"][0], start + tensors[name]["data_offsets"][1])
+                for name in selected
+            ])
+            plans[component_id] = ComponentLoadPlan(
+                component_id=component_id,
+                component=component,
+                file=file,
+                prefix=prefix,
+                ranges=ranges,
+                nbytes=sum(end - begin for begin, end in ranges)
+            )
+        return plans
+
+    async def load(self, plans: List[ComponentLoadPlan], device_id: Optional[str] = None,
+                   dtype: Optional[str] = "float16", cache_prefix: str = "") -> Dict[str, Any]:
+        """
+        Load planned components concurrently.
+
+        Args:
+            plans: Components to load, from `plan`
+            device_id: Target device ("cuda:0", "gpu_0", "cpu"); the default device when unset
+            dtype: Floating point dtype name to cast to; None keeps the stored dtype
+            cache_prefix: Prefix of the tiered cache keys of the loaded components
+
+        Returns:
+            {"components": {component_id: result}, "timeline": [...], "wall_seconds", "parallelism"}
+        """
+        device = torch_device(device_id)
+        dtype = getattr(torch, dtype) if dtype else None
+        loop = asyncio.get_running_loop()
+        start_time = time.perf_counter()
+        futures = [
+            loop.run_in_executor(self._executor, self._load_component, plan, device, dtype, cache_prefix, start_time)
+            for plan in plans
+        ]
+        outcomes = await asyncio.gather(*futures, return_exceptions=True)
+        wall_seconds = time.perf_counter() - start_time
+
+        components: Dict[str, Any] = {}
+        for plan, outcome in zip(plans, outcomes):
+            if isinstance(outcome, Exception):
+                self.stats["failures"] += 1
+                components[plan.component_id] = {"success": False, "error": str(outcome), "phases": plan.phases}
+            else:
+                components[plan.component_id] = outcome
+
+        busy_seconds = sum(phase["end_ms"] - phase["start_ms"] for plan in plans for phase in plan.phases) / 1000
+        timeline = sorted(
+            ({"component_id": plan.component_id, **phase} for plan in plans for phase in plan.phases),
+            key=lambda phase: phase["start_ms"]
+        )
+        self.stats["loads"] += 1
+        return {
+            "components": components,
+            "timeline": timeline,
+            "phase_totals_ms": {
+                name: sum(phase["end_ms"] - phase["start_ms"] for phase in timeline if phase["phase"] == name)
+                for name in PHASES
+            },
+            "wall_seconds": wall_seconds,
+            # Average number of phases in progress at once
+            "parallelism": busy_seconds / wall_seconds if wall_seconds > 0 else None
+        }
+
+    def _load_component(self, plan: ComponentLoadPlan, device: torch.device, dtype: Optional[torch.dtype],
+                        cache_prefix: str, origin: float) -> Dict[str, Any]:
+        """Run the four load phases of one component (in a pool thread)."""
+        thread = threading.current_thread().name
+
+        def phase(name: str, begin: float, **details) -> None:
+            plan.phases.append({
+                "phase": name,
+                "start_ms": (begin - origin) * 1000,
+                "end_ms": (time.perf_counter() - origin) * 1000,
+                "thread": thread,
+                **details
+            })
+
+        # Prefetched single-file components are keyed by component, whole files by path only
+        begin = time.perf_counter()
+        state_dict = None
+        if self.prefetch_manager is not None:
+            state_dict = self.prefetch_manager.take(plan.file, plan.component if plan.prefix else None)
+        prefetched = state_dict is not None
+        bytes_read = 0
+        if prefetched:
+            self.stats["prefetched"] += 1
+            phase("deserialize", begin, tensors=len(state_dict), prefetched=True)
+        else:
+            # The wait for a disk reader slot is not part of the read phase
+            with self._disk_readers:
+                begin = time.perf_counter()
+                bytes_read = self._read_ranges(plan.file, plan.ranges)
+            phase("read", begin, bytes=bytes_read)
+
+            begin = time.perf_counter()
+            weights = MmapSafetensorsFile(plan.file)
+            state_dict = {
+                name[len(plan.prefix):]: weights.get_tensor(name)[0]
+                for name in weights.keys() if name.startswith(plan.prefix)
+            }
+            phase("deserialize", begin, tensors=len(state_dict))
+
+        begin = time.perf_counter()
+        if dtype is not None:
+            state_dict = {
+                name: tensor.to(dtype) if tensor.is_floating_point() and tensor.dtype != dtype else tensor
+                for name, tensor in state_dict.items()
+            }
+        phase("cast", begin, dtype=str(dtype) if dtype is not None else None)
+
+        begin = time.perf_counter()
+        cache_key = f"{cache_prefix}{plan.component}"
+        if self.tiered_cache is not None and str(self.tiered_cache.device) == str(device):
+            state_dict = self.tiered_cache.put(cache_key, state_dict, TIER_DEVICE, path=plan.file).value
+        else:
+            state_dict = {name: tensor.to(device) for name, tensor in state_dict.items()}
+        phase("transfer", begin, device=str(device))
+
+        self.stats["components"] += 1
+        self.stats["bytes_read"] += bytes_read
+        return {
+            "success": True,
+            "component": plan.component,
+            "file": plan.file,
+            "prefetched": prefetched,
+            "cache_key": cache_key,
+            "tensors": len(state_dict),
+            "nbytes": measure_nbytes(state_dict),
+            "load_seconds": sum(entry["end_ms"] - entry["start_ms"] for entry in plan.phases) / 1000,
+            "phases": plan.phases
+        }
+
+    def _read_ranges(self, path: str, ranges: List[Tuple[int, int]]) -> int:
+        """Stream byte ranges of a file through a reusable buffer, leaving them in the page cache."""
+        buffer = bytearray(self.read_chunk_bytes)
+        view = memoryview(buffer)
+        total = 0
+        with open(path, "rb", buffering=0) as handle:
+            for begin, end in ranges:
+                handle.seek(begin)
+                remaining = end - begin
+                while remaining > 0:
+                    read = handle.readinto(view[:min(remaining, len(buffer))])
+                    if not read:
+                        break
+                    remaining -= read
+                    total += read
+        return total
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get parallel component loader status."""
+        return {
+            "initialized": self.initialized,
+            "max_workers": self.max_workers,
+            "max_disk_readers": self.max_disk_readers,
+            "components": list(COMPONENT_PREFIXES),
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up parallel component loader resources."""
+        try:
+            self.logger.info("Cleaning up parallel component loader...")
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self.initialized = False
+            self.logger.info("Parallel component loader cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Parallel component loader cleanup error: {e}")
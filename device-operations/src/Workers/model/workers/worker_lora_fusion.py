@@ -0,0 +1,470 @@
+"""
+LoRA Weight Fusion for SDXL Workers System
+==========================================
+
+Applies LoRA adapters by fusing their low-rank deltas into the base
+weights of a pipeline's UNet and text encoders, so generation runs at the
+speed of the base model. The fused weights of each (LoRA set, scales)
+combination are memoized in a bounded LRU cache; switching to a cached
+combination is a copy into the existing parameters, with no delta math.
+
+The first time a layer is fused its base weight is copied aside, and
+unfusing copies it back in place: the base model is never reloaded and
+repeated fuse/unfuse cycles accumulate no rounding error. Every switch
+bumps the weight version of the components it rewrote, so caches keyed on
+weight content (ONNX exports) know to rehash them.
+"""
+
+import logging
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Set
+
+import torch
+
+from ...utilities.timing import record_stages, summarize_samples
+
+try:
+    import safetensors.torch
+    SAFETENSORS_AVAILABLE = True
+except ImportError:
+    SAFETENSORS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FUSED_COMPONENTS = ("unet", "text_encoder", "text_encoder_2")
+WEIGHT_VERSION_ATTRIBUTE = "_lora_weight_version"
+
+# (down, up) weight suffixes of the kohya, PEFT, diffusers and diffusers-linear-layer formats
+LORA_SUFFIX_PAIRS = (
+    (".lora_down.weight", ".lora_up.weight"),
+    (".lora_A.weight", ".lora_B.weight"),
+    (".lora.down.weight", ".lora.up.weight"),
+    (".lora_linear_layer.down.weight", ".lora_linear_layer.up.weight")
+)
+
+# Key prefixes naming the component a LoRA layer belongs to (longest first when matching)
+KOHYA_PREFIXES = {
+    "lora_unet_": "unet",
+    "lora_te_": "text_encoder",
+    "lora_te1_": "text_encoder",
+    "lora_te2_": "text_encoder_2"
+}
+DOTTED_PREFIXES = {
+    "unet.": "unet",
+    "text_encoder.": "text_encoder",
+    "text_encoder_2.": "text_encoder_2"
+}
+
+# A combination of adapters: ((path, scale), ...) sorted by path
+Combination = Tuple[Tuple[str, float], ...]
+LayerKey = Tuple[str, str]
+
+
+@dataclass
+class LoRALayer:
+    """Low-rank update of one base layer."""
+    component: str
+    module: str
+    down: torch.Tensor
+    up: torch.Tensor
+    alpha: Optional[float] = None
+
+    @property
+    def key(self) -> LayerKey:
+        return self.component, self.module
+
+    @property
+    def rank(self) -> int:
+        return self.down.shape[0]
+
+    def delta(self, weight: torch.Tensor) -> torch.Tensor:
+        """Float32 weight delta `up @ down * alpha / rank` on the weight's device, shaped like it."""
+        down = self.down.to(weight.device, torch.float32).flatten(1)
+        up = self.up.to(weight.device, torch.float32).flatten(1)
+        delta = up @ down
+        if delta.numel() != weight.numel():
+            raise ValueError(f"LoRA update of {self.module} has shape {tuple(delta.shape)}, "
+                             f"the layer weight {tuple(weight.shape)}")
+        if self.alpha is not None:
+            delta *= self.alpha / self.rank
+        return delta.reshape(weight.shape)
+
+
+def weight_version(module: torch.nn.Module) -> int:
+    """Number of times fusion rewrote a component's weights in place (0 if never)."""
+    return getattr(module, WEIGHT_VERSION_ATTRIBUTE, 0)
+
+
+def combination_key(adapters: List[Tuple[str, float]]) -> Combination:
+    """Canonical key of an adapter set and its scales (order does not matter)."""
+    return tuple(sorted((str(path), round(float(scale), 4)) for path, scale in adapters))
+
+
+def lora_modules(pipeline: Any) -> Dict[str, Dict[str, torch.nn.Module]]:
+    """Linear and conv layers LoRAs can target, per pipeline component."""
+    modules: Dict[str, Dict[str, torch.nn.Module]] = {}
+    for component in FUSED_COMPONENTS:
+        model = getattr(pipeline, component, None)
+        if model is None:
+            continue
+        found: Dict[str, torch.nn.Module] = {}
+        for name, module in model.named_modules():
+            base = getattr(module, "lora_base", None)
+            if base is not None:
+                # Layers wrapped for multi-LoRA batches keep their original name
+                found[name] = base
+            elif name and isinstance(module, (torch.nn.Linear, torch.nn.Conv2d)) and not name.endswith(".lora_base"):
+                found[name] = module
+        modules[component] = found
+    return modules
+
+
+def parse_lora(state_dict: Dict[str, torch.Tensor],
+               modules: Dict[str, Dict[str, torch.nn.Module]]) -> Tuple[List[LoRALayer], List[str]]:
+    """
+    Low-rank layers of a LoRA state dict, matched to pipeline modules.
+
+    Supports kohya (`lora_unet_down_blocks_0_..._to_q.lora_down.weight`)
+    and dotted PEFT/diffusers keys (`unet.down_blocks.0....to_q.lora_A.weight`).
+    Returns the matched layers and the key bases that matched no module.
+    """
+    underscored = {
+        component: {name.replace(".", "_"): name for name in names}
+        for component, names in modules.items()
+    }
+    layers: List[LoRALayer] = []
+    unmatched: List[str] = []
+    for key, down in state_dict.items():
+        pair = next(((d, u) for d, u in LORA_SUFFIX_PAIRS if key.endswith(d)), None)
+        if pair is None:
+            continue
+        base = key[:-len(pair[0])]
+        up = state_dict.get(base + pair[1])
+        target = _resolve_target(base, modules, underscored) if up is not None else None
+        if target is None:
+            unmatched.append(base)
+            continue
+        alpha = state_dict.get(base + ".alpha")
+        layers.append(LoRALayer(target[0], target[1], down, up, float(alpha) if alpha is not None else None))
+    return layers, unmatched
+
+
+def _resolve_target(base: str, modules: Dict[str, Dict[str, torch.nn.Module]],
+                    underscored: Dict[str, Dict[str, str]]) -> Optional[LayerKey]:
+    """(component, module name) a LoRA key base refers to."""
+    for prefix in sorted(KOHYA_PREFIXES, key=len, reverse=True):
+        if base.startswith(prefix):
+            component = KOHYA_PREFIXES[prefix]
+            name = underscored.get(component, {}).get(base[len(prefix):])
+            return (component, name) if name else None
+    for prefix in sorted(DOTTED_PREFIXES, key=len, reverse=True):
+        if base.startswith(prefix):
+            component = DOTTED_PREFIXES[prefix]
+            name = base[len(prefix):]
+            return (component, name) if name in modules.get(component, {}) else None
+    # UNet-only PEFT files carry no component prefix
+    return ("unet", base) if base in modules.get("unet", {}) else None
+
+
+@dataclass
+class _PipelineState:
+    """Fusion state of one pipeline."""
+    token: str
+    components: Dict[str, torch.nn.Module]
+    modules: Dict[str, Dict[str, torch.nn.Module]]
+    base: Dict[LayerKey, torch.Tensor] = field(default_factory=dict)
+    parsed: Dict[str, List[LoRALayer]] = field(default_factory=dict)
+    active: Combination = ()
+    active_layers: Set[LayerKey] = field(default_factory=set)
+
+    def weight(self, key: LayerKey) -> torch.Tensor:
+        return self.modules[key[0]][key[1]].weight
+
+
+class LoRAFusionWorker:
+    """
+    Fuses LoRA combinations into pipelines with a per-combination memo.
+
+    `activate(pipeline, [(path, scale), ...])` makes a combination the
+    pipeline's active weights; `deactivate` restores the base weights.
+    Both run synchronously and are meant to be called off the event loop.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        fusion_config = config.get("lora_fusion", {})
+        self.cache_bytes = int(fusion_config.get("cache_mb", 2048) * 1024 * 1024)
+        self.cache_device = torch.device(fusion_config.get("cache_device", "cpu"))
+        self.pin_memory = fusion_config.get("pin_memory", True) and torch.cuda.is_available()
+        self.use_pipeline_conversion = fusion_config.get("use_pipeline_conversion", True)
+
+        self.adapters: Dict[str, Dict[str, torch.Tensor]] = {}
+        # (pipeline token, combination) -> fused weights of the layers the combination touches
+        self.fused_cache: "OrderedDict[Tuple[str, Combination], Dict[LayerKey, torch.Tensor]]" = OrderedDict()
+        self.cached_bytes = 0
+        self._states: "weakref.WeakKeyDictionary[Any, _PipelineState]" = weakref.WeakKeyDictionary()
+        self._lock = threading.RLock()
+
+        self._switch_samples: Dict[str, deque] = {
+            "cached": deque(maxlen=1000),
+            "computed": deque(maxlen=1000),
+            "unfuse": deque(maxlen=1000)
+        }
+        self.stats = {
+            "switches": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "evictions": 0,
+            "uncached_combinations": 0,
+            "unmatched_keys": 0
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize LoRA fusion worker."""
+        try:
+            self.logger.info("Initializing LoRA fusion worker...")
+            if not SAFETENSORS_AVAILABLE:
+                self.logger.warning("Safetensors not available, only .pt LoRA files can be fused")
+            self.initialized = True
+            self.logger.info("LoRA fusion worker initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"LoRA fusion worker initialization failed: {e}")
+            return False
+
+    def load_adapter(self, path: str) -> Dict[str, torch.Tensor]:
+        """LoRA state dict of a file, read once and kept on the host."""
+        path = str(Path(path).resolve())
+        with self._lock:
+            if path in self.adapters:
+                return self.adapters[path]
+        if path.endswith(".safetensors"):
+            if not SAFETENSORS_AVAILABLE:
+                raise RuntimeError("safetensors is required to load .safetensors LoRAs")
+            state_dict = safetensors.torch.load_file(path, device="cpu")
+        else:
+            state_dict = torch.load(path, map_location="cpu", weights_only=True)
+            state_dict = state_dict.get("state_dict", state_dict)
+        with self._lock:
+            self.adapters[path] = state_dict
+        return state_dict
+
+    def release_adapter(self, path: str) -> None:
+        """Drop an adapter's weights and every memoized combination that uses it."""
+        path = str(Path(path).resolve())
+        with self._lock:
+            self.adapters.pop(path, None)
+            for state in self._states.values():
+                state.parsed.pop(path, None)
+            for key in [key for key in self.fused_cache if any(entry[0] == path for entry in key[1])]:
+                self._evict(key)
+
+    def activate(self, pipeline: Any, adapters: List[Tuple[str, float]]) -> Dict[str, Any]:
+        """
+        Make a LoRA combination the pipeline's active weights.
+
+        Layers the new combination touches get its fused weights (from the
+        memo, or computed and memoized); layers only the previous
+        combination touched get their base weights back. Returns what the
+        switch did and how long it took.
+        """
+        adapters = [(str(Path(path).resolve()), scale) for path, scale in adapters if scale != 0]
+        if not adapters:
+            return self.deactivate(pipeline)
+
+        key = combination_key(adapters)
+        with self._lock:
+            state = self._state(pipeline)
+            if state.active == key:
+                return {"combination": key, "switched": False, "layers": len(state.active_layers)}
+
+            start_time = time.perf_counter()
+            fused = self.fused_cache.get((state.token, key))
+            if fused is not None:
+                self.fused_cache.move_to_end((state.token, key))
+                self.stats["cache_hits"] += 1
+                kind = "cached"
+            else:
+                fused = self._compute(state, pipeline, key)
+                self._memoize(state.token, key, fused)
+                self.stats["cache_misses"] += 1
+                kind = "computed"
+
+            self._write(state, fused)
+            state.active = key
+            seconds = self._record_switch(kind, start_time)
+            return {"combination": key, "switched": True, "source": kind,
+                    "layers": len(fused), "switch_ms": seconds * 1000}
+
+    def deactivate(self, pipeline: Any) -> Dict[str, Any]:
+        """Restore the base weights of every fused layer in place."""
+        with self._lock:
+            state = self._states.get(pipeline)
+            if state is None or not state.active:
+                return {"combination": (), "switched": False, "layers": 0}
+            start_time = time.perf_counter()
+            restored = len(state.active_layers)
+            self._write(state, {})
+            state.active = ()
+            seconds = self._record_switch("unfuse", start_time)
+            return {"combination": (), "switched": True, "source": "base",
+                    "layers": restored, "switch_ms": seconds * 1000}
+
+    def active_combination(self, pipeline: Any) -> Combination:
+        """Combination currently fused into a pipeline; empty for base weights."""
+        state = self._states.get(pipeline)
+        return state.active if state is not None else ()
+
+    def forget_pipeline(self, pipeline: Any) -> None:
+        """Drop the base copies and memoized combinations of a pipeline being unloaded."""
+        with self._lock:
+            state = self._states.pop(pipeline, None)
+            if state is None:
+                return
+            for key in [key for key in self.fused_cache if key[0] == state.token]:
+                self._evict(key)
+
+    def adapter_layers(self, pipeline: Any, path: str) -> List[LoRALayer]:
+        """LoRA layers of an adapter file matched to a pipeline's modules."""
+        with self._lock:
+            return self._layers(self._state(pipeline), pipeline, str(Path(path).resolve()))
+
+    def _state(self, pipeline: Any) -> _PipelineState:
+        state = self._states.get(pipeline)
+        if state is None:
+            components = {
+                component: getattr(pipeline, component)
+                for component in FUSED_COMPONENTS if getattr(pipeline, component, None) is not None
+            }
+            state = _PipelineState(token=uuid.uuid4().hex, components=components, modules=lora_modules(pipeline))
+            self._states[pipeline] = state
+        return state
+
+    def _layers(self, state: _PipelineState, pipeline: Any, path: str) -> List[LoRALayer]:
+        """LoRA layers of an adapter matched to the pipeline's modules (parsed once per pipeline)."""
+        if path in state.parsed:
+            return state.parsed[path]
+        layers, unmatched = parse_lora(self.load_adapter(path), state.modules)
+        if unmatched and self.use_pipeline_conversion and hasattr(pipeline, "lora_state_dict"):
+            # Layouts not named after diffusers modules (e.g. SGM-style SDXL kohya keys) are
+            # converted by diffusers, which returns dotted keys and alphas separately
+            converted, alphas = pipeline.lora_state_dict(path)
+            converted = dict(converted)
+            for name, alpha in (alphas or {}).items():
+                converted.setdefault(name, torch.tensor(alpha))
+            converted_layers, converted_unmatched = parse_lora(converted, state.modules)
+            if len(converted_layers) > len(layers):
+                layers, unmatched = converted_layers, converted_unmatched
+        if unmatched:
+            self.stats["unmatched_keys"] += len(unmatched)
+            self.logger.warning(f"{len(unmatched)} LoRA layers of {Path(path).name} match no pipeline module")
+        state.parsed[path] = layers
+        return layers
+
+    @torch.no_grad()
+    def _compute(self, state: _PipelineState, pipeline: Any, key: Combination) -> Dict[LayerKey, torch.Tensor]:
+        """Fused weights of a combination: base + sum of scaled deltas, in the layer dtype."""
+        deltas: Dict[LayerKey, torch.Tensor] = {}
+        for path, scale in key:
+            for layer in self._layers(state, pipeline, path):
+                weight = state.weight(layer.key)
+                delta = layer.delta(weight) * scale
+                deltas[layer.key] = deltas[layer.key] + delta if layer.key in deltas else delta
+
+        fused = {}
+        for layer_key, delta in deltas.items():
+            weight = state.weight(layer_key)
+            base = state.base.get(layer_key)
+            base = base.to(weight.device) if base is not None else weight
+            fused[layer_key] = (base.float() + delta).to(weight.dtype).to(self.cache_device)
+            if self.pin_memory and self.cache_device.type == "cpu":
+                fused[layer_key] = fused[layer_key].pin_memory()
+        return fused
+
+    @torch.no_grad()
+    def _write(self, state: _PipelineState, fused: Dict[LayerKey, torch.Tensor]) -> None:
+        """Copy fused weights into their layers and base weights into layers no longer fused."""
+        touched = {layer_key[0] for layer_key in state.active_layers | fused.keys()}
+        for layer_key in state.active_layers - fused.keys():
+            state.weight(layer_key).copy_(state.base[layer_key], non_blocking=True)
+        for layer_key, tensor in fused.items():
+            weight = state.weight(layer_key)
+            if layer_key not in state.base:
+                # The first fuse of a layer keeps its base weight for unfusing
+                base = weight.detach().to(self.cache_device, copy=True)
+                state.base[layer_key] = base.pin_memory() if self.pin_memory and base.device.type == "cpu" else base
+            weight.copy_(tensor, non_blocking=True)
+        state.active_layers = set(fused)
+        for component in touched:
+            module = state.components[component]
+            setattr(module, WEIGHT_VERSION_ATTRIBUTE, weight_version(module) + 1)
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+
+    def _memoize(self, token: str, key: Combination, fused: Dict[LayerKey, torch.Tensor]) -> None:
+        """Add fused weights to the memo, evicting least recently used combinations to fit."""
+        nbytes = sum(tensor.numel() * tensor.element_size() for tensor in fused.values())
+        if nbytes > self.cache_bytes:
+            self.stats["uncached_combinations"] += 1
+            return
+        while self.fused_cache and self.cached_bytes + nbytes > self.cache_bytes:
+            self._evict(next(iter(self.fused_cache)))
+            self.stats["evictions"] += 1
+        self.fused_cache[(token, key)] = fused
+        self.cached_bytes += nbytes
+
+    def _evict(self, key: Tuple[str, Combination]) -> None:
+        fused = self.fused_cache.pop(key)
+        self.cached_bytes -= sum(tensor.numel() * tensor.element_size() for tensor in fused.values())
+
+    def _record_switch(self, kind: str, start_time: float) -> float:
+        seconds = time.perf_counter() - start_time
+        self._switch_samples[kind].append(seconds * 1000)
+        self.stats["switches"] += 1
+        record_stages({"lora_switch": seconds})
+        return seconds
+
+    def get_switch_latency(self) -> Dict[str, Any]:
+        """Switch latency percentiles for memoized, computed and unfuse switches."""
+        return {kind: summarize_samples(list(samples)) for kind, samples in self._switch_samples.items() if samples}
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get LoRA fusion worker status."""
+        base_bytes = sum(tensor.numel() * tensor.element_size()
+                         for state in list(self._states.values()) for tensor in state.base.values())
+        return {
+            "initialized": self.initialized,
+            "loaded_adapters": len(self.adapters),
+            "pipelines": len(self._states),
+            "cached_combinations": len(self.fused_cache),
+            "cache_mb": self.cached_bytes / (1024 * 1024),
+            "cache_limit_mb": self.cache_bytes / (1024 * 1024),
+            "base_copies_mb": base_bytes / (1024 * 1024),
+            "switch_latency": self.get_switch_latency(),
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up LoRA fusion worker resources."""
+        try:
+            self.logger.info("Cleaning up LoRA fusion worker...")
+            with self._lock:
+                for pipeline in list(self._states.keys()):
+                    self.deactivate(pipeline)
+                self._states.clear()
+                self.fused_cache.clear()
+                self.cached_bytes = 0
+                self.adapters.clear()
+            self.initialized = False
+            self.logger.info("LoRA fusion worker cleanup complete")
+        except Exception as e:
+            self.logger.error(f"LoRA fusion worker cleanup error: {e}")
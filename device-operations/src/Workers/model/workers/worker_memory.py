@@ -6,8 +6,23 @@ Consolidates model_loader.py, unified_model_manager.py, and gpu_model_manager.py
 Handles loading and unloading, automatic memory management across devices.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, TYPE_CHECKING
+
+from .worker_tiered_cache import (
+    DEFAULT_DISK_GBPS,
+    estimate_transfer_seconds,
+    gdsf_priority,
+    measure_nbytes
+)
+
+if TYPE_CHECKING:
+    from .worker_tiered_cache import TieredModelCache
+    from .worker_quantization import Int8WeightQuantizer
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +44,12 @@ class MemoryWorker:
         self.memory_limit = config.get("memory_limit_mb", 8192)  # 8GB default
         self.initialized = False
         
+        # Injected by the model interface; holds the modules of models loaded with a "model" object
+        self.tiered_cache: Optional["TieredModelCache"] = None
+        self.quantizer: Optional["Int8WeightQuantizer"] = None
+        # Per model access statistics driving cost-aware eviction
+        self.access_stats: Dict[str, Dict[str, Any]] = {}
+        
     async def initialize(self) -> bool:
         """Initialize memory worker."""
         try:
@@ -46,32 +67,60 @@ class MemoryWorker:
             model_name = model_data.get("name", "default")
             model_path = model_data.get("path", "")
             model_type = model_data.get("type", "unknown")
+            model = model_data.get("model")
+            
+            if model_name in self.loaded_models:
+                self._record_access(model_name)
+                return {
+                    "loaded": True,
+                    "cached": True,
+                    "model_name": model_name,
+                    "model_type": model_type,
+                    "size_mb": self.memory_usage[model_name]
+                }
             
-            # Check memory constraints
-            estimated_size = model_data.get("estimated_size_mb", 1024)
-            if not self._check_memory_available(estimated_size):
+            # Check memory constraints against the measured size
+            size_mb, size_source = self._measure_size_mb(model_data)
+            if not self._check_memory_available(size_mb):
                 return {
                     "loaded": False,
-                    "error": f"Insufficient memory. Need {estimated_size}MB, available: {self._get_available_memory()}MB"
+                    "error": f"Insufficient memory. Need {size_mb:.0f}MB, available: {self._get_available_memory()}MB"
                 }
             
-            # Simulate model loading
+            start_time = time.perf_counter()
+            if model is not None and self.tiered_cache is not None:
+                self.tiered_cache.put(
+                    model_name,
+                    model,
+                    reloader=model_data.get("reloader"),
+                    path=model_path or None,
+                    load_seconds=model_data.get("load_seconds")
+                )
+            
             self.loaded_models[model_name] = {
                 "path": model_path,
                 "type": model_type,
-                "size_mb": estimated_size,
+                "size_mb": size_mb,
+                "size_source": size_source,
                 "loaded": True
             }
             
-            self.memory_usage[model_name] = estimated_size
+            self.memory_usage[model_name] = size_mb
+            self.access_stats[model_name] = {
+                "hits": 0,
+                "last_access": time.monotonic(),
+                "load_seconds": model_data.get("load_seconds", time.perf_counter() - start_time)
+            }
+            self._record_access(model_name)
             
-            self.logger.info(f"Loaded model: {model_name} ({model_type})")
+            self.logger.info(f"Loaded model: {model_name} ({model_type}, {size_mb:.1f}MB {size_source})")
             
             return {
                 "loaded": True,
                 "model_name": model_name,
                 "model_type": model_type,
-                "size_mb": estimated_size
+                "size_mb": size_mb,
+                "size_source": size_source
             }
         except Exception as e:
             self.logger.error(f"Failed to load model: {e}")
@@ -86,6 +135,9 @@ class MemoryWorker:
                 size_mb = self.memory_usage.get(model_name, 0)
                 del self.loaded_models[model_name]
                 del self.memory_usage[model_name]
+                self.access_stats.pop(model_name, None)
+                if self.tiered_cache is not None:
+                    self.tiered_cache.remove(model_name)
                 
                 self.logger.info(f"Unloaded model: {model_name}")
                 
@@ -113,25 +165,78 @@ class MemoryWorker:
             "model_count": len(self.loaded_models)
         }
     
+    async def quantize_model(self, model_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Switch a loaded model's UNet and text encoders to int8 weights in place."""
+        try:
+            model_name = model_data.get("name", "default")
+            if model_name not in self.loaded_models:
+                return {"quantized": False, "error": f"Model not loaded: {model_name}"}
+            if self.tiered_cache is None or self.quantizer is None or not self.tiered_cache.contains(model_name):
+                return {"quantized": False, "error": f"No module held for {model_name}; load it with a model object"}
+            
+            components = model_data.get("components")
+            model_path = self.loaded_models[model_name]["path"] or None
+            model = await asyncio.to_thread(self.tiered_cache.hold, model_name)
+            try:
+                reports = await asyncio.to_thread(
+                    self.quantizer.quantize_model,
+                    model,
+                    components,
+                    model_path,
+                    model_data.get("evaluate", True),
+                    model_data.get("latent_size", 64)
+                )
+            finally:
+                self.tiered_cache.release(model_name)
+            
+            # Reloads from disk come back quantized from the int8 cache
+            def requantizing(reloader):
+                return self.quantizer.requantizing_reloader(reloader, components, model_path)
+            self.tiered_cache.refresh(
+                model_name, requantizing if self.quantizer.cache_enabled and model_path else None
+            )
+            
+            size_before = self.memory_usage[model_name]
+            size_mb = measure_nbytes(model) / (1024 * 1024)
+            self.memory_usage[model_name] = size_mb
+            self.loaded_models[model_name]["size_mb"] = size_mb
+            self.loaded_models[model_name]["quantization"] = "int8"
+            return {
+                "quantized": True,
+                "model_name": model_name,
+                "components": reports,
+                "size_before_mb": size_before,
+                "size_after_mb": size_mb,
+                "memory_saved_mb": size_before - size_mb
+            }
+        except Exception as e:
+            self.logger.error(f"Failed to quantize model: {e}")
+            return {"quantized": False, "error": str(e)}
+    
     async def optimize_memory(self) -> Dict[str, Any]:
-        """Optimize memory usage by unloading unused models."""
+        """Optimize memory usage by unloading the models that are cheapest to bring back."""
         try:
-            # Simple optimization: unload models if we're over 80% memory usage
+            # Keep the cached modules within their tier budgets
+            rebalanced = self.tiered_cache.rebalance() if self.tiered_cache is not None else None
+            
+            # Unload models if we're over 80% memory usage
             current_usage = sum(self.memory_usage.values())
             usage_percentage = (current_usage / self.memory_limit) * 100
             
             if usage_percentage > 80:
-                # Unload oldest models (simple FIFO strategy)
+                # Lowest priority first: rarely used, cheap to reload and large models go first
                 models_to_unload = []
+                freed_mb = 0.0
                 target_usage = self.memory_limit * 0.7  # Target 70% usage
                 
-                for model_name in list(self.loaded_models.keys()):
+                for model_name in self._eviction_order():
                     if current_usage <= target_usage:
                         break
                     
                     size_mb = self.memory_usage.get(model_name, 0)
                     models_to_unload.append(model_name)
                     current_usage -= size_mb
+                    freed_mb += size_mb
                 
                 # Unload selected models
                 for model_name in models_to_unload:
@@ -140,17 +245,50 @@ class MemoryWorker:
                 return {
                     "optimized": True,
                     "unloaded_models": models_to_unload,
-                    "freed_mb": sum(self.memory_usage.get(name, 0) for name in models_to_unload)
+                    "freed_mb": freed_mb,
+                    "tiered_cache": rebalanced
                 }
             else:
                 return {
                     "optimized": False,
-                    "reason": f"Memory usage ({usage_percentage:.1f}%) below threshold"
+                    "reason": f"Memory usage ({usage_percentage:.1f}%) below threshold",
+                    "tiered_cache": rebalanced
                 }
         except Exception as e:
             self.logger.error(f"Memory optimization failed: {e}")
             return {"optimized": False, "error": str(e)}
     
+    def _record_access(self, model_name: str) -> None:
+        """Count a use of a loaded model."""
+        stats = self.access_stats[model_name]
+        stats["hits"] += 1
+        stats["last_access"] = time.monotonic()
+    
+    def _eviction_order(self) -> List[str]:
+        """Loaded models from lowest to highest GreedyDual-Size-Frequency priority."""
+        def priority(model_name: str) -> float:
+            stats = self.access_stats.get(model_name, {})
+            nbytes = int(self.memory_usage.get(model_name, 0) * 1024 * 1024)
+            # Simulated loads take no time; fall back to what reading the weights would cost
+            reload_seconds = max(stats.get("load_seconds", 0.0), estimate_transfer_seconds(nbytes, DEFAULT_DISK_GBPS))
+            return gdsf_priority(stats.get("hits", 0), reload_seconds, nbytes)
+        
+        # Ties (equal priority) go to the least recently used model
+        return sorted(
+            self.loaded_models,
+            key=lambda name: (priority(name), self.access_stats.get(name, {}).get("last_access", 0.0))
+        )
+    
+    def _measure_size_mb(self, model_data: Dict[str, Any]) -> Tuple[float, str]:
+        """Size of a model in MB and where it came from: its tensors, its weight files or the caller's estimate."""
+        model = model_data.get("model")
+        if model is not None:
+            return measure_nbytes(model) / (1024 * 1024), "measured"
+        model_path = model_data.get("path", "")
+        if model_path and os.path.exists(model_path):
+            return _weights_nbytes(model_path) / (1024 * 1024), "file"
+        return model_data.get("estimated_size_mb", 1024), "estimated"
+    
     def _check_memory_available(self, required_mb: int) -> bool:
         """Check if enough memory is available."""
         current_usage = sum(self.memory_usage.values())
@@ -183,4 +321,16 @@ class MemoryWorker:
             self.initialized = False
             self.logger.info("Memory worker cleanup complete")
         except Exception as e:
-            self.logger.error(f"Memory worker cleanup error: {e}")
\ No newline at end of file
+            self.logger.error(f"Memory worker cleanup error: {e}")
+
+
+def _weights_nbytes(path: str) -> int:
+    """Bytes of the weight files of a model file or directory."""
+    model_path = Path(path)
+    if model_path.is_file():
+        return model_path.stat().st_size
+    weight_suffixes = {".safetensors", ".sft", ".bin", ".ckpt", ".pt", ".pth"}
+    return sum(
+        file.stat().st_size for file in model_path.rglob("*")
+        if file.is_file() and file.suffix.lower() in weight_suffixes
+    )
\ No newline at end of file
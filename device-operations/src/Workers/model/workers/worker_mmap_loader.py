@@ -0,0 +1,315 @@
+"""
+Memory-Mapped Weight Loader for SDXL Workers System
+===================================================
+
+Zero-copy safetensors loading. Files are memory-mapped copy-on-write and
+tensors are created directly over the mapping, so weights live in the OS
+page cache (shared by every process that maps the same file) instead of
+private heap copies. Only the tensors of the requested component are
+materialized from single-file checkpoints; the rest of the file is never
+touched.
+"""
+
+import json
+import logging
+import mmap
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+import psutil
+import torch
+
+from ..managers.manager_model_index import (
+    COMPONENT_PREFIXES,
+    read_safetensors_header,
+    detect_architecture,
+    component_prefix
+)
+
+logger = logging.getLogger(__name__)
+
+SAFETENSORS_TORCH_DTYPES: Dict[str, torch.dtype] = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool
+}
+for _name, _attribute in (("F8_E4M3", "float8_e4m3fn"), ("F8_E5M2", "float8_e5m2")):
+    if hasattr(torch, _attribute):
+        SAFETENSORS_TORCH_DTYPES[_name] = getattr(torch, _attribute)
+
+# AutoencoderKL configuration of the SDXL VAE, used when no config.json is available
+SDXL_VAE_CONFIG: Dict[str, Any] = {
+    "in_channels": 3,
+    "out_channels": 3,
+    "down_block_types": ["DownEncoderBlock2D"] * 4,
+    "up_block_types": ["UpDecoderBlock2D"] * 4,
+    "block_out_channels": [128, 256, 512, 512],
+    "layers_per_block": 2,
+    "latent_channels": 4,
+    "norm_num_groups": 32,
+    "sample_size": 1024,
+    "scaling_factor": 0.13025,
+    "force_upcast": True
+}
+
+
+class MmapSafetensorsFile:
+    """A safetensors file mapped copy-on-write, handing out tensors that alias the mapping."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.header = read_safetensors_header(self.path)
+        self.data_start = self.header.pop("__data_start__")
+        self.metadata = self.header.pop("__metadata__", {})
+        with open(self.path, "rb") as handle:
+            # ACCESS_COPY maps MAP_PRIVATE: pages stay shared with the page cache until written
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_COPY)
+        self.file_size = len(self._mmap)
+
+    def keys(self) -> List[str]:
+        """Tensor names in the file."""
+        return list(self.header)
+
+    def tensor_nbytes(self, name: str) -> int:
+        """Stored size of a tensor in bytes."""
+        begin, end = self.header[name]["data_offsets"]
+        return end - begin
+
+    def get_tensor(self, name: str) -> Tuple[torch.Tensor, bool]:
+        """Tensor over the mapping; returns (tensor, zero_copy)."""
+        info = self.header[name]
+        dtype = SAFETENSORS_TORCH_DTYPES.get(info["dtype"])
+        if dtype is None:
+            raise ValueError(f"Unsupported safetensors dtype {info['dtype']} for {name}")
+        shape = info["shape"]
+        begin, end = info["data_offsets"]
+        offset = self.data_start + begin
+        if end == begin:
+            return torch.empty(shape, dtype=dtype), True
+
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        if offset % itemsize == 0:
+            tensor = torch.frombuffer(self._mmap, dtype=dtype, count=(end - begin) // itemsize, offset=offset)
+            return tensor.view(shape), True
+        # Misaligned data cannot be viewed in place
+        data = bytearray(self._mmap[offset:self.data_start + end])
+        return torch.frombuffer(data, dtype=dtype).view(shape), False
+
+    def close(self) -> None:
+        """Unmap the file once no tensor references it any more."""
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Live tensors still alias the mapping; it is released with them
+            pass
+
+
+class MmapWeightLoader:
+    """
+    Loads component weights from safetensors files through memory maps.
+
+    Every load reports its wall time, the bytes it materialized versus
+    the bytes it skipped, and the change in resident and private memory.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        mmap_config = config.get("mmap_loading", {})
+        self.enabled = mmap_config.get("enabled", True)
+
+        self.stats = {
+            "loads": 0,
+            "mapped_bytes": 0,
+            "materialized_bytes": 0,
+            "skipped_bytes": 0,
+            "copied_bytes": 0
+        }
+        self.last_loads: Dict[str, Dict[str, Any]] = {}
+
+    async def initialize(self) -> bool:
+        """Initialize memory-mapped weight loader."""
+        try:
+            self.logger.info("Initializing memory-mapped weight loader...")
+            self.initialized = True
+            self.logger.info("Memory-mapped weight loader initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Memory-mapped weight loader initialization failed: {e}")
+            return False
+
+    def load_state_dict(self, path: str, component: Optional[str] = None,
+                        dtype: Optional[torch.dtype] = None,
+                        device: Optional[str] = None) -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+        """
+        Map a safetensors file and materialize one component's tensors.
+
+        Args:
+            path: Safetensors file
+            component: "unet", "vae", "text_encoder" or "text_encoder_2" to select
+                that component's keys (prefix stripped) from a single-file
+                checkpoint; None loads every tensor
+            dtype: Convert floating point tensors to this dtype (copies when it differs)
+            device: Move tensors to this device (copies unless "cpu")
+
+        Returns:
+            (state_dict, load statistics)
+        """
+        start_time = time.perf_counter()
+        memory_before = _memory_snapshot()
+
+        weights = MmapSafetensorsFile(path)
+        names = weights.keys()
+        prefix = component_prefix(names, component) if component is not None else ""
+        if prefix:
+            names = [name for name in names if name.startswith(prefix)]
+
+        state_dict: Dict[str, torch.Tensor] = {}
+        zero_copy = 0
+        copied_bytes = 0
+        for name in names:
+            tensor, aliased = weights.get_tensor(name)
+            if dtype is not None and tensor.is_floating_point() and tensor.dtype != dtype:
+                tensor = tensor.to(dtype)
+                aliased = False
+            if device is not None and str(device) != "cpu":
+                tensor = tensor.to(device)
+                aliased = False
+            zero_copy += aliased
+            copied_bytes += 0 if aliased else weights.tensor_nbytes(name)
+            state_dict[name[len(prefix):]] = tensor
+
+        materialized = sum(weights.tensor_nbytes(name) for name in names)
+        total = sum(weights.tensor_nbytes(name) for name in weights.keys())
+        memory_after = _memory_snapshot()
+        stats = {
+            "path": str(path),
+            "component": component,
+            "prefix": prefix,
+            "tensors": len(state_dict),
+            "zero_copy_tensors": zero_copy,
+            "mapped_bytes": weights.file_size,
+            "materialized_bytes": materialized,
+            "skipped_bytes": total - materialized,
+            "copied_bytes": copied_bytes,
+            "load_seconds": time.perf_counter() - start_time,
+            "rss_delta_mb": _delta_mb(memory_before, memory_after, "rss"),
+            "private_delta_mb": _delta_mb(memory_before, memory_after, "uss")
+        }
+
+        self.stats["loads"] += 1
+        self.stats["mapped_bytes"] += weights.file_size
+        self.stats["materialized_bytes"] += materialized
+        self.stats["skipped_bytes"] += total - materialized
+        self.stats["copied_bytes"] += copied_bytes
+        self.last_loads[str(path)] = stats
+        return state_dict, stats
+
+    def load_vae(self, path: str, torch_dtype: Optional[torch.dtype] = None,
+                 vae_config: Optional[Dict[str, Any]] = None,
+                 device: Optional[str] = None) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Build an AutoencoderKL over mapped weights (copied to `device` unless it is "cpu").
+
+        Accepts a standalone VAE file (diffusers or original layout), a
+        diffusers VAE directory, or a single-file checkpoint, in which case
+        only the `first_stage_model.` tensors are read.
+        """
+        from diffusers import AutoencoderKL
+
+        weights_path, config = self.resolve_vae_weights(path, vae_config)
+        state_dict, stats = self.load_state_dict(weights_path, component="vae", dtype=torch_dtype, device=device)
+        start_time = time.perf_counter()
+
+        if not any(name.startswith("encoder.down_blocks.") for name in state_dict):
+            from diffusers.loaders.single_file_utils import convert_ldm_vae_checkpoint
+            state_dict = convert_ldm_vae_checkpoint(state_dict, config)
+
+        # Build on the meta device and adopt the mapped tensors instead of copying into fresh parameters
+        with torch.device("meta"):
+            vae = AutoencoderKL.from_config(config)
+        missing, unexpected = vae.load_state_dict(state_dict, strict=False, assign=True)
+        if missing:
+            raise ValueError(f"VAE weights are missing {len(missing)} tensors, e.g. {missing[:3]}")
+        if unexpected:
+            self.logger.debug(f"Ignoring {len(unexpected)} unexpected VAE tensors")
+        vae.eval()
+
+        stats["build_seconds"] = time.perf_counter() - start_time
+        stats["load_seconds"] += stats["build_seconds"]
+        return vae, stats
+
+    @staticmethod
+    def resolve_vae_weights(path: str, vae_config: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """Weights file and model config of a VAE file or diffusers directory."""
+        model_path = Path(path)
+        config = dict(vae_config or SDXL_VAE_CONFIG)
+        if model_path.is_dir():
+            for directory in (model_path, model_path / "vae"):
+                weights = directory / "diffusion_pytorch_model.safetensors"
+                if weights.exists():
+                    config_file = directory / "config.json"
+                    if config_file.exists() and vae_config is None:
+                        config = json.loads(config_file.read_text(encoding="utf-8"))
+                    return str(weights), config
+            raise FileNotFoundError(f"No safetensors VAE weights in {path}")
+        return str(model_path), config
+
+    def inspect(self, path: str) -> Dict[str, Any]:
+        """Components present in a safetensors file and their stored sizes."""
+        weights = MmapSafetensorsFile(path)
+        try:
+            sizes = {}
+            for component, prefixes in COMPONENT_PREFIXES.items():
+                size = sum(weights.tensor_nbytes(name) for name in weights.keys() if name.startswith(prefixes))
+                if size:
+                    sizes[component] = size
+            tensors = {name: weights.header[name] for name in weights.keys()}
+            return {"architecture": detect_architecture(tensors), "component_bytes": sizes}
+        finally:
+            weights.close()
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get memory-mapped weight loader status."""
+        return {
+            "initialized": self.initialized,
+            "enabled": self.enabled,
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up memory-mapped weight loader resources."""
+        try:
+            self.logger.info("Cleaning up memory-mapped weight loader...")
+            self.last_loads.clear()
+            self.initialized = False
+            self.logger.info("Memory-mapped weight loader cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Memory-mapped weight loader cleanup error: {e}")
+
+
+def _memory_snapshot() -> Dict[str, int]:
+    """Resident and private (unique set) memory of this process in bytes."""
+    process = psutil.Process(os.getpid())
+    try:
+        info = process.memory_full_info()
+        return {"rss": info.rss, "uss": getattr(info, "uss", info.rss)}
+    except (psutil.AccessDenied, AttributeError):
+        rss = process.memory_info().rss
+        return {"rss": rss, "uss": rss}
+
+
+def _delta_mb(before: Dict[str, int], after: Dict[str, int], key: str) -> float:
+    """Memory growth between two snapshots in MB."""
+    return (after[key] - before[key]) / (1024 * 1024)
@@ -0,0 +1,352 @@
+"""
+Multi-LoRA Batching for SDXL Workers System
+===========================================
+
+Unfused LoRA execution, so one batch can mix samples that use different
+adapters. Every layer an adapter targets is wrapped: the base layer runs
+once for the whole batch, and each row adds its own low-rank products,
+gathered from the stacked down/up weights of all registered adapters by a
+per-row adapter index:
+
+    y_b = base(x_b) + sum_k scale_bk * up[a_bk] @ (down[a_bk] @ x_b)
+
+Slot 0 of every stack is an all-zero adapter that pads rows using fewer
+adapters than the widest row. Adapters are registered once per pipeline
+and evicted least recently used beyond `multi_lora.max_adapters`.
+"""
+
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Set, Iterator, TYPE_CHECKING
+
+import torch
+import torch.nn.functional as F
+
+from .worker_lora_fusion import LayerKey
+
+if TYPE_CHECKING:
+    from .worker_lora_fusion import LoRAFusionWorker
+
+logger = logging.getLogger(__name__)
+
+# Adapters of one batch row: [(adapter path, scale), ...]
+SampleAdapters = List[Tuple[str, float]]
+
+
+class _BatchContext:
+    """Per-row adapter selection shared by the wrapped layers of one pipeline."""
+
+    def __init__(self):
+        self.index: Optional[torch.Tensor] = None
+        self.scale: Optional[torch.Tensor] = None
+        self.active_slots: Set[int] = set()
+        self._rows: Dict[Tuple[int, torch.device, torch.dtype], Tuple[torch.Tensor, torch.Tensor]] = {}
+
+    def set(self, index: List[List[int]], scale: List[List[float]]) -> None:
+        self.index = torch.tensor(index, dtype=torch.long)
+        self.scale = torch.tensor(scale, dtype=torch.float32)
+        self.active_slots = {slot for row in index for slot in row if slot}
+        self._rows.clear()
+
+    def clear(self) -> None:
+        self.index = self.scale = None
+        self.active_slots = set()
+        self._rows.clear()
+
+    def rows(self, batch_size: int, device: torch.device, dtype: torch.dtype) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Slot index and scale of every row of a layer input.
+
+        Inputs whose batch is a multiple of the sample count (classifier-free
+        guidance concatenates the unconditional and conditional halves)
+        repeat the sample order.
+        """
+        key = (batch_size, device, dtype)
+        cached = self._rows.get(key)
+        if cached is None:
+            samples = self.index.shape[0]
+            if batch_size % samples:
+                raise ValueError(f"A batch of {batch_size} rows does not tile {samples} LoRA samples")
+            repeats = batch_size // samples
+            cached = (self.index.repeat(repeats, 1).to(device), self.scale.repeat(repeats, 1).to(device, dtype))
+            self._rows[key] = cached
+        return cached
+
+
+class MultiLoRALayer(torch.nn.Module):
+    """A Linear or Conv2d layer plus per-row low-rank updates from stacked adapters."""
+
+    def __init__(self, base: torch.nn.Module, context: _BatchContext):
+        super().__init__()
+        self.lora_base = base
+        self.context = context
+        self.conv = isinstance(base, torch.nn.Conv2d)
+        # [slots, rank, in] (conv: [slots, rank, in, kh, kw]) and [slots, out, rank]; buffers so
+        # `.to()` moves them with the base layer, not persistent so state dicts stay unchanged
+        self.register_buffer("down", None, persistent=False)
+        self.register_buffer("up", None, persistent=False)
+        self.slots: Set[int] = set()
+
+    @property
+    def weight(self) -> torch.Tensor:
+        return self.lora_base.weight
+
+    @property
+    def bias(self) -> Optional[torch.Tensor]:
+        return self.lora_base.bias
+
+    def set_slot(self, slot: int, down: torch.Tensor, up: torch.Tensor) -> None:
+        """Store an adapter's down and (alpha-scaled) up weights in a slot, growing the stacks as needed."""
+        weight = self.lora_base.weight
+        down = down.to(weight.device, weight.dtype)
+        up = up.to(weight.device, weight.dtype).flatten(1)
+        if not self.conv:
+            down = down.flatten(1)
+        if down.shape[1:] != weight.shape[1:] or up.shape != (weight.shape[0], down.shape[0]):
+            raise ValueError(f"LoRA weights {tuple(down.shape)} / {tuple(up.shape)} do not fit "
+                             f"a layer of shape {tuple(weight.shape)}")
+        rank = down.shape[0]
+
+        slots = 0 if self.down is None else self.down.shape[0]
+        ranks = 0 if self.down is None else self.down.shape[1]
+        if slot >= slots or rank > ranks:
+            grown_down = weight.new_zeros((max(slots, slot + 1), max(ranks, rank)) + tuple(down.shape[1:]))
+            grown_up = weight.new_zeros((max(slots, slot + 1), up.shape[0], max(ranks, rank)))
+            if self.down is not None:
+                grown_down[:slots, :ranks] = self.down
+                grown_up[:slots, :, :ranks] = self.up
+            self.down, self.up = grown_down, grown_up
+
+        self.down[slot].zero_()
+        self.up[slot].zero_()
+        self.down[slot, :rank] = down
+        self.up[slot, :, :rank] = up
+        self.slots.add(slot)
+
+    def clear_slot(self, slot: int) -> None:
+        """Zero a slot so rows selecting it add nothing."""
+        if slot in self.slots:
+            self.down[slot].zero_()
+            self.up[slot].zero_()
+            self.slots.discard(slot)
+
+    def forward(self, x: torch.Tensor, *args, **kwargs) -> torch.Tensor:
+        output = self.lora_base(x, *args, **kwargs)
+        context = self.context
+        if context.index is None or not (self.slots & context.active_slots):
+            return output
+
+        index, scale = context.rows(x.shape[0], x.device, self.down.dtype)
+        # Gather each row's adapters: [rows, k, rank, ...] and [rows, k, out, rank]
+        down, up = self.down[index], self.up[index]
+        x = x.to(down.dtype)
+        if self.conv:
+            base = self.lora_base
+            rows, width, rank = down.shape[:3]
+            # One grouped convolution applies every row's own down kernels
+            hidden = F.conv2d(x.reshape(1, -1, *x.shape[2:]), down.reshape(rows * width * rank, *down.shape[3:]),
+                              stride=base.stride, padding=base.padding, dilation=base.dilation, groups=rows)
+            hidden = hidden.view(rows, width, rank, *hidden.shape[2:]) * scale[:, :, None, None, None]
+            delta = torch.einsum("bkrhw,bkor->bohw", hidden, up)
+        else:
+            hidden = torch.einsum("b...i,bkri->b...kr", x, down)
+            hidden = hidden * scale.view(scale.shape[0], *([1] * (x.dim() - 2)), scale.shape[1], 1)
+            delta = torch.einsum("b...kr,bkor->b...o", hidden, up)
+        return output + delta.to(output.dtype)
+
+
+@dataclass
+class _MultiLoRAState:
+    """Wrapped layers and registered adapters of one pipeline."""
+    context: _BatchContext
+    layers: Dict[LayerKey, MultiLoRALayer] = field(default_factory=dict)
+    # Held for the whole of a batch: the context and the slots it selects belong to it
+    running: threading.Lock = field(default_factory=threading.Lock)
+    # Adapter path -> slot, least recently used first
+    slots: "OrderedDict[str, int]" = field(default_factory=OrderedDict)
+    slot_layers: Dict[int, List[LayerKey]] = field(default_factory=dict)
+
+
+class MultiLoRAWorker:
+    """
+    Runs batches whose rows use different LoRA adapters without fusing any.
+
+    `batch(pipeline, samples)` is a context manager: pipeline calls inside
+    it give batch row i the adapters `samples[i]`. One batch runs per
+    pipeline at a time; a second `batch` on the same pipeline waits for the
+    first to exit, so async callers must serialize runs per pipeline
+    themselves rather than block the event loop here.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        multi_config = config.get("multi_lora", {})
+        self.enabled = multi_config.get("enabled", True)
+        self.max_adapters = multi_config.get("max_adapters", 16)
+        self.max_adapters_per_sample = multi_config.get("max_adapters_per_sample", 4)
+
+        # Injected by the owner; parses adapter files against pipeline modules
+        self.fusion_worker: Optional["LoRAFusionWorker"] = None
+        self._states: "weakref.WeakKeyDictionary[Any, _MultiLoRAState]" = weakref.WeakKeyDictionary()
+        self._lock = threading.RLock()
+
+        self.stats = {
+            "batches": 0,
+            "samples": 0,
+            "adapters_registered": 0,
+            "adapters_evicted": 0
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize multi-LoRA worker."""
+        try:
+            self.logger.info("Initializing multi-LoRA worker...")
+            self.initialized = True
+            self.logger.info("Multi-LoRA worker initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Multi-LoRA worker initialization failed: {e}")
+            return False
+
+    @contextmanager
+    def batch(self, pipeline: Any, samples: List[SampleAdapters]) -> Iterator[Dict[str, Any]]:
+        """Select per-row adapters for the pipeline calls made inside the block."""
+        samples = [[(str(Path(path).resolve()), float(scale)) for path, scale in sample if scale != 0]
+                   for sample in samples]
+        width = max([len(sample) for sample in samples] + [1])
+        if width > self.max_adapters_per_sample:
+            raise ValueError(f"A sample uses {width} LoRAs; multi_lora.max_adapters_per_sample is "
+                             f"{self.max_adapters_per_sample}")
+
+        with self._lock:
+            state = self._state(pipeline)
+        with state.running:
+            with self._lock:
+                keep = {path for sample in samples for path, _ in sample}
+                index, scale = [], []
+                for sample in samples:
+                    slots = [self.register(pipeline, path, keep) for path, _ in sample]
+                    index.append(slots + [0] * (width - len(slots)))
+                    scale.append([value for _, value in sample] + [0.0] * (width - len(slots)))
+                state.context.set(index, scale)
+                self.stats["batches"] += 1
+                self.stats["samples"] += len(samples)
+            try:
+                yield {
+                    "mode": "heterogeneous",
+                    "samples": len(samples),
+                    "adapters": len(keep),
+                    "wrapped_layers": len(state.layers)
+                }
+            finally:
+                state.context.clear()
+
+    def register(self, pipeline: Any, path: str, keep: Optional[Set[str]] = None) -> int:
+        """Slot of an adapter on a pipeline, wrapping its layers and filling its stacks on first use."""
+        path = str(Path(path).resolve())
+        with self._lock:
+            state = self._state(pipeline)
+            if path in state.slots:
+                state.slots.move_to_end(path)
+                return state.slots[path]
+            if len(state.slots) >= self.max_adapters:
+                self._evict(state, keep or set())
+
+            used = set(state.slots.values())
+            slot = next(slot for slot in range(1, self.max_adapters + 1) if slot not in used)
+            keys = []
+            for layer in self.fusion_worker.adapter_layers(pipeline, path):
+                # Alpha scaling is folded into the up weights once
+                scale = layer.alpha / layer.rank if layer.alpha is not None else 1.0
+                self._wrap(pipeline, state, layer.key).set_slot(slot, layer.down, layer.up * scale)
+                keys.append(layer.key)
+            state.slots[path] = slot
+            state.slot_layers[slot] = keys
+            self.stats["adapters_registered"] += 1
+            return slot
+
+    def release_adapter(self, path: str) -> None:
+        """Clear an adapter's slot on every pipeline."""
+        path = str(Path(path).resolve())
+        with self._lock:
+            for state in self._states.values():
+                if path in state.slots:
+                    self._clear(state, path)
+
+    def detach(self, pipeline: Any) -> None:
+        """Put a pipeline's original layers back."""
+        with self._lock:
+            state = self._states.pop(pipeline, None)
+            if state is None:
+                return
+            for (component, name), wrapped in state.layers.items():
+                self._replace(getattr(pipeline, component), name, wrapped.lora_base)
+
+    def _state(self, pipeline: Any) -> _MultiLoRAState:
+        state = self._states.get(pipeline)
+        if state is None:
+            state = _MultiLoRAState(context=_BatchContext())
+            self._states[pipeline] = state
+        return state
+
+    def _wrap(self, pipeline: Any, state: _MultiLoRAState, key: LayerKey) -> MultiLoRALayer:
+        wrapped = state.layers.get(key)
+        if wrapped is None:
+            component, name = key
+            model = getattr(pipeline, component)
+            wrapped = MultiLoRALayer(model.get_submodule(name), state.context)
+            self._replace(model, name, wrapped)
+            state.layers[key] = wrapped
+        return wrapped
+
+    @staticmethod
+    def _replace(model: torch.nn.Module, name: str, module: torch.nn.Module) -> None:
+        parent_name, _, child_name = name.rpartition(".")
+        setattr(model.get_submodule(parent_name) if parent_name else model, child_name, module)
+
+    def _evict(self, state: _MultiLoRAState, keep: Set[str]) -> None:
+        """Free the least recently used slot not needed by the current or the running batch."""
+        path = next((path for path, slot in state.slots.items()
+                     if path not in keep and slot not in state.context.active_slots), None)
+        if path is None:
+            raise RuntimeError(f"A batch needs more than multi_lora.max_adapters ({self.max_adapters}) LoRAs")
+        self._clear(state, path)
+        self.stats["adapters_evicted"] += 1
+
+    def _clear(self, state: _MultiLoRAState, path: str) -> None:
+        slot = state.slots.pop(path)
+        for key in state.slot_layers.pop(slot, []):
+            state.layers[key].clear_slot(slot)
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get multi-LoRA worker status."""
+        states = list(self._states.values())
+        return {
+            "initialized": self.initialized,
+            "enabled": self.enabled,
+            "max_adapters": self.max_adapters,
+            "max_adapters_per_sample": self.max_adapters_per_sample,
+            "pipelines": len(states),
+            "registered_adapters": sum(len(state.slots) for state in states),
+            "wrapped_layers": sum(len(state.layers) for state in states),
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up multi-LoRA worker resources."""
+        try:
+            self.logger.info("Cleaning up multi-LoRA worker...")
+            for pipeline in list(self._states.keys()):
+                self.detach(pipeline)
+            self.initialized = False
+            self.logger.info("Multi-LoRA worker cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Multi-LoRA worker cleanup error: {e}")
@@ -0,0 +1,415 @@
+"""
+Weight-Only Int8 Quantization for SDXL Workers System
+=====================================================
+
+Opt-in int8 weights for the UNet and text encoders on CPU-only nodes and
+memory-constrained devices. Linear and conv weights are stored as int8
+with one symmetric scale per output channel and dequantized to the
+activation dtype inside each layer's forward; activations, biases and
+norms stay in floating point. Weights take half the memory of fp16 (a
+quarter of fp32) at the cost of a dequantize per layer per step.
+
+Quantized weights are cached on disk keyed by the source weights file and
+component, so re-quantizing a model after a restart or a reload only
+reads the cached int8 tensors.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+import torch
+import torch.nn.functional as F
+
+from .worker_tiered_cache import measure_nbytes
+
+try:
+    import safetensors.torch
+    SAFETENSORS_AVAILABLE = True
+except ImportError:
+    SAFETENSORS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_VERSION = 1
+QUANTIZED_COMPONENTS = ("unet", "text_encoder", "text_encoder_2")
+# First and last UNet convolutions are small and disproportionately sensitive to weight error
+DEFAULT_SKIP_MODULES = ("conv_in", "conv_out")
+
+
+def quantize_weight(weight: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Symmetric per-output-channel int8 quantization; returns (int8 weight, float32 scales)."""
+    flat = weight.detach().float().reshape(weight.shape[0], -1)
+    scale = flat.abs().amax(dim=1).clamp_min(1e-8) / 127.0
+    quantized = torch.round(flat / scale[:, None]).clamp_(-127, 127).to(torch.int8)
+    return quantized.reshape(weight.shape), scale
+
+
+def dequantize_weight(weight_int8: torch.Tensor, weight_scale: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+    """Floating point weight of an int8 weight and its per-channel scales."""
+    shape = (-1,) + (1,) * (weight_int8.dim() - 1)
+    return weight_int8.to(dtype) * weight_scale.to(dtype).view(shape)
+
+
+class QuantizedLinear(torch.nn.Module):
+    """nn.Linear with an int8 weight, dequantized on the fly."""
+
+    def __init__(self, weight_int8: torch.Tensor, weight_scale: torch.Tensor, bias: Optional[torch.Tensor]):
+        super().__init__()
+        self.in_features = weight_int8.shape[1]
+        self.out_features = weight_int8.shape[0]
+        self.register_buffer("weight_int8", weight_int8)
+        self.register_buffer("weight_scale", weight_scale)
+        self.bias = torch.nn.Parameter(bias.detach(), requires_grad=False) if bias is not None else None
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return F.linear(x, dequantize_weight(self.weight_int8, self.weight_scale, x.dtype), self.bias)
+
+    def extra_repr(self) -> str:
+        return f"in_features={self.in_features}, out_features={self.out_features}, bias={self.bias is not None}, int8"
+
+
+class QuantizedConv2d(torch.nn.Module):
+    """nn.Conv2d with an int8 weight, dequantized on the fly."""
+
+    def __init__(self, conv: torch.nn.Conv2d, weight_int8: torch.Tensor, weight_scale: torch.Tensor):
+        super().__init__()
+        self.in_channels = conv.in_channels
+        self.out_channels = conv.out_channels
+        self.kernel_size = conv.kernel_size
+        self.stride = conv.stride
+        self.padding = conv.padding
+        self.dilation = conv.dilation
+        self.groups = conv.groups
+        self.register_buffer("weight_int8", weight_int8)
+        self.register_buffer("weight_scale", weight_scale)
+        self.bias = torch.nn.Parameter(conv.bias.detach(), requires_grad=False) if conv.bias is not None else None
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        weight = dequantize_weight(self.weight_int8, self.weight_scale, x.dtype)
+        return F.conv2d(x, weight, self.bias, self.stride, self.padding, self.dilation, self.groups)
+
+    def extra_repr(self) -> str:
+        return (f"{self.in_channels}, {self.out_channels}, kernel_size={self.kernel_size}, "
+                f"stride={self.stride}, padding={self.padding}, int8")
+
+
+def unet_step_inputs(unet: torch.nn.Module, batch_size: int = 1, latent_size: int = 64,
+                     latent_width: Optional[int] = None) -> Dict[str, Any]:
+    """Deterministic inputs for one UNet denoising step, SDXL added conditioning included."""
+    config = unet.config
+    latent_width = latent_width or latent_size
+    generator = torch.Generator().manual_seed(0)
+    hidden_dim = config.cross_attention_dim
+    if isinstance(hidden_dim, (list, tuple)):
+        hidden_dim = hidden_dim[0]
+    inputs: Dict[str, Any] = {
+        "sample": torch.randn(batch_size, config.in_channels, latent_size, latent_width, generator=generator),
+        "timestep": torch.full((batch_size,), 500, dtype=torch.long),
+        "encoder_hidden_states": torch.randn(batch_size, 77, hidden_dim, generator=generator)
+    }
+    if getattr(config, "addition_embed_type", None) == "text_time":
+        text_embeds_dim = config.projection_class_embeddings_input_dim - 6 * config.addition_time_embed_dim
+        height, width = latent_size * 8, latent_width * 8
+        inputs["added_cond_kwargs"] = {
+            "text_embeds": torch.randn(batch_size, text_embeds_dim, generator=generator),
+            "time_ids": torch.tensor([[height, width, 0, 0, height, width]] * batch_size, dtype=torch.float32)
+        }
+    return inputs
+
+
+def text_encoder_inputs(encoder: torch.nn.Module, batch_size: int = 1) -> Dict[str, Any]:
+    """Deterministic token ids for one text encoder forward pass."""
+    generator = torch.Generator().manual_seed(0)
+    return {"input_ids": torch.randint(0, encoder.config.vocab_size, (batch_size, 77), generator=generator)}
+
+
+def output_difference(reference: torch.Tensor, candidate: torch.Tensor) -> Dict[str, float]:
+    """Error metrics of a quantized output against the reference output."""
+    reference = reference.detach().float().flatten()
+    candidate = candidate.detach().float().flatten()
+    difference = candidate - reference
+    return {
+        "max_abs_error": difference.abs().max().item(),
+        "mean_abs_error": difference.abs().mean().item(),
+        "relative_l2_error": (difference.norm() / reference.norm().clamp_min(1e-12)).item(),
+        "cosine_similarity": F.cosine_similarity(reference, candidate, dim=0).item()
+    }
+
+
+def _output_tensor(output: Any) -> torch.Tensor:
+    """Main tensor of a module output (diffusers/transformers output classes or tuples)."""
+    if isinstance(output, torch.Tensor):
+        return output
+    for attribute in ("sample", "last_hidden_state"):
+        value = getattr(output, attribute, None)
+        if isinstance(value, torch.Tensor):
+            return value
+    return output[0]
+
+
+def move_inputs(value: Any, device: torch.device, dtype: torch.dtype) -> Any:
+    """Move nested inputs to a device, casting floating point tensors to dtype."""
+    if isinstance(value, torch.Tensor):
+        return value.to(device, dtype) if value.is_floating_point() else value.to(device)
+    if isinstance(value, dict):
+        return {key: move_inputs(item, device, dtype) for key, item in value.items()}
+    return value
+
+
+class Int8WeightQuantizer:
+    """
+    Replaces the linear and conv layers of model components with int8 weight-only layers.
+
+    `quantize_model` quantizes the UNet and text encoders of a pipeline (or
+    a bare module) in place and reports memory saved and, when asked, the
+    step latency change and output error against the unquantized module.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        quantization_config = config.get("weight_quantization", {})
+        self.cache_enabled = quantization_config.get("cache_enabled", True)
+        self.cache_dir = Path(quantization_config.get(
+            "cache_dir", os.path.join(tempfile.gettempdir(), "sdxl_int8_cache")
+        ))
+        # Layers with fewer weights gain little and cost a dequantize per step
+        self.min_weight_numel = quantization_config.get("min_weight_numel", 4096)
+        self.skip_modules = tuple(quantization_config.get("skip_modules", DEFAULT_SKIP_MODULES))
+        self.benchmark_runs = quantization_config.get("benchmark_runs", 3)
+
+        self.stats = {"quantized_components": 0, "quantized_layers": 0, "cache_hits": 0, "bytes_saved": 0}
+
+    async def initialize(self) -> bool:
+        """Initialize int8 weight quantizer."""
+        try:
+            self.logger.info("Initializing int8 weight quantizer...")
+            self.initialized = True
+            self.logger.info("Int8 weight quantizer initialized successfully")
+            return True
+        except Exception as e:
+            self.logger.error(f"Int8 weight quantizer initialization failed: {e}")
+            return False
+
+    def cache_key(self, path: Optional[str], component: str) -> Optional[str]:
+        """Disk cache key of a component loaded from `path`; None when the source is unknown."""
+        if not path or not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        identity = (f"{QUANTIZATION_VERSION}:{Path(path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}:"
+                    f"{component}:{self.min_weight_numel}:{','.join(self.skip_modules)}")
+        return hashlib.blake2b(identity.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _cache_file(self, cache_key: str) -> Path:
+        """Disk cache file of a cache key."""
+        return self.cache_dir / f"{cache_key}.safetensors"
+
+    def _quantizable(self, name: str, module: torch.nn.Module) -> bool:
+        """Whether a layer is replaced by its int8 counterpart."""
+        if not isinstance(module, (torch.nn.Linear, torch.nn.Conv2d)):
+            return False
+        if isinstance(module, torch.nn.Conv2d) and module.padding_mode != "zeros":
+            return False
+        if module.weight.device.type == "meta" or module.weight.numel() < self.min_weight_numel:
+            return False
+        return not any(name == skip or name.startswith(skip + ".") for skip in self.skip_modules)
+
+    def quantize_module(self, module: torch.nn.Module, cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Replace the eligible layers of a module with int8 layers, in place.
+
+        Int8 weights are read from the disk cache when `cache_key` has an
+        entry and written to it otherwise.
+        """
+        start_time = time.perf_counter()
+        bytes_before = measure_nbytes(module)
+        cached: Dict[str, torch.Tensor] = {}
+        cache_file = self._cache_file(cache_key) if cache_key and self.cache_enabled else None
+        if cache_file is not None and cache_file.exists() and SAFETENSORS_AVAILABLE:
+            cached = safetensors.torch.load_file(str(cache_file))
+
+        targets = [(name, child) for name, child in module.named_modules() if name and self._quantizable(name, child)]
+        computed: Dict[str, torch.Tensor] = {}
+        for name, layer in targets:
+            if f"{name}.weight_int8" in cached and cached[f"{name}.weight_int8"].shape == layer.weight.shape:
+                weight_int8, weight_scale = cached[f"{name}.weight_int8"], cached[f"{name}.weight_scale"]
+            else:
+                weight_int8, weight_scale = quantize_weight(layer.weight)
+                computed[f"{name}.weight_int8"] = weight_int8.cpu()
+                computed[f"{name}.weight_scale"] = weight_scale.cpu()
+            device = layer.weight.device
+            weight_int8, weight_scale = weight_int8.to(device), weight_scale.to(device)
+            if isinstance(layer, torch.nn.Linear):
+                replacement = QuantizedLinear(weight_int8, weight_scale, layer.bias)
+            else:
+                replacement = QuantizedConv2d(layer, weight_int8, weight_scale)
+            parent_name, _, child_name = name.rpartition(".")
+            setattr(module.get_submodule(parent_name) if parent_name else module, child_name, replacement)
+
+        if cache_file is not None and computed and SAFETENSORS_AVAILABLE:
+            self._write_cache(cache_file, {**cached, **computed})
+
+        bytes_after = measure_nbytes(module)
+        self.stats["quantized_layers"] += len(targets)
+        self.stats["cache_hits"] += int(bool(cached) and not computed)
+        self.stats["bytes_saved"] += bytes_before - bytes_after
+        return {
+            "quantized_layers": len(targets),
+            "from_cache": bool(cached) and not computed,
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "memory_saved_mb": (bytes_before - bytes_after) / (1024 * 1024),
+            "quantize_seconds": time.perf_counter() - start_time
+        }
+
+    def _write_cache(self, cache_file: Path, tensors: Dict[str, torch.Tensor]) -> None:
+        """Write quantized weights to the disk cache (atomic replace)."""
+        temp_name = None
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # A unique temporary file per write, so concurrent quantizations never share one
+            descriptor, temp_name = tempfile.mkstemp(dir=cache_file.parent, prefix=f".{cache_file.name}.", suffix=".tmp")
+            os.close(descriptor)
+            safetensors.torch.save_file(tensors, temp_name, metadata={"format": "int8_weight_only"})
+            os.replace(temp_name, cache_file)
+        except Exception as e:
+            self.logger.warning(f"Could not cache quantized weights in {cache_file}: {e}")
+            if temp_name is not None and os.path.exists(temp_name):
+                os.unlink(temp_name)
+
+    def quantize_model(self, model: Any, components: Optional[List[str]] = None, path: Optional[str] = None,
+                       evaluate: bool = False, latent_size: int = 64) -> Dict[str, Any]:
+        """
+        Quantize the UNet and text encoders of a pipeline, or a bare module.
+
+        Args:
+            model: Diffusers pipeline or a single module
+            components: Pipeline attributes to quantize (UNet and text encoders by default)
+            path: Weights file or directory the model was loaded from (disk cache key)
+            evaluate: Run one step before and after quantizing and compare outputs and latency
+            latent_size: Latent resolution of the UNet evaluation step
+
+        Returns:
+            {component: report}
+        """
+        if isinstance(model, torch.nn.Module):
+            targets = {(components or ["model"])[0]: model}
+        else:
+            targets = {
+                component: getattr(model, component)
+                for component in (components or QUANTIZED_COMPONENTS)
+                if isinstance(getattr(model, component, None), torch.nn.Module)
+            }
+
+        reports = {}
+        for component, module in targets.items():
+            inputs = reference = None
+            if evaluate:
+                try:
+                    inputs = self._sample_inputs(component, module, latent_size)
+                    reference = self._run(module, inputs)
+                except Exception as e:
+                    self.logger.warning(f"Cannot evaluate {component} before quantizing: {e}")
+
+            report = self.quantize_module(module, self.cache_key(path, component))
+            if reference is not None:
+                quantized = self._run(module, inputs)
+                report.update({
+                    "reference_dtype": str(reference["dtype"]),
+                    "reference_step_ms": reference["step_ms"],
+                    "quantized_step_ms": quantized["step_ms"],
+                    "step_latency_change": quantized["step_ms"] / reference["step_ms"] - 1.0,
+                    "output_difference": output_difference(reference["output"], quantized["output"])
+                })
+            reports[component] = report
+            self.stats["quantized_components"] += 1
+            self.logger.info(
+                f"Quantized {component} to int8: {report['quantized_layers']} layers, "
+                f"{report['memory_saved_mb']:.0f}MB saved"
+            )
+        return reports
+
+    def requantizing_reloader(self, reloader: Callable[[], Any], components: Optional[List[str]],
+                              path: Optional[str]) -> Callable[[], Any]:
+        """Wrap a tiered cache reloader so reloaded components come back quantized."""
+        def reload() -> Any:
+            loaded = reloader()
+            if isinstance(loaded, dict):
+                return self.quantize_state_dict(loaded, self.cache_key(path, (components or ["model"])[0]))
+            self.quantize_model(loaded, components, path)
+            return loaded
+        return reload
+
+    def quantize_state_dict(self, state_dict: Dict[str, torch.Tensor], cache_key: Optional[str]) -> Dict[str, torch.Tensor]:
+        """State dict of the quantized module, from a float state dict and the cached int8 weights."""
+        cache_file = self._cache_file(cache_key) if cache_key else None
+        if cache_file is None or not cache_file.exists():
+            raise FileNotFoundError("No cached int8 weights to rebuild the quantized state dict from")
+        cached = safetensors.torch.load_file(str(cache_file))
+        quantized = dict(state_dict)
+        for key, tensor in cached.items():
+            layer = key.rsplit(".", 1)[0]
+            quantized.pop(f"{layer}.weight", None)
+            quantized[key] = tensor
+        return quantized
+
+    @staticmethod
+    def _sample_inputs(component: str, module: torch.nn.Module, latent_size: int) -> Dict[str, Any]:
+        """Evaluation inputs for a component."""
+        if component == "unet" or hasattr(module.config, "cross_attention_dim"):
+            return unet_step_inputs(module, latent_size=latent_size)
+        return text_encoder_inputs(module)
+
+    def _run(self, module: torch.nn.Module, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Output and mean step latency of a module, after one warmup pass."""
+        reference = next(module.parameters(), None)
+        if reference is None:
+            reference = next(module.buffers())
+        device = reference.device
+        dtype = reference.dtype if reference.is_floating_point() else torch.float32
+        inputs = move_inputs(inputs, device, dtype)
+
+        with torch.inference_mode():
+            module(**inputs)
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            start_time = time.perf_counter()
+            for _ in range(self.benchmark_runs):
+                output = module(**inputs)
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            step_ms = (time.perf_counter() - start_time) * 1000 / self.benchmark_runs
+        return {"output": _output_tensor(output).float().cpu(), "step_ms": step_ms, "dtype": dtype}
+
+    def estimate_savings(self, nbytes: int, dtype_bytes: int = 2) -> int:
+        """Bytes saved by int8 weights for `nbytes` of weights stored at `dtype_bytes` per value."""
+        if dtype_bytes <= 1:
+            return 0
+        return int(nbytes * (1 - 1 / dtype_bytes))
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get int8 weight quantizer status."""
+        return {
+            "initialized": self.initialized,
+            "cache_dir": str(self.cache_dir),
+            "cache_enabled": self.cache_enabled,
+            "min_weight_numel": self.min_weight_numel,
+            "skip_modules": list(self.skip_modules),
+            "stats": dict(self.stats)
+        }
+
+    async def cleanup(self) -> None:
+        """Clean up int8 weight quantizer resources."""
+        try:
+            self.logger.info("Cleaning up int8 weight quantizer...")
+            self.initialized = False
+            self.logger.info("Int8 weight quantizer cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Int8 weight quantizer cleanup error: {e}")
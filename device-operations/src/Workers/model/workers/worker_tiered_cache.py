@@ -0,0 +1,560 @@
+"""
+Tiered Model Cache for SDXL Workers System
+==========================================
+
+One cache for model components across three tiers: device memory,
+pinned host memory and disk. A component on the disk tier keeps its
+module structure on the meta device and is re-materialized through its
+reloader, normally a memory-mapped safetensors load, so it costs no
+resident memory until it is needed again.
+
+Sizes are measured from the tensors a component actually holds. When a
+tier goes over budget the entry with the lowest priority is demoted one
+tier. Priorities follow GreedyDual-Size-Frequency: access count times
+the measured cost of bringing the component back, per GB, plus an aging
+clock that rises to the priority of every demoted entry so components
+that stop being used lose their advantage over time.
+
+Promotion from host to device runs in a worker thread on a dedicated
+CUDA copy stream; the event loop and the compute stream keep running
+while weights are transferred.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Callable, Iterator
+
+import psutil
+import torch
+
+logger = logging.getLogger(__name__)
+
+TIER_DEVICE = "device"
+TIER_HOST = "host"
+TIER_DISK = "disk"
+TIERS = (TIER_DEVICE, TIER_HOST, TIER_DISK)
+
+# Used until a transfer of the component itself has been measured
+DEFAULT_HOST_TO_DEVICE_GBPS = 12.0
+DEFAULT_DISK_GBPS = 1.5
+
+# Returns the component again (a module, or a state dict for the module kept on the meta device)
+ComponentReloader = Callable[[], Any]
+
+
+def _iter_tensors(value: Any) -> Iterator[torch.Tensor]:
+    """Tensors held by a tensor, a state dict or a module."""
+    if isinstance(value, torch.Tensor):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_tensors(item)
+    elif hasattr(value, "parameters"):
+        yield from value.parameters()
+        yield from value.buffers()
+
+
+def measure_nbytes(value: Any) -> int:
+    """Bytes actually held by a component's tensors; tied or shared tensors count once."""
+    seen = set()
+    total = 0
+    for tensor in _iter_tensors(value):
+        if tensor.device.type == "meta":
+            continue
+        key = (tensor.data_ptr(), tensor.numel(), tensor.dtype)
+        if key in seen:
+            continue
+        seen.add(key)
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def estimate_transfer_seconds(nbytes: int, gbps: float) -> float:
+    """Transfer time of `nbytes` at a bandwidth in GB/s."""
+    return nbytes / (gbps * 1024 ** 3)
+
+
+def gdsf_priority(hits: int, reload_seconds: float, nbytes: int, clock: float = 0.0) -> float:
+    """GreedyDual-Size-Frequency priority: reload seconds per GB, weighted by use, plus the aging clock."""
+    return clock + max(hits, 1) * reload_seconds / max(nbytes / 1024 ** 3, 1e-6)
+
+
+def _move(value: Any, device: Any, non_blocking: bool = False) -> Any:
+    """Move a tensor, state dict or module to a device (modules move in place)."""
+    if isinstance(value, torch.Tensor):
+        return value.to(device, non_blocking=non_blocking)
+    if isinstance(value, dict):
+        return {name: _move(item, device, non_blocking) for name, item in value.items()}
+    return value.to(device, non_blocking=non_blocking)
+
+
+def _pin(value: Any) -> Any:
+    """Page-lock the host memory of a tensor, state dict or module."""
+    if isinstance(value, torch.Tensor):
+        return value if value.is_pinned() else value.pin_memory()
+    if isinstance(value, dict):
+        return {name: _pin(item) for name, item in value.items()}
+    value._apply(lambda tensor: tensor if tensor.is_pinned() else tensor.pin_memory())
+    return value
+
+
+@dataclass
+class CacheEntry:
+    """A component held by the tiered cache."""
+    name: str
+    value: Any
+    tier: str
+    nbytes: int
+    reloader: Optional[ComponentReloader] = None
+    path: Optional[str] = None
+    hits: int = 0
+    last_access: float = field(default_factory=time.monotonic)
+    promote_seconds: Optional[float] = None  # measured host -> device transfer
+    reload_seconds: Optional[float] = None   # measured disk -> host materialization
+    priority: float = 0.0
+    holds: int = 0
+    transfer_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        """Validate entry."""
+        if self.tier not in TIERS:
+            raise ValueError(f"tier must be one of {TIERS}, got {self.tier}")
+        if self.nbytes < 0:
+            raise ValueError(f"nbytes must be non-negative, got {self.nbytes}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize entry without its value."""
+        return {
+            "name": self.name,
+            "tier": self.tier,
+            "size_mb": self.nbytes / (1024 * 1024),
+            "path": self.path,
+            "hits": self.hits,
+            "idle_seconds": time.monotonic() - self.last_access,
+            "promote_seconds": self.promote_seconds,
+            "reload_seconds": self.reload_seconds,
+            "priority": self.priority,
+            "held": self.holds > 0,
+            "reloadable": self.reloader is not None
+        }
+
+
+class TieredModelCache:
+    """
+    Device / pinned host / disk cache of model components with cost-aware eviction.
+
+    Components are registered with `put`, used through `get` (or awaited
+    with `get_async`) and, while a pipeline runs on them, protected from
+    eviction with `hold` / `release`.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.initialized = False
+
+        cache_config = config.get("tiered_cache", {})
+        self.enabled = cache_config.get("enabled", True)
+        default_device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = torch.device(cache_config.get("device", config.get("device", default_device)))
+        self.device_budget_mb: Optional[float] = cache_config.get("device_budget_mb")
+        self.host_budget_mb: Optional[float] = cache_config.get("host_budget_mb")
+        self.device_budget_fraction = cache_config.get("device_budget_fraction", 0.85)
+        self.host_budget_fraction = cache_config.get("host_budget_fraction", 0.5)
+        self.pin_host_memory = cache_config.get("pin_host_memory", True)
+
+        self.entries: Dict[str, CacheEntry] = {}
+        self._clock = 0.0
+        self._lock = threading.RLock()
+        self._copy_stream = None
+        self._pending: Dict[str, "asyncio.Task"] = {}
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "promotions": 0,
+            "demotions": 0,
+            "reloads": 0,
+            "dropped": 0,
+            "bytes_promoted": 0,
+            "bytes_demoted": 0
+        }
+
+    async def initialize(self) -> bool:
+        """Initialize tiered model cache."""
+        try:
+            self.logger.info("Initializing tiered model cache...")
+            if self.device.type == "cuda" and torch.cuda.is_available():
+                self._copy_stream = torch.cuda.Stream(device=self.device)
+                if self.device_budget_mb is None:
+                    _, total = torch.cuda.mem_get_info(self.device)
+                    self.device_budget_mb = total * self.device_budget_fraction / (1024 * 1024)
+            if self.host_budget_mb is None:
+                self.host_budget_mb = psutil.virtual_memory().total * self.host_budget_fraction / (1024 * 1024)
+            if self.device_budget_mb is None:
+                # Device is the host: both tiers share system memory
+                self.device_budget_mb = self.host_budget_mb
+            self.initialized = True
+            self.logger.info(
+                f"Tiered model cache initialized successfully (device {self.device_budget_mb:.0f}MB, "
+                f"host {self.host_budget_mb:.0f}MB)"
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"Tiered model cache initialization failed: {e}")
+            return False
+
+    @property
+    def _pins_host_memory(self) -> bool:
+        """Whether host tier memory is page-locked (only useful for CUDA copies)."""
+        return self.pin_host_memory and self._copy_stream is not None
+
+    def put(self, name: str, value: Any, tier: str = TIER_DEVICE, reloader: Optional[ComponentReloader] = None,
+            path: Optional[str] = None, load_seconds: Optional[float] = None) -> CacheEntry:
+        """
+        Register a component and place it on a tier.
+
+        Args:
+            name: Cache key
+            value: Module, state dict or tensor
+            tier: Tier to place the component on
+            reloader: Rebuilds the component after it was demoted to disk;
+                without one, demotion past the host tier drops the entry
+            path: Weights file the component was loaded from
+            load_seconds: Measured time the caller took to load the component
+
+        Returns:
+            The cache entry
+        """
+        if tier not in TIERS:
+            raise ValueError(f"tier must be one of {TIERS}, got {tier}")
+        with self._lock:
+            if name in self.entries:
+                self.remove(name)
+            entry = CacheEntry(
+                name=name,
+                value=value,
+                tier=TIER_HOST,
+                nbytes=measure_nbytes(value),
+                reloader=reloader,
+                path=path,
+                reload_seconds=load_seconds
+            )
+            self.entries[name] = entry
+            self._touch(entry)
+            if tier == TIER_DISK:
+                self._demote(entry, TIER_DISK)
+            elif tier == TIER_HOST:
+                self._place_on_host(entry)
+            else:
+                entry.holds += 1
+        if tier == TIER_DEVICE:
+            try:
+                with entry.transfer_lock:
+                    self._promote(entry)
+            finally:
+                with self._lock:
+                    entry.holds -= 1
+        return entry
+
+    def get(self, name: str) -> Optional[Any]:
+        """Component on the device, promoting it synchronously if needed; None if unknown."""
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._touch(entry)
+            if entry.tier == TIER_DEVICE:
+                self.stats["hits"] += 1
+                return entry.value
+            # Not evictable while it moves; the cache lock is not held during the transfer
+            entry.holds += 1
+        try:
+            with entry.transfer_lock:
+                self._promote(entry)
+        finally:
+            with self._lock:
+                entry.holds -= 1
+        return entry.value
+
+    async def get_async(self, name: str) -> Optional[Any]:
+        """Component on the device; promotion runs in a worker thread without blocking the event loop."""
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is not None and entry.tier == TIER_DEVICE:
+                self.stats["hits"] += 1
+                self._touch(entry)
+                return entry.value
+        task = self.prefetch(name)
+        if task is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        return await task
+
+    def prefetch(self, name: str) -> Optional["asyncio.Task"]:
+        """Start promoting a component to the device; concurrent callers share one transfer."""
+        with self._lock:
+            if name not in self.entries:
+                return None
+            task = self._pending.get(name)
+            if task is None or task.done():
+                task = asyncio.get_running_loop().create_task(asyncio.to_thread(self.get, name))
+                task.add_done_callback(lambda _, key=name: self._pending.pop(key, None))
+                self._pending[name] = task
+            return task
+
+    def hold(self, name: str) -> Optional[Any]:
+        """Get a component on the device and protect it from eviction until `release`."""
+        with self._lock:
+            value = self.get(name)
+            if value is not None:
+                self.entries[name].holds += 1
+            return value
+
+    def release(self, name: str) -> None:
+        """Drop one hold on a component."""
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is not None and entry.holds > 0:
+                entry.holds -= 1
+
+    def refresh(self, name: str,
+                wrap_reloader: Optional[Callable[[ComponentReloader], ComponentReloader]] = None) -> Optional[CacheEntry]:
+        """Re-measure a component changed in place (e.g. quantized), optionally wrapping its reloader."""
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                return None
+            if entry.tier != TIER_DISK:
+                entry.nbytes = measure_nbytes(entry.value)
+            if wrap_reloader is not None and entry.reloader is not None:
+                entry.reloader = wrap_reloader(entry.reloader)
+            return entry
+
+    def demote(self, name: str, tier: str = TIER_HOST) -> bool:
+        """Move a component down to a lower tier."""
+        if tier not in TIERS:
+            raise ValueError(f"tier must be one of {TIERS}, got {tier}")
+        with self._lock:
+            entry = self.entries.get(name)
+            if entry is None or TIERS.index(tier) <= TIERS.index(entry.tier):
+                return False
+            self._demote(entry, tier)
+            return True
+
+    def remove(self, name: str) -> int:
+        """Forget a component; returns the resident bytes it held."""
+        with self._lock:
+            entry = self.entries.pop(name, None)
+            if entry is None:
+                return 0
+            freed = entry.nbytes if entry.tier != TIER_DISK else 0
+            entry.value = None
+            return freed
+
+    def rebalance(self) -> Dict[str, Any]:
+        """Demote entries until every tier is within budget (e.g. after budgets changed)."""
+        with self._lock:
+            before = {tier: self._used(tier) for tier in TIERS}
+            demotions = self.stats["demotions"]
+            self._make_room(TIER_DEVICE, 0)
+            self._make_room(TIER_HOST, 0)
+            return {
+                "demotions": self.stats["demotions"] - demotions,
+                "freed_device_mb": (before[TIER_DEVICE] - self._used(TIER_DEVICE)) / (1024 * 1024),
+                "freed_host_mb": (before[TIER_HOST] - self._used(TIER_HOST)) / (1024 * 1024)
+            }
+
+    def free_bytes(self, tier: str) -> float:
+        """Budget left on a tier before anything would have to be demoted."""
+        with self._lock:
+            return max(0.0, self._budget(tier) - self._used(tier))
+
+    def contains(self, name: str, tier: Optional[str] = None) -> bool:
+        """Whether a component is cached (on a given tier or better)."""
+        with self._lock:
+            entry = self.entries.get(name)
+            return entry is not None and (tier is None or TIERS.index(entry.tier) <= TIERS.index(tier))
+
+    def eviction_order(self, tier: Optional[str] = None) -> List[str]:
+        """Entry names from first to last to be demoted."""
+        with self._lock:
+            candidates = [entry for entry in self.entries.values() if tier is None or entry.tier == tier]
+            candidates.sort(key=lambda entry: (entry.holds > 0, self._priority(entry)))
+            return [entry.name for entry in candidates]
+
+    def _touch(self, entry: CacheEntry) -> None:
+        """Record an access and refresh the entry's priority."""
+        entry.hits += 1
+        entry.last_access = time.monotonic()
+        entry.priority = self._priority(entry)
+
+    def _priority(self, entry: CacheEntry) -> float:
+        """Priority against the current clock, from the cost of reloading the entry after a demotion."""
+        promote = entry.promote_seconds
+        if promote is None:
+            promote = estimate_transfer_seconds(entry.nbytes, DEFAULT_HOST_TO_DEVICE_GBPS)
+        if entry.tier == TIER_DEVICE:
+            cost = promote
+        else:
+            reload_seconds = entry.reload_seconds
+            if reload_seconds is None:
+                reload_seconds = estimate_transfer_seconds(entry.nbytes, DEFAULT_DISK_GBPS)
+            cost = reload_seconds + promote
+        return gdsf_priority(entry.hits, cost, entry.nbytes, self._clock)
+
+    def _budget(self, tier: str) -> float:
+        """Budget of a tier in bytes."""
+        if tier == TIER_DEVICE:
+            return (self.device_budget_mb or 0) * 1024 * 1024
+        if tier == TIER_HOST:
+            return (self.host_budget_mb or 0) * 1024 * 1024
+        return float("inf")
+
+    def _used(self, tier: str) -> int:
+        """Measured bytes resident on a tier."""
+        return sum(entry.nbytes for entry in self.entries.values() if entry.tier == tier)
+
+    def _make_room(self, tier: str, nbytes: int, exclude: Optional[str] = None) -> bool:
+        """Demote the lowest priority entries of a tier until `nbytes` more fit."""
+        budget = self._budget(tier)
+        while self._used(tier) + nbytes > budget:
+            candidates = [
+                entry for entry in self.entries.values()
+                if entry.tier == tier and entry.holds == 0 and entry.name != exclude
+            ]
+            if not candidates:
+                return False
+            victim = min(candidates, key=self._priority)
+            # Aging: everything still cached now competes against the victim's priority
+            self._clock = max(self._clock, self._priority(victim))
+            self._demote(victim, TIERS[TIERS.index(tier) + 1])
+        return True
+
+    def _promote(self, entry: CacheEntry) -> None:
+        """Bring an entry to the device, reloading it from disk first if needed."""
+        if entry.tier == TIER_DISK:
+            self._reload(entry)
+        if entry.tier == TIER_DEVICE:
+            return
+        with self._lock:
+            if not self._make_room(TIER_DEVICE, entry.nbytes, exclude=entry.name):
+                self.logger.warning(f"Promoting {entry.name} exceeds the device budget; every device entry is held")
+
+        start_time = time.perf_counter()
+        if self._copy_stream is not None:
+            with torch.cuda.stream(self._copy_stream):
+                entry.value = _move(entry.value, self.device, non_blocking=self._pins_host_memory)
+                done = torch.cuda.Event()
+                done.record(self._copy_stream)
+            done.synchronize()
+        else:
+            entry.value = _move(entry.value, self.device)
+        entry.promote_seconds = time.perf_counter() - start_time
+
+        with self._lock:
+            entry.tier = TIER_DEVICE
+            entry.priority = self._priority(entry)
+            self.stats["promotions"] += 1
+            self.stats["bytes_promoted"] += entry.nbytes
+        self.logger.debug(f"Promoted {entry.name} to {self.device} in {entry.promote_seconds * 1000:.1f}ms")
+
+    def _place_on_host(self, entry: CacheEntry) -> None:
+        """Move an entry to (pinned) host memory."""
+        self._make_room(TIER_HOST, entry.nbytes, exclude=entry.name)
+        entry.value = _move(entry.value, "cpu")
+        if self._pins_host_memory:
+            entry.value = _pin(entry.value)
+        entry.tier = TIER_HOST
+        entry.priority = self._priority(entry)
+
+    def _demote(self, entry: CacheEntry, tier: str) -> None:
+        """Move an entry down to `tier`; entries that cannot be reloaded are dropped instead of going to disk."""
+        self.stats["demotions"] += 1
+        self.stats["bytes_demoted"] += entry.nbytes
+        if tier == TIER_HOST:
+            self._place_on_host(entry)
+            self.logger.debug(f"Demoted {entry.name} to host memory")
+            return
+
+        if entry.reloader is None:
+            self.entries.pop(entry.name, None)
+            entry.value = None
+            self.stats["dropped"] += 1
+            self.logger.info(f"Dropped {entry.name} from the model cache (no reloader)")
+            return
+        if isinstance(entry.value, torch.nn.Module):
+            # Keep the module structure; its storage is released and reloaded from disk
+            entry.value = entry.value.to("meta")
+        else:
+            entry.value = None
+        entry.tier = TIER_DISK
+        entry.priority = self._priority(entry)
+        self.logger.debug(f"Demoted {entry.name} to disk")
+
+    def _reload(self, entry: CacheEntry) -> None:
+        """Materialize a disk tier entry in host memory through its reloader."""
+        with self._lock:
+            self._make_room(TIER_HOST, entry.nbytes, exclude=entry.name)
+        start_time = time.perf_counter()
+        loaded = entry.reloader()
+        if isinstance(entry.value, torch.nn.Module) and isinstance(loaded, dict):
+            entry.value.load_state_dict(loaded, assign=True)
+        else:
+            entry.value = loaded
+        entry.reload_seconds = time.perf_counter() - start_time
+        with self._lock:
+            entry.nbytes = measure_nbytes(entry.value)
+            entry.tier = TIER_HOST
+            self.stats["reloads"] += 1
+        self.logger.debug(f"Reloaded {entry.name} from disk in {entry.reload_seconds * 1000:.1f}ms")
+
+    def get_entries(self) -> List[Dict[str, Any]]:
+        """Entries in eviction order."""
+        with self._lock:
+            return [self.entries[name].to_dict() for name in self.eviction_order()]
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get tiered model cache status."""
+        with self._lock:
+            tiers = {
+                tier: {
+                    "entries": sum(1 for entry in self.entries.values() if entry.tier == tier),
+                    "used_mb": self._used(tier) / (1024 * 1024),
+                    "budget_mb": None if tier == TIER_DISK else self._budget(tier) / (1024 * 1024)
+                }
+                for tier in TIERS
+            }
+            return {
+                "initialized": self.initialized,
+                "enabled": self.enabled,
+                "device": str(self.device),
+                "pinned_host_memory": self._pins_host_memory,
+                "tiers": tiers,
+                "pending_promotions": len(self._pending),
+                "stats": dict(self.stats)
+            }
+
+    async def cleanup(self) -> None:
+        """Clean up tiered model cache resources."""
+        try:
+            self.logger.info("Cleaning up tiered model cache...")
+            for task in list(self._pending.values()):
+                task.cancel()
+            self._pending.clear()
+            with self._lock:
+                for entry in self.entries.values():
+                    entry.value = None
+                self.entries.clear()
+                self._clock = 0.0
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            self.initialized = False
+            self.logger.info("Tiered model cache cleanup complete")
+        except Exception as e:
+            self.logger.error(f"Tiered model cache cleanup error: {e}")
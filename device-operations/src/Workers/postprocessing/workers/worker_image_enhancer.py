@@ -7,10 +7,13 @@ Worker for advanced image enhancement and post-processing operations.
 """
 
 import logging
+import time
 import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
 from typing import Dict, Any, Optional
 
+from ...utilities.timing import record_stages
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,6 +66,7 @@ class ImageEnhancerWorker:
                 raise ValueError(f"Unsupported enhancement type: {enhancement_type}")
             
             # Process enhancement
+            start_time = time.perf_counter()
             if enhancement_type == "auto_contrast":
                 result_image = self.auto_contrast(input_image, **enhancement_params)
             elif enhancement_type == "color_correction":
@@ -76,12 +80,14 @@ class ImageEnhancerWorker:
                 result_image = EnhancementPresets.apply_preset(self, input_image, preset_name)
             else:
                 raise ValueError(f"Enhancement type {enhancement_type} not implemented")
+            processing_time = time.perf_counter() - start_time
+            record_stages({"enhance": processing_time})
             
             return {
                 "type": "enhancement",
                 "enhancement_type": enhancement_type,
                 "output_image": result_image,
-                "processing_time": 1.0,
+                "processing_time": processing_time,
                 "status": "completed"
             }
             
@@ -14,6 +14,8 @@ from typing import List, Dict, Any, Optional, Union, Tuple
 import hashlib
 import time
 
+from ...utilities.timing import record_stages
+
 logger = logging.getLogger(__name__)
 
 
@@ -134,6 +136,7 @@ class SafetyCheckerWorker:
             self.total_flagged += len(results["unsafe_indices"])
             
             results["processing_time"] = time.time() - start_time
+            record_stages({"safety_check": results["processing_time"]})
             
             self.logger.info("Processed %s images, %s flagged", len(images), len(results['unsafe_indices']))
             return results
@@ -7,11 +7,14 @@ Dedicated worker for image upscaling operations with Real-ESRGAN and ESRGAN supp
 """
 
 import logging
+import time
 import torch
 import gc
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
+from ...utilities.timing import record_stages
+
 # Optional dependencies for upscaling
 try:
     import cv2
@@ -95,12 +98,15 @@ class UpscalerWorker:
                 raise ValueError(f"Unsupported upscaling method: {method}")
             
             # Process upscaling
+            start_time = time.perf_counter()
             if method == "realesrgan" and UPSCALER_DEPS_AVAILABLE:
                 result = await self._upscale_realesrgan(input_image, scale_factor)
             elif method == "esrgan" and UPSCALER_DEPS_AVAILABLE:
                 result = await self._upscale_esrgan(input_image, scale_factor)
             else:
                 result = await self._upscale_basic(input_image, scale_factor, method)
+            processing_time = time.perf_counter() - start_time
+            record_stages({"upscale": processing_time})
             
             return {
                 "type": "upscale",
@@ -110,7 +116,7 @@ class UpscalerWorker:
                 "output_image": result.get("output_image"),
                 "original_size": result.get("original_size"),
                 "upscaled_size": result.get("upscaled_size"),
-                "processing_time": result.get("processing_time", 1.0),
+                "processing_time": processing_time,
                 "status": "completed"
             }
             
@@ -138,7 +144,6 @@ class UpscalerWorker:
                 "output_image": image,  # Would be upscaled image
                 "original_size": original_size,
                 "upscaled_size": upscaled_size,
-                "processing_time": 3.0,
                 "model_used": model_name
             }
             
@@ -162,7 +167,6 @@ class UpscalerWorker:
                 "output_image": image,  # Would be upscaled image
                 "original_size": original_size,
                 "upscaled_size": upscaled_size,
-                "processing_time": 2.5,
                 "model_used": "ESRGAN"
             }
             
@@ -192,7 +196,6 @@ class UpscalerWorker:
                 "output_image": image,  # Would be upscaled image
                 "original_size": original_size,
                 "upscaled_size": upscaled_size,
-                "processing_time": 0.5,
                 "interpolation": interpolation
             }
             
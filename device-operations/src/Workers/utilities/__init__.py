@@ -12,10 +12,26 @@ from .dml_patch import (
     get_directml_device_count,
     distribute_models_across_gpus
 )
+from .timing import (
+    RequestTimer,
+    TimingHistograms,
+    current_timer,
+    request_timer,
+    timed_stage,
+    summarize_samples
+)
+from .files import atomic_write_text
 
 __all__ = [
     "DirectMLPatch",
     "get_directml_device", 
     "get_directml_device_count",
-    "distribute_models_across_gpus"
+    "distribute_models_across_gpus",
+    "RequestTimer",
+    "TimingHistograms",
+    "current_timer",
+    "request_timer",
+    "timed_stage",
+    "summarize_samples",
+    "atomic_write_text"
 ]
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+File Helpers for SDXL Workers System
+====================================
+
+Atomic replacement of files and directories that other components (or
+other processes) may be reading or writing at the same time.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Union
+
+PathLike = Union[str, Path]
+
+
+def atomic_write_text(path: PathLike, text: str, encoding: str = "utf-8") -> None:
+    """
+    Replace a file's contents atomically.
+
+    The text goes to a uniquely named temporary file in the same directory,
+    which is then renamed over `path`, so concurrent writers never share a
+    temporary file and readers see either the old or the new contents.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w", encoding=encoding) as handle:
+            handle.write(text)
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,226 @@
+"""
+Request Timing for SDXL Workers System
+======================================
+
+Lightweight per-request stage timing. A `RequestTimer` is bound to the
+current request through a context variable, so instructors, interfaces,
+managers and workers (including code running in `asyncio.to_thread`) can
+record stages without threading the timer through every signature.
+Finished timings are aggregated into per-stage histograms.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+_current_timer: "contextvars.ContextVar[Optional[RequestTimer]]" = contextvars.ContextVar(
+    "request_timer", default=None
+)
+
+# Histogram bucket upper bounds in milliseconds (roughly log-spaced)
+DEFAULT_BUCKETS_MS: List[float] = [
+    1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000
+]
+
+
+class RequestTimer:
+    """
+    Monotonic stage timings of a single request.
+
+    Stages accumulate durations (a stage entered twice adds up); marks
+    record the offset of a point in time from the start of the request.
+    """
+
+    def __init__(self, request_type: str = ""):
+        self.request_type = request_type
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> None:
+        """Record the current offset from the request start."""
+        with self._lock:
+            self.marks.setdefault(name, time.perf_counter() - self.start)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add a measured duration to a stage."""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + max(0.0, seconds)
+
+    def record_stages(self, stages: Dict[str, float], prefix: str = "") -> None:
+        """Add several measured stage durations at once."""
+        for name, seconds in stages.items():
+            self.record(f"{prefix}{name}", seconds)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block as a stage."""
+        stage_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - stage_start)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize as the `timings` block of a response (milliseconds)."""
+        with self._lock:
+            return {
+                "total_ms": self.elapsed * 1000,
+                "stages_ms": {name: seconds * 1000 for name, seconds in self.stages.items()},
+                "marks_ms": {name: seconds * 1000 for name, seconds in self.marks.items()}
+            }
+
+
+def current_timer() -> Optional[RequestTimer]:
+    """Timer of the request being processed, if any."""
+    return _current_timer.get()
+
+
+@contextmanager
+def request_timer(request_type: str = "") -> Iterator[RequestTimer]:
+    """Bind a new timer to the current request context."""
+    timer = RequestTimer(request_type)
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[None]:
+    """Time a block as a stage of the current request; a no-op outside a request."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def mark(name: str) -> None:
+    """Mark a point in time on the current request, if any."""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.mark(name)
+
+
+def record_stages(stages: Dict[str, float], prefix: str = "") -> None:
+    """Add measured stage durations to the current request, if any."""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.record_stages(stages, prefix)
+
+
+def summarize_samples(samples_ms: List[float]) -> Dict[str, Any]:
+    """Exact statistics of a small set of latency samples (linear interpolation between ranks)."""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"count": 0}
+
+    def percentile(percentile: float) -> float:
+        position = percentile / 100 * (len(ordered) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered),
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1],
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99)
+    }
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.buckets_ms = list(buckets_ms or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+
+    def observe(self, value_ms: float) -> None:
+        """Add one observation."""
+        self.counts[bisect.bisect_left(self.buckets_ms, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.min_ms = value_ms if self.min_ms is None else min(self.min_ms, value_ms)
+        self.max_ms = value_ms if self.max_ms is None else max(self.max_ms, value_ms)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Estimate a percentile as the upper bound of the bucket containing it."""
+        if self.count == 0:
+            return None
+        rank = percentile / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return self.buckets_ms[index] if index < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize histogram."""
+        return {
+            "count": self.count,
+            "sum_ms": self.sum_ms,
+            "mean_ms": self.sum_ms / self.count if self.count else None,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": [
+                {"le_ms": bound, "count": count}
+                for bound, count in zip(self.buckets_ms + [float("inf")], self.counts)
+            ]
+        }
+
+
+class TimingHistograms:
+    """Per request type, per stage histograms of finished request timings."""
+
+    def __init__(self, buckets_ms: Optional[List[float]] = None):
+        self.buckets_ms = buckets_ms
+        self.histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, timer: RequestTimer) -> None:
+        """Aggregate a finished request timer."""
+        timings = timer.to_dict()
+        with self._lock:
+            stages = self.histograms.setdefault(timer.request_type or "unknown", {})
+            stages.setdefault("total", Histogram(self.buckets_ms)).observe(timings["total_ms"])
+            for name, value_ms in timings["stages_ms"].items():
+                stages.setdefault(name, Histogram(self.buckets_ms)).observe(value_ms)
+
+    def snapshot(self, request_type: Optional[str] = None) -> Dict[str, Any]:
+        """Histograms of all (or one) request types."""
+        with self._lock:
+            return {
+                name: {stage: histogram.to_dict() for stage, histogram in stages.items()}
+                for name, stages in self.histograms.items()
+                if request_type is None or name == request_type
+            }
+
+    def reset(self) -> None:
+        """Drop all aggregated timings."""
+        with self._lock:
+            self.histograms.clear()